@@ -29,6 +29,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerfiladoMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -38,6 +39,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Perfilado de vistas (core.middleware.PerfiladoMiddleware): desactivado por defecto
+PERFILADO_ACTIVO = os.getenv('PERFILADO_ACTIVO', '').lower() in ('1', 'true')
+
+# Caché del ranking de la flota (core.flota). Sin CACHES se usa el LocMemCache,
+# que es de cada proceso: la invalidación al guardar una Maquina solo alcanza al
+# worker que la guardó y los demás sirven el ranking anterior hasta que vence
+# este tiempo (segundos). Con varios workers, configurar CACHES con un backend
+# compartido (Redis, Memcached) para que la invalidación sea inmediata.
+RANKING_FLOTA_CACHE_TIMEOUT = int(os.getenv('RANKING_FLOTA_CACHE_TIMEOUT', '60'))
+
 ROOT_URLCONF = 'automatizacion.urls'
 
 TEMPLATES = [
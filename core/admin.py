@@ -1,3 +1,26 @@
+import tempfile
+
 from django.contrib import admin
+from django.http import FileResponse
+
+from .estados_cuenta import generar_estados_cuenta
+from .models import Cliente
+
+
+@admin.register(Cliente)
+class ClienteAdmin(admin.ModelAdmin):
+    list_display = ('id', 'nombre', 'city', 'terminos_contractuales', 'average_days_to_pay')
+    search_fields = ('id', 'nombre')
+    actions = ['descargar_estados_cuenta']
 
-# Register your models here.
+    @admin.action(description='Descargar estados de cuenta (PDF en ZIP)')
+    def descargar_estados_cuenta(self, request, queryset):
+        archivo = tempfile.TemporaryFile()
+        generados = generar_estados_cuenta(archivo, clientes=queryset.values('pk'))
+        if not generados:
+            archivo.close()
+            self.message_user(request, 'Los clientes seleccionados no tienen registros.', level='warning')
+            return None
+        archivo.seek(0)
+        return FileResponse(archivo, as_attachment=True, filename='estados_cuenta.zip',
+                            content_type='application/zip')
@@ -0,0 +1,334 @@
+"""
+Benchmarks de tesorería y maquinaria con datos sintéticos reproducibles.
+
+generar_datos(escala, semilla) crea clientes, proveedores, registros con sus
+obligaciones y pagos, máquinas y análisis; ejecutar_benchmarks() mide cada caso
+(tiempo y número de consultas) y retorna un diccionario serializable a JSON
+para comparar resultados entre commits (ver el comando benchmark).
+"""
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
+
+import django
+import numpy as np
+import openpyxl
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from . import views
+from .finance import analisis_par, analisis_portafolio
+from .finance.amortizacion import _terminos
+from .importacion import HOJAS, importar_excel
+from .models import (
+    AnalisisComparativo, Cliente, Maquina, Obligacion, PagoCliente, PagoProveedor, Proveedor, Registro,
+)
+
+ESCALAS = {'1k': 1000, '10k': 10000, '100k': 100000}
+LOTE = 2000
+FECHA_BASE = date(2025, 1, 1)
+METODOS_PAGO = [clave for clave, _ in Registro.METODO_PAGO_CHOICES]
+
+
+def _monto(rng, minimo, maximo):
+    return Decimal(rng.randint(minimo * 100, maximo * 100)) / 100
+
+
+# ==================== GENERADORES ====================
+
+def generar_clientes(rng, cantidad):
+    return [
+        Cliente(id=f'BC{i:06d}', nombre=f'Cliente {i}', city=rng.choice(['Bogotá', 'Medellín', 'Cali', 'Houston']),
+                terminos_contractuales=rng.choice([15, 30, 45, 60, 90]))
+        for i in range(cantidad)
+    ]
+
+
+def generar_proveedores(rng, cantidad):
+    return [
+        Proveedor(id=f'BP{i:06d}', nombre=f'Proveedor {i}', contacto=f'Contacto {i}',
+                  terminos_pago=rng.choice([15, 30, 45, 60]))
+        for i in range(cantidad)
+    ]
+
+
+def generar_registros(rng, cantidad, clientes, proveedores):
+    """
+    Registros con 1 a 3 obligaciones, 0 a 3 pagos de cliente y 0 a 2 pagos por
+    obligación. Retorna (registros, obligaciones, pagos_cliente, pagos_proveedor);
+    los pagos a proveedor llevan en _numero_obligacion la obligación que pagan.
+    """
+    registros, obligaciones, pagos_cliente, pagos_proveedor = [], [], [], []
+    dias_periodo = (date.today() - FECHA_BASE).days + 60
+
+    for i in range(cantidad):
+        cliente = rng.choice(clientes)
+        entrega = FECHA_BASE + timedelta(days=rng.randint(0, dias_periodo))
+        valor = _monto(rng, 500, 50000)
+        registro = Registro(
+            id=f'BR{i:07d}', cliente=cliente, fecha_entrega_cliente=entrega, valor_cobrar_cliente=valor,
+            fecha_limite_cobro=entrega + timedelta(days=cliente.terminos_contractuales),
+        )
+        registros.append(registro)
+
+        numero_pago = 0
+        for numero in range(1, rng.randint(1, 3) + 1):
+            proveedor = rng.choice(proveedores)
+            recepcion = entrega - timedelta(days=rng.randint(0, 30))
+            valor_pagar = (valor * Decimal(rng.uniform(0.1, 0.4))).quantize(Decimal('0.01'))
+            obligaciones.append(Obligacion(
+                registro=registro, numero=numero, proveedor=proveedor, proveedor_nombre=proveedor.nombre,
+                valor_pagar=valor_pagar, fecha_recepcion=recepcion,
+                fecha_vencimiento=recepcion + timedelta(days=proveedor.terminos_pago),
+                descripcion='Materia prima',
+            ))
+            for _ in range(rng.randint(0, 2)):
+                numero_pago += 1
+                pago = PagoProveedor(
+                    registro=registro, numero=numero_pago, monto=(valor_pagar / 2).quantize(Decimal('0.01')),
+                    fecha_pago=recepcion + timedelta(days=rng.randint(0, 60)), metodo_pago=rng.choice(METODOS_PAGO),
+                )
+                pago._numero_obligacion = numero
+                pagos_proveedor.append(pago)
+
+        for numero in range(1, rng.randint(0, 3) + 1):
+            pagos_cliente.append(PagoCliente(
+                registro=registro, numero=numero, monto=(valor * Decimal(rng.uniform(0.1, 0.35))).quantize(Decimal('0.01')),
+                fecha_pago=entrega + timedelta(days=rng.randint(0, 150)), metodo_pago=rng.choice(METODOS_PAGO),
+            ))
+
+    return registros, obligaciones, pagos_cliente, pagos_proveedor
+
+
+def generar_maquinas(rng, cantidad):
+    maquinas = []
+    for i in range(cantidad):
+        tipo = 'Defender' if i % 2 == 0 else 'Challenger'
+        precio = _monto(rng, 20000, 500000)
+        maquinas.append(Maquina(
+            tipo=tipo, nombre=f'{tipo} {i}', purchase_price=precio,
+            acquisition_cost=precio if tipo == 'Defender' else None,
+            installation_and_training_cost=(precio * Decimal('0.05')).quantize(Decimal('0.01')),
+            setup_costs=(precio * Decimal('0.02')).quantize(Decimal('0.01')),
+            current_resale_value=(precio * Decimal(rng.uniform(0.2, 0.6))).quantize(Decimal('0.01')),
+            salvage_value=(precio * Decimal('0.1')).quantize(Decimal('0.01')),
+            annual_maintenance_labor_parts=_monto(rng, 1000, 40000),
+            operator_labor_cost=_monto(rng, 12, 45),
+            monthly_operating_hours=rng.choice([120, 160, 200, 320]),
+            useful_life=rng.choice([60, 84, 120, 150, 180, 240]),
+            criticality_ranking=rng.randint(1, 5),
+            availability=rng.uniform(80, 99),
+        ))
+    return maquinas
+
+
+def generar_analisis(rng, cantidad, defenders, challengers):
+    return [
+        AnalisisComparativo(
+            nombre_analisis=f'Benchmark {i}', defender=rng.choice(defenders), challenger=challenger,
+            wacc=Decimal(rng.choice(['0.08', '0.10', '0.12', '0.14'])), tax_rate=Decimal('0.21'),
+            financing_rate=Decimal(rng.choice(['5.5', '7.5', '9.0'])), financing_months=rng.choice([36, 60, 120, 240]),
+            monto_financiado=challenger.costo_inicial_total,
+        )
+        for i, challenger in enumerate(rng.choice(challengers) for _ in range(cantidad))
+    ]
+
+
+def generar_datos(escala, semilla=42):
+    """
+    Crea los datos sintéticos de una escala (número de registros). Las demás
+    entidades se derivan de ella: un cliente por cada 20 registros, un proveedor
+    por cada 50, una máquina por cada 10 y un análisis por cada 100.
+    """
+    rng = random.Random(semilla)
+    clientes = generar_clientes(rng, max(escala // 20, 1))
+    proveedores = generar_proveedores(rng, max(escala // 50, 1))
+    Cliente.objects.bulk_create(clientes, batch_size=LOTE)
+    Proveedor.objects.bulk_create(proveedores, batch_size=LOTE)
+
+    registros, obligaciones, pagos_cliente, pagos_proveedor = generar_registros(rng, escala, clientes, proveedores)
+    Registro.objects.bulk_create(registros, batch_size=LOTE)
+    Obligacion.objects.bulk_create(obligaciones, batch_size=LOTE)
+    PagoCliente.objects.bulk_create(pagos_cliente, batch_size=LOTE)
+
+    ids_obligacion = {
+        (registro_id, numero): pk
+        for pk, registro_id, numero in Obligacion.objects.filter(registro__id__startswith='BR').values_list(
+            'pk', 'registro_id', 'numero')
+    }
+    for pago in pagos_proveedor:
+        pago.obligacion_id = ids_obligacion[(pago.registro_id, pago._numero_obligacion)]
+    PagoProveedor.objects.bulk_create(pagos_proveedor, batch_size=LOTE)
+    Registro.objects.filter(id__startswith='BR').recalcular_saldos(batch_size=LOTE)
+
+    maquinas = generar_maquinas(rng, max(escala // 10, 2))
+    Maquina.objects.bulk_create(maquinas, batch_size=LOTE)
+    defenders = [m for m in maquinas if m.tipo == 'Defender']
+    challengers = [m for m in maquinas if m.tipo == 'Challenger']
+    analisis = generar_analisis(rng, max(escala // 100, 1), defenders, challengers)
+    AnalisisComparativo.objects.bulk_create(analisis, batch_size=LOTE)
+
+    return {
+        'clientes': len(clientes),
+        'proveedores': len(proveedores),
+        'registros': len(registros),
+        'obligaciones': len(obligaciones),
+        'pagos_cliente': len(pagos_cliente),
+        'pagos_proveedor': len(pagos_proveedor),
+        'maquinas': len(maquinas),
+        'analisis': len(analisis),
+    }
+
+
+def libro_importacion(rng, cantidad, prefijo):
+    """Libro Excel de importación completa con 'cantidad' registros nuevos"""
+    libro = openpyxl.Workbook(write_only=True)
+    filas = {nombre: [] for nombre in HOJAS}
+    filas['Clientes'].append((f'{prefijo}C', f'Cliente {prefijo}', 'Bogotá', None, None, 30, 0, True, ''))
+    filas['Proveedores'].append((f'{prefijo}P', f'Proveedor {prefijo}', 'Ana', None, None, 30, '', True, ''))
+    for i in range(cantidad):
+        registro_id = f'{prefijo}{i:07d}'
+        entrega = FECHA_BASE + timedelta(days=rng.randint(0, 300))
+        valor = float(_monto(rng, 500, 50000))
+        filas['Registros'].append((registro_id, f'{prefijo}C', entrega, valor, 'pendiente', ''))
+        filas['Obligaciones'].append((registro_id, f'{prefijo}P', '', round(valor * 0.3, 2),
+                                      entrega + timedelta(days=30), 'Materia prima', ''))
+        filas['Pagos_Cliente'].append((registro_id, round(valor * 0.5, 2), entrega + timedelta(days=20),
+                                       'transferencia', '', ''))
+        filas['Pagos_Proveedor'].append((registro_id, 1, round(valor * 0.1, 2), entrega + timedelta(days=10),
+                                         'transferencia', '', ''))
+    for nombre, contenido in filas.items():
+        hoja = libro.create_sheet(nombre)
+        hoja.append(list(HOJAS[nombre]))
+        for fila in contenido:
+            hoja.append(list(fila))
+    archivo = BytesIO()
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+# ==================== CASOS ====================
+
+def _casos(escala, semilla):
+    """Casos a medir: nombre -> (preparación opcional, función medida)"""
+    fabrica = RequestFactory()
+    rng = random.Random(semilla + 1)
+    registro_ids = list(Registro.objects.order_by().values_list('id', flat=True)[:1000])
+    analisis = list(AnalisisComparativo.objects.select_related('defender', 'challenger'))
+    maquinas = list(Maquina.objects.all())
+    defenders = [m for m in maquinas if m.tipo == 'Defender']
+    challengers = [m for m in maquinas if m.tipo == 'Challenger']
+    importaciones = iter(range(1_000_000))
+
+    def flujo_caja():
+        registro_id = rng.choice(registro_ids)
+        views.calcular_flujo_caja(fabrica.get('/calcular-flujo/', {'registro_id': registro_id}))
+
+    def preparar_importacion():
+        return libro_importacion(rng, max(escala // 10, 10), f'BI{next(importaciones):03d}-')
+
+    def tabla_amortizacion():
+        _terminos.cache_clear()
+        for a in analisis:
+            for _ in a.filas_amortizacion():
+                pass
+
+    def analisis_pares():
+        for a in analisis:
+            analisis_par(a.defender, a.challenger, a.wacc, a.tax_rate)
+
+    return {
+        'cuentas_por_cobrar_api': (None, lambda: views.cuentas_por_cobrar_api(fabrica.get('/api/cuentas-por-cobrar/'))),
+        'cuentas_por_pagar_api': (None, lambda: views.cuentas_por_pagar_api(
+            fabrica.get('/api/cuentas-por-pagar/', {'page_size': 100, 'sort': '-netBalance'}))),
+        'calcular_flujo_caja': (None, flujo_caja),
+        'flujo_caja_cartera_api': (None, lambda: views.flujo_caja_cartera_api(
+            fabrica.get('/api/flujo-caja-cartera/', {'agrupacion': 'semana'}))),
+        'cargar_excel_completo': (preparar_importacion, importar_excel),
+        'generar_tabla_amortizacion': (None, tabla_amortizacion),
+        'calcular_analisis_completo': (None, analisis_pares),
+        'analisis_portafolio': (None, lambda: analisis_portafolio(defenders, challengers, 0.12, 0.21)),
+    }
+
+
+def medir(funcion, preparar=None, repeticiones=5):
+    """Tiempos (ms) y consultas de 'repeticiones' ejecuciones de funcion"""
+    tiempos = []
+    consultas = 0
+    for _ in range(repeticiones):
+        argumentos = (preparar(),) if preparar else ()
+        with CaptureQueriesContext(connection) as contexto:
+            inicio = time.perf_counter()
+            funcion(*argumentos)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        consultas = max(consultas, len(contexto))
+    return {
+        'repeticiones': repeticiones,
+        'min_ms': round(min(tiempos), 3),
+        'mediana_ms': round(statistics.median(tiempos), 3),
+        'promedio_ms': round(statistics.fmean(tiempos), 3),
+        'max_ms': round(max(tiempos), 3),
+        'consultas': consultas,
+    }
+
+
+def ejecutar_benchmarks(escala, semilla=42, repeticiones=5, casos=None):
+    """Genera los datos de la escala en la base actual y mide los casos pedidos"""
+    inicio = time.perf_counter()
+    datos = generar_datos(escala, semilla)
+    generacion_s = time.perf_counter() - inicio
+
+    resultados = []
+    for nombre, (preparar, funcion) in _casos(escala, semilla).items():
+        if casos and nombre not in casos:
+            continue
+        resultados.append({'caso': nombre, 'escala': escala, **medir(funcion, preparar, repeticiones)})
+
+    return {'escala': escala, 'datos': datos, 'generacion_s': round(generacion_s, 3), 'casos': resultados}
+
+
+def metadatos(semilla, repeticiones):
+    """Entorno de la ejecución, para comparar resultados entre commits y máquinas"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {
+        'commit': commit or None,
+        'fecha': date.today().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'numpy': np.__version__,
+        'base_datos': connection.vendor,
+        'plataforma': platform.platform(),
+        'semilla': semilla,
+        'repeticiones': repeticiones,
+    }
+
+
+def comparar(actual, referencia):
+    """Variación porcentual de la mediana de cada caso respecto a una ejecución anterior"""
+    base = {(c['caso'], c['escala']): c for r in referencia['resultados'] for c in r['casos']}
+    comparacion = []
+    for resultado in actual['resultados']:
+        for caso in resultado['casos']:
+            anterior = base.get((caso['caso'], caso['escala']))
+            if not anterior or not anterior['mediana_ms']:
+                continue
+            comparacion.append({
+                'caso': caso['caso'],
+                'escala': caso['escala'],
+                'mediana_ms': caso['mediana_ms'],
+                'mediana_ms_referencia': anterior['mediana_ms'],
+                'variacion_pct': round((caso['mediana_ms'] / anterior['mediana_ms'] - 1) * 100, 1),
+                'consultas': caso['consultas'],
+                'consultas_referencia': anterior['consultas'],
+            })
+    return comparacion
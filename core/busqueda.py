@@ -0,0 +1,209 @@
+"""
+Búsqueda y paginación por cursor (keyset) de registros, clientes y máquinas.
+
+Las listas se recorren en un orden fijo que termina en la clave primaria (con
+índice compuesto en cada modelo). El cursor codifica los valores de esa clave de
+orden de la última fila mostrada y la página siguiente se obtiene con
+"WHERE (orden) > (cursor) LIMIT n": el costo no crece con el número de página
+como ocurre con OFFSET.
+
+Los filtros de texto usan icontains. En PostgreSQL la migración
+0014_indices_busqueda crea índices trigram (pg_trgm) sobre UPPER(columna), la
+misma expresión que Django genera para icontains; en SQLite no hay equivalente
+y la consulta sigue funcionando sin ellos.
+"""
+import base64
+import json
+
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.urls import reverse
+
+from .models import Cliente, Maquina, Registro
+
+TAMANO_PAGINA = 50
+TAMANO_BUSQUEDA = 20
+
+# (campo, descendente): cada orden termina en la clave primaria para ser total
+ORDEN_REGISTROS = [('fecha_creacion', True), ('id', False)]
+ORDEN_CLIENTES = [('nombre', False), ('id', False)]
+ORDEN_MAQUINAS = [('nombre', False), ('id', False)]
+
+
+# ==================== CURSOR ====================
+
+def codificar_cursor(valores):
+    texto = json.dumps([v.isoformat() if hasattr(v, 'isoformat') else str(v) for v in valores])
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(modelo, campos, cursor):
+    """Valores (ya convertidos al tipo de cada campo) de un cursor; ValueError si no es válido"""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError('Cursor no válido')
+    if not isinstance(valores, list) or len(valores) != len(campos):
+        raise ValueError('Cursor no válido')
+    try:
+        return [modelo._meta.get_field(campo).to_python(valor) for campo, valor in zip(campos, valores)]
+    except Exception:
+        raise ValueError('Cursor no válido')
+
+
+def _filtro_despues(orden, valores):
+    """Q de las filas posteriores a 'valores' en el orden dado (comparación lexicográfica)"""
+    filtro = Q()
+    iguales = Q()
+    for (campo, descendente), valor in zip(orden, valores):
+        filtro |= iguales & Q(**{f"{campo}__{'lt' if descendente else 'gt'}": valor})
+        iguales &= Q(**{campo: valor})
+    return filtro
+
+
+def pagina_keyset(queryset, orden, cursor=None, tamano=None):
+    """
+    Retorna (items, siguiente_cursor) de la página que sigue a 'cursor' (o la
+    primera si no hay). siguiente_cursor es None en la última página.
+    """
+    tamano = tamano or TAMANO_PAGINA
+    campos = [campo for campo, _ in orden]
+    queryset = queryset.order_by(*[f'-{campo}' if descendente else campo for campo, descendente in orden])
+    if cursor:
+        queryset = queryset.filter(_filtro_despues(orden, decodificar_cursor(queryset.model, campos, cursor)))
+    items = list(queryset[:tamano + 1])
+    siguiente = None
+    if len(items) > tamano:
+        items = items[:tamano]
+        ultimo = items[-1]
+        siguiente = codificar_cursor(
+            [ultimo[campo] if isinstance(ultimo, dict) else getattr(ultimo, campo) for campo in campos]
+        )
+    return items, siguiente
+
+
+# ==================== FILTROS ====================
+
+def estados_cobro_que_coinciden(texto):
+    """Claves de ESTADO_CHOICES cuya clave o etiqueta contiene el texto (filtro exacto e indexable)"""
+    texto = texto.lower()
+    return [clave for clave, etiqueta in Registro.ESTADO_CHOICES
+            if texto in clave.lower() or texto in str(etiqueta).lower()]
+
+
+def filtrar_registros(queryset, texto):
+    if not texto:
+        return queryset
+    return queryset.filter(
+        Q(id__icontains=texto) |
+        Q(cliente__nombre__icontains=texto) |
+        Q(estado_cobro__in=estados_cobro_que_coinciden(texto))
+    )
+
+
+def filtrar_clientes(queryset, texto):
+    if not texto:
+        return queryset
+    return queryset.filter(
+        Q(id__icontains=texto) |
+        Q(nombre__icontains=texto) |
+        Q(city__icontains=texto) |
+        Q(email__icontains=texto)
+    )
+
+
+def filtrar_maquinas(queryset, texto):
+    if not texto:
+        return queryset
+    return queryset.filter(
+        Q(nombre__icontains=texto) |
+        Q(numero_serie__icontains=texto) |
+        Q(equipment_number__icontains=texto)
+    )
+
+
+# ==================== BÚSQUEDA COMBINADA ====================
+
+def _puntaje(texto, campo_clave, campo_nombre):
+    """Coincidencia exacta o por prefijo de la clave, luego prefijo y subcadena del nombre"""
+    return Case(
+        When(**{f'{campo_clave}__iexact': texto}, then=Value(100)),
+        When(**{f'{campo_clave}__istartswith': texto}, then=Value(80)),
+        When(**{f'{campo_nombre}__istartswith': texto}, then=Value(60)),
+        When(**{f'{campo_nombre}__icontains': texto}, then=Value(40)),
+        default=Value(20),
+        output_field=IntegerField(),
+    )
+
+
+def _resultados_registros(texto, tamano):
+    consulta = filtrar_registros(Registro.objects.all(), texto).annotate(
+        puntaje=_puntaje(texto, 'id', 'cliente__nombre')
+    ).order_by('-puntaje', '-fecha_creacion', 'id').values(
+        'id', 'cliente__nombre', 'estado_cobro', 'saldo_pendiente', 'puntaje'
+    )[:tamano]
+    estados = dict(Registro.ESTADO_CHOICES)
+    return [{
+        'tipo': 'registro',
+        'id': fila['id'],
+        'titulo': fila['id'],
+        'detalle': f"{fila['cliente__nombre']} - {estados.get(fila['estado_cobro'], fila['estado_cobro'])}",
+        'puntaje': fila['puntaje'],
+        'url': reverse('registros_editar', args=[fila['id']]),
+    } for fila in consulta]
+
+
+def _resultados_clientes(texto, tamano):
+    consulta = filtrar_clientes(Cliente.objects.all(), texto).annotate(
+        puntaje=_puntaje(texto, 'id', 'nombre')
+    ).order_by('-puntaje', 'nombre', 'id').values('id', 'nombre', 'city', 'puntaje')[:tamano]
+    return [{
+        'tipo': 'cliente',
+        'id': fila['id'],
+        'titulo': fila['nombre'],
+        'detalle': f"{fila['id']} - {fila['city']}",
+        'puntaje': fila['puntaje'],
+        'url': reverse('clientes_editar', args=[fila['id']]),
+    } for fila in consulta]
+
+
+def _resultados_maquinas(texto, tamano):
+    consulta = filtrar_maquinas(Maquina.objects.all(), texto).annotate(
+        puntaje=_puntaje(texto, 'numero_serie', 'nombre')
+    ).order_by('-puntaje', 'nombre', 'id').values('id', 'nombre', 'numero_serie', 'tipo', 'puntaje')[:tamano]
+    return [{
+        'tipo': 'maquina',
+        'id': str(fila['id']),
+        'titulo': fila['nombre'],
+        'detalle': f"{fila['tipo']} - {fila['numero_serie'] or 'Sin serie'}",
+        'puntaje': fila['puntaje'],
+        'url': reverse('editar_maquina', args=[fila['id']]),
+    } for fila in consulta]
+
+
+FUENTES = {
+    'registros': _resultados_registros,
+    'clientes': _resultados_clientes,
+    'maquinas': _resultados_maquinas,
+}
+
+
+def buscar(texto, tipos=None, tamano=TAMANO_BUSQUEDA):
+    """
+    Búsqueda combinada: cada fuente aporta a lo sumo 'tamano' filas ordenadas por
+    puntaje en la base de datos y el resultado es la mezcla de las mejores
+    'tamano' (puntaje, luego el orden de FUENTES y el título).
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        raise ValueError('Ingrese un texto de búsqueda')
+    tipos = tipos or list(FUENTES)
+    invalidos = [tipo for tipo in tipos if tipo not in FUENTES]
+    if invalidos:
+        raise ValueError(f"Tipo no válido: {', '.join(invalidos)}. Use {', '.join(FUENTES)}")
+
+    resultados = []
+    for posicion, tipo in enumerate(FUENTES):
+        if tipo in tipos:
+            resultados.extend((posicion, fila) for fila in FUENTES[tipo](texto, tamano))
+    resultados.sort(key=lambda par: (-par[1]['puntaje'], par[0], par[1]['titulo'].lower()))
+    return [fila for _, fila in resultados[:tamano]]
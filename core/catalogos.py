@@ -0,0 +1,87 @@
+"""
+Catálogos de términos de clientes y proveedores para los formularios de registros.
+
+Los mapas {id: {'nombre', 'terminos'}} se guardan en la caché de Django bajo una
+clave versionada. Guardar o eliminar un Cliente o Proveedor (y las importaciones
+masivas, que no emiten señales) cambia la versión, de modo que la siguiente
+lectura reconstruye el catálogo. La versión también sirve de ETag para el
+endpoint JSON. Con el LocMemCache por defecto la caché es de cada proceso y
+CATALOGOS_CACHE_TIMEOUT acota cuánto puede tardar otro proceso en ver un cambio;
+con un backend compartido (Redis, Memcached) la invalidación es inmediata.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Cliente, Proveedor
+
+CLAVE_VERSION = 'catalogos:version'
+
+# tipo: (modelo, campo de términos en días)
+CATALOGOS = {
+    'clientes': (Cliente, 'terminos_contractuales'),
+    'proveedores': (Proveedor, 'terminos_pago'),
+}
+
+LIMITE_BUSQUEDA = 20
+
+
+def tiempo_cache():
+    return getattr(settings, 'CATALOGOS_CACHE_TIMEOUT', 300)
+
+
+def version():
+    """Versión vigente de los catálogos (se crea si la caché no la tiene)"""
+    actual = cache.get(CLAVE_VERSION)
+    if actual is None:
+        cache.add(CLAVE_VERSION, uuid.uuid4().hex[:16], tiempo_cache())
+        actual = cache.get(CLAVE_VERSION)
+    return actual
+
+
+def invalidar():
+    cache.set(CLAVE_VERSION, uuid.uuid4().hex[:16], tiempo_cache())
+
+
+@receiver([post_save, post_delete], sender=Cliente, dispatch_uid='catalogos_cliente')
+@receiver([post_save, post_delete], sender=Proveedor, dispatch_uid='catalogos_proveedor')
+def _invalidar_por_senal(sender, **kwargs):
+    # Al confirmar la transacción: antes, otro proceso podría reconstruir el
+    # catálogo con los datos viejos bajo la versión nueva
+    transaction.on_commit(invalidar)
+
+
+def terminos():
+    """{'version': ..., 'clientes': {id: {'nombre', 'terminos'}}, 'proveedores': {...}}"""
+    vigente = version()
+    clave = f'catalogos:terminos:{vigente}'
+    datos = cache.get(clave)
+    if datos is None:
+        datos = {'version': vigente}
+        for tipo, (modelo, campo) in CATALOGOS.items():
+            datos[tipo] = {
+                str(pk): {'nombre': nombre, 'terminos': dias}
+                for pk, nombre, dias in modelo.objects.order_by('nombre', 'pk').values_list('pk', 'nombre', campo)
+            }
+        cache.set(clave, datos, tiempo_cache())
+    return datos
+
+
+def buscar(tipo, texto='', limite=LIMITE_BUSQUEDA):
+    """Clientes o proveedores cuyo nombre contiene 'texto' o cuyo ID empieza por él"""
+    if tipo not in CATALOGOS:
+        raise ValueError(f"Tipo no válido: {tipo}. Use {' o '.join(CATALOGOS)}")
+    modelo, campo = CATALOGOS[tipo]
+    consulta = modelo.objects.order_by('nombre', 'pk')
+    texto = (texto or '').strip()
+    if texto:
+        consulta = consulta.filter(Q(nombre__icontains=texto) | Q(pk__istartswith=texto))
+    return [
+        {'id': pk, 'nombre': nombre, 'terminos': dias}
+        for pk, nombre, dias in consulta.values_list('pk', 'nombre', campo)[:limite]
+    ]
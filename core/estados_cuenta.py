@@ -0,0 +1,156 @@
+"""
+Estados de cuenta en PDF por cliente, generados en lote.
+
+Los datos de todos los clientes se leen por adelantado en tres consultas
+(clientes, registros y pagos) y se agrupan en diccionarios simples; el
+renderizado con reportlab, que consume CPU, se reparte entre procesos con
+ProcessPoolExecutor y los PDF resultantes se empaquetan en un ZIP.
+"""
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from io import BytesIO
+
+from django.conf import settings
+from django.utils.html import escape
+from django.utils.text import get_valid_filename
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, Spacer
+
+from .models import Cliente, PagoCliente, Registro
+from .reportes import ESTILOS_PDF, documento_pdf, moneda, tabla_pdf
+
+
+def procesos_por_defecto():
+    return getattr(settings, 'ESTADOS_CUENTA_PROCESOS', None) or os.cpu_count() or 1
+
+
+def datos_estados_cuenta(clientes=None, fecha_corte=None):
+    """
+    Lista de estados de cuenta (uno por cliente con registros), cada uno con sus
+    registros, pagos y totales. 'clientes' es un queryset o lista de IDs opcional.
+    """
+    fecha_corte = fecha_corte or date.today()
+    consulta_clientes = Cliente.objects.order_by('nombre', 'id')
+    consulta_registros = Registro.objects.all()
+    consulta_pagos = PagoCliente.objects.all()
+    if clientes is not None:
+        consulta_clientes = consulta_clientes.filter(pk__in=clientes)
+        ids = consulta_clientes.order_by().values('pk')
+        consulta_registros = consulta_registros.filter(cliente_id__in=ids)
+        consulta_pagos = consulta_pagos.filter(registro__cliente_id__in=ids)
+
+    estados = {
+        cliente['id']: {**cliente, 'fecha_corte': fecha_corte.isoformat(), 'registros': []}
+        for cliente in consulta_clientes.values('id', 'nombre', 'city', 'email')
+    }
+
+    nombres_estado = dict(Registro.ESTADO_CHOICES)
+    registros = {}
+    for registro in consulta_registros.order_by('cliente_id', 'fecha_entrega_cliente', 'id').values(
+        'id', 'cliente_id', 'fecha_entrega_cliente', 'fecha_limite_cobro', 'valor_cobrar_cliente',
+        'total_cobrado', 'saldo_pendiente', 'estado_cobro',
+    ):
+        fecha_limite = registro['fecha_limite_cobro']
+        registros[registro['id']] = item = {
+            'id': registro['id'],
+            'fecha_entrega': registro['fecha_entrega_cliente'].isoformat(),
+            'fecha_limite': fecha_limite.isoformat() if fecha_limite else '',
+            'valor': float(registro['valor_cobrar_cliente']),
+            'cobrado': float(registro['total_cobrado']),
+            'saldo': float(registro['saldo_pendiente']),
+            'vencido': bool(fecha_limite and fecha_limite < fecha_corte and registro['saldo_pendiente'] > 0),
+            'estado': nombres_estado.get(registro['estado_cobro'], registro['estado_cobro']),
+            'pagos': [],
+        }
+        estados[registro['cliente_id']]['registros'].append(item)
+
+    for pago in consulta_pagos.order_by('registro_id', 'fecha_pago', 'numero').values(
+        'registro_id', 'fecha_pago', 'monto', 'metodo_pago', 'referencia'
+    ):
+        registros[pago['registro_id']]['pagos'].append({
+            'fecha': pago['fecha_pago'].isoformat() if pago['fecha_pago'] else '',
+            'monto': float(pago['monto']),
+            'metodo': pago['metodo_pago'],
+            'referencia': pago['referencia'],
+        })
+
+    resultado = []
+    for estado in estados.values():
+        if not estado['registros']:
+            continue
+        estado['totales'] = {
+            'valor': sum(r['valor'] for r in estado['registros']),
+            'cobrado': sum(r['cobrado'] for r in estado['registros']),
+            'saldo': sum(r['saldo'] for r in estado['registros']),
+            'vencido': sum(r['saldo'] for r in estado['registros'] if r['vencido']),
+        }
+        resultado.append(estado)
+    return resultado
+
+
+def nombre_archivo(estado):
+    return get_valid_filename(f"estado_cuenta_{estado['id']}.pdf")
+
+
+def renderizar_estado_cuenta(estado):
+    """Retorna (nombre de archivo, bytes del PDF) del estado de cuenta de un cliente"""
+    estilos = ESTILOS_PDF
+    totales = estado['totales']
+    registros = estado['registros']
+    pagos = [(registro['id'], pago) for registro in registros for pago in registro['pagos']]
+    elementos = [
+        Paragraph(f"Estado de Cuenta - {escape(estado['nombre'])}", estilos['Title']),
+        Paragraph(
+            f"Cliente: <b>{escape(estado['id'])}</b> | Ciudad: {escape(estado['city'])} | "
+            f"Email: {escape(estado['email'] or 'N/A')} | Fecha de corte: {estado['fecha_corte']}",
+            estilos['Normal'],
+        ),
+        Paragraph(
+            f"Total facturado: {moneda(totales['valor'])} | Total cobrado: {moneda(totales['cobrado'])} | "
+            f"Saldo pendiente: <b>{moneda(totales['saldo'])}</b> | Saldo vencido: {moneda(totales['vencido'])}",
+            estilos['Normal'],
+        ),
+        Spacer(1, 0.5 * cm),
+        Paragraph('Registros', estilos['Heading2']),
+        tabla_pdf(
+            ['Registro', 'Entrega', 'Fecha Límite', 'Valor', 'Cobrado', 'Saldo', 'Estado'],
+            [[r['id'], r['fecha_entrega'], r['fecha_limite'], moneda(r['valor']), moneda(r['cobrado']),
+              moneda(r['saldo']), f"{r['estado']} (vencido)" if r['vencido'] else r['estado']]
+             for r in registros]
+            + [['Total', '', '', moneda(totales['valor']), moneda(totales['cobrado']), moneda(totales['saldo']), '']],
+            alinear_derecha=(3, 4, 5),
+        ),
+        Spacer(1, 0.5 * cm),
+        Paragraph('Pagos Recibidos', estilos['Heading2']),
+        tabla_pdf(
+            ['Registro', 'Fecha', 'Monto', 'Método', 'Referencia'],
+            [[registro_id, p['fecha'], moneda(p['monto']), p['metodo'], p['referencia']] for registro_id, p in pagos],
+            alinear_derecha=(2,),
+        ),
+    ]
+    contenido = BytesIO()
+    documento_pdf(contenido, f"Estado de Cuenta {estado['id']}", elementos)
+    return nombre_archivo(estado), contenido.getvalue()
+
+
+def generar_estados_cuenta(destino, clientes=None, fecha_corte=None, procesos=None):
+    """
+    Escribe en 'destino' (ruta o archivo binario) un ZIP con el estado de cuenta
+    en PDF de cada cliente. Con procesos=1 se renderiza en el proceso actual.
+    Retorna el número de estados generados.
+    """
+    estados = datos_estados_cuenta(clientes, fecha_corte)
+    procesos = min(procesos or procesos_por_defecto(), max(len(estados), 1))
+
+    with zipfile.ZipFile(destino, 'w', zipfile.ZIP_DEFLATED) as archivo_zip:
+        if procesos == 1:
+            for nombre, contenido in map(renderizar_estado_cuenta, estados):
+                archivo_zip.writestr(nombre, contenido)
+        else:
+            with ProcessPoolExecutor(max_workers=procesos) as executor:
+                lote = max(len(estados) // (procesos * 4), 1)
+                for nombre, contenido in executor.map(renderizar_estado_cuenta, estados, chunksize=lote):
+                    archivo_zip.writestr(nombre, contenido)
+    return len(estados)
@@ -0,0 +1,109 @@
+"""
+Exportación a Excel (XLSX) de los reportes de antigüedad de cartera.
+
+Los libros se escriben con XlsxWriter en modo constant_memory: cada fila se
+vuelca a disco apenas se escribe, así que el consumo de memoria no depende del
+número de filas. El libro terminado queda en un archivo temporal que la vista
+envía por bloques con FileResponse.
+"""
+import tempfile
+from datetime import date
+
+import xlsxwriter
+
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Tipos de columna: 'texto', 'entero', 'fecha' (ISO 8601) y 'moneda'
+FORMATOS = {
+    'entero': {'num_format': '0'},
+    'fecha': {'num_format': 'yyyy-mm-dd'},
+    'moneda': {'num_format': '#,##0.00'},
+}
+
+
+def columna(encabezado, clave, tipo='texto', ancho=14):
+    return {'encabezado': encabezado, 'clave': clave, 'tipo': tipo, 'ancho': ancho}
+
+
+def _valor(item, col):
+    valor = item.get(col['clave'])
+    if valor is None:
+        return None
+    if col['tipo'] == 'fecha':
+        return date.fromisoformat(valor)
+    return valor
+
+
+def hoja(nombre, columnas, items, titulo=None, totales=True):
+    return {'nombre': nombre, 'columnas': columnas, 'items': items, 'titulo': titulo, 'totales': totales}
+
+
+def _escribir_hoja(libro, formatos, spec):
+    columnas = spec['columnas']
+    ws = libro.add_worksheet(spec['nombre'])
+    fila = 0
+    if spec['titulo']:
+        ws.write_string(fila, 0, spec['titulo'], formatos['negrita'])
+        fila += 2
+    for i, col in enumerate(columnas):
+        ws.set_column(i, i, col['ancho'], formatos.get(col['tipo']))
+        ws.write_string(fila, i, col['encabezado'], formatos['encabezado'])
+    ws.freeze_panes(fila + 1, 0)
+    primera = fila + 1
+
+    totales = [0.0] * len(columnas)
+    for item in spec['items']:
+        fila += 1
+        for i, col in enumerate(columnas):
+            valor = _valor(item, col)
+            if valor is None:
+                continue
+            if col['tipo'] == 'fecha':
+                ws.write_datetime(fila, i, valor, formatos['fecha'])
+            elif col['tipo'] == 'texto':
+                ws.write_string(fila, i, str(valor))
+            else:
+                ws.write_number(fila, i, valor, formatos[col['tipo']])
+                if col['tipo'] == 'moneda':
+                    totales[i] += valor
+
+    if fila >= primera:
+        ws.autofilter(primera - 1, 0, fila, len(columnas) - 1)
+    if spec['totales']:
+        fila += 1
+        ws.write_string(fila, 0, 'Total', formatos['negrita'])
+        for i, col in enumerate(columnas):
+            if col['tipo'] == 'moneda':
+                ws.write_number(fila, i, round(totales[i], 2), formatos['total'])
+
+
+def escribir_libro(archivo, hojas):
+    """
+    Escribe en 'archivo' (ruta o archivo binario) un libro con las hojas dadas
+    (ver hoja()). Cada hoja termina con una fila que suma sus columnas 'moneda',
+    salvo que se cree con totales=False.
+    """
+    libro = xlsxwriter.Workbook(archivo, {'constant_memory': True})
+    formatos = {tipo: libro.add_format(formato) for tipo, formato in FORMATOS.items()}
+    formatos['negrita'] = libro.add_format({'bold': True})
+    formatos['total'] = libro.add_format({**FORMATOS['moneda'], 'bold': True, 'top': 1})
+    formatos['encabezado'] = libro.add_format({'bold': True, 'bg_color': '#E2E8F0', 'border': 1})
+    for spec in hojas:
+        _escribir_hoja(libro, formatos, spec)
+    libro.close()
+
+
+def libro_xlsx(nombre, columnas, items, titulo=None):
+    """
+    Escribe los items (diccionarios) en un libro de una hoja y retorna el archivo
+    temporal abierto y posicionado al inicio. El llamador es responsable de
+    cerrar el archivo.
+    """
+    archivo = tempfile.TemporaryFile()
+    try:
+        escribir_libro(archivo, [hoja(nombre, columnas, items, titulo)])
+    except Exception:
+        archivo.close()
+        raise
+    archivo.seek(0)
+    return archivo
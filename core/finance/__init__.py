@@ -0,0 +1,42 @@
+"""
+Cálculos financieros del análisis de reemplazo de activos.
+"""
+from .amortizacion import filas_amortizacion, pago_mensual, terminos_prestamo
+from .analisis import (
+    analisis_par,
+    analisis_portafolio,
+    eac_vectorizado,
+    evaluar_maquinas,
+    flujos_anuales,
+    parametros_maquinas,
+    resumen_maquina,
+)
+from .mensual import evaluar_mensual, parametros_mensuales, resumen_mensual
+from .ranking import ranking_pares
+from .sensibilidad import tornado
+from .simulacion import leer_distribuciones, parametros_simulacion, simular
+from .vida_economica import curvas_eac, parametros_vida, reemplazo_diferido
+
+__all__ = [
+    'analisis_par',
+    'filas_amortizacion',
+    'analisis_portafolio',
+    'curvas_eac',
+    'eac_vectorizado',
+    'evaluar_mensual',
+    'evaluar_maquinas',
+    'flujos_anuales',
+    'leer_distribuciones',
+    'pago_mensual',
+    'parametros_maquinas',
+    'parametros_mensuales',
+    'parametros_simulacion',
+    'parametros_vida',
+    'ranking_pares',
+    'reemplazo_diferido',
+    'resumen_maquina',
+    'resumen_mensual',
+    'simular',
+    'terminos_prestamo',
+    'tornado',
+]
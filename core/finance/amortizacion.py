@@ -0,0 +1,91 @@
+"""
+Tabla de amortización de cuota fija calculada bajo demanda.
+
+Cada fila se obtiene en forma cerrada a partir del principal, la tasa anual (%)
+y el plazo, de modo que cualquier rango de meses se calcula sin recorrer los
+anteriores ni guardar filas. El saldo después de k pagos es:
+
+    B_k = P·((1+r)^n - (1+r)^k) / ((1+r)^n - 1)      (B_k = P - cuota·k si r = 0)
+
+Los valores se redondean a centavos igual que al guardarlos en TablaAmortizacion,
+por lo que coinciden con la tabla generada mes a mes. Con tasas y plazos extremos
+(p. ej. más de 80 % anual a 50 años) el cálculo mes a mes acumula errores de
+redondeo; ahí la forma cerrada es la exacta.
+"""
+from decimal import Decimal, localcontext
+from functools import lru_cache
+
+CENTAVO = Decimal('0.01')
+
+
+def _decimal(valor):
+    return valor if isinstance(valor, Decimal) else Decimal(str(valor or 0))
+
+
+@lru_cache(maxsize=1024)
+def _terminos(principal, financing_rate, financing_months):
+    """Tasa mensual y cuota fija de un préstamo (en caché por principal, tasa y plazo)"""
+    r = financing_rate / Decimal('100') / Decimal('12')
+    if r == 0:
+        return r, principal / Decimal(str(financing_months))
+    factor = (Decimal('1') + r) ** financing_months
+    return r, principal * (r * factor) / (factor - Decimal('1'))
+
+
+def terminos_prestamo(principal, financing_rate, financing_months):
+    """
+    (tasa mensual, cuota) o None si el préstamo no aplica (plazo o principal nulos).
+    """
+    principal = _decimal(principal)
+    financing_rate = _decimal(financing_rate)
+    financing_months = int(financing_months or 0)
+    if financing_months <= 0 or principal <= 0:
+        return None
+    return _terminos(principal, financing_rate, financing_months)
+
+
+def pago_mensual(principal, financing_rate, financing_months):
+    """Cuota mensual redondeada a centavos (0 si el préstamo no aplica)"""
+    terminos = terminos_prestamo(principal, financing_rate, financing_months)
+    return terminos[1].quantize(CENTAVO) if terminos else Decimal('0.00')
+
+
+def _saldo(principal, r, cuota, pagos, plazo):
+    if r == 0:
+        return principal - cuota * pagos
+    # Forma estable de P·(1+r)^k - cuota·((1+r)^k - 1)/r, que resta dos
+    # términos enormes cuando (1+r)^k crece mucho
+    with localcontext() as contexto:
+        contexto.prec += 10
+        g = Decimal('1') + r
+        saldo = principal * (g ** plazo - g ** pagos) / (g ** plazo - Decimal('1'))
+    return +saldo
+
+
+def filas_amortizacion(principal, financing_rate, financing_months, desde=1, hasta=None):
+    """
+    Genera las filas de los meses desde..hasta (inclusive, limitados al plazo)
+    con mes, balance_inicial, pago_mensual, pago_principal, pago_interes y
+    balance_final.
+    """
+    terminos = terminos_prestamo(principal, financing_rate, financing_months)
+    if terminos is None:
+        return
+    r, cuota = terminos
+    principal = _decimal(principal)
+    n = int(financing_months)
+    hasta = n if hasta is None else min(int(hasta), n)
+
+    for mes in range(max(int(desde), 1), hasta + 1):
+        balance = _saldo(principal, r, cuota, mes - 1, n)
+        interes = balance * r
+        pago_principal = cuota - interes
+        balance_final = balance - pago_principal
+        yield {
+            'mes': mes,
+            'balance_inicial': balance.quantize(CENTAVO),
+            'pago_mensual': cuota.quantize(CENTAVO),
+            'pago_principal': pago_principal.quantize(CENTAVO),
+            'pago_interes': interes.quantize(CENTAVO),
+            'balance_final': max(Decimal('0'), balance_final).quantize(CENTAVO),
+        }
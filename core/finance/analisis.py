@@ -0,0 +1,213 @@
+"""
+Motor vectorizado del análisis Defender/Challenger.
+
+Evalúa valor presente (PV), costo anual equivalente (EAC) y la matriz de flujos
+anuales de muchas máquinas en una sola llamada. Replica la lógica de
+calcular_analisis_completo / calcular_eac (core.views), fila por fila:
+
+    PV = inicial + Σ_{año=1..⌊vida⌋} after_tax_cash_flow / (1+wacc)^año
+         - salvamento / (1+wacc)^vida
+
+donde after_tax_cash_flow = opex·(1 - t) - depreciación·t y la depreciación es
+lineal sobre la base depreciable menos el valor de salvamento.
+"""
+from decimal import Decimal
+
+import numpy as np
+
+# Vida útil por defecto (meses) cuando la máquina no la tiene definida
+VIDA_DEFECTO_MESES = {'Defender': 120, 'Challenger': 180}
+
+# maintenance_cost_gradient: % del costo mensual inicial de mantenimiento que se
+# suma cada mes (MaquinaForm lo acepta entre 0 y 100)
+GRADIENTE_LIMITES = (0.0, 100.0)
+
+
+def _f(valor):
+    return float(valor or 0)
+
+
+def gradiente_mantenimiento(valor):
+    """maintenance_cost_gradient en % mensual, recortado a GRADIENTE_LIMITES"""
+    return min(max(_f(valor), GRADIENTE_LIMITES[0]), GRADIENTE_LIMITES[1])
+
+
+def crecimiento_mantenimiento(gradiente, meses):
+    """
+    Factor sobre el mantenimiento mensual inicial en cada mes (gradiente
+    aritmético): 1 + g/100·(mes - 1). 'gradiente' (en %) es escalar o un arreglo
+    por fila; el resultado tiene una columna por mes.
+    """
+    g = np.clip(np.asarray(gradiente, dtype=float), *GRADIENTE_LIMITES) / 100
+    return 1 + g[..., None] * (np.asarray(meses, dtype=float) - 1)
+
+
+def crecimiento_mantenimiento_anual(gradiente, anios):
+    """
+    Factor medio del año (promedio de sus 12 meses) para costos anuales:
+    12·m0·factor es la suma del mantenimiento mensual de ese año.
+    """
+    return crecimiento_mantenimiento(gradiente, 12 * (np.asarray(anios, dtype=float) - 1) + 6.5)
+
+
+def parametros_maquinas(maquinas, rol):
+    """
+    Arreglos de parámetros de un conjunto de máquinas evaluadas como 'Defender'
+    (costo de oportunidad de no vender) o 'Challenger' (costo de compra).
+    El costo de oportunidad del Defender depende de la tasa de impuestos y se
+    calcula en evaluar_maquinas.
+    """
+    if rol not in VIDA_DEFECTO_MESES:
+        raise ValueError(f'Rol no válido: {rol}')
+    maquinas = list(maquinas)
+
+    def arreglo(funcion):
+        return np.fromiter((funcion(m) for m in maquinas), dtype=float, count=len(maquinas))
+
+    if rol == 'Defender':
+        base = arreglo(lambda m: _f(m.acquisition_cost or m.purchase_price))
+        reventa = arreglo(lambda m: _f(m.current_resale_value))
+        inicial = None
+    else:
+        base = arreglo(lambda m: _f(m.purchase_price) + _f(m.installation_and_training_cost))
+        reventa = None
+        inicial = arreglo(lambda m: _f(m.purchase_price) + _f(m.installation_and_training_cost)
+                          + _f(m.setup_costs))
+
+    return {
+        'rol': rol,
+        'base_depreciable': base,
+        'valor_reventa': reventa,
+        'inicial': inicial,
+        'salvamento': arreglo(lambda m: _f(m.salvage_value)),
+        'opex_anual': arreglo(lambda m: _f(m.annual_maintenance_labor_parts)
+                              + _f(m.operator_labor_cost) * _f(m.monthly_operating_hours) * 12),
+        'vida_anios': arreglo(lambda m: (m.useful_life or VIDA_DEFECTO_MESES[rol]) / 12),
+    }
+
+
+def eac_vectorizado(pv, vida_anios, wacc):
+    """Equivalente vectorizado de calcular_eac"""
+    pv, vida_anios, wacc = np.broadcast_arrays(
+        np.asarray(pv, dtype=float), np.asarray(vida_anios, dtype=float), np.asarray(wacc, dtype=float)
+    )
+    sin_descuento = (vida_anios <= 0) | (wacc <= 0)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        factor = (1 - (1 + wacc) ** (-vida_anios)) / wacc
+        eac = np.where(factor == 0, pv, pv / factor)
+        eac = np.where(np.isinf(eac), 0.0, eac)
+        eac = np.where(sin_descuento, pv / np.where(vida_anios == 0, 1.0, vida_anios), eac)
+    return eac
+
+
+def evaluar_maquinas(parametros, wacc, tax_rate):
+    """
+    Evalúa todas las máquinas de 'parametros' (ver parametros_maquinas). wacc y
+    tax_rate pueden ser escalares o arreglos por máquina.
+
+    Retorna un diccionario de arreglos: pv y eac por máquina, los flujos anuales
+    (constantes por máquina) y la matriz pv_flujos (máquinas × años), con ceros
+    en los años posteriores a la vida de cada máquina ('mascara').
+    """
+    n = parametros['salvamento'].shape[0]
+    wacc = np.broadcast_to(np.asarray(wacc, dtype=float), (n,))
+    tax_rate = np.broadcast_to(np.asarray(tax_rate, dtype=float), (n,))
+    vida = parametros['vida_anios']
+    salvamento = parametros['salvamento']
+    base = parametros['base_depreciable']
+
+    if parametros['rol'] == 'Defender':
+        reventa = parametros['valor_reventa']
+        impuesto_venta = (reventa - base) * tax_rate
+        inicial = reventa - impuesto_venta
+    else:
+        inicial = parametros['inicial']
+
+    depreciacion = (base - salvamento) / vida
+    tax_shield = depreciacion * tax_rate
+    after_tax = parametros['opex_anual'] * (1 - tax_rate) - tax_shield
+
+    anios_completos = np.floor(vida).astype(int)
+    max_anios = int(anios_completos.max()) if n else 0
+    anios = np.arange(1, max_anios + 1)
+    mascara = anios[None, :] <= anios_completos[:, None]
+
+    factores = (1 + wacc)[:, None] ** anios[None, :]
+    pv_flujos = np.where(mascara, after_tax[:, None] / factores, 0.0)
+
+    # Suma acumulada en el mismo orden que el cálculo año a año
+    pv = np.cumsum(np.column_stack([inicial, pv_flujos]), axis=1)[:, -1]
+    pv = pv - salvamento / ((1 + wacc) ** vida)
+
+    return {
+        'anios': anios,
+        'mascara': mascara,
+        'inicial': inicial,
+        'cash_flow': parametros['opex_anual'],
+        'depreciacion': depreciacion,
+        'tax_shield': tax_shield,
+        'after_tax_cash_flow': after_tax,
+        'pv_flujos': pv_flujos,
+        'vida_anios': vida,
+        'pv': pv,
+        'eac': eac_vectorizado(pv, vida, wacc),
+    }
+
+
+def flujos_anuales(resultado, indice):
+    """Flujos año a año de una máquina en el formato de calcular_analisis_completo"""
+    anios = int(resultado['mascara'][indice].sum())
+    return [
+        {
+            'year': year,
+            'cash_flow': float(resultado['cash_flow'][indice]),
+            'depreciation': float(resultado['depreciacion'][indice]),
+            'tax_shield': float(resultado['tax_shield'][indice]),
+            'after_tax_cash_flow': float(resultado['after_tax_cash_flow'][indice]),
+            'pv': float(resultado['pv_flujos'][indice, year - 1]),
+        }
+        for year in range(1, anios + 1)
+    ]
+
+
+def resumen_maquina(resultado, indice):
+    """Costo inicial (oportunidad o inversión), costo operativo anual y vida de una máquina"""
+    return {
+        'costo_inicial': float(resultado['inicial'][indice]),
+        'opex_anual': float(resultado['cash_flow'][indice]),
+        'vida_anios': float(resultado['vida_anios'][indice]),
+    }
+
+
+def analisis_par(defender, challenger, wacc, tax_rate):
+    """
+    Análisis completo de un par Defender/Challenger con el mismo formato de
+    resultado que calcular_analisis_completo.
+    """
+    wacc = float(wacc)
+    tax_rate = float(tax_rate)
+    res_defender = evaluar_maquinas(parametros_maquinas([defender], 'Defender'), wacc, tax_rate)
+    res_challenger = evaluar_maquinas(parametros_maquinas([challenger], 'Challenger'), wacc, tax_rate)
+
+    return {
+        'pv_defender': Decimal(str(float(res_defender['pv'][0]))),
+        'eac_defender': Decimal(str(float(res_defender['eac'][0]))),
+        'pv_challenger': Decimal(str(float(res_challenger['pv'][0]))),
+        'eac_challenger': Decimal(str(float(res_challenger['eac'][0]))),
+        'flujos_defender': flujos_anuales(res_defender, 0),
+        'flujos_challenger': flujos_anuales(res_challenger, 0),
+        'resumen_defender': resumen_maquina(res_defender, 0),
+        'resumen_challenger': resumen_maquina(res_challenger, 0),
+    }
+
+
+def analisis_portafolio(defenders, challengers, wacc, tax_rate):
+    """
+    Evalúa listas de Defenders y Challengers en una sola llamada por rol.
+    Retorna {'Defender': resultado, 'Challenger': resultado} (ver evaluar_maquinas).
+    """
+    return {
+        'Defender': evaluar_maquinas(parametros_maquinas(defenders, 'Defender'), wacc, tax_rate),
+        'Challenger': evaluar_maquinas(parametros_maquinas(challengers, 'Challenger'), wacc, tax_rate),
+    }
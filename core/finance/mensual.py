@@ -0,0 +1,136 @@
+"""
+Modelo de costos mensual que usa todos los campos operativos de Maquina.
+
+Para cada máquina y cada mes t = 1..vida (useful_life, en meses):
+
+    mantenimiento(t) = m0·(1 + g/100·(t-1))
+    operador         = operator_labor_cost · horas
+    energía          = energy_consumption · energy_cost · horas
+    inactividad      = cost_of_downtime · horas · (1 - availability/100)
+    unidades         = production_rate · horas · availability/100
+    consumibles      = consumable_replacement_cost_1 · unidades / consumable_lifespan_1
+
+con horas = monthly_operating_hours, m0 y g como en vida_economica
+(production_rate en unidades por hora; sin disponibilidad registrada se asume
+100 %). El flujo después de impuestos descuenta la depreciación lineal mensual
+y se trae a valor presente con la tasa mensual equivalente al wacc:
+
+    PV  = inicial + Σ_t [costo(t)·(1 - T) - depreciación·T] / (1+r)^t - salvamento / (1+r)^vida
+    EAC = eac_vectorizado(PV, vida/12, wacc)
+
+El costo por unidad es el costo nivelado PV / Σ_t unidades / (1+r)^t. Todas las
+máquinas y todos los meses se calculan como una matriz máquinas × meses.
+"""
+import numpy as np
+
+from .analisis import _f, crecimiento_mantenimiento, eac_vectorizado
+from .vida_economica import parametros_vida
+
+COMPONENTES = ('mantenimiento', 'operador', 'energia', 'inactividad', 'consumibles')
+
+
+def _disponibilidad(maquina):
+    if maquina.availability is None:
+        return 1.0
+    return min(max(float(maquina.availability), 0.0), 100.0) / 100
+
+
+def _costo_consumible_por_unidad(maquina):
+    vida_consumible = _f(maquina.consumable_lifespan_1)
+    return _f(maquina.consumable_replacement_cost_1) / vida_consumible if vida_consumible > 0 else 0.0
+
+
+def parametros_mensuales(maquinas, roles=None):
+    """parametros_vida más los rubros mensuales de energía, inactividad, producción y consumibles"""
+    maquinas = list(maquinas)
+    parametros = parametros_vida(maquinas, roles)
+
+    def arreglo(funcion):
+        return np.fromiter((funcion(m) for m in maquinas), dtype=float, count=len(maquinas))
+
+    horas = arreglo(lambda m: _f(m.monthly_operating_hours))
+    disponibilidad = arreglo(_disponibilidad)
+    unidades = arreglo(lambda m: _f(m.production_rate)) * horas * disponibilidad
+    parametros.update({
+        'energia_mensual': arreglo(lambda m: _f(m.energy_consumption) * _f(m.energy_cost)) * horas,
+        'inactividad_mensual': arreglo(lambda m: _f(m.cost_of_downtime)) * horas * (1 - disponibilidad),
+        'unidades_mensuales': unidades,
+        'consumibles_mensual': arreglo(_costo_consumible_por_unidad) * unidades,
+    })
+    return parametros
+
+
+def evaluar_mensual(parametros, wacc, tax_rate):
+    """
+    Evalúa el modelo mensual. Retorna 'meses', la matriz de cada rubro y del
+    flujo después de impuestos (máquinas × meses, ceros después de la vida), y
+    por máquina: pv, eac, unidades totales y costo por unidad (NaN sin producción).
+    """
+    wacc = float(wacc)
+    tax_rate = float(tax_rate)
+    vida = parametros['vida_meses'].astype(int)
+    n = vida.shape[0]
+    meses = np.arange(1, (int(vida.max()) if n else 0) + 1)
+    mascara = meses[None, :] <= vida[:, None]
+    descuento = (1 + wacc) ** (meses / 12)
+
+    def constante(clave):
+        return np.where(mascara, parametros[clave][:, None], 0.0)
+
+    rubros = {
+        'mantenimiento': np.where(mascara, parametros['mantenimiento_mensual'][:, None]
+                                  * crecimiento_mantenimiento(parametros['gradiente'], meses), 0.0),
+        'operador': constante('operador_mensual'),
+        'energia': constante('energia_mensual'),
+        'inactividad': constante('inactividad_mensual'),
+        'consumibles': constante('consumibles_mensual'),
+    }
+    costo = sum(rubros.values())
+    unidades = constante('unidades_mensuales')
+
+    base = parametros['base_depreciable']
+    salvamento = parametros['salvamento']
+    reventa = parametros['reventa_inicial']
+    inicial = np.where(parametros['defender'], reventa - (reventa - base) * tax_rate, parametros['costo_compra'])
+    depreciacion = (base - salvamento) / vida
+    after_tax = np.where(mascara, costo * (1 - tax_rate) - (depreciacion * tax_rate)[:, None], 0.0)
+
+    pv = inicial + (after_tax / descuento[None, :]).sum(axis=1) - salvamento / (1 + wacc) ** (vida / 12)
+    unidades_descontadas = (unidades / descuento[None, :]).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        costo_unidad = np.where(unidades_descontadas > 0, pv / unidades_descontadas, np.nan)
+
+    return {
+        'meses': meses,
+        'mascara': mascara,
+        'rubros': rubros,
+        'after_tax_cash_flow': after_tax,
+        'pv': pv,
+        'eac': eac_vectorizado(pv, vida / 12, wacc),
+        'unidades_totales': unidades.sum(axis=1),
+        'costo_por_unidad': costo_unidad,
+    }
+
+
+def resumen_mensual(resultado, indice, detalle=False):
+    """Resultado de una máquina listo para JSON; con detalle incluye la serie mensual"""
+    vida = int(resultado['mascara'][indice].sum())
+    costo_unidad = float(resultado['costo_por_unidad'][indice])
+    resumen = {
+        'vida_meses': vida,
+        'pv': float(resultado['pv'][indice]),
+        'eac': float(resultado['eac'][indice]),
+        'unidades_totales': float(resultado['unidades_totales'][indice]),
+        'costo_por_unidad': None if np.isnan(costo_unidad) else costo_unidad,
+        'totales': {rubro: float(resultado['rubros'][rubro][indice].sum()) for rubro in COMPONENTES},
+    }
+    if detalle:
+        resumen['flujos_mensuales'] = [
+            {
+                'mes': mes,
+                **{rubro: float(resultado['rubros'][rubro][indice, mes - 1]) for rubro in COMPONENTES},
+                'after_tax_cash_flow': float(resultado['after_tax_cash_flow'][indice, mes - 1]),
+            }
+            for mes in range(1, vida + 1)
+        ]
+    return resumen
@@ -0,0 +1,79 @@
+"""
+Ranking de pares Defender × Challenger por ahorro de EAC ponderado.
+
+Con wacc y tax_rate comunes, el EAC de cada máquina no depende de con quién se
+compare: se calcula una sola vez por máquina (analisis_portafolio) y el ahorro
+de cada par es la diferencia de dos vectores:
+
+    ahorro[i, j]  = EAC Defender i - EAC Challenger j   (> 0: conviene reemplazar)
+    puntaje[i, j] = ahorro[i, j] · peso[i]              (peso: criticidad del Defender)
+
+La matriz de pares se recorre por bloques de filas de a lo sumo LOTE_PARES
+elementos; de cada bloque se conservan los mejores 'limite' pares
+(argpartition) y el mejor Challenger de cada Defender, de modo que la memoria
+no crece con el tamaño de la flota.
+"""
+import numpy as np
+
+LIMITE_DEFECTO = 100
+LOTE_PARES = 250_000
+
+
+def _mejores(filas, columnas, puntajes, limite):
+    """Los 'limite' pares de mayor puntaje (empates: menor fila y luego menor columna)"""
+    orden = np.lexsort((columnas, filas, -puntajes))[:limite]
+    return filas[orden], columnas[orden], puntajes[orden]
+
+
+def ranking_pares(eac_defender, eac_challenger, pesos, limite=LIMITE_DEFECTO, lote=None):
+    """
+    Evalúa todos los pares. Retorna:
+      - 'pares': (filas, columnas, puntajes) de los mejores pares con ahorro positivo
+      - 'mejor_challenger' y 'mejor_ahorro': para cada Defender, el Challenger de
+        mayor ahorro (-1 si no hay Challengers)
+      - 'evaluados' y 'recomendados' (pares con ahorro positivo)
+    """
+    eac_defender = np.asarray(eac_defender, dtype=float)
+    eac_challenger = np.asarray(eac_challenger, dtype=float)
+    pesos = np.asarray(pesos, dtype=float)
+    n, m = eac_defender.shape[0], eac_challenger.shape[0]
+
+    mejor_challenger = np.full(n, -1, dtype=int)
+    mejor_ahorro = np.zeros(n)
+    filas = np.zeros(0, dtype=int)
+    columnas = np.zeros(0, dtype=int)
+    puntajes = np.zeros(0)
+    recomendados = 0
+
+    if m:
+        tamano = max(1, (lote or LOTE_PARES) // m)
+        for inicio in range(0, n, tamano):
+            fin = min(n, inicio + tamano)
+            ahorro = eac_defender[inicio:fin, None] - eac_challenger[None, :]
+            mejor = ahorro.argmax(axis=1)
+            mejor_challenger[inicio:fin] = mejor
+            mejor_ahorro[inicio:fin] = ahorro[np.arange(fin - inicio), mejor]
+
+            positivos = ahorro > 0
+            recomendados += int(positivos.sum())
+            plano = np.where(positivos, ahorro * pesos[inicio:fin, None], -np.inf).ravel()
+            k = min(limite, plano.size)
+            if k <= 0:
+                continue
+            candidatos = np.argpartition(-plano, k - 1)[:k] if k < plano.size else np.arange(plano.size)
+            candidatos = candidatos[np.isfinite(plano[candidatos])]
+            fila_bloque, columna_bloque = np.divmod(candidatos, m)
+            filas, columnas, puntajes = _mejores(
+                np.concatenate([filas, fila_bloque + inicio]),
+                np.concatenate([columnas, columna_bloque]),
+                np.concatenate([puntajes, plano[candidatos]]),
+                limite,
+            )
+
+    return {
+        'pares': (filas, columnas, puntajes),
+        'mejor_challenger': mejor_challenger,
+        'mejor_ahorro': mejor_ahorro,
+        'evaluados': n * m,
+        'recomendados': recomendados,
+    }
@@ -0,0 +1,169 @@
+"""
+Análisis de sensibilidad (tornado) de un par Defender/Challenger.
+
+Cada entrada se desplaza ±variación (p. ej. 10 %) manteniendo las demás en su
+valor registrado, y se mide cómo cambia la brecha de EAC:
+
+    brecha = EAC Defender - EAC Challenger   (positiva cuando conviene el Challenger)
+
+Las entradas de máquina (precio de compra, mantenimiento, mano de obra del
+operador, costo de energía, vida útil y salvamento) se desplazan en cada
+máquina por separado; wacc y tax_rate en ambas a la vez. El caso base y todas
+las perturbaciones se apilan en filas de arreglos y se evalúan en una sola
+llamada a eac_escenarios por máquina, con el mismo costo operativo que la
+simulación Monte Carlo (sin energía, inactividad ni crecimiento del
+mantenimiento coincide con analisis_par).
+
+financing_rate no interviene en el EAC (su barra es siempre cero); para esa
+entrada se informa además la cuota mensual del préstamo con cada valor.
+"""
+import copy
+
+import numpy as np
+
+from .amortizacion import pago_mensual
+from .analisis import VIDA_DEFECTO_MESES
+from .simulacion import ROLES, VARIABLES, eac_escenarios, parametros_simulacion
+
+VARIACION_DEFECTO = 0.10
+
+# entrada: (etiqueta, campos de Maquina que se desplazan)
+ENTRADAS_MAQUINA = {
+    'precio_compra': ('Precio de compra', ('purchase_price', 'acquisition_cost')),
+    'mantenimiento': ('Mantenimiento anual', ('annual_maintenance_labor_parts',)),
+    'operador': ('Mano de obra del operador', ('operator_labor_cost',)),
+    'energia': ('Costo de energía', ('energy_cost',)),
+    'vida_util': ('Vida útil', ('useful_life',)),
+    'salvamento': ('Valor de salvamento', ('salvage_value',)),
+}
+ENTRADAS_ANALISIS = {
+    'wacc': 'WACC',
+    'tax_rate': 'Tasa de impuestos',
+    'financing_rate': 'Tasa de financiamiento',
+}
+
+# Campos de Maquina que leen parametros_simulacion (para la clave de caché)
+CAMPOS_MAQUINA = (
+    'purchase_price', 'acquisition_cost', 'installation_and_training_cost', 'setup_costs',
+    'current_resale_value', 'salvage_value', 'useful_life', 'annual_maintenance_labor_parts',
+    'operator_labor_cost', 'monthly_operating_hours', 'energy_consumption', 'energy_cost',
+    'cost_of_downtime', 'availability', 'maintenance_cost_gradient',
+)
+
+
+def _valor_base(maquina, rol, entrada):
+    """Valor registrado de una entrada de máquina (el que usa el análisis)"""
+    if entrada == 'precio_compra' and rol == 'Defender':
+        valor = maquina.acquisition_cost or maquina.purchase_price
+    elif entrada == 'vida_util':
+        valor = maquina.useful_life or VIDA_DEFECTO_MESES[rol]
+    else:
+        valor = getattr(maquina, ENTRADAS_MAQUINA[entrada][1][0])
+    return float(valor or 0)
+
+
+def _desplazada(maquina, rol, entrada, factor):
+    """Copia en memoria de la máquina con los campos de 'entrada' multiplicados por factor"""
+    copia = copy.copy(maquina)
+    for campo in ENTRADAS_MAQUINA[entrada][1]:
+        valor = getattr(maquina, campo)
+        if campo == 'useful_life':
+            valor = valor or VIDA_DEFECTO_MESES[rol]
+        if valor is not None:
+            setattr(copia, campo, float(valor) * factor)
+    return copia
+
+
+def _apilar(filas):
+    """Lista de parametros_simulacion (una por fila) -> diccionario de arreglos"""
+    apilado = {'rol': filas[0]['rol']}
+    for clave in filas[0]:
+        if clave != 'rol':
+            apilado[clave] = np.array([fila[clave] or 0.0 for fila in filas], dtype=float)
+    return apilado
+
+
+def tornado(defender, challenger, parametros, variacion=VARIACION_DEFECTO, principal=None):
+    """
+    Sensibilidad de la brecha de EAC a cada entrada desplazada ±variacion
+    (fracción). 'parametros' tiene wacc, tax_rate, financing_rate y
+    financing_months; 'principal' es el monto financiado (por defecto el costo
+    inicial del Challenger).
+
+    Retorna el caso base y las entradas ordenadas de mayor a menor impacto
+    (|brecha_alta - brecha_baja|).
+    """
+    if not 0 < variacion < 1:
+        raise ValueError('La variación debe estar entre 0 y 100 %')
+    maquinas = {'Defender': defender, 'Challenger': challenger}
+    factores = (1 - variacion, 1 + variacion)
+    wacc = float(parametros['wacc'])
+    tax_rate = float(parametros['tax_rate'])
+
+    # Fila 0: caso base; luego dos filas (baja, alta) por entrada
+    entradas = [(entrada, rol) for entrada in ENTRADAS_MAQUINA for rol in ROLES]
+    entradas += [(entrada, None) for entrada in ENTRADAS_ANALISIS]
+    filas = {rol: [parametros_simulacion(maquinas[rol], rol)] for rol in ROLES}
+    tasas = [(wacc, tax_rate)]
+    for entrada, objetivo in entradas:
+        for factor in factores:
+            for rol in ROLES:
+                if rol == objetivo:
+                    filas[rol].append(parametros_simulacion(_desplazada(maquinas[rol], rol, entrada, factor), rol))
+                else:
+                    filas[rol].append(filas[rol][0])
+            tasas.append((
+                float(np.clip(wacc * factor, *VARIABLES['wacc'])) if entrada == 'wacc' else wacc,
+                float(np.clip(tax_rate * factor, *VARIABLES['tax_rate'])) if entrada == 'tax_rate' else tax_rate,
+            ))
+
+    wacc_filas = np.array([w for w, _ in tasas])
+    tax_filas = np.array([t for _, t in tasas])
+    unos = np.ones(len(tasas))
+    eac = {}
+    for rol in ROLES:
+        apilado = _apilar(filas[rol])
+        eac[rol] = eac_escenarios(apilado, wacc_filas, tax_filas, apilado['gradiente'], unos, unos, unos)
+    brecha = eac['Defender'] - eac['Challenger']
+
+    if principal is None:
+        principal = challenger.costo_inicial_total
+    financing_rate = float(parametros['financing_rate'])
+    financing_months = parametros['financing_months']
+
+    resultado = []
+    for i, (entrada, rol) in enumerate(entradas):
+        baja, alta = brecha[1 + 2 * i], brecha[2 + 2 * i]
+        if rol:
+            etiqueta = f'{ENTRADAS_MAQUINA[entrada][0]} ({rol})'
+            valor = _valor_base(maquinas[rol], rol, entrada)
+        else:
+            etiqueta = ENTRADAS_ANALISIS[entrada]
+            valor = {'wacc': wacc, 'tax_rate': tax_rate, 'financing_rate': financing_rate}[entrada]
+        fila = {
+            'entrada': entrada,
+            'maquina': rol,
+            'etiqueta': etiqueta,
+            'valor_base': valor,
+            'valor_bajo': valor * factores[0],
+            'valor_alto': valor * factores[1],
+            'brecha_baja': float(baja),
+            'brecha_alta': float(alta),
+            'impacto': float(abs(alta - baja)),
+        }
+        if entrada == 'financing_rate':
+            fila['pago_mensual_bajo'] = float(pago_mensual(principal, financing_rate * factores[0], financing_months))
+            fila['pago_mensual_alto'] = float(pago_mensual(principal, financing_rate * factores[1], financing_months))
+        resultado.append(fila)
+    resultado.sort(key=lambda fila: -fila['impacto'])
+
+    return {
+        'variacion': variacion,
+        'base': {
+            'eac_defender': float(eac['Defender'][0]),
+            'eac_challenger': float(eac['Challenger'][0]),
+            'brecha': float(brecha[0]),
+            'pago_mensual': float(pago_mensual(principal, financing_rate, financing_months)),
+        },
+        'entradas': resultado,
+    }
@@ -0,0 +1,326 @@
+"""
+Simulación Monte Carlo del análisis Defender/Challenger.
+
+Cada escenario muestrea WACC, tasa de impuestos, crecimiento del mantenimiento,
+costo de inactividad, costo de energía y valor de salvamento, y evalúa el EAC
+de ambas máquinas con la misma fórmula de evaluar_maquinas, pero con un costo
+operativo anual que incluye los rubros que dependen de esas variables:
+
+    opex(año) = mantenimiento·crecimiento(año) + operador
+                + energía·f_energía + inactividad·f_inactividad
+
+    mantenimiento = annual_maintenance_labor_parts
+    operador      = operator_labor_cost · horas_mes · 12
+    energía       = energy_consumption · energy_cost · horas_mes · 12
+    inactividad   = cost_of_downtime · horas_mes · 12 · (1 - availability/100)
+
+crecimiento(año) es el factor medio del año de un mantenimiento mensual que
+sube cada mes g % de su valor inicial (g = maintenance_cost_gradient, ver
+crecimiento_mantenimiento_anual). Con g = 0 y sin energía ni inactividad el
+resultado coincide con analisis_par.
+
+Los escenarios se evalúan por lotes de arreglos NumPy (escenarios × años); con
+varios procesos los lotes se reparten con ProcessPoolExecutor. Cada lote usa
+una semilla derivada (SeedSequence.spawn) de la semilla de la simulación, así
+que el resultado no depende del número de procesos.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .analisis import (
+    GRADIENTE_LIMITES, VIDA_DEFECTO_MESES, _f, crecimiento_mantenimiento_anual, eac_vectorizado,
+    gradiente_mantenimiento,
+)
+
+ROLES = ('Defender', 'Challenger')
+ESCENARIOS_DEFECTO = 10_000
+MAX_ESCENARIOS = 100_000
+LOTE_ESCENARIOS = 25_000
+BINS_DEFECTO = 30
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+# Parámetros de cada tipo de distribución
+DISTRIBUCIONES = {
+    'fijo': ('valor',),
+    'uniforme': ('min', 'max'),
+    'triangular': ('min', 'moda', 'max'),
+    'normal': ('media', 'desviacion'),
+}
+
+# Variables simuladas y los límites (mínimo, máximo) a los que se recortan las
+# muestras. wacc y tax_rate se muestrean como fracciones y el gradiente de
+# mantenimiento en % mensual (las unidades del campo); las demás son factores
+# sobre el valor registrado de cada máquina (1 = sin cambio).
+VARIABLES = {
+    'wacc': (-0.99, 10.0),
+    'tax_rate': (0.0, 0.99),
+    'maintenance_cost_gradient': GRADIENTE_LIMITES,
+    'cost_of_downtime': (0.0, None),
+    'energy_cost': (0.0, None),
+    'salvage_value': (0.0, None),
+}
+# Variables comunes a ambas máquinas (no admiten una distribución por rol)
+VARIABLES_COMPARTIDAS = ('wacc', 'tax_rate')
+
+
+# ==================== PARÁMETROS ====================
+
+def parametros_simulacion(maquina, rol):
+    """Valores (float) de una máquina que usa la simulación; se envían a los procesos"""
+    if rol not in VIDA_DEFECTO_MESES:
+        raise ValueError(f'Rol no válido: {rol}')
+    horas_anio = _f(maquina.monthly_operating_hours) * 12
+    # Sin disponibilidad registrada se asume que la máquina no tiene paradas
+    disponibilidad = 100.0 if maquina.availability is None else min(max(float(maquina.availability), 0.0), 100.0)
+    if rol == 'Defender':
+        base = _f(maquina.acquisition_cost or maquina.purchase_price)
+        inicial = None
+    else:
+        base = _f(maquina.purchase_price) + _f(maquina.installation_and_training_cost)
+        inicial = base + _f(maquina.setup_costs)
+    return {
+        'rol': rol,
+        'base_depreciable': base,
+        'valor_reventa': _f(maquina.current_resale_value),
+        'inicial': inicial,
+        'salvamento': _f(maquina.salvage_value),
+        'vida_anios': (maquina.useful_life or VIDA_DEFECTO_MESES[rol]) / 12,
+        'mantenimiento': _f(maquina.annual_maintenance_labor_parts),
+        'operador': _f(maquina.operator_labor_cost) * horas_anio,
+        'energia': _f(maquina.energy_consumption) * _f(maquina.energy_cost) * horas_anio,
+        'inactividad': _f(maquina.cost_of_downtime) * horas_anio * (1 - disponibilidad / 100),
+        'gradiente': gradiente_mantenimiento(maquina.maintenance_cost_gradient),
+    }
+
+
+def _validar_distribucion(variable, spec):
+    if not isinstance(spec, dict) or spec.get('tipo') not in DISTRIBUCIONES:
+        raise ValueError(
+            f"Distribución no válida para {variable}: use tipo {', '.join(DISTRIBUCIONES)}"
+        )
+    valores = {}
+    for parametro in DISTRIBUCIONES[spec['tipo']]:
+        try:
+            valores[parametro] = float(spec[parametro])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{variable}: falta o no es numérico el parámetro '{parametro}'")
+        if not np.isfinite(valores[parametro]):
+            raise ValueError(f"{variable}: '{parametro}' debe ser finito")
+    tipo = spec['tipo']
+    if tipo == 'uniforme' and valores['min'] > valores['max']:
+        raise ValueError(f'{variable}: min no puede ser mayor que max')
+    if tipo == 'triangular' and not valores['min'] <= valores['moda'] <= valores['max']:
+        raise ValueError(f'{variable}: se requiere min <= moda <= max')
+    if tipo == 'normal' and valores['desviacion'] < 0:
+        raise ValueError(f'{variable}: la desviación no puede ser negativa')
+    return {'tipo': tipo, **valores}
+
+
+def leer_distribuciones(distribuciones, maquinas, wacc, tax_rate):
+    """
+    Normaliza las distribuciones recibidas. Cada variable de VARIABLES acepta una
+    distribución (la misma muestra para ambas máquinas) o, salvo wacc y tax_rate,
+    {'Defender': dist, 'Challenger': dist} con muestras independientes. Las
+    variables omitidas quedan fijas: wacc/tax_rate en los parámetros del análisis,
+    el crecimiento en el de cada máquina y los factores en 1.
+    """
+    distribuciones = distribuciones or {}
+    if not isinstance(distribuciones, dict):
+        raise ValueError('distribuciones debe ser un objeto')
+    desconocidas = set(distribuciones) - set(VARIABLES)
+    if desconocidas:
+        raise ValueError(f"Variables no válidas: {', '.join(sorted(desconocidas))}. Use {', '.join(VARIABLES)}")
+
+    especificacion = {}
+    for variable in VARIABLES:
+        spec = distribuciones.get(variable)
+        if spec is None:
+            if variable == 'wacc':
+                spec = {'tipo': 'fijo', 'valor': float(wacc)}
+            elif variable == 'tax_rate':
+                spec = {'tipo': 'fijo', 'valor': float(tax_rate)}
+            elif variable == 'maintenance_cost_gradient':
+                spec = {rol: {'tipo': 'fijo', 'valor': maquinas[rol]['gradiente']} for rol in ROLES}
+            else:
+                spec = {'tipo': 'fijo', 'valor': 1.0}
+
+        if isinstance(spec, dict) and set(spec) == set(ROLES):
+            if variable in VARIABLES_COMPARTIDAS:
+                raise ValueError(f'{variable} es común a ambas máquinas: use una sola distribución')
+            especificacion[variable] = {rol: _validar_distribucion(f'{variable} ({rol})', spec[rol]) for rol in ROLES}
+        else:
+            especificacion[variable] = _validar_distribucion(variable, spec)
+    return especificacion
+
+
+# ==================== MUESTREO Y EVALUACIÓN ====================
+
+def _muestrear(rng, dist, n, variable):
+    tipo = dist['tipo']
+    if tipo == 'fijo':
+        muestras = np.full(n, dist['valor'])
+    elif tipo == 'uniforme':
+        muestras = rng.uniform(dist['min'], dist['max'], n)
+    elif tipo == 'triangular':
+        if dist['min'] == dist['max']:
+            muestras = np.full(n, dist['min'])
+        else:
+            muestras = rng.triangular(dist['min'], dist['moda'], dist['max'], n)
+    else:
+        muestras = rng.normal(dist['media'], dist['desviacion'], n)
+    return np.clip(muestras, *VARIABLES[variable])
+
+
+def _valor_central(dist):
+    return {
+        'fijo': lambda: dist['valor'],
+        'uniforme': lambda: (dist['min'] + dist['max']) / 2,
+        'triangular': lambda: dist['moda'],
+        'normal': lambda: dist['media'],
+    }[dist['tipo']]()
+
+
+def _muestras_por_rol(especificacion, obtener):
+    """{variable: {rol: arreglo}}; una distribución compartida usa el mismo arreglo en ambos roles"""
+    muestras = {}
+    for variable in VARIABLES:
+        spec = especificacion[variable]
+        if 'tipo' in spec:
+            valor = obtener(variable, spec)
+            muestras[variable] = {rol: valor for rol in ROLES}
+        else:
+            muestras[variable] = {rol: obtener(variable, spec[rol]) for rol in ROLES}
+    return muestras
+
+
+def eac_escenarios(maquina, wacc, tax_rate, gradiente, factor_inactividad, factor_energia, factor_salvamento):
+    """
+    EAC de una máquina en cada escenario. Todos los argumentos salvo 'maquina'
+    son arreglos; los valores de 'maquina' pueden ser escalares o arreglos por
+    escenario (p. ej. una vida útil distinta en cada fila, ver sensibilidad).
+    Los años posteriores a la vida de cada escenario quedan en cero.
+    """
+    def columna(valor):
+        return np.asarray(valor, dtype=float)[..., None]
+
+    vida = np.broadcast_to(np.asarray(maquina['vida_anios'], dtype=float), wacc.shape)
+    anios_completos = np.floor(vida).astype(int)
+    anios = np.arange(1, int(anios_completos.max()) + 1)
+    mascara = anios[None, :] <= anios_completos[:, None]
+
+    salvamento = maquina['salvamento'] * factor_salvamento
+    depreciacion = (maquina['base_depreciable'] - salvamento) / vida
+    if maquina['rol'] == 'Defender':
+        reventa = maquina['valor_reventa']
+        inicial = reventa - (reventa - maquina['base_depreciable']) * tax_rate
+    else:
+        inicial = np.broadcast_to(np.asarray(maquina['inicial'], dtype=float), wacc.shape)
+
+    crecimiento = crecimiento_mantenimiento_anual(gradiente, anios)
+    opex = (columna(maquina['mantenimiento']) * crecimiento + columna(maquina['operador'])
+            + (maquina['energia'] * factor_energia)[:, None]
+            + (maquina['inactividad'] * factor_inactividad)[:, None])
+    after_tax = opex * (1 - tax_rate)[:, None] - (depreciacion * tax_rate)[:, None]
+    descuento = (1 + wacc)[:, None] ** anios[None, :]
+
+    pv = inicial + np.where(mascara, after_tax / descuento, 0.0).sum(axis=1) - salvamento / (1 + wacc) ** vida
+    return eac_vectorizado(pv, vida, wacc)
+
+
+def _evaluar(maquinas, muestras):
+    return {
+        rol: eac_escenarios(
+            maquinas[rol],
+            muestras['wacc'][rol],
+            muestras['tax_rate'][rol],
+            muestras['maintenance_cost_gradient'][rol],
+            muestras['cost_of_downtime'][rol],
+            muestras['energy_cost'][rol],
+            muestras['salvage_value'][rol],
+        )
+        for rol in ROLES
+    }
+
+
+def _evaluar_lote(argumentos):
+    """Muestrea y evalúa un lote de escenarios (se ejecuta en un proceso del pool)"""
+    maquinas, especificacion, semilla, n = argumentos
+    rng = np.random.default_rng(semilla)
+    muestras = _muestras_por_rol(especificacion, lambda variable, dist: _muestrear(rng, dist, n, variable))
+    return _evaluar(maquinas, muestras)
+
+
+# ==================== RESUMEN ====================
+
+def _estadisticas(valores):
+    return {
+        'media': float(valores.mean()),
+        'desviacion': float(valores.std()),
+        'percentiles': {f'p{p}': float(v) for p, v in zip(PERCENTILES, np.percentile(valores, PERCENTILES))},
+    }
+
+
+def _histograma(valores, bordes):
+    conteos, bordes = np.histogram(valores, bins=bordes)
+    return {'bordes': bordes.tolist(), 'conteos': conteos.tolist()}
+
+
+def simular(maquinas, especificacion, escenarios=ESCENARIOS_DEFECTO, semilla=None, procesos=1, bins=BINS_DEFECTO):
+    """
+    Ejecuta la simulación. 'maquinas' es {'Defender': parametros_simulacion(...),
+    'Challenger': ...} y 'especificacion' el resultado de leer_distribuciones.
+
+    Retorna percentiles de EAC de cada máquina y de la diferencia
+    (EAC Defender - EAC Challenger; positiva cuando conviene el Challenger),
+    P(EAC Challenger < EAC Defender), histogramas y el caso base (valores
+    centrales de cada distribución).
+    """
+    if not 1 <= escenarios <= MAX_ESCENARIOS:
+        raise ValueError(f'escenarios debe estar entre 1 y {MAX_ESCENARIOS}')
+    if not 1 <= bins <= 200:
+        raise ValueError('bins debe estar entre 1 y 200')
+    if semilla is None:
+        semilla = int(np.random.SeedSequence().entropy % 2**32)
+
+    tamanos = [LOTE_ESCENARIOS] * (escenarios // LOTE_ESCENARIOS)
+    if escenarios % LOTE_ESCENARIOS:
+        tamanos.append(escenarios % LOTE_ESCENARIOS)
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+    lotes = [(maquinas, especificacion, s, n) for s, n in zip(semillas, tamanos)]
+
+    procesos = min(procesos or 1, len(lotes))
+    if procesos == 1:
+        resultados = list(map(_evaluar_lote, lotes))
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as executor:
+            resultados = list(executor.map(_evaluar_lote, lotes))
+
+    eac = {rol: np.concatenate([r[rol] for r in resultados]) for rol in ROLES}
+    diferencia = eac['Defender'] - eac['Challenger']
+    bordes = np.histogram_bin_edges(np.concatenate([eac['Defender'], eac['Challenger']]), bins=bins)
+
+    centrales = _muestras_por_rol(
+        especificacion, lambda variable, dist: np.clip(np.array([_valor_central(dist)]), *VARIABLES[variable])
+    )
+    base = _evaluar(maquinas, centrales)
+
+    return {
+        'escenarios': escenarios,
+        'semilla': semilla,
+        'procesos': procesos,
+        'probabilidad_challenger': float((eac['Challenger'] < eac['Defender']).mean()),
+        'eac_defender': _estadisticas(eac['Defender']),
+        'eac_challenger': _estadisticas(eac['Challenger']),
+        'diferencia': _estadisticas(diferencia),
+        'histograma_eac': {
+            'bordes': bordes.tolist(),
+            'defender': np.histogram(eac['Defender'], bins=bordes)[0].tolist(),
+            'challenger': np.histogram(eac['Challenger'], bins=bordes)[0].tolist(),
+        },
+        'histograma_diferencia': _histograma(diferencia, bins),
+        'caso_base': {
+            'eac_defender': float(base['Defender'][0]),
+            'eac_challenger': float(base['Challenger'][0]),
+        },
+    }
@@ -0,0 +1,142 @@
+"""
+Vida económica (edad de reemplazo de mínimo EAC) de un conjunto de máquinas.
+
+Para cada máquina y cada edad de retención n = 1..vida (meses):
+
+    PV(n) = inicial + Σ_{t=1..n} [costo(t)·(1 - T) - depreciación·T] / (1+r)^t
+            - reventa(n) / (1+r)^n
+
+    costo(t)     = m0·(1 + g/100·(t-1)) + operador
+    reventa(n)   = reventa_0 - (reventa_0 - salvamento)·n / vida
+    depreciación = (base depreciable - salvamento) / vida   (mensual, lineal)
+
+con r la tasa mensual equivalente al wacc ((1+r)^12 = 1+wacc), m0 el
+mantenimiento mensual inicial (initial_monthly_maintenance_cost o, si falta,
+annual_maintenance_labor_parts / 12) y g el % de m0 que se suma cada mes
+(maintenance_cost_gradient, ver crecimiento_mantenimiento). El EAC
+de cada edad es el de eac_vectorizado con vida n/12 años. El inicial y la
+base depreciable son los de parametros_maquinas: para un Defender, el costo de
+oportunidad de no venderlo hoy (la reventa actual menos el impuesto de la
+venta); para un Challenger, su costo de compra total.
+
+Todas las edades de todas las máquinas se evalúan a la vez sobre una matriz
+máquinas × meses (sumas acumuladas a lo largo de los meses).
+"""
+import numpy as np
+
+from .analisis import VIDA_DEFECTO_MESES, _f, crecimiento_mantenimiento, eac_vectorizado, gradiente_mantenimiento
+
+
+def parametros_vida(maquinas, roles=None):
+    """
+    Arreglos de parámetros de vida económica. El rol de cada máquina es su tipo,
+    salvo que se indique 'roles' (uno por máquina).
+    """
+    maquinas = list(maquinas)
+    roles = list(roles) if roles is not None else [m.tipo for m in maquinas]
+    for rol in roles:
+        if rol not in VIDA_DEFECTO_MESES:
+            raise ValueError(f'Rol no válido: {rol}')
+
+    def arreglo(funcion):
+        return np.fromiter((funcion(m) for m in maquinas), dtype=float, count=len(maquinas))
+
+    defender = np.array([rol == 'Defender' for rol in roles], dtype=bool)
+    compra = arreglo(lambda m: _f(m.purchase_price) + _f(m.installation_and_training_cost))
+    return {
+        'defender': defender,
+        'base_depreciable': np.where(defender, arreglo(lambda m: _f(m.acquisition_cost or m.purchase_price)), compra),
+        'costo_compra': compra + arreglo(lambda m: _f(m.setup_costs)),
+        # Valor de mercado al inicio: la reventa actual del Defender o el precio del Challenger
+        'reventa_inicial': np.where(defender, arreglo(lambda m: _f(m.current_resale_value)),
+                                    arreglo(lambda m: _f(m.purchase_price))),
+        'salvamento': arreglo(lambda m: _f(m.salvage_value)),
+        'mantenimiento_mensual': arreglo(
+            lambda m: _f(m.initial_monthly_maintenance_cost) if m.initial_monthly_maintenance_cost is not None
+            else _f(m.annual_maintenance_labor_parts) / 12
+        ),
+        'gradiente': arreglo(lambda m: gradiente_mantenimiento(m.maintenance_cost_gradient)),
+        'operador_mensual': arreglo(lambda m: _f(m.operator_labor_cost) * _f(m.monthly_operating_hours)),
+        'vida_meses': np.array([max(int(m.useful_life or VIDA_DEFECTO_MESES[rol]), 1)
+                                for m, rol in zip(maquinas, roles)], dtype=float),
+    }
+
+
+def curvas_eac(parametros, wacc, tax_rate):
+    """
+    EAC (anual) de cada máquina para cada edad de retención en meses.
+
+    Retorna 'meses' (1..vida máxima), 'pv' y 'eac' (máquinas × meses, NaN
+    después de la vida de cada máquina), 'edad_optima' (meses) y 'eac_minimo'.
+    """
+    wacc = float(wacc)
+    tax_rate = float(tax_rate)
+    vida = parametros['vida_meses'].astype(int)
+    n = vida.shape[0]
+    meses = np.arange(1, (int(vida.max()) if n else 0) + 1)
+    mascara = meses[None, :] <= vida[:, None]
+    tasa_mensual = (1 + wacc) ** (1 / 12) - 1
+
+    reventa_0 = parametros['reventa_inicial']
+    salvamento = parametros['salvamento']
+    defender = parametros['defender']
+    inicial = np.where(
+        defender, reventa_0 - (reventa_0 - parametros['base_depreciable']) * tax_rate, parametros['costo_compra']
+    )
+    depreciacion = (parametros['base_depreciable'] - salvamento) / vida
+
+    costo = (parametros['mantenimiento_mensual'][:, None] * crecimiento_mantenimiento(parametros['gradiente'], meses)
+             + parametros['operador_mensual'][:, None])
+    after_tax = costo * (1 - tax_rate) - (depreciacion * tax_rate)[:, None]
+    descuento = (1 + tasa_mensual) ** meses
+    acumulado = np.cumsum(np.where(mascara, after_tax / descuento[None, :], 0.0), axis=1)
+    reventa = reventa_0[:, None] - (reventa_0 - salvamento)[:, None] * meses[None, :] / vida[:, None]
+    pv = inicial[:, None] + acumulado - reventa / descuento[None, :]
+    eac = np.where(mascara, eac_vectorizado(pv, meses[None, :] / 12, wacc), np.nan)
+    pv = np.where(mascara, pv, np.nan)
+
+    if n:
+        indice = np.nanargmin(eac, axis=1)
+        eac_minimo = eac[np.arange(n), indice]
+    else:
+        indice = eac_minimo = np.zeros(0)
+    return {
+        'meses': meses,
+        'pv': pv,
+        'eac': eac,
+        'edad_optima': indice + 1,
+        'eac_minimo': eac_minimo,
+    }
+
+
+def reemplazo_diferido(curvas, indice, eac_challenger, wacc):
+    """
+    Planes "conservar el Defender k años más y luego cambiar al Challenger"
+    para k = 0..años completos de vida del Defender (fila 'indice' de
+    curvas_eac). Todos los planes cubren el mismo horizonte (la vida del
+    Defender): k años con el Defender y el resto con el Challenger a su EAC
+    mínimo 'eac_challenger'. Retorna los planes con su EAC equivalente sobre el
+    horizonte y el k de menor costo.
+    """
+    wacc = float(wacc)
+    vida = int(np.count_nonzero(~np.isnan(curvas['pv'][indice])))
+    horizonte = vida / 12
+    anios = np.arange(0, vida // 12 + 1)
+    pv_defender = np.concatenate([[0.0], curvas['pv'][indice, 11::12][:anios[-1]]])
+
+    restante = horizonte - anios
+    if wacc > 0:
+        anualidad = (1 - (1 + wacc) ** (-restante)) / wacc
+    else:
+        anualidad = restante
+    pv_plan = pv_defender + float(eac_challenger) * anualidad / (1 + wacc) ** anios
+    eac_plan = eac_vectorizado(pv_plan, horizonte, wacc)
+    mejor = int(np.argmin(eac_plan))
+    return {
+        'horizonte_anios': horizonte,
+        'anios_optimos': int(anios[mejor]),
+        'planes': [
+            {'anios_defender': int(k), 'pv': float(pv), 'eac': float(eac)}
+            for k, pv, eac in zip(anios, pv_plan, eac_plan)
+        ],
+    }
@@ -0,0 +1,134 @@
+"""
+Ranking de reemplazos recomendados para toda la flota.
+
+Evalúa cada par Defender × Challenger compatible (una máquina de tipo Defender
+con una de tipo Challenger), o los subconjuntos elegidos, con
+core.finance.ranking. El peso de cada Defender es su criticality_ranking (1 si
+no lo tiene).
+
+El resultado se guarda en la caché de Django bajo una clave con una versión
+que cambia al guardar o eliminar una Maquina (mismo esquema que
+core.catalogos), los parámetros y los subconjuntos pedidos. Con el
+LocMemCache por defecto la caché es de cada proceso: un cambio guardado en un
+worker no invalida el ranking de los demás, que pueden seguir sirviendo una
+recomendación desactualizada hasta RANKING_FLOTA_CACHE_TIMEOUT segundos (60 por
+defecto). Con varios workers conviene un backend compartido (Redis, Memcached),
+con el que la invalidación es inmediata.
+"""
+import hashlib
+import json
+import uuid
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .finance import analisis_portafolio, ranking_pares
+from .finance.ranking import LIMITE_DEFECTO
+from .models import Maquina
+
+CLAVE_VERSION = 'flota:version'
+MAX_LIMITE = 1000
+
+
+def tiempo_cache():
+    return getattr(settings, 'RANKING_FLOTA_CACHE_TIMEOUT', 60)
+
+
+def version():
+    actual = cache.get(CLAVE_VERSION)
+    if actual is None:
+        cache.add(CLAVE_VERSION, uuid.uuid4().hex[:16], tiempo_cache())
+        actual = cache.get(CLAVE_VERSION)
+    return actual
+
+
+def invalidar():
+    cache.set(CLAVE_VERSION, uuid.uuid4().hex[:16], tiempo_cache())
+
+
+@receiver([post_save, post_delete], sender=Maquina, dispatch_uid='flota_maquina')
+def _invalidar_por_senal(sender, **kwargs):
+    transaction.on_commit(invalidar)
+
+
+def _maquinas(tipo, ids):
+    consulta = Maquina.objects.filter(tipo=tipo).order_by('nombre', 'id')
+    if ids:
+        consulta = consulta.filter(id__in=ids)
+    return list(consulta)
+
+
+def _resumen(maquina):
+    return {'id': str(maquina.id), 'nombre': maquina.nombre, 'criticidad': maquina.criticality_ranking}
+
+
+def _fila(defender, challenger, eac_defender, eac_challenger, peso):
+    ahorro = eac_defender - eac_challenger
+    return {
+        'defender': _resumen(defender),
+        'challenger': _resumen(challenger),
+        'eac_defender': eac_defender,
+        'eac_challenger': eac_challenger,
+        'ahorro_anual': ahorro,
+        'peso': peso,
+        'puntaje': ahorro * peso,
+    }
+
+
+def calcular_ranking(parametros, defender_ids=None, challenger_ids=None, limite=LIMITE_DEFECTO):
+    """
+    Ranking sin caché: los mejores 'limite' pares por puntaje y, para cada
+    Defender, su mejor Challenger si el reemplazo ahorra (ordenados por puntaje).
+    """
+    defenders = _maquinas('Defender', defender_ids)
+    challengers = _maquinas('Challenger', challenger_ids)
+    resultado = analisis_portafolio(defenders, challengers, parametros['wacc'], parametros['tax_rate'])
+    eac_defender = resultado['Defender']['eac']
+    eac_challenger = resultado['Challenger']['eac']
+    pesos = np.array([1.0 if m.criticality_ranking is None else m.criticality_ranking for m in defenders])
+
+    ranking = ranking_pares(eac_defender, eac_challenger, pesos, limite)
+    filas, columnas, _ = ranking['pares']
+    pares = [
+        _fila(defenders[i], challengers[j], float(eac_defender[i]), float(eac_challenger[j]), float(pesos[i]))
+        for i, j in zip(filas, columnas)
+    ]
+    por_defender = [
+        _fila(defender, challengers[j], float(eac_defender[i]), float(eac_challenger[j]), float(pesos[i]))
+        for i, (defender, j) in enumerate(zip(defenders, ranking['mejor_challenger']))
+        if j >= 0 and ranking['mejor_ahorro'][i] > 0
+    ]
+    por_defender.sort(key=lambda fila: -fila['puntaje'])
+
+    return {
+        'defenders': len(defenders),
+        'challengers': len(challengers),
+        'pares_evaluados': ranking['evaluados'],
+        'pares_recomendados': ranking['recomendados'],
+        'por_defender': por_defender,
+        'pares': pares,
+    }
+
+
+def ranking_flota(parametros, defender_ids=None, challenger_ids=None, limite=LIMITE_DEFECTO):
+    """Ranking de la flota desde la caché si existe. Retorna (resultado, desde_cache)"""
+    if not 1 <= limite <= MAX_LIMITE:
+        raise ValueError(f'limite debe estar entre 1 y {MAX_LIMITE}')
+    entradas = json.dumps({
+        'wacc': str(parametros['wacc']),
+        'tax_rate': str(parametros['tax_rate']),
+        'defenders': sorted(map(str, defender_ids or [])),
+        'challengers': sorted(map(str, challenger_ids or [])),
+        'limite': limite,
+    }, sort_keys=True)
+    clave = f'flota:ranking:{version()}:{hashlib.sha256(entradas.encode()).hexdigest()[:32]}'
+    resultado = cache.get(clave)
+    if resultado is not None:
+        return resultado, True
+    resultado = calcular_ranking(parametros, defender_ids, challenger_ids, limite)
+    cache.set(clave, resultado, tiempo_cache())
+    return resultado, False
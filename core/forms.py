@@ -247,6 +247,14 @@ class RegistroForm(forms.ModelForm):
         self.fields['valor_cobrar_cliente'].label = 'Valor a Cobrar ($)'
         self.fields['observaciones'].label = 'Observaciones'
 
+        # El select solo incluye el cliente seleccionado; el resto se busca desde la
+        # página (api_buscar_catalogo). La validación sigue usando el queryset completo.
+        cliente_id = self['cliente'].value()
+        opciones = [('', '---------')]
+        if cliente_id:
+            opciones += [(cliente.pk, str(cliente)) for cliente in Cliente.objects.filter(pk=cliente_id)]
+        self.fields['cliente'].widget.choices = opciones
+
 # Formulario para crear/editar obligaciones individuales
 class ObligacionForm(forms.Form):
     proveedor_id = forms.IntegerField(widget=forms.HiddenInput())
@@ -571,7 +579,7 @@ class RegistroCompletoForm(forms.Form):
                 try:
                     obligaciones = json.loads(obligaciones_json)
                     # Limpiar obligaciones existentes
-                    registro.obligaciones_data = []
+                    registro.obligaciones.all().delete()
                     
                     # Agregar nuevas obligaciones
                     for obligacion in obligaciones:
@@ -583,6 +591,8 @@ class RegistroCompletoForm(forms.Form):
                             descripcion=obligacion.get('descripcion', ''),
                             referencia=obligacion.get('referencia', '')
                         )
+                    # Recalcular los saldos materializados (también si no quedan obligaciones)
+                    registro.save()
                 except json.JSONDecodeError:
                     pass  # Ya se validó en clean_obligaciones_json
         
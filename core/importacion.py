@@ -0,0 +1,385 @@
+"""
+Importación masiva del libro Excel completo (clientes, proveedores, registros,
+obligaciones y pagos).
+
+El libro se lee en modo read_only y se valida fuera de la transacción (cargando
+los IDs existentes en una consulta por tabla); luego todas las filas nuevas se
+escriben con bulk_create dentro de una única transacción. Las filas inválidas no
+detienen la importación: se reportan en la lista de errores con su hoja y número
+de fila.
+"""
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+import openpyxl
+from django.db import transaction
+from django.db.models import Max
+
+from . import catalogos
+from .models import (
+    Cliente, Obligacion, PagoCliente, PagoProveedor, Proveedor, Registro,
+    _a_fecha, _a_numero,
+)
+
+# Columnas esperadas por hoja (en orden, desde la fila 2). 'activo' y
+# 'tipo_materia_prima' se aceptan por compatibilidad con la plantilla pero no se guardan.
+HOJAS = {
+    'Clientes': ('id', 'nombre', 'city', 'email', 'telefono', 'terminos',
+                 'average_days_to_pay', 'activo', 'observaciones'),
+    'Proveedores': ('id', 'nombre', 'contacto', 'email', 'telefono', 'terminos',
+                    'tipo_materia_prima', 'activo', 'observaciones'),
+    'Registros': ('id', 'cliente_id', 'fecha_entrega', 'valor_cobrar', 'estado_cobro', 'observaciones'),
+    'Obligaciones': ('registro_id', 'proveedor_id', 'proveedor_nombre', 'valor_pagar',
+                     'fecha_vencimiento', 'descripcion', 'referencia'),
+    'Pagos_Cliente': ('registro_id', 'monto', 'fecha_pago', 'metodo_pago', 'referencia', 'observaciones'),
+    'Pagos_Proveedor': ('registro_id', 'obligacion_id', 'monto', 'fecha_pago', 'metodo_pago',
+                        'referencia', 'observaciones'),
+}
+
+TAMANO_LOTE = 1000
+
+ESTADOS_COBRO = {clave for clave, _ in Registro.ESTADO_CHOICES}
+METODOS_PAGO = {clave for clave, _ in Registro.METODO_PAGO_CHOICES}
+
+
+class FilaInvalida(Exception):
+    """Error de validación de una fila del libro"""
+
+
+def _en_lotes(elementos, tamano=500):
+    """Divide una lista en lotes (para consultas con __in)"""
+    elementos = list(elementos)
+    for inicio in range(0, len(elementos), tamano):
+        yield elementos[inicio:inicio + tamano]
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _id(valor, campo='ID'):
+    texto = _texto(valor)
+    if not texto:
+        raise FilaInvalida(f'{campo} vacío')
+    return texto
+
+
+def _monto(valor, campo='monto'):
+    try:
+        monto = Decimal(_texto(valor))
+    except InvalidOperation:
+        raise FilaInvalida(f'{campo} no válido: {valor!r}')
+    if monto <= 0:
+        raise FilaInvalida(f'{campo} debe ser mayor que cero')
+    return monto
+
+
+def _entero(valor, campo, defecto=0):
+    if valor in (None, ''):
+        return defecto
+    try:
+        return int(Decimal(_texto(valor)))
+    except InvalidOperation:
+        raise FilaInvalida(f'{campo} no válido: {valor!r}')
+
+
+def _fecha(valor, campo):
+    fecha = _a_fecha(valor)
+    if fecha is None:
+        raise FilaInvalida(f'{campo} no válida: {valor!r}')
+    return fecha
+
+
+def _metodo_pago(valor):
+    metodo = _texto(valor).lower() or 'transferencia'
+    return metodo if metodo in METODOS_PAGO else 'otro'
+
+
+class ImportadorExcel:
+    """
+    Importa un libro Excel completo. Uso:
+
+        resultado = ImportadorExcel(archivo).importar()
+
+    'progreso' es un callable opcional que recibe el resultado parcial cada
+    TAMANO_LOTE filas leídas, al terminar cada hoja y al terminar la escritura.
+    Se invoca siempre fuera de la transacción de escritura.
+    """
+
+    def __init__(self, archivo, progreso=None):
+        self.archivo = archivo
+        self.progreso = progreso
+        self.nuevos = {}
+        self.resultado = {
+            'filas_totales': 0,
+            'filas_procesadas': 0,
+            'filas_con_error': 0,
+            'creados': {hoja: 0 for hoja in HOJAS},
+            'errores': [],
+        }
+
+    # ==================== LECTURA ====================
+
+    def _filas(self, libro, hoja):
+        """Genera (número de fila, dict) de una hoja, omitiendo filas vacías"""
+        if hoja not in libro.sheetnames:
+            return
+        columnas = HOJAS[hoja]
+        for numero, valores in enumerate(libro[hoja].iter_rows(min_row=2, values_only=True), start=2):
+            if not valores or all(v in (None, '') for v in valores):
+                continue
+            valores = tuple(valores[:len(columnas)]) + (None,) * (len(columnas) - len(valores))
+            yield numero, dict(zip(columnas, valores))
+
+    def _procesar(self, libro, hoja, convertir):
+        """Convierte cada fila con 'convertir'; las filas inválidas se agregan al reporte"""
+        objetos = self.nuevos.setdefault(hoja, [])
+        for numero, fila in self._filas(libro, hoja):
+            self.resultado['filas_procesadas'] += 1
+            try:
+                objeto = convertir(fila)
+            except FilaInvalida as e:
+                self._error(hoja, numero, fila, str(e))
+                continue
+            if objeto is not None:
+                objetos.append(objeto)
+            if self.resultado['filas_procesadas'] % TAMANO_LOTE == 0:
+                self._notificar()
+        self._notificar()
+        return objetos
+
+    def _error(self, hoja, numero, fila, mensaje):
+        self.resultado['filas_con_error'] += 1
+        self.resultado['errores'].append({
+            'hoja': hoja,
+            'fila': numero,
+            'id': _texto(fila.get('id') or fila.get('registro_id')),
+            'error': mensaje,
+        })
+
+    def _notificar(self):
+        if self.progreso:
+            self.progreso(self.resultado)
+
+    def _guardar(self, hoja, modelo):
+        objetos = self.nuevos.get(hoja, [])
+        modelo.objects.bulk_create(objetos, batch_size=TAMANO_LOTE)
+        self.resultado['creados'][hoja] += len(objetos)
+
+    # ==================== IMPORTACIÓN ====================
+
+    def importar(self):
+        """Valida el libro completo, escribe las filas válidas en una transacción y retorna el reporte"""
+        libro = openpyxl.load_workbook(self.archivo, read_only=True, data_only=True)
+        try:
+            # Total aproximado de filas (según las dimensiones de cada hoja) para el progreso
+            self.resultado['filas_totales'] = sum(
+                max((libro[hoja].max_row or 1) - 1, 0) for hoja in HOJAS if hoja in libro.sheetnames
+            )
+            self._leer_clientes(libro)
+            self._leer_proveedores(libro)
+            self._leer_registros(libro)
+            self._leer_obligaciones(libro)
+            self._leer_pagos_cliente(libro)
+            self._leer_pagos_proveedor(libro)
+        finally:
+            libro.close()
+
+        with transaction.atomic():
+            self._guardar('Clientes', Cliente)
+            self._guardar('Proveedores', Proveedor)
+            self._guardar('Registros', Registro)
+            self._guardar('Obligaciones', Obligacion)
+            self._guardar('Pagos_Cliente', PagoCliente)
+            self._enlazar_pagos_proveedor()
+            self._guardar('Pagos_Proveedor', PagoProveedor)
+            self._actualizar_saldos()
+        if self.nuevos.get('Clientes') or self.nuevos.get('Proveedores'):
+            # bulk_create no emite post_save
+            catalogos.invalidar()
+        self._notificar()
+        return self.resultado
+
+    def _leer_clientes(self, libro):
+        # ID -> términos contractuales (se usa para la fecha límite de cobro de los registros)
+        self.terminos_clientes = dict(Cliente.objects.order_by().values_list('id', 'terminos_contractuales'))
+
+        def convertir(fila):
+            cliente_id = _id(fila['id'], 'ID de cliente')
+            if cliente_id in self.terminos_clientes:
+                return None  # Los clientes existentes no se modifican
+            cliente = Cliente(
+                id=cliente_id,
+                nombre=_texto(fila['nombre']),
+                city=_texto(fila['city']),
+                email=_texto(fila['email']) or None,
+                telefono=_texto(fila['telefono']) or None,
+                terminos_contractuales=_entero(fila['terminos'], 'términos', 30),
+                average_days_to_pay=_entero(fila['average_days_to_pay'], 'días promedio de pago'),
+                observaciones=_texto(fila['observaciones']),
+            )
+            self.terminos_clientes[cliente_id] = cliente.terminos_contractuales
+            return cliente
+
+        self._procesar(libro, 'Clientes', convertir)
+
+    def _leer_proveedores(self, libro):
+        self.proveedores = set(Proveedor.objects.order_by().values_list('id', flat=True))
+
+        def convertir(fila):
+            proveedor_id = _id(fila['id'], 'ID de proveedor')
+            if proveedor_id in self.proveedores:
+                return None
+            self.proveedores.add(proveedor_id)
+            return Proveedor(
+                id=proveedor_id,
+                nombre=_texto(fila['nombre']),
+                contacto=_texto(fila['contacto']),
+                email=_texto(fila['email']) or None,
+                telefono=_texto(fila['telefono']) or None,
+                terminos_pago=_entero(fila['terminos'], 'términos', 30),
+                observaciones=_texto(fila['observaciones']),
+            )
+
+        self._procesar(libro, 'Proveedores', convertir)
+
+    def _leer_registros(self, libro):
+        self.registros = set(Registro.objects.order_by().values_list('id', flat=True))
+        self.registros_modificados = set()
+
+        def convertir(fila):
+            registro_id = _id(fila['id'], 'ID de registro')
+            if registro_id in self.registros:
+                return None
+            cliente_id = _id(fila['cliente_id'], 'ID de cliente')
+            if cliente_id not in self.terminos_clientes:
+                raise FilaInvalida(f'El cliente {cliente_id} no existe')
+            fecha_entrega = _fecha(fila['fecha_entrega'], 'Fecha de entrega')
+            valor = _monto(fila['valor_cobrar'], 'Valor a cobrar')
+            estado = _texto(fila['estado_cobro']) or 'pendiente'
+            if estado not in ESTADOS_COBRO:
+                raise FilaInvalida(f'Estado de cobro no válido: {estado}')
+
+            registro = Registro(
+                id=registro_id,
+                cliente_id=cliente_id,
+                fecha_entrega_cliente=fecha_entrega,
+                fecha_limite_cobro=fecha_entrega + timedelta(days=self.terminos_clientes[cliente_id]),
+                valor_cobrar_cliente=valor,
+                estado_cobro=estado,
+                observaciones=_texto(fila['observaciones']),
+            )
+            # Sin movimientos todavía; los saldos se ajustan al final
+            registro.asignar_saldos(Decimal('0'), Decimal('0'), Decimal('0'))
+            self.registros.add(registro_id)
+            return registro
+
+        self._procesar(libro, 'Registros', convertir)
+
+    def _siguiente_numero(self, modelo):
+        """Retorna una función que asigna el siguiente número por registro (como agregar_*)"""
+        ultimos = dict(modelo.objects.order_by().values('registro_id').annotate(
+            ultimo=Max('numero')).values_list('registro_id', 'ultimo'))
+
+        def siguiente(registro_id):
+            ultimos[registro_id] = (ultimos.get(registro_id) or 0) + 1
+            return ultimos[registro_id]
+        return siguiente
+
+    def _registro_de(self, fila):
+        registro_id = _id(fila['registro_id'], 'ID de registro')
+        if registro_id not in self.registros:
+            raise FilaInvalida(f'El registro {registro_id} no existe')
+        return registro_id
+
+    def _leer_obligaciones(self, libro):
+        siguiente = self._siguiente_numero(Obligacion)
+
+        def convertir(fila):
+            registro_id = self._registro_de(fila)
+            valor = _monto(fila['valor_pagar'], 'Valor a pagar')
+            proveedor_id = _texto(fila['proveedor_id'])
+            self.registros_modificados.add(registro_id)
+            return Obligacion(
+                registro_id=registro_id,
+                numero=siguiente(registro_id),
+                proveedor_id=proveedor_id if proveedor_id in self.proveedores else None,
+                proveedor_nombre=_texto(fila['proveedor_nombre']),
+                valor_pagar=valor,
+                fecha_vencimiento=_a_fecha(fila['fecha_vencimiento']),
+                descripcion=_texto(fila['descripcion']),
+                referencia=_texto(fila['referencia']),
+            )
+
+        self._procesar(libro, 'Obligaciones', convertir)
+
+    def _leer_pagos_cliente(self, libro):
+        siguiente = self._siguiente_numero(PagoCliente)
+
+        def convertir(fila):
+            registro_id = self._registro_de(fila)
+            monto = _monto(fila['monto'])
+            self.registros_modificados.add(registro_id)
+            return PagoCliente(
+                registro_id=registro_id,
+                numero=siguiente(registro_id),
+                monto=monto,
+                fecha_pago=_a_fecha(fila['fecha_pago']),
+                metodo_pago=_metodo_pago(fila['metodo_pago']),
+                referencia=_texto(fila['referencia']),
+                observaciones=_texto(fila['observaciones']),
+            )
+
+        self._procesar(libro, 'Pagos_Cliente', convertir)
+
+    def _leer_pagos_proveedor(self, libro):
+        siguiente = self._siguiente_numero(PagoProveedor)
+        self.obligacion_de_pago = []
+
+        def convertir(fila):
+            registro_id = self._registro_de(fila)
+            numero_obligacion = _a_numero(_texto(fila['obligacion_id']))
+            if numero_obligacion is None:
+                raise FilaInvalida(f"ID de obligación no válido: {fila['obligacion_id']!r}")
+            monto = _monto(fila['monto'])
+            self.registros_modificados.add(registro_id)
+            self.obligacion_de_pago.append(numero_obligacion)
+            return PagoProveedor(
+                registro_id=registro_id,
+                numero=siguiente(registro_id),
+                monto=monto,
+                fecha_pago=_a_fecha(fila['fecha_pago']),
+                metodo_pago=_metodo_pago(fila['metodo_pago']),
+                referencia=_texto(fila['referencia']),
+                observaciones=_texto(fila['observaciones']),
+            )
+
+        self._procesar(libro, 'Pagos_Proveedor', convertir)
+
+    def _enlazar_pagos_proveedor(self):
+        """Asigna a cada pago la obligación (ya guardada) indicada por su número dentro del registro"""
+        pagos = self.nuevos.get('Pagos_Proveedor', [])
+        obligaciones = {}
+        for lote in _en_lotes({pago.registro_id for pago in pagos}):
+            obligaciones.update({
+                (registro_id, numero): pk
+                for pk, registro_id, numero in Obligacion.objects.filter(
+                    registro_id__in=lote
+                ).order_by().values_list('pk', 'registro_id', 'numero')
+            })
+        for pago, numero_obligacion in zip(pagos, self.obligacion_de_pago):
+            pago.obligacion_id = obligaciones.get((pago.registro_id, numero_obligacion))
+
+    def _actualizar_saldos(self):
+        """Recalcula (bulk_update) los saldos materializados de los registros con movimientos nuevos"""
+        for lote in _en_lotes(self.registros_modificados):
+            Registro.objects.filter(pk__in=lote).recalcular_saldos()
+
+
+def importar_excel(archivo, progreso=None):
+    """Importa el libro Excel completo y retorna el reporte de la importación"""
+    return ImportadorExcel(archivo, progreso).importar()
@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, teardown_databases
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide las vistas y cálculos de tesorería y maquinaria con datos sintéticos. '
+        'Cada escala se ejecuta en una base de datos de prueba nueva (no toca los datos reales).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', action='append', choices=list(benchmark.ESCALAS),
+                            help='Escala(s) a medir: 1k, 10k o 100k registros (por defecto 1k)')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla de los generadores')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Ejecuciones por caso')
+        parser.add_argument('--caso', action='append', dest='casos', help='Limita la medición a estos casos')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar los resultados (por defecto, stdout)')
+        parser.add_argument('--comparar', help='JSON de una ejecución anterior para calcular la variación')
+
+    def handle(self, *args, **options):
+        if options['repeticiones'] < 1:
+            raise CommandError('--repeticiones debe ser al menos 1')
+        if connection.vendor != 'sqlite':
+            self.stderr.write(self.style.WARNING(
+                f'La base de datos es {connection.vendor}; los resultados de referencia son de SQLite'
+            ))
+
+        referencia = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as archivo:
+                    referencia = json.load(archivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'No se pudo leer {options["comparar"]}: {e}')
+
+        salida = {
+            'meta': benchmark.metadatos(options['semilla'], options['repeticiones']),
+            'resultados': [],
+        }
+        for nombre in options['escala'] or ['1k']:
+            configuracion = setup_databases(verbosity=0, interactive=False, aliases={'default'},
+                                            serialized_aliases=set())
+            try:
+                self.stderr.write(f'Escala {nombre}: generando datos y midiendo...')
+                salida['resultados'].append(benchmark.ejecutar_benchmarks(
+                    benchmark.ESCALAS[nombre], options['semilla'], options['repeticiones'], options['casos'],
+                ))
+            finally:
+                teardown_databases(configuracion, verbosity=0)
+
+        if referencia:
+            salida['comparacion'] = benchmark.comparar(salida, referencia)
+
+        texto = json.dumps(salida, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(texto)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+        else:
+            self.stdout.write(texto)
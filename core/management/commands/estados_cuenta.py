@@ -0,0 +1,31 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core.estados_cuenta import generar_estados_cuenta
+
+
+class Command(BaseCommand):
+    help = 'Genera en paralelo el estado de cuenta en PDF de cada cliente y los empaqueta en un ZIP'
+
+    def add_arguments(self, parser):
+        parser.add_argument('clientes', nargs='*', help='IDs de clientes (por defecto, todos los que tienen registros)')
+        parser.add_argument('--salida', help='Ruta del ZIP (por defecto, estados_cuenta_<fecha de corte>.zip)')
+        parser.add_argument('--fecha-corte', help='Fecha de corte AAAA-MM-DD (por defecto, hoy)')
+        parser.add_argument('--procesos', type=int, help='Procesos de renderizado (por defecto, uno por CPU)')
+
+    def handle(self, *args, **options):
+        fecha_corte = date.today()
+        if options['fecha_corte']:
+            fecha_corte = parse_date(options['fecha_corte'])
+            if fecha_corte is None:
+                raise CommandError('--fecha-corte debe tener el formato AAAA-MM-DD')
+        if options['procesos'] is not None and options['procesos'] < 1:
+            raise CommandError('--procesos debe ser al menos 1')
+
+        salida = options['salida'] or f'estados_cuenta_{fecha_corte.isoformat()}.zip'
+        generados = generar_estados_cuenta(
+            salida, clientes=options['clientes'] or None, fecha_corte=fecha_corte, procesos=options['procesos'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'{generados} estados de cuenta generados en {salida}'))
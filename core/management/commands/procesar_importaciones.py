@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from core.models import TrabajoImportacion
+from core.trabajos import ejecutar_importacion, reiniciar_trabajos_estancados
+
+
+class Command(BaseCommand):
+    help = (
+        'Procesa los trabajos de importación pendientes (por ejemplo, tras reiniciar el servidor), '
+        'incluidos los que quedaron en proceso más tiempo del permitido'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout', type=int, default=None,
+            help='Segundos tras los que un trabajo en proceso se considera abandonado '
+                 '(por defecto IMPORTACION_TIMEOUT_EN_PROCESO, 3600)',
+        )
+
+    def handle(self, *args, **options):
+        reiniciados = reiniciar_trabajos_estancados(options['timeout'])
+        if reiniciados:
+            self.stdout.write(f'{reiniciados} trabajos en proceso abandonados vuelven a pendiente')
+
+        pendientes = TrabajoImportacion.objects.filter(estado='pendiente').order_by(
+            'fecha_creacion'
+        ).values_list('pk', flat=True)
+
+        for trabajo_id in list(pendientes):
+            trabajo = ejecutar_importacion(trabajo_id)
+            if trabajo is None:
+                continue
+            self.stdout.write(
+                f'{trabajo.nombre_archivo}: {trabajo.get_estado_display()} '
+                f'({trabajo.filas_procesadas} filas, {trabajo.filas_con_error} con error)'
+            )
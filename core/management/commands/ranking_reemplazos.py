@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exportacion import columna, escribir_libro, hoja
+from core.flota import LIMITE_DEFECTO, ranking_flota
+from core.reemplazo import leer_parametros
+
+COLUMNAS = [
+    columna('Defender', 'defender', ancho=30),
+    columna('Criticidad', 'peso', 'moneda'),
+    columna('Challenger', 'challenger', ancho=30),
+    columna('EAC Defender', 'eac_defender', 'moneda', 16),
+    columna('EAC Challenger', 'eac_challenger', 'moneda', 16),
+    columna('Ahorro Anual', 'ahorro_anual', 'moneda', 16),
+    columna('Puntaje', 'puntaje', 'moneda', 16),
+]
+
+
+def _filas(pares):
+    return ({**par, 'defender': par['defender']['nombre'], 'challenger': par['challenger']['nombre']} for par in pares)
+
+
+class Command(BaseCommand):
+    help = (
+        'Evalúa todos los pares Defender × Challenger de la flota y guarda en un XLSX el ranking '
+        'de reemplazos por ahorro de EAC ponderado por criticidad (también deja el resultado en caché)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wacc', default=None, help='WACC como fracción (por defecto 0.14)')
+        parser.add_argument('--tax-rate', default=None, help='Tasa de impuestos como fracción (por defecto 0.21)')
+        parser.add_argument('--limite', type=int, default=LIMITE_DEFECTO, help='Mejores pares a incluir')
+        parser.add_argument('--salida', default='ranking_reemplazos.xlsx', help='Ruta del XLSX')
+
+    def handle(self, *args, **options):
+        try:
+            parametros = leer_parametros({'wacc': options['wacc'], 'tax_rate': options['tax_rate']})
+            resultado, _ = ranking_flota(parametros, limite=options['limite'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        escribir_libro(options['salida'], [
+            hoja('Por Defender', COLUMNAS, _filas(resultado['por_defender']),
+                 titulo='Mejor reemplazo de cada Defender', totales=False),
+            hoja('Mejores Pares', COLUMNAS, _filas(resultado['pares']),
+                 titulo=f"Mejores {options['limite']} pares", totales=False),
+        ])
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['pares_evaluados']} pares evaluados, {resultado['pares_recomendados']} con ahorro; "
+            f"ranking guardado en {options['salida']}"
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Registro, recalcular_dias_pago_clientes
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula desde los pagos los días de pago materializados de los registros y las '
+        'sumas y el promedio de días de pago de los clientes (corrige desviaciones)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('clientes', nargs='*', help='IDs de clientes a recalcular (por defecto, todos)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Registros por lote de actualización')
+
+    def handle(self, *args, **options):
+        clientes = options['clientes'] or None
+        registros = Registro.objects.all()
+        if clientes:
+            registros = registros.filter(cliente_id__in=clientes)
+
+        recalculados = registros.recalcular_saldos(batch_size=options['batch_size'])
+        actualizados = recalcular_dias_pago_clientes(clientes)
+        self.stdout.write(self.style.SUCCESS(
+            f'{recalculados} registros y {actualizados} clientes recalculados'
+        ))
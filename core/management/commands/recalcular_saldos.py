@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Registro
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los saldos materializados de los registros a partir de obligaciones y pagos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('registros', nargs='*', help='IDs de registros a recalcular (por defecto, todos)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Registros por lote de actualización')
+
+    def handle(self, *args, **options):
+        registros = Registro.objects.all()
+        if options['registros']:
+            registros = registros.filter(pk__in=options['registros'])
+
+        actualizados = registros.recalcular_saldos(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{actualizados} registros recalculados'))
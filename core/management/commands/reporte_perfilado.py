@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import perfilado
+
+
+class Command(BaseCommand):
+    help = 'Muestra el reporte de perfilado por vista (p50/p95/p99 de tiempo, consultas, tiempo de BD y bytes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orden', default='tiempo_ms', choices=perfilado.METRICAS,
+                            help='Métrica por cuyo p95 se ordena el reporte')
+        parser.add_argument('--limite', type=int, default=0, help='Número máximo de vistas (0 = todas)')
+        parser.add_argument('--json', action='store_true', help='Imprime el reporte como JSON')
+        parser.add_argument('--reiniciar', action='store_true', help='Descarta las muestras después del reporte')
+
+    def handle(self, *args, **options):
+        try:
+            filas = perfilado.reporte(orden=options['orden'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['limite']:
+            filas = filas[:options['limite']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(filas, indent=2, ensure_ascii=False))
+        elif not filas:
+            self.stdout.write('No hay muestras de perfilado (¿PERFILADO_ACTIVO está activado?)')
+        else:
+            self.stdout.write(
+                f"{'Vista':<40} {'N':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+                f"{'SQL p95':>8} {'BD p95 ms':>10} {'KB p95':>8}"
+            )
+            for fila in filas:
+                self.stdout.write(
+                    f"{fila['vista'][:40]:<40} {fila['solicitudes']:>6} "
+                    f"{fila['tiempo_ms']['p50']:>9.1f} {fila['tiempo_ms']['p95']:>9.1f} {fila['tiempo_ms']['p99']:>9.1f} "
+                    f"{fila['consultas']['p95']:>8.0f} {fila['tiempo_db_ms']['p95']:>10.1f} "
+                    f"{fila['bytes']['p95'] / 1024:>8.1f}"
+                )
+
+        if options['reiniciar']:
+            perfilado.reiniciar()
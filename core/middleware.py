@@ -0,0 +1,54 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .perfilado import registro
+
+
+class _ContadorConsultas:
+    """execute_wrapper que cuenta las consultas y acumula su duración"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+class PerfiladoMiddleware:
+    """
+    Registra por nombre de URL el tiempo de respuesta, el número de consultas,
+    el tiempo en base de datos y el tamaño de la respuesta (ver core.perfilado).
+    Solo se activa con PERFILADO_ACTIVO = True.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFILADO_ACTIVO', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        contador = _ContadorConsultas()
+        inicio = time.perf_counter()
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(contador))
+            response = self.get_response(request)
+        tiempo = time.perf_counter() - inicio
+
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else 'sin_ruta'
+        tamano = 0 if response.streaming else len(response.content)
+
+        registro.registrar(vista, tiempo * 1000, contador.consultas, contador.tiempo * 1000, tamano)
+        registro.volcar()
+        return response
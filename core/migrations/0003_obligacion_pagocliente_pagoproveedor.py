@@ -0,0 +1,78 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:51
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_remove_maquina_machine_age'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Obligacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.PositiveBigIntegerField(verbose_name='ID Obligación')),
+                ('proveedor_nombre', models.CharField(blank=True, max_length=200, verbose_name='Nombre Proveedor')),
+                ('valor_pagar', models.DecimalField(decimal_places=2, max_digits=15, verbose_name='Valor a Pagar')),
+                ('fecha_recepcion', models.DateField(blank=True, null=True, verbose_name='Fecha Recepción')),
+                ('fecha_vencimiento', models.DateField(blank=True, db_index=True, null=True, verbose_name='Fecha Vencimiento')),
+                ('descripcion', models.TextField(blank=True, verbose_name='Descripción')),
+                ('referencia', models.CharField(blank=True, max_length=100, verbose_name='Referencia')),
+                ('fecha_creacion', models.DateField(default=datetime.date.today, verbose_name='Fecha Creación')),
+                ('proveedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='obligaciones', to='core.proveedor', verbose_name='Proveedor')),
+                ('registro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='obligaciones', to='core.registro', verbose_name='Registro')),
+            ],
+            options={
+                'verbose_name': 'Obligación',
+                'verbose_name_plural': 'Obligaciones',
+                'ordering': ['registro', 'numero'],
+                'unique_together': {('registro', 'numero')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PagoCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.PositiveBigIntegerField(verbose_name='ID Pago')),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=15, verbose_name='Monto')),
+                ('fecha_pago', models.DateField(blank=True, db_index=True, null=True, verbose_name='Fecha Pago')),
+                ('metodo_pago', models.CharField(choices=[('efectivo', 'Efectivo'), ('transferencia', 'Transferencia'), ('cheque', 'Cheque'), ('tarjeta', 'Tarjeta'), ('otro', 'Otro')], default='transferencia', max_length=20, verbose_name='Método de Pago')),
+                ('referencia', models.CharField(blank=True, max_length=100, verbose_name='Referencia')),
+                ('observaciones', models.TextField(blank=True, verbose_name='Observaciones')),
+                ('fecha_registro', models.DateField(default=datetime.date.today, verbose_name='Fecha Registro')),
+                ('registro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pagos_cliente', to='core.registro', verbose_name='Registro')),
+            ],
+            options={
+                'verbose_name': 'Pago de Cliente',
+                'verbose_name_plural': 'Pagos de Clientes',
+                'ordering': ['registro', 'numero'],
+                'unique_together': {('registro', 'numero')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PagoProveedor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.PositiveBigIntegerField(verbose_name='ID Pago')),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=15, verbose_name='Monto')),
+                ('fecha_pago', models.DateField(blank=True, db_index=True, null=True, verbose_name='Fecha Pago')),
+                ('metodo_pago', models.CharField(choices=[('efectivo', 'Efectivo'), ('transferencia', 'Transferencia'), ('cheque', 'Cheque'), ('tarjeta', 'Tarjeta'), ('otro', 'Otro')], default='transferencia', max_length=20, verbose_name='Método de Pago')),
+                ('referencia', models.CharField(blank=True, max_length=100, verbose_name='Referencia')),
+                ('observaciones', models.TextField(blank=True, verbose_name='Observaciones')),
+                ('fecha_registro', models.DateField(default=datetime.date.today, verbose_name='Fecha Registro')),
+                ('obligacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pagos', to='core.obligacion', verbose_name='Obligación')),
+                ('registro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pagos_proveedor', to='core.registro', verbose_name='Registro')),
+            ],
+            options={
+                'verbose_name': 'Pago a Proveedor',
+                'verbose_name_plural': 'Pagos a Proveedores',
+                'ordering': ['registro', 'numero'],
+                'unique_together': {('registro', 'numero')},
+            },
+        ),
+    ]
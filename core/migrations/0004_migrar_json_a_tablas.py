@@ -0,0 +1,179 @@
+# Migración de datos: mueve obligaciones_data, pagos_cliente_data y
+# pagos_proveedor_data de Registro a las tablas Obligacion, PagoCliente y PagoProveedor.
+
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations
+
+
+def _a_fecha(valor):
+    if not valor:
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    try:
+        return datetime.fromisoformat(str(valor).strip()).date()
+    except ValueError:
+        return None
+
+
+def _a_decimal(valor):
+    try:
+        return Decimal(str(valor if valor not in (None, '') else 0))
+    except InvalidOperation:
+        return Decimal('0')
+
+
+def _a_numero(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _numerar(elementos):
+    usados = set()
+    numerados = []
+    for elemento in elementos:
+        numero = _a_numero(elemento.get('id')) if isinstance(elemento, dict) else None
+        if numero is None or numero <= 0 or numero in usados:
+            numero = None
+        else:
+            usados.add(numero)
+        numerados.append([numero, elemento])
+
+    siguiente = max(usados, default=0)
+    for par in numerados:
+        if par[0] is None:
+            siguiente += 1
+            par[0] = siguiente
+    return [tuple(par) for par in numerados if isinstance(par[1], dict)]
+
+
+def migrar_json_a_tablas(apps, schema_editor):
+    Registro = apps.get_model('core', 'Registro')
+    Proveedor = apps.get_model('core', 'Proveedor')
+    Obligacion = apps.get_model('core', 'Obligacion')
+    PagoCliente = apps.get_model('core', 'PagoCliente')
+    PagoProveedor = apps.get_model('core', 'PagoProveedor')
+
+    proveedores_validos = set(Proveedor.objects.values_list('id', flat=True))
+
+    for registro in Registro.objects.all().iterator(chunk_size=500):
+        obligaciones = registro.obligaciones_data if isinstance(registro.obligaciones_data, list) else []
+        pagos_cliente = registro.pagos_cliente_data if isinstance(registro.pagos_cliente_data, list) else []
+        pagos_proveedor = registro.pagos_proveedor_data if isinstance(registro.pagos_proveedor_data, list) else []
+        fecha_base = registro.fecha_creacion.date() if registro.fecha_creacion else date.today()
+
+        por_numero = {}
+        for numero, data in _numerar(obligaciones):
+            proveedor_id = str(data.get('proveedor_id') or '')
+            obligacion = Obligacion.objects.create(
+                registro=registro,
+                numero=numero,
+                proveedor_id=proveedor_id if proveedor_id in proveedores_validos else None,
+                proveedor_nombre=data.get('proveedor_nombre') or '',
+                valor_pagar=_a_decimal(data.get('valor_pagar')),
+                fecha_recepcion=_a_fecha(data.get('fecha_recepcion')),
+                fecha_vencimiento=_a_fecha(data.get('fecha_vencimiento')),
+                descripcion=data.get('descripcion') or '',
+                referencia=data.get('referencia') or '',
+                fecha_creacion=_a_fecha(data.get('fecha_creacion')) or fecha_base,
+            )
+            por_numero.setdefault(_a_numero(data.get('id')), obligacion)
+            por_numero.setdefault(numero, obligacion)
+
+        PagoCliente.objects.bulk_create([
+            PagoCliente(
+                registro=registro,
+                numero=numero,
+                monto=_a_decimal(data.get('monto')),
+                fecha_pago=_a_fecha(data.get('fecha_pago')),
+                metodo_pago=data.get('metodo_pago') or 'transferencia',
+                referencia=data.get('referencia') or '',
+                observaciones=data.get('observaciones') or '',
+                fecha_registro=_a_fecha(data.get('fecha_registro')) or fecha_base,
+            )
+            for numero, data in _numerar(pagos_cliente)
+        ])
+
+        PagoProveedor.objects.bulk_create([
+            PagoProveedor(
+                registro=registro,
+                obligacion=por_numero.get(_a_numero(data.get('obligacion_id'))),
+                numero=numero,
+                monto=_a_decimal(data.get('monto')),
+                fecha_pago=_a_fecha(data.get('fecha_pago')),
+                metodo_pago=data.get('metodo_pago') or 'transferencia',
+                referencia=data.get('referencia') or '',
+                observaciones=data.get('observaciones') or '',
+                fecha_registro=_a_fecha(data.get('fecha_registro')) or fecha_base,
+            )
+            for numero, data in _numerar(pagos_proveedor)
+        ])
+
+
+def migrar_tablas_a_json(apps, schema_editor):
+    Registro = apps.get_model('core', 'Registro')
+    Obligacion = apps.get_model('core', 'Obligacion')
+    PagoCliente = apps.get_model('core', 'PagoCliente')
+    PagoProveedor = apps.get_model('core', 'PagoProveedor')
+
+    def _iso(fecha):
+        return fecha.isoformat() if fecha else None
+
+    for registro in Registro.objects.all().iterator(chunk_size=500):
+        registro.obligaciones_data = [
+            {
+                'id': o.numero,
+                'proveedor_id': o.proveedor_id,
+                'proveedor_nombre': o.proveedor_nombre,
+                'valor_pagar': str(o.valor_pagar),
+                'fecha_recepcion': _iso(o.fecha_recepcion),
+                'fecha_vencimiento': _iso(o.fecha_vencimiento),
+                'descripcion': o.descripcion,
+                'referencia': o.referencia,
+                'fecha_creacion': _iso(o.fecha_creacion),
+            }
+            for o in Obligacion.objects.filter(registro=registro).order_by('numero')
+        ]
+        registro.pagos_cliente_data = [
+            {
+                'id': p.numero,
+                'monto': str(p.monto),
+                'fecha_pago': _iso(p.fecha_pago),
+                'metodo_pago': p.metodo_pago,
+                'referencia': p.referencia,
+                'observaciones': p.observaciones,
+                'fecha_registro': _iso(p.fecha_registro),
+            }
+            for p in PagoCliente.objects.filter(registro=registro).order_by('numero')
+        ]
+        registro.pagos_proveedor_data = [
+            {
+                'id': p.numero,
+                'obligacion_id': p.obligacion.numero if p.obligacion_id else None,
+                'monto': str(p.monto),
+                'fecha_pago': _iso(p.fecha_pago),
+                'metodo_pago': p.metodo_pago,
+                'referencia': p.referencia,
+                'observaciones': p.observaciones,
+                'fecha_registro': _iso(p.fecha_registro),
+            }
+            for p in PagoProveedor.objects.filter(registro=registro).select_related('obligacion').order_by('numero')
+        ]
+        registro.save(update_fields=['obligaciones_data', 'pagos_cliente_data', 'pagos_proveedor_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_obligacion_pagocliente_pagoproveedor'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrar_json_a_tablas, migrar_tablas_a_json),
+    ]
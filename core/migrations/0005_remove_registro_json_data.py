@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:51
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_migrar_json_a_tablas'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='registro',
+            name='obligaciones_data',
+        ),
+        migrations.RemoveField(
+            model_name='registro',
+            name='pagos_cliente_data',
+        ),
+        migrations.RemoveField(
+            model_name='registro',
+            name='pagos_proveedor_data',
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:57
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_remove_registro_json_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registro',
+            name='margen_bruto',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=Decimal('0'), editable=False, max_digits=15, verbose_name='Margen Bruto'),
+        ),
+        migrations.AddField(
+            model_name='registro',
+            name='porcentaje_cobrado',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=Decimal('0'), editable=False, max_digits=9, verbose_name='Porcentaje Cobrado'),
+        ),
+        migrations.AddField(
+            model_name='registro',
+            name='saldo_pendiente',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=Decimal('0'), editable=False, max_digits=15, verbose_name='Saldo Pendiente Cliente'),
+        ),
+        migrations.AddField(
+            model_name='registro',
+            name='total_cobrado',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=15, verbose_name='Total Cobrado'),
+        ),
+        migrations.AddField(
+            model_name='registro',
+            name='total_obligaciones_pendientes',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=Decimal('0'), editable=False, max_digits=15, verbose_name='Total Obligaciones Pendientes'),
+        ),
+    ]
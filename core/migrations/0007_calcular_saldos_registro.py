@@ -0,0 +1,59 @@
+# Migración de datos: calcula los saldos materializados de los registros existentes
+# a partir de las tablas Obligacion, PagoCliente y PagoProveedor.
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Sum
+
+
+def calcular_saldos(apps, schema_editor):
+    Registro = apps.get_model('core', 'Registro')
+    Obligacion = apps.get_model('core', 'Obligacion')
+    PagoCliente = apps.get_model('core', 'PagoCliente')
+    PagoProveedor = apps.get_model('core', 'PagoProveedor')
+
+    cobrado = dict(PagoCliente.objects.order_by().values('registro_id').annotate(
+        total=Sum('monto')).values_list('registro_id', 'total'))
+    pagado = dict(PagoProveedor.objects.filter(obligacion__isnull=False).order_by().values(
+        'obligacion_id').annotate(total=Sum('monto')).values_list('obligacion_id', 'total'))
+
+    obligaciones = {}
+    pendientes = {}
+    for obligacion_id, registro_id, valor in Obligacion.objects.values_list('id', 'registro_id', 'valor_pagar'):
+        obligaciones[registro_id] = obligaciones.get(registro_id, Decimal('0')) + valor
+        saldo = valor - (pagado.get(obligacion_id) or Decimal('0'))
+        if saldo > 0:
+            pendientes[registro_id] = pendientes.get(registro_id, Decimal('0')) + saldo
+
+    lote = []
+    for registro in Registro.objects.order_by('pk').iterator(chunk_size=500):
+        valor = registro.valor_cobrar_cliente
+        total_cobrado = cobrado.get(registro.pk) or Decimal('0')
+        registro.total_cobrado = total_cobrado
+        registro.saldo_pendiente = valor - total_cobrado
+        registro.total_obligaciones_pendientes = pendientes.get(registro.pk, Decimal('0'))
+        registro.margen_bruto = valor - obligaciones.get(registro.pk, Decimal('0'))
+        registro.porcentaje_cobrado = (
+            (total_cobrado / valor * 100).quantize(Decimal('0.01')) if valor > 0 else Decimal('0')
+        )
+        lote.append(registro)
+        if len(lote) >= 500:
+            Registro.objects.bulk_update(lote, CAMPOS)
+            lote = []
+    if lote:
+        Registro.objects.bulk_update(lote, CAMPOS)
+
+
+CAMPOS = ['total_cobrado', 'saldo_pendiente', 'total_obligaciones_pendientes', 'margen_bruto', 'porcentaje_cobrado']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_saldos_materializados_registro'),
+    ]
+
+    operations = [
+        migrations.RunPython(calcular_saldos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:01
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_calcular_saldos_registro'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoImportacion',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nombre_archivo', models.CharField(max_length=255, verbose_name='Archivo')),
+                ('contenido', models.BinaryField(verbose_name='Contenido del Archivo')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En Proceso'), ('completado', 'Completado'), ('fallido', 'Fallido')], db_index=True, default='pendiente', max_length=20, verbose_name='Estado')),
+                ('filas_totales', models.PositiveIntegerField(default=0, verbose_name='Filas Totales')),
+                ('filas_procesadas', models.PositiveIntegerField(default=0, verbose_name='Filas Procesadas')),
+                ('filas_con_error', models.PositiveIntegerField(default=0, verbose_name='Filas con Error')),
+                ('errores', models.JSONField(blank=True, default=list, verbose_name='Errores por Fila')),
+                ('creados', models.JSONField(blank=True, default=dict, verbose_name='Filas Creadas por Hoja')),
+                ('mensaje_error', models.TextField(blank=True, verbose_name='Error General')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha Creación')),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Fecha Inicio')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fecha Fin')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Importación',
+                'verbose_name_plural': 'Trabajos de Importación',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_trabajoimportacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analisiscomparativo',
+            name='monto_financiado',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=20, null=True, verbose_name='Monto Financiado'),
+        ),
+    ]
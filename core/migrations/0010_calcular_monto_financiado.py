@@ -0,0 +1,39 @@
+# Migración de datos: guarda el monto financiado de los análisis existentes para
+# que su tabla de amortización se pueda calcular sin las filas de TablaAmortizacion.
+
+from decimal import Decimal
+
+from django.db import migrations
+
+
+def calcular_monto_financiado(apps, schema_editor):
+    AnalisisComparativo = apps.get_model('core', 'AnalisisComparativo')
+    TablaAmortizacion = apps.get_model('core', 'TablaAmortizacion')
+
+    primer_mes = dict(TablaAmortizacion.objects.filter(mes=1).values_list('analisis_id', 'balance_inicial'))
+
+    lote = []
+    for analisis in AnalisisComparativo.objects.select_related('challenger').iterator(chunk_size=500):
+        challenger = analisis.challenger
+        analisis.monto_financiado = primer_mes.get(analisis.pk, sum(
+            (valor for valor in (challenger.purchase_price, challenger.installation_and_training_cost,
+                                 challenger.setup_costs) if valor),
+            Decimal('0'),
+        ))
+        lote.append(analisis)
+        if len(lote) >= 500:
+            AnalisisComparativo.objects.bulk_update(lote, ['monto_financiado'])
+            lote = []
+    if lote:
+        AnalisisComparativo.objects.bulk_update(lote, ['monto_financiado'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_monto_financiado_analisis'),
+    ]
+
+    operations = [
+        migrations.RunPython(calcular_monto_financiado, migrations.RunPython.noop),
+    ]
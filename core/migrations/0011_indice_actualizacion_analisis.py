@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_calcular_monto_financiado'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analisiscomparativo',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_indice_actualizacion_analisis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='dias_pago_acumulados',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='pagos_con_dias',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='registro',
+            name='dias_pago_total',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='registro',
+            name='pagos_con_dias',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Migración de datos: calcula los días de pago materializados de cada registro y
+# las sumas acumuladas (y el promedio) de cada cliente a partir de los pagos existentes.
+
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+
+
+def calcular_dias_pago(apps, schema_editor):
+    Cliente = apps.get_model('core', 'Cliente')
+    Registro = apps.get_model('core', 'Registro')
+    PagoCliente = apps.get_model('core', 'PagoCliente')
+
+    por_registro = PagoCliente.objects.filter(fecha_pago__isnull=False).annotate(
+        dias=ExpressionWrapper(F('fecha_pago') - F('registro__fecha_entrega_cliente'), output_field=DurationField()),
+    ).filter(dias__gte=timedelta(0)).order_by().values('registro_id').annotate(
+        total_dias=Sum('dias'), pagos=Count('pk'),
+    ).values_list('registro_id', 'total_dias', 'pagos')
+
+    lote = []
+    for registro_id, total_dias, pagos in por_registro.iterator(chunk_size=500):
+        lote.append(Registro(pk=registro_id, dias_pago_total=total_dias.days, pagos_con_dias=pagos))
+        if len(lote) >= 500:
+            Registro.objects.bulk_update(lote, ['dias_pago_total', 'pagos_con_dias'])
+            lote = []
+    if lote:
+        Registro.objects.bulk_update(lote, ['dias_pago_total', 'pagos_con_dias'])
+
+    por_cliente = Registro.objects.order_by().values('cliente_id').annotate(
+        dias=Sum('dias_pago_total'), pagos=Sum('pagos_con_dias'),
+    ).filter(pagos__gt=0).values_list('cliente_id', 'dias', 'pagos')
+    for cliente_id, dias, pagos in por_cliente:
+        Cliente.objects.filter(pk=cliente_id).update(
+            dias_pago_acumulados=dias, pagos_con_dias=pagos, average_days_to_pay=dias // pagos,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_dias_pago_acumulados'),
+    ]
+
+    operations = [
+        migrations.RunPython(calcular_dias_pago, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:33
+
+from django.db import DatabaseError, migrations, models, transaction
+
+# Índices trigram (solo PostgreSQL) sobre UPPER(columna::text), la expresión que
+# Django usa en icontains, para que las búsquedas por subcadena no recorran la tabla.
+INDICES_TRIGRAM = [
+    ('registro_id_trgm_idx', 'core_registro', 'id'),
+    ('cliente_id_trgm_idx', 'core_cliente', 'id'),
+    ('cliente_nombre_trgm_idx', 'core_cliente', 'nombre'),
+    ('maquina_nombre_trgm_idx', 'core_maquina', 'nombre'),
+    ('maquina_numero_serie_trgm_idx', 'core_maquina', 'numero_serie'),
+]
+
+
+def crear_indices_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError:
+        # Sin permisos para crear la extensión: icontains funciona igual, sin estos índices
+        return
+    for nombre, tabla, columna in INDICES_TRIGRAM:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} USING gin (UPPER({columna}::text) gin_trgm_ops)'
+        )
+
+
+def eliminar_indices_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre, _, _ in INDICES_TRIGRAM:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nombre}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_calcular_dias_pago'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='registro',
+            name='estado_cobro',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('pagado_parcial', 'Pagado Parcial'), ('pagado_total', 'Pagado Total')], db_index=True, default='pendiente', max_length=20, verbose_name='Estado Cobro'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['nombre', 'id'], name='cliente_nombre_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maquina',
+            index=models.Index(fields=['nombre', 'id'], name='maquina_nombre_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maquina',
+            index=models.Index(fields=['numero_serie'], name='maquina_numero_serie_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registro',
+            index=models.Index(fields=['-fecha_creacion', 'id'], name='registro_creacion_id_idx'),
+        ),
+        migrations.RunPython(crear_indices_trigram, eliminar_indices_trigram),
+    ]
@@ -1,11 +1,20 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (
+    Count, Sum, Max, OuterRef, Subquery, Value, F, Q, Case, When, ExpressionWrapper,
+    BooleanField, DateField, DecimalField, DurationField,
+)
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThanOrEqual, LessThanOrEqual
 import uuid
 from django.core.validators import MinValueValidator
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from datetime import datetime, date, timedelta
 import json
 
+from . import finance
+
 
 class Maquina(models.Model):
     # CATEGORÍA 1: IDENTIFICACIÓN Y ESTATUS
@@ -59,10 +68,24 @@ class Maquina(models.Model):
     class Meta:
         verbose_name = "Máquina"
         verbose_name_plural = "Máquinas"
+        indexes = [
+            # Orden y cursor de la lista de maquinaria (core.busqueda)
+            models.Index(fields=['nombre', 'id'], name='maquina_nombre_id_idx'),
+            models.Index(fields=['numero_serie'], name='maquina_numero_serie_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} ({self.get_tipo_display()})"
 
+    @property
+    def costo_inicial_total(self):
+        """Precio de compra más instalación, formación y configuración"""
+        total = Decimal('0')
+        for valor in (self.purchase_price, self.installation_and_training_cost, self.setup_costs):
+            if valor:
+                total += valor
+        return total
+
 class AnalisisComparativo(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     nombre_analisis = models.CharField("Nombre del Análisis", max_length=200)
@@ -76,6 +99,7 @@ class AnalisisComparativo(models.Model):
     # Parámetros de financiamiento para Challenger
     financing_rate = models.DecimalField("Tasa de Financiamiento (%)", max_digits=5, decimal_places=2, default=7.5)
     financing_months = models.IntegerField("Meses de Financiamiento", default=60)
+    monto_financiado = models.DecimalField("Monto Financiado", max_digits=20, decimal_places=2, blank=True, null=True)
     
     # Resultados del análisis
     pv_defender = models.DecimalField("Valor Presente Defender", max_digits=20, decimal_places=2, blank=True, null=True)
@@ -86,12 +110,29 @@ class AnalisisComparativo(models.Model):
     recomendacion = models.CharField("Recomendación", max_length=50, blank=True, null=True)  # "Defender" o "Challenger"
     
     fecha_creacion = models.DateTimeField(auto_now_add=True)
-    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         verbose_name = "Análisis Comparativo"
         verbose_name_plural = "Análisis Comparativos"
 
+    @property
+    def principal_prestamo(self):
+        """Monto financiado al guardar el análisis (o el costo actual del challenger)"""
+        if self.monto_financiado is not None:
+            return self.monto_financiado
+        return self.challenger.costo_inicial_total
+
+    @property
+    def pago_mensual(self):
+        return finance.pago_mensual(self.principal_prestamo, self.financing_rate, self.financing_months)
+
+    def filas_amortizacion(self, desde=1, hasta=None):
+        """Tabla de amortización calculada bajo demanda para los meses desde..hasta"""
+        return finance.filas_amortizacion(
+            self.principal_prestamo, self.financing_rate, self.financing_months, desde, hasta
+        )
+
 class FlujoCaja(models.Model):
     analisis = models.ForeignKey(AnalisisComparativo, related_name='flujos_caja', on_delete=models.CASCADE)
     tipo_equipo = models.CharField(max_length=15, choices=[('Defender', 'Defender'), ('Challenger', 'Challenger')])
@@ -140,39 +181,27 @@ class Cliente(models.Model):
     )
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha Creación")
     observaciones = models.TextField(blank=True, verbose_name="Descripción")
-    def actualizar_dias_promedio_pago(self):
-        from .models import Registro  # o el módulo donde esté Registro
+    # Sumas acumuladas de los pagos con fecha (días desde la entrega y número de
+    # pagos); Registro.save() las ajusta con la diferencia de cada registro
+    dias_pago_acumulados = models.BigIntegerField(default=0, editable=False)
+    pagos_con_dias = models.PositiveIntegerField(default=0, editable=False)
 
-        registros = self.registro_set.all()
-        total_dias = 0
-        total_pagos = 0
-
-        for reg in registros:
-            fecha_entrega = reg.fecha_entrega_cliente
-            for pago in reg.obtener_pagos_cliente():
-                fecha_pago = pago.get('fecha_pago')
-                if fecha_pago:
-                    if isinstance(fecha_pago, str):
-                        try:
-                            fecha_pago = datetime.strptime(fecha_pago, '%Y-%m-%d').date()
-                        except ValueError:
-                            continue
-                    
-                    dias = (fecha_pago - fecha_entrega).days
-                    if dias >= 0:
-                        total_dias += dias
-                        total_pagos += 1
+    def actualizar_dias_promedio_pago(self):
+        """Recalcula desde cero las sumas de días de pago del cliente y su promedio"""
+        recalcular_dias_pago_clientes([self.pk])
+        self.refresh_from_db(fields=['dias_pago_acumulados', 'pagos_con_dias', 'average_days_to_pay'])
 
-        if total_pagos > 0:
-            self.average_days_to_pay = total_dias // total_pagos
-        else:
-            self.average_days_to_pay = 1  # valor por defecto válido
+    @staticmethod
+    def promedio_dias_pago(dias, pagos):
+        return dias // pagos if pagos > 0 else 1  # 1 es el valor por defecto válido
 
-        self.save()
     class Meta:
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['nombre', 'id'], name='cliente_nombre_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.id} - {self.nombre}"
@@ -199,6 +228,215 @@ class Proveedor(models.Model):
     def __str__(self):
         return f"{self.id} - {self.nombre}"
 
+# ==================== UTILIDADES DE CONVERSIÓN ====================
+
+def _a_fecha(valor):
+    """Convierte un valor (date, datetime o texto ISO) en date; None si no es válido"""
+    if not valor:
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    try:
+        return datetime.fromisoformat(str(valor).strip()).date()
+    except ValueError:
+        return None
+
+def _a_decimal(valor):
+    """Convierte un monto recibido como texto o número en Decimal"""
+    try:
+        return Decimal(str(valor if valor not in (None, '') else 0))
+    except InvalidOperation:
+        return Decimal('0')
+
+def _a_numero(valor):
+    """Convierte un identificador interno (int o texto) en entero; None si no aplica"""
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+def _numerar(elementos):
+    """
+    Asigna a cada elemento un número único dentro del registro, respetando el
+    'id' que ya traiga cuando es válido y no está repetido.
+    """
+    usados = set()
+    numerados = []
+    for elemento in elementos:
+        numero = _a_numero(elemento.get('id'))
+        if numero is None or numero <= 0 or numero in usados:
+            numero = None
+        else:
+            usados.add(numero)
+        numerados.append([numero, elemento])
+
+    siguiente = max(usados, default=0)
+    for par in numerados:
+        if par[0] is None:
+            siguiente += 1
+            par[0] = siguiente
+    return [tuple(par) for par in numerados]
+
+def _proveedor_existente(proveedor_id):
+    """Retorna el ID del proveedor si existe en la base de datos"""
+    if not proveedor_id:
+        return None
+    return Proveedor.objects.filter(id=str(proveedor_id)).values_list('id', flat=True).first()
+
+class RegistroQuerySet(models.QuerySet):
+    def con_cobros(self, fecha_corte=None):
+        """
+        Anota en la base de datos el vencimiento ('vencido', 'dias_vencidos') y los
+        cobros clasificados por antigüedad (una columna por cada Registro.RANGOS_COBRO).
+        El total cobrado y el saldo se leen de las columnas materializadas del registro.
+        """
+        fecha_corte = fecha_corte or date.today()
+        monto = DecimalField(max_digits=15, decimal_places=2)
+        dias_pago = ExpressionWrapper(
+            F('pagos_cliente__fecha_pago') - F('fecha_entrega_cliente'),
+            output_field=DurationField()
+        )
+
+        def cobros_entre(desde, hasta):
+            condicion = Q(GreaterThanOrEqual(dias_pago, Value(timedelta(days=desde))))
+            if hasta is not None:
+                condicion &= Q(LessThanOrEqual(dias_pago, Value(timedelta(days=hasta))))
+            return Coalesce(Sum('pagos_cliente__monto', filter=condicion), Value(Decimal('0')), output_field=monto)
+
+        vencido = Q(fecha_limite_cobro__lt=fecha_corte) & ~Q(estado_cobro='pagado_total')
+        return self.annotate(
+            **{nombre: cobros_entre(desde, hasta) for nombre, desde, hasta in Registro.RANGOS_COBRO},
+        ).annotate(
+            vencido=ExpressionWrapper(vencido, output_field=BooleanField()),
+            dias_vencidos=Case(
+                When(vencido, then=ExpressionWrapper(
+                    Value(fecha_corte, output_field=DateField()) - F('fecha_limite_cobro'),
+                    output_field=DurationField()
+                )),
+                default=Value(timedelta(0)),
+                output_field=DurationField(),
+            ),
+        )
+
+    def recalcular_saldos(self, batch_size=500):
+        """
+        Recalcula las columnas materializadas de saldos de los registros del queryset
+        a partir de las tablas de obligaciones y pagos. Retorna el número de registros actualizados.
+        """
+        actualizados = 0
+        registros = self.order_by('pk').only(
+            'pk', 'valor_cobrar_cliente', 'cliente_id', 'dias_pago_total', 'pagos_con_dias')
+        lote = []
+        for registro in registros.iterator(chunk_size=batch_size):
+            lote.append(registro)
+            if len(lote) >= batch_size:
+                actualizados += _guardar_saldos(lote)
+                lote = []
+        if lote:
+            actualizados += _guardar_saldos(lote)
+        return actualizados
+
+def _totales_movimientos(registro_ids):
+    """
+    Totales por registro calculados en la base de datos (tres consultas agrupadas):
+    {registro_id: (total_cobrado, total_obligaciones, total_obligaciones_pendientes,
+    dias_pago_total, pagos_con_dias)}
+    """
+    cobrado = {}
+    dias_pago = {}
+    for registro_id, total, dias, pagos in PagoCliente.objects.filter(
+        registro_id__in=registro_ids
+    ).con_dias().order_by().values('registro_id').annotate(
+        total=Sum('monto'),
+        total_dias=Sum('dias', filter=PAGO_CON_DIAS),
+        pagos=Count('pk', filter=PAGO_CON_DIAS),
+    ).values_list('registro_id', 'total', 'total_dias', 'pagos'):
+        cobrado[registro_id] = total
+        dias_pago[registro_id] = (dias.days if dias else 0, pagos)
+    obligaciones = dict(Obligacion.objects.filter(registro_id__in=registro_ids).order_by().values(
+        'registro_id').annotate(total=Sum('valor_pagar')).values_list('registro_id', 'total'))
+    pendientes = dict(Obligacion.objects.con_saldo().filter(
+        registro_id__in=registro_ids, saldo__gt=0
+    ).order_by().values('registro_id').annotate(total=Sum('saldo')).values_list('registro_id', 'total'))
+    return {
+        registro_id: (
+            cobrado.get(registro_id) or Decimal('0'),
+            obligaciones.get(registro_id) or Decimal('0'),
+            pendientes.get(registro_id) or Decimal('0'),
+            *dias_pago.get(registro_id, (0, 0)),
+        )
+        for registro_id in registro_ids
+    }
+
+def _guardar_saldos(registros):
+    """Asigna y guarda (bulk_update) los saldos materializados de una lista de registros"""
+    totales = _totales_movimientos([registro.pk for registro in registros])
+    # bulk_update no aplica auto_now; fecha_actualizacion invalida los reportes en caché
+    ahora = timezone.now()
+    ajustes = {}
+    for registro in registros:
+        anterior = (registro.dias_pago_total, registro.pagos_con_dias)
+        registro.asignar_saldos(*totales[registro.pk])
+        registro.fecha_actualizacion = ahora
+        _acumular_ajuste(ajustes, registro.cliente_id, registro.dias_pago_total - anterior[0],
+                         registro.pagos_con_dias - anterior[1])
+    Registro.objects.bulk_update(registros, Registro.CAMPOS_SALDO + ['fecha_actualizacion'])
+    ajustar_dias_pago_clientes(ajustes)
+    return len(registros)
+
+def _acumular_ajuste(ajustes, cliente_id, dias, pagos):
+    if cliente_id is not None and (dias or pagos):
+        total = ajustes.get(cliente_id, (0, 0))
+        ajustes[cliente_id] = (total[0] + dias, total[1] + pagos)
+
+def ajustar_dias_pago_clientes(ajustes):
+    """
+    Suma a cada cliente la diferencia {cliente_id: (días, pagos)} en sus totales de
+    días de pago (UPDATE con F(), sin releer su historial) y actualiza su promedio.
+    """
+    ajustes = {cliente_id: ajuste for cliente_id, ajuste in ajustes.items() if any(ajuste)}
+    if not ajustes:
+        return
+    for cliente_id, (dias, pagos) in ajustes.items():
+        Cliente.objects.filter(pk=cliente_id).update(
+            dias_pago_acumulados=F('dias_pago_acumulados') + dias,
+            pagos_con_dias=F('pagos_con_dias') + pagos,
+        )
+    clientes = list(Cliente.objects.filter(pk__in=list(ajustes)).only(
+        'pk', 'dias_pago_acumulados', 'pagos_con_dias'))
+    for cliente in clientes:
+        cliente.average_days_to_pay = Cliente.promedio_dias_pago(cliente.dias_pago_acumulados, cliente.pagos_con_dias)
+    Cliente.objects.bulk_update(clientes, ['average_days_to_pay'])
+
+def recalcular_dias_pago_clientes(clientes=None):
+    """
+    Recalcula desde cero (una consulta agrupada) las sumas de días de pago y el
+    promedio de los clientes dados (IDs o queryset; por defecto, todos). Corrige
+    cualquier desviación de los ajustes incrementales. Retorna el número de clientes.
+    """
+    consulta = Cliente.objects.all() if clientes is None else Cliente.objects.filter(pk__in=clientes)
+    pagos = PagoCliente.objects.con_dias().filter(PAGO_CON_DIAS)
+    if clientes is not None:
+        pagos = pagos.filter(registro__cliente_id__in=consulta.values('pk'))
+    totales = {
+        cliente_id: (dias, cantidad)
+        for cliente_id, dias, cantidad in pagos.order_by().values('registro__cliente_id').annotate(
+            total_dias=Sum('dias'), cantidad=Count('pk'),
+        ).values_list('registro__cliente_id', 'total_dias', 'cantidad')
+    }
+    actualizados = []
+    for cliente in consulta.only('pk').iterator():
+        dias, cantidad = totales.get(cliente.pk, (None, 0))
+        cliente.dias_pago_acumulados = dias.days if dias else 0
+        cliente.pagos_con_dias = cantidad
+        cliente.average_days_to_pay = Cliente.promedio_dias_pago(cliente.dias_pago_acumulados, cantidad)
+        actualizados.append(cliente)
+    Cliente.objects.bulk_update(actualizados, ['dias_pago_acumulados', 'pagos_con_dias', 'average_days_to_pay'],
+                                batch_size=500)
+    return len(actualizados)
+
 class Registro(models.Model):
     ESTADO_CHOICES = [
         ('pendiente', 'Pendiente'),
@@ -214,6 +452,15 @@ class Registro(models.Model):
         ('otro', 'Otro')
     ]
     
+    # Rangos (en días desde la entrega al cliente) para clasificar los cobros
+    RANGOS_COBRO = [
+        ('cobros_0_30', 0, 30),
+        ('cobros_31_60', 31, 60),
+        ('cobros_61_90', 61, 90),
+        ('cobros_91_120', 91, 120),
+        ('cobros_120_plus', 121, None),
+    ]
+    
     # Información básica del registro
     id = models.CharField(max_length=50, primary_key=True, verbose_name="ID Registro")
     cliente = models.ForeignKey(
@@ -238,42 +485,55 @@ class Registro(models.Model):
         max_length=20,
         choices=ESTADO_CHOICES,
         default='pendiente',
+        db_index=True,
         verbose_name="Estado Cobro"
     )
     
-    # Información de obligaciones/proveedores (solo almacenamiento)
-    obligaciones_data = models.JSONField(
-        default=list,
-        blank=True,
-        verbose_name="Datos de Obligaciones",
-        help_text="Lista de obligaciones con proveedores"
+    # Las obligaciones y los pagos viven en las tablas Obligacion, PagoCliente y PagoProveedor
+
+    # Saldos materializados: se recalculan en save() y al agregar/eliminar movimientos
+    total_cobrado = models.DecimalField(
+        max_digits=15, decimal_places=2, default=Decimal('0'), editable=False,
+        verbose_name="Total Cobrado"
     )
-    
-    # Información de pagos de clientes (solo almacenamiento)
-    pagos_cliente_data = models.JSONField(
-        default=list,
-        blank=True,
-        verbose_name="Datos de Pagos Cliente",
-        help_text="Lista de pagos recibidos del cliente"
+    saldo_pendiente = models.DecimalField(
+        max_digits=15, decimal_places=2, default=Decimal('0'), editable=False, db_index=True,
+        verbose_name="Saldo Pendiente Cliente"
     )
-    
-    # Información de pagos a proveedores (solo almacenamiento)
-    pagos_proveedor_data = models.JSONField(
-        default=list,
-        blank=True,
-        verbose_name="Datos de Pagos Proveedor",
-        help_text="Lista de pagos realizados a proveedores"
+    total_obligaciones_pendientes = models.DecimalField(
+        max_digits=15, decimal_places=2, default=Decimal('0'), editable=False, db_index=True,
+        verbose_name="Total Obligaciones Pendientes"
     )
-    
+    margen_bruto = models.DecimalField(
+        max_digits=15, decimal_places=2, default=Decimal('0'), editable=False, db_index=True,
+        verbose_name="Margen Bruto"
+    )
+    porcentaje_cobrado = models.DecimalField(
+        max_digits=9, decimal_places=2, default=Decimal('0'), editable=False, db_index=True,
+        verbose_name="Porcentaje Cobrado"
+    )
+    # Días entre la entrega y cada pago del cliente (pagos con fecha, no anteriores a la
+    # entrega): su suma y cantidad alimentan Cliente.average_days_to_pay
+    dias_pago_total = models.BigIntegerField(default=0, editable=False)
+    pagos_con_dias = models.PositiveIntegerField(default=0, editable=False)
+
     # Campos de auditoría
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha Creación")
     fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Fecha Actualización")
     observaciones = models.TextField(blank=True, verbose_name="Observaciones")
     
+    objects = RegistroQuerySet.as_manager()
+    
+    CAMPOS_SALDO = ['total_cobrado', 'saldo_pendiente', 'total_obligaciones_pendientes',
+                    'margen_bruto', 'porcentaje_cobrado', 'dias_pago_total', 'pagos_con_dias']
+    
     class Meta:
         verbose_name = "Registro"
         verbose_name_plural = "Registros"
         ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['-fecha_creacion', 'id'], name='registro_creacion_id_idx'),
+        ]
     
     def clean(self):
         """Validaciones básicas de coherencia"""
@@ -285,52 +545,7 @@ class Registro(models.Model):
                 raise ValidationError(
                     'La fecha límite de cobro no puede ser anterior a la fecha de entrega.'
                 )
-        
-        # Validar estructura básica de los datos JSON
-        self._validar_estructura_json()
-    
-    def _validar_estructura_json(self):
-        """Valida que los datos JSON tengan la estructura correcta"""
-        
-        # Validar obligaciones_data
-        if not isinstance(self.obligaciones_data, list):
-            raise ValidationError('obligaciones_data debe ser una lista.')
-        
-        for obligacion in self.obligaciones_data:
-            if not isinstance(obligacion, dict):
-                raise ValidationError('Cada obligación debe ser un diccionario.')
-            
-            campos_requeridos = ['proveedor_nombre', 'valor_pagar']
-            for campo in campos_requeridos:
-                if campo not in obligacion:
-                    raise ValidationError(f'La obligación debe tener el campo: {campo}')
-        
-        # Validar pagos_cliente_data
-        if not isinstance(self.pagos_cliente_data, list):
-            raise ValidationError('pagos_cliente_data debe ser una lista.')
-        
-        for pago in self.pagos_cliente_data:
-            if not isinstance(pago, dict):
-                raise ValidationError('Cada pago de cliente debe ser un diccionario.')
-            
-            campos_requeridos = ['monto', 'fecha_pago']
-            for campo in campos_requeridos:
-                if campo not in pago:
-                    raise ValidationError(f'El pago de cliente debe tener el campo: {campo}')
-        
-        # Validar pagos_proveedor_data
-        if not isinstance(self.pagos_proveedor_data, list):
-            raise ValidationError('pagos_proveedor_data debe ser una lista.')
-        
-        for pago in self.pagos_proveedor_data:
-            if not isinstance(pago, dict):
-                raise ValidationError('Cada pago de proveedor debe ser un diccionario.')
-            
-            campos_requeridos = ['monto', 'fecha_pago', 'obligacion_id']
-            for campo in campos_requeridos:
-                if campo not in pago:
-                    raise ValidationError(f'El pago de proveedor debe tener el campo: {campo}')
-    
+
     def save(self, *args, **kwargs):
         """Guardar con lógica mínima"""
         # Calcular fecha límite de cobro automáticamente si no está definida
@@ -339,134 +554,217 @@ class Registro(models.Model):
                 days=self.cliente.terminos_contractuales
             )
         
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(self.CAMPOS_SALDO)
+
+        with transaction.atomic():
+            # Lo guardado antes (cliente y días de pago) para ajustar los totales del cliente
+            anterior = None
+            if not self._state.adding:
+                anterior = Registro.objects.filter(pk=self.pk).values_list(
+                    'cliente_id', 'dias_pago_total', 'pagos_con_dias', 'fecha_entrega_cliente').first()
+            self.actualizar_saldos()
+            super().save(*args, **kwargs)
+            if anterior and anterior[3] != self.fecha_entrega_cliente and (
+                    update_fields is None or 'fecha_entrega_cliente' in update_fields):
+                # Los días de pago se calcularon con la fecha de entrega anterior
+                self.dias_pago_total, self.pagos_con_dias = _totales_movimientos([self.pk])[self.pk][3:]
+                Registro.objects.filter(pk=self.pk).update(
+                    dias_pago_total=self.dias_pago_total, pagos_con_dias=self.pagos_con_dias)
+
+            cliente_id = self.cliente_id
+            ajustes = {}
+            if anterior:
+                if update_fields is not None and 'cliente' not in update_fields:
+                    cliente_id = anterior[0]
+                _acumular_ajuste(ajustes, anterior[0], -anterior[1], -anterior[2])
+            _acumular_ajuste(ajustes, cliente_id, self.dias_pago_total, self.pagos_con_dias)
+            ajustar_dias_pago_clientes(ajustes)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            ajustes = {}
+            _acumular_ajuste(ajustes, self.cliente_id, -self.dias_pago_total, -self.pagos_con_dias)
+            resultado = super().delete(*args, **kwargs)
+            ajustar_dias_pago_clientes(ajustes)
+        return resultado
+    
+    def asignar_saldos(self, total_cobrado, total_obligaciones, total_obligaciones_pendientes,
+                       dias_pago_total=0, pagos_con_dias=0):
+        """Asigna las columnas materializadas a partir de los totales de movimientos"""
+        self.dias_pago_total = dias_pago_total
+        self.pagos_con_dias = pagos_con_dias
+        self.total_cobrado = total_cobrado
+        self.saldo_pendiente = self.valor_cobrar_cliente - total_cobrado
+        self.total_obligaciones_pendientes = total_obligaciones_pendientes
+        self.margen_bruto = self.valor_cobrar_cliente - total_obligaciones
+        if self.valor_cobrar_cliente and self.valor_cobrar_cliente > 0:
+            self.porcentaje_cobrado = (total_cobrado / self.valor_cobrar_cliente * 100).quantize(Decimal('0.01'))
+        else:
+            self.porcentaje_cobrado = Decimal('0')
+    
+    def actualizar_saldos(self):
+        """Recalcula (sin guardar) los saldos materializados desde obligaciones y pagos"""
+        if self._state.adding:
+            # Un registro nuevo todavía no tiene movimientos
+            self.asignar_saldos(Decimal('0'), Decimal('0'), Decimal('0'))
+        else:
+            self.asignar_saldos(*_totales_movimientos([self.pk])[self.pk])
     
     # ==================== MÉTODOS BÁSICOS DE ACCESO A DATOS ====================
     
+    def _siguiente_numero(self, movimientos):
+        """
+        Siguiente 'numero' de una relación del registro. Debe llamarse dentro de
+        una transacción: bloquea la fila del registro para que dos altas
+        simultáneas no tomen el mismo número.
+        """
+        list(Registro.objects.select_for_update().filter(pk=self.pk).values_list('pk', flat=True))
+        return (movimientos.aggregate(ultimo=Max('numero'))['ultimo'] or 0) + 1
+    
+    @transaction.atomic
     def agregar_obligacion(self, proveedor_nombre, valor_pagar, fecha_vencimiento, 
                           proveedor_id=None, descripcion="", referencia=""):
         """Agrega una nueva obligación al registro"""
-        if not isinstance(self.obligaciones_data, list):
-            self.obligaciones_data = []
-        
-        # Generar ID único basado en el índice
-        nuevo_id = max(
-            [int(obl.get('id', 0)) for obl in self.obligaciones_data if str(obl.get('id', '')).isdigit()],
-            default=0
-        ) + 1
+        nuevo_id = self._siguiente_numero(self.obligaciones)
         
-        nueva_obligacion = {
-            'id': nuevo_id,
-            'proveedor_id': proveedor_id,
-            'proveedor_nombre': proveedor_nombre,
-            'valor_pagar': str(valor_pagar),
-            'fecha_vencimiento': fecha_vencimiento.isoformat() if hasattr(fecha_vencimiento, 'isoformat') else str(fecha_vencimiento),
-            'descripcion': descripcion,
-            'referencia': referencia,
-            'fecha_creacion': date.today().isoformat()
-        }
+        obligacion = Obligacion.objects.create(
+            registro=self,
+            numero=nuevo_id,
+            proveedor_id=_proveedor_existente(proveedor_id),
+            proveedor_nombre=proveedor_nombre or '',
+            valor_pagar=_a_decimal(valor_pagar),
+            fecha_vencimiento=_a_fecha(fecha_vencimiento),
+            descripcion=descripcion or '',
+            referencia=referencia or '',
+        )
         
-        self.obligaciones_data.append(nueva_obligacion)
         self.save()
-        return nueva_obligacion
+        return obligacion.como_dict()
     
+    @transaction.atomic
     def agregar_pago_cliente(self, monto, fecha_pago, metodo_pago='transferencia', 
                             referencia="", observaciones=""):
         """Agrega un nuevo pago del cliente"""
-        if not isinstance(self.pagos_cliente_data, list):
-            self.pagos_cliente_data = []
-        
-        # Generar ID único
-        nuevo_id = max([pago.get('id', 0) for pago in self.pagos_cliente_data], default=0) + 1
+        nuevo_id = self._siguiente_numero(self.pagos_cliente)
         
-        nuevo_pago = {
-            'id': nuevo_id,
-            'monto': str(monto),
-            'fecha_pago': fecha_pago.isoformat() if hasattr(fecha_pago, 'isoformat') else str(fecha_pago),
-            'metodo_pago': metodo_pago,
-            'referencia': referencia,
-            'observaciones': observaciones,
-            'fecha_registro': date.today().isoformat()
-        }
+        pago = PagoCliente.objects.create(
+            registro=self,
+            numero=nuevo_id,
+            monto=_a_decimal(monto),
+            fecha_pago=_a_fecha(fecha_pago),
+            metodo_pago=metodo_pago or 'transferencia',
+            referencia=referencia or '',
+            observaciones=observaciones or '',
+        )
         
-        self.pagos_cliente_data.append(nuevo_pago)
         self.save()
-        return nuevo_pago
+        return pago.como_dict()
     
+    @transaction.atomic
     def agregar_pago_proveedor(self, obligacion_id, monto, fecha_pago, 
                               metodo_pago='transferencia', referencia="", observaciones=""):
         """Agrega un nuevo pago a proveedor"""
-        if not isinstance(self.pagos_proveedor_data, list):
-            self.pagos_proveedor_data = []
+        nuevo_id = self._siguiente_numero(self.pagos_proveedor)
         
-        # Generar ID único
-        nuevo_id = max([pago.get('id', 0) for pago in self.pagos_proveedor_data], default=0) + 1
+        pago = PagoProveedor.objects.create(
+            registro=self,
+            numero=nuevo_id,
+            obligacion=self.obligaciones.filter(numero=_a_numero(obligacion_id)).first(),
+            monto=_a_decimal(monto),
+            fecha_pago=_a_fecha(fecha_pago),
+            metodo_pago=metodo_pago or 'transferencia',
+            referencia=referencia or '',
+            observaciones=observaciones or '',
+        )
         
-        nuevo_pago = {
-            'id': nuevo_id,
-            'obligacion_id': obligacion_id,
-            'monto': str(monto),
-            'fecha_pago': fecha_pago.isoformat() if hasattr(fecha_pago, 'isoformat') else str(fecha_pago),
-            'metodo_pago': metodo_pago,
-            'referencia': referencia,
-            'observaciones': observaciones,
-            'fecha_registro': date.today().isoformat()
-        }
+        self.save()
+        return pago.como_dict()
+    
+    def reemplazar_movimientos(self, obligaciones, pagos_cliente, pagos_proveedor):
+        """
+        Reemplaza las obligaciones y los pagos del registro a partir de listas de
+        diccionarios con el mismo formato que devuelven los métodos obtener_*.
+        Los pagos a proveedor se enlazan a la obligación por su 'obligacion_id'.
+        """
+        self.pagos_proveedor.all().delete()
+        self.pagos_cliente.all().delete()
+        self.obligaciones.all().delete()
+        
+        proveedores_validos = set(Proveedor.objects.filter(
+            id__in=[str(o.get('proveedor_id')) for o in obligaciones if o.get('proveedor_id')]
+        ).values_list('id', flat=True))
+        
+        nuevas_obligaciones = [
+            Obligacion.desde_dict(self, numero, obligacion, proveedores_validos)
+            for numero, obligacion in _numerar(obligaciones)
+        ]
+        Obligacion.objects.bulk_create(nuevas_obligaciones)
+        
+        # Enlazar cada pago con la obligación según el número original
+        por_numero = {}
+        for (numero_original, obligacion) in zip(
+            [_a_numero(o.get('id')) for o in obligaciones], nuevas_obligaciones
+        ):
+            por_numero.setdefault(numero_original, obligacion)
+            por_numero.setdefault(obligacion.numero, obligacion)
+        # bulk_create no siempre devuelve la PK (MySQL); se recupera si hace falta
+        if any(o.pk is None for o in nuevas_obligaciones):
+            guardadas = {o.numero: o for o in self.obligaciones.all()}
+            por_numero = {k: guardadas[v.numero] for k, v in por_numero.items()}
+        
+        PagoCliente.objects.bulk_create([
+            PagoCliente.desde_dict(self, numero, pago)
+            for numero, pago in _numerar(pagos_cliente)
+        ])
+        PagoProveedor.objects.bulk_create([
+            PagoProveedor.desde_dict(self, numero, pago, por_numero.get(_a_numero(pago.get('obligacion_id'))))
+            for numero, pago in _numerar(pagos_proveedor)
+        ])
         
-        self.pagos_proveedor_data.append(nuevo_pago)
         self.save()
-        return nuevo_pago
     
     # ==================== MÉTODOS BÁSICOS DE CONSULTA ====================
     
     def obtener_obligaciones(self):
         """Retorna la lista de obligaciones"""
-        return self.obligaciones_data or []
+        return [obligacion.como_dict() for obligacion in self.obligaciones.all()]
     
     def obtener_pagos_cliente(self):
         """Retorna la lista de pagos del cliente"""
-        return self.pagos_cliente_data or []
+        return [pago.como_dict() for pago in self.pagos_cliente.all()]
     
     def obtener_pagos_proveedor(self):
         """Retorna la lista de pagos a proveedores"""
-        return self.pagos_proveedor_data or []
+        return [pago.como_dict() for pago in self.pagos_proveedor.select_related('obligacion')]
     
     def obtener_obligacion(self, obligacion_id):
         """Obtiene una obligación específica por ID"""
-        for obligacion in self.obtener_obligaciones():
-            if obligacion.get('id') == obligacion_id:
-                return obligacion
-        return None
+        obligacion = self.obligaciones.filter(numero=_a_numero(obligacion_id)).first()
+        return obligacion.como_dict() if obligacion else None
     
     def obtener_pagos_de_obligacion(self, obligacion_id):
         """Retorna los pagos de una obligación específica"""
+        numero = _a_numero(obligacion_id)
         return [pago for pago in self.obtener_pagos_proveedor() 
-                if pago.get('obligacion_id') == obligacion_id]
+                if pago.get('obligacion_id') == numero]
     
     # ==================== MÉTODOS BÁSICOS DE ELIMINACIÓN ====================
     
     def eliminar_obligacion(self, obligacion_id):
-        """Elimina una obligación específica"""
-        self.obligaciones_data = [
-            obl for obl in self.obligaciones_data 
-            if obl.get('id') != obligacion_id
-        ]
+        """Elimina una obligación específica (y los pagos asociados a ella)"""
+        self.obligaciones.filter(numero=_a_numero(obligacion_id)).delete()
         self.save()
     
     def eliminar_pago_cliente(self, pago_id):
         """Elimina un pago del cliente"""
-        self.pagos_cliente_data = [
-            pago for pago in self.pagos_cliente_data 
-            if pago.get('id') != pago_id
-        ]
+        self.pagos_cliente.filter(numero=_a_numero(pago_id)).delete()
         self.save()
     
     def eliminar_pago_proveedor(self, pago_id):
         """Elimina un pago a proveedor"""
-        self.pagos_proveedor_data = [
-            pago for pago in self.pagos_proveedor_data 
-            if pago.get('id') != pago_id
-        ]
+        self.pagos_proveedor.filter(numero=_a_numero(pago_id)).delete()
         self.save()
     
     # ==================== PROPIEDADES BÁSICAS ====================
@@ -497,51 +795,27 @@ class Registro(models.Model):
 
     def calcular_saldo_pendiente_cliente(self):
         """Calcula el saldo pendiente de cobro al cliente"""
-        pagos_realizados = sum(
-            Decimal(str(pago.get('monto', 0))) 
-            for pago in self.obtener_pagos_cliente()
-        )
+        pagos_realizados = self.pagos_cliente.aggregate(total=Sum('monto'))['total'] or Decimal('0')
         return self.valor_cobrar_cliente - pagos_realizados
 
     def calcular_total_obligaciones(self):
         """Calcula el total de obligaciones pendientes"""
-        total = Decimal('0')
-        for obligacion in self.obtener_obligaciones():
-            pagos_realizados = sum(
-                Decimal(str(pago.get('monto', 0))) 
-                for pago in self.obtener_pagos_de_obligacion(obligacion.get('id'))
-            )
-            valor_obligacion = Decimal(str(obligacion.get('valor_pagar', 0)))
-            saldo_pendiente = valor_obligacion - pagos_realizados
-            if saldo_pendiente > 0:
-                total += saldo_pendiente
-        return total
+        return self.obligaciones.con_saldo().filter(saldo__gt=0).aggregate(
+            total=Sum('saldo')
+        )['total'] or Decimal('0')
 
     def obtener_obligaciones_por_fecha_vencimiento(self, fecha_objetivo):
         """Obtiene las obligaciones que vencen en una fecha específica"""
         obligaciones_vencen = []
         
-        for obligacion in self.obtener_obligaciones():
-            fecha_vencimiento_str = obligacion.get('fecha_vencimiento')
-            if fecha_vencimiento_str:
-                try:
-                    fecha_vencimiento = datetime.strptime(fecha_vencimiento_str, '%Y-%m-%d').date()
-                    if fecha_vencimiento == fecha_objetivo:
-                        # Calcular saldo pendiente
-                        pagos_realizados = sum(
-                            Decimal(str(pago.get('monto', 0))) 
-                            for pago in self.obtener_pagos_de_obligacion(obligacion.get('id'))
-                        )
-                        valor_obligacion = Decimal(str(obligacion.get('valor_pagar', 0)))
-                        saldo_pendiente = valor_obligacion - pagos_realizados
-                        
-                        if saldo_pendiente > 0:
-                            obligacion_copia = obligacion.copy()
-                            obligacion_copia['saldo_pendiente'] = saldo_pendiente
-                            obligacion_copia['pagos_realizados'] = pagos_realizados
-                            obligaciones_vencen.append(obligacion_copia)
-                except ValueError:
-                    continue
+        pendientes = self.obligaciones.con_saldo().filter(
+            fecha_vencimiento=fecha_objetivo, saldo__gt=0
+        )
+        for obligacion in pendientes:
+            obligacion_copia = obligacion.como_dict()
+            obligacion_copia['saldo_pendiente'] = obligacion.saldo
+            obligacion_copia['pagos_realizados'] = obligacion.pagado
+            obligaciones_vencen.append(obligacion_copia)
         
         return obligaciones_vencen
 
@@ -612,30 +886,18 @@ class Registro(models.Model):
                 })
         
         # Proyección de egresos (obligaciones)
-        for obligacion in self.obtener_obligaciones():
-            fecha_vencimiento_str = obligacion.get('fecha_vencimiento')
-            if fecha_vencimiento_str:
-                try:
-                    fecha_vencimiento = datetime.strptime(fecha_vencimiento_str, '%Y-%m-%d').date()
-                    if fecha_inicio <= fecha_vencimiento <= fecha_fin:
-                        pagos_realizados = sum(
-                            Decimal(str(pago.get('monto', 0))) 
-                            for pago in self.obtener_pagos_de_obligacion(obligacion.get('id'))
-                        )
-                        valor_obligacion = Decimal(str(obligacion.get('valor_pagar', 0)))
-                        saldo_pendiente = valor_obligacion - pagos_realizados
-                        
-                        if saldo_pendiente > 0:
-                            flujo_proyectado.append({
-                                'fecha': fecha_vencimiento,
-                                'tipo': 'egreso',
-                                'monto': float(saldo_pendiente),
-                                'concepto': f'Pago a {obligacion.get("proveedor_nombre")}',
-                                'registro_id': self.id,
-                                'obligacion_id': obligacion.get('id')
-                            })
-                except ValueError:
-                    continue
+        pendientes = self.obligaciones.con_saldo().filter(
+            fecha_vencimiento__range=(fecha_inicio, fecha_fin), saldo__gt=0
+        )
+        for obligacion in pendientes:
+            flujo_proyectado.append({
+                'fecha': obligacion.fecha_vencimiento,
+                'tipo': 'egreso',
+                'monto': float(obligacion.saldo),
+                'concepto': f'Pago a {obligacion.proveedor_nombre}',
+                'registro_id': self.id,
+                'obligacion_id': obligacion.numero
+            })
         
         return flujo_proyectado
 
@@ -648,46 +910,24 @@ class Registro(models.Model):
             return (self.margen_bruto / self.valor_cobrar_cliente) * 100
         return 0
 
-    @property
-    def margen_bruto(self):
-        """Calcula el margen bruto fijo del registro (valor cliente - total obligaciones originales)"""
-        total_obligaciones_originales = sum(
-            Decimal(str(obl.get('valor_pagar', 0))) 
-            for obl in self.obtener_obligaciones()
-        )
-        return self.valor_cobrar_cliente - total_obligaciones_originales
-
-    @property
-    def porcentaje_cobrado(self):
-        """Calcula el porcentaje cobrado del valor total"""
-        if self.valor_cobrar_cliente > 0:
-            pagos_realizados = sum(
-                Decimal(str(pago.get('monto', 0))) 
-                for pago in self.obtener_pagos_cliente()
-            )
-            return (pagos_realizados / self.valor_cobrar_cliente) * 100
-        return 0
+    # margen_bruto y porcentaje_cobrado son columnas materializadas (ver asignar_saldos)
 
     @property
     def porcentaje_pagado_proveedores(self):
         """Calcula el porcentaje pagado a proveedores"""
-        total_obligaciones = sum(
-            Decimal(str(obl.get('valor_pagar', 0))) 
-            for obl in self.obtener_obligaciones()
-        )
+        total_obligaciones = self.obligaciones.aggregate(
+            total=Sum('valor_pagar')
+        )['total'] or Decimal('0')
         
         if total_obligaciones > 0:
-            total_pagado = sum(
-                Decimal(str(pago.get('monto', 0))) 
-                for pago in self.obtener_pagos_proveedor()
-            )
+            total_pagado = self.pagos_proveedor.aggregate(total=Sum('monto'))['total'] or Decimal('0')
             return (total_pagado / total_obligaciones) * 100
         return 0
 
     @property
     def dias_promedio_cobro(self):
         """Calcula los días promedio de cobro basado en pagos realizados"""
-        pagos_cliente = self.obtener_pagos_cliente()
+        pagos_cliente = list(self.pagos_cliente.all())
         if not pagos_cliente:
             return None
         
@@ -695,15 +935,12 @@ class Registro(models.Model):
         total_pagos = 0
         
         for pago in pagos_cliente:
-            try:
-                fecha_pago = datetime.strptime(pago.get('fecha_pago'), '%Y-%m-%d').date()
-                dias_transcurridos = (fecha_pago - self.fecha_entrega_cliente).days
-                monto_pago = Decimal(str(pago.get('monto', 0)))
-                
-                total_dias += dias_transcurridos * float(monto_pago)
-                total_pagos += float(monto_pago)
-            except (ValueError, TypeError):
+            if not pago.fecha_pago:
                 continue
+            dias_transcurridos = (pago.fecha_pago - self.fecha_entrega_cliente).days
+            
+            total_dias += dias_transcurridos * float(pago.monto)
+            total_pagos += float(pago.monto)
         
         if total_pagos > 0:
             return total_dias / total_pagos
@@ -717,7 +954,7 @@ class Registro(models.Model):
             return {'nivel': 'sin_datos', 'mensaje': 'No hay fecha límite establecida'}
         
         dias_vencimiento = self.dias_vencimiento
-        saldo_pendiente = self.calcular_saldo_pendiente_cliente()
+        saldo_pendiente = self.saldo_pendiente
         
         if saldo_pendiente <= 0:
             return {'nivel': 'sin_riesgo', 'mensaje': 'Pagado completamente'}
@@ -742,8 +979,8 @@ class Registro(models.Model):
             'fecha_entrega': self.fecha_entrega_cliente.isoformat(),
             'fecha_limite_cobro': self.fecha_limite_cobro.isoformat() if self.fecha_limite_cobro else None,
             'valor_total': float(self.valor_cobrar_cliente),
-            'saldo_pendiente_cliente': float(self.calcular_saldo_pendiente_cliente()),
-            'total_obligaciones': float(self.calcular_total_obligaciones()),
+            'saldo_pendiente_cliente': float(self.saldo_pendiente),
+            'total_obligaciones': float(self.total_obligaciones_pendientes),
             'margen_bruto': float(self.margen_bruto),
             'rentabilidad_estimada': self.rentabilidad_estimada,
             'porcentaje_cobrado': self.porcentaje_cobrado,
@@ -755,5 +992,277 @@ class Registro(models.Model):
             'total_pagos_proveedor': len(self.obtener_pagos_proveedor()),
             'total_obligaciones_count': len(self.obtener_obligaciones())
         }
-        
-        
\ No newline at end of file
+
+
+# ==================== OBLIGACIONES Y PAGOS ====================
+
+class ObligacionQuerySet(models.QuerySet):
+    def con_saldo(self):
+        """Anota el total pagado ('pagado') y el saldo pendiente ('saldo') de cada obligación"""
+        pagado = PagoProveedor.objects.filter(obligacion=OuterRef('pk')).order_by().values(
+            'obligacion'
+        ).annotate(total=Sum('monto')).values('total')
+        monto = DecimalField(max_digits=15, decimal_places=2)
+        return self.annotate(
+            pagado=Coalesce(Subquery(pagado, output_field=monto), Value(Decimal('0')), output_field=monto),
+        ).annotate(
+            saldo=ExpressionWrapper(F('valor_pagar') - F('pagado'), output_field=monto),
+        )
+
+class Obligacion(models.Model):
+    registro = models.ForeignKey(
+        Registro,
+        related_name='obligaciones',
+        on_delete=models.CASCADE,
+        verbose_name="Registro"
+    )
+    numero = models.PositiveBigIntegerField(verbose_name="ID Obligación")
+    proveedor = models.ForeignKey(
+        Proveedor,
+        related_name='obligaciones',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        verbose_name="Proveedor"
+    )
+    proveedor_nombre = models.CharField(max_length=200, blank=True, verbose_name="Nombre Proveedor")
+    valor_pagar = models.DecimalField(max_digits=15, decimal_places=2, verbose_name="Valor a Pagar")
+    fecha_recepcion = models.DateField(blank=True, null=True, verbose_name="Fecha Recepción")
+    fecha_vencimiento = models.DateField(blank=True, null=True, db_index=True, verbose_name="Fecha Vencimiento")
+    descripcion = models.TextField(blank=True, verbose_name="Descripción")
+    referencia = models.CharField(max_length=100, blank=True, verbose_name="Referencia")
+    fecha_creacion = models.DateField(default=date.today, verbose_name="Fecha Creación")
+
+    objects = ObligacionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Obligación"
+        verbose_name_plural = "Obligaciones"
+        ordering = ['registro', 'numero']
+        unique_together = ('registro', 'numero')
+
+    def __str__(self):
+        return f"{self.registro_id} - {self.numero} ({self.proveedor_nombre})"
+
+    @classmethod
+    def desde_dict(cls, registro, numero, data, proveedores_validos=()):
+        """Construye (sin guardar) una obligación a partir del formato de diccionario"""
+        proveedor_id = str(data.get('proveedor_id') or '')
+        return cls(
+            registro=registro,
+            numero=numero,
+            proveedor_id=proveedor_id if proveedor_id in proveedores_validos else None,
+            proveedor_nombre=data.get('proveedor_nombre') or '',
+            valor_pagar=_a_decimal(data.get('valor_pagar')),
+            fecha_recepcion=_a_fecha(data.get('fecha_recepcion')),
+            fecha_vencimiento=_a_fecha(data.get('fecha_vencimiento')),
+            descripcion=data.get('descripcion') or '',
+            referencia=data.get('referencia') or '',
+            fecha_creacion=_a_fecha(data.get('fecha_creacion')) or date.today(),
+        )
+
+    def como_dict(self):
+        """Representación compatible con el antiguo formato JSON del registro"""
+        return {
+            'id': self.numero,
+            'proveedor_id': self.proveedor_id,
+            'proveedor_nombre': self.proveedor_nombre,
+            'valor_pagar': str(self.valor_pagar),
+            'fecha_recepcion': self.fecha_recepcion.isoformat() if self.fecha_recepcion else None,
+            'fecha_vencimiento': self.fecha_vencimiento.isoformat() if self.fecha_vencimiento else None,
+            'descripcion': self.descripcion,
+            'referencia': self.referencia,
+            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
+        }
+
+class PagoClienteQuerySet(models.QuerySet):
+    def con_dias(self):
+        """Anota 'dias': tiempo entre la entrega del registro y la fecha del pago"""
+        return self.annotate(dias=ExpressionWrapper(
+            F('fecha_pago') - F('registro__fecha_entrega_cliente'), output_field=DurationField()
+        ))
+
+# Pagos que cuentan para los días promedio de pago (requiere con_dias())
+PAGO_CON_DIAS = Q(fecha_pago__isnull=False, dias__gte=timedelta(0))
+
+class PagoCliente(models.Model):
+    registro = models.ForeignKey(
+        Registro,
+        related_name='pagos_cliente',
+        on_delete=models.CASCADE,
+        verbose_name="Registro"
+    )
+    numero = models.PositiveBigIntegerField(verbose_name="ID Pago")
+    monto = models.DecimalField(max_digits=15, decimal_places=2, verbose_name="Monto")
+    fecha_pago = models.DateField(blank=True, null=True, db_index=True, verbose_name="Fecha Pago")
+    metodo_pago = models.CharField(
+        max_length=20,
+        choices=Registro.METODO_PAGO_CHOICES,
+        default='transferencia',
+        verbose_name="Método de Pago"
+    )
+    referencia = models.CharField(max_length=100, blank=True, verbose_name="Referencia")
+    observaciones = models.TextField(blank=True, verbose_name="Observaciones")
+    fecha_registro = models.DateField(default=date.today, verbose_name="Fecha Registro")
+
+    objects = PagoClienteQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Pago de Cliente"
+        verbose_name_plural = "Pagos de Clientes"
+        ordering = ['registro', 'numero']
+        unique_together = ('registro', 'numero')
+
+    def __str__(self):
+        return f"{self.registro_id} - {self.numero} (${self.monto})"
+
+    @classmethod
+    def desde_dict(cls, registro, numero, data):
+        """Construye (sin guardar) un pago de cliente a partir del formato de diccionario"""
+        return cls(
+            registro=registro,
+            numero=numero,
+            monto=_a_decimal(data.get('monto')),
+            fecha_pago=_a_fecha(data.get('fecha_pago')),
+            metodo_pago=data.get('metodo_pago') or 'transferencia',
+            referencia=data.get('referencia') or '',
+            observaciones=data.get('observaciones') or '',
+            fecha_registro=_a_fecha(data.get('fecha_registro')) or date.today(),
+        )
+
+    def como_dict(self):
+        """Representación compatible con el antiguo formato JSON del registro"""
+        return {
+            'id': self.numero,
+            'monto': str(self.monto),
+            'fecha_pago': self.fecha_pago.isoformat() if self.fecha_pago else None,
+            'metodo_pago': self.metodo_pago,
+            'referencia': self.referencia,
+            'observaciones': self.observaciones,
+            'fecha_registro': self.fecha_registro.isoformat() if self.fecha_registro else None,
+        }
+
+class PagoProveedor(models.Model):
+    registro = models.ForeignKey(
+        Registro,
+        related_name='pagos_proveedor',
+        on_delete=models.CASCADE,
+        verbose_name="Registro"
+    )
+    obligacion = models.ForeignKey(
+        Obligacion,
+        related_name='pagos',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        verbose_name="Obligación"
+    )
+    numero = models.PositiveBigIntegerField(verbose_name="ID Pago")
+    monto = models.DecimalField(max_digits=15, decimal_places=2, verbose_name="Monto")
+    fecha_pago = models.DateField(blank=True, null=True, db_index=True, verbose_name="Fecha Pago")
+    metodo_pago = models.CharField(
+        max_length=20,
+        choices=Registro.METODO_PAGO_CHOICES,
+        default='transferencia',
+        verbose_name="Método de Pago"
+    )
+    referencia = models.CharField(max_length=100, blank=True, verbose_name="Referencia")
+    observaciones = models.TextField(blank=True, verbose_name="Observaciones")
+    fecha_registro = models.DateField(default=date.today, verbose_name="Fecha Registro")
+
+    class Meta:
+        verbose_name = "Pago a Proveedor"
+        verbose_name_plural = "Pagos a Proveedores"
+        ordering = ['registro', 'numero']
+        unique_together = ('registro', 'numero')
+
+    def __str__(self):
+        return f"{self.registro_id} - {self.numero} (${self.monto})"
+
+    @classmethod
+    def desde_dict(cls, registro, numero, data, obligacion=None):
+        """Construye (sin guardar) un pago a proveedor a partir del formato de diccionario"""
+        return cls(
+            registro=registro,
+            obligacion=obligacion,
+            numero=numero,
+            monto=_a_decimal(data.get('monto')),
+            fecha_pago=_a_fecha(data.get('fecha_pago')),
+            metodo_pago=data.get('metodo_pago') or 'transferencia',
+            referencia=data.get('referencia') or '',
+            observaciones=data.get('observaciones') or '',
+            fecha_registro=_a_fecha(data.get('fecha_registro')) or date.today(),
+        )
+
+    def como_dict(self):
+        """Representación compatible con el antiguo formato JSON del registro"""
+        return {
+            'id': self.numero,
+            'obligacion_id': self.obligacion.numero if self.obligacion_id else None,
+            'monto': str(self.monto),
+            'fecha_pago': self.fecha_pago.isoformat() if self.fecha_pago else None,
+            'metodo_pago': self.metodo_pago,
+            'referencia': self.referencia,
+            'observaciones': self.observaciones,
+            'fecha_registro': self.fecha_registro.isoformat() if self.fecha_registro else None,
+        }
+
+
+# ==================== TRABAJOS EN SEGUNDO PLANO ====================
+
+class TrabajoImportacion(models.Model):
+    """Importación de un libro Excel encolada para procesarse en segundo plano"""
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En Proceso'),
+        ('completado', 'Completado'),
+        ('fallido', 'Fallido'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    nombre_archivo = models.CharField(max_length=255, verbose_name="Archivo")
+    contenido = models.BinaryField(verbose_name="Contenido del Archivo")
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente',
+                              db_index=True, verbose_name="Estado")
+
+    filas_totales = models.PositiveIntegerField(default=0, verbose_name="Filas Totales")
+    filas_procesadas = models.PositiveIntegerField(default=0, verbose_name="Filas Procesadas")
+    filas_con_error = models.PositiveIntegerField(default=0, verbose_name="Filas con Error")
+    errores = models.JSONField(default=list, blank=True, verbose_name="Errores por Fila")
+    creados = models.JSONField(default=dict, blank=True, verbose_name="Filas Creadas por Hoja")
+    mensaje_error = models.TextField(blank=True, verbose_name="Error General")
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha Creación")
+    fecha_inicio = models.DateTimeField(null=True, blank=True, verbose_name="Fecha Inicio")
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name="Fecha Fin")
+
+    class Meta:
+        verbose_name = "Trabajo de Importación"
+        verbose_name_plural = "Trabajos de Importación"
+        ordering = ['-fecha_creacion']
+
+    def __str__(self):
+        return f"{self.nombre_archivo} ({self.get_estado_display()})"
+
+    @property
+    def terminado(self):
+        return self.estado in ('completado', 'fallido')
+
+    def como_dict(self):
+        """Estado del trabajo para la API de consulta de progreso"""
+        return {
+            'id': str(self.id),
+            'nombre_archivo': self.nombre_archivo,
+            'estado': self.estado,
+            'estado_display': self.get_estado_display(),
+            'terminado': self.terminado,
+            'filas_totales': self.filas_totales,
+            'filas_procesadas': self.filas_procesadas,
+            'filas_con_error': self.filas_con_error,
+            'errores': self.errores,
+            'creados': self.creados,
+            'mensaje_error': self.mensaje_error,
+            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
+            'fecha_inicio': self.fecha_inicio.isoformat() if self.fecha_inicio else None,
+            'fecha_fin': self.fecha_fin.isoformat() if self.fecha_fin else None,
+        }
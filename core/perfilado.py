@@ -0,0 +1,134 @@
+"""
+Perfilado de vistas: tiempo total, consultas SQL, tiempo en base de datos y
+tamaño de respuesta por nombre de URL.
+
+PerfiladoMiddleware (core.middleware) registra cada petición en una ventana
+móvil en memoria por vista. Cada proceso vuelca periódicamente sus muestras a
+PERFILADO_DIR, de modo que el reporte (api_perfilado y el comando
+reporte_perfilado) combina todos los procesos del servidor.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+from django.conf import settings
+
+# Métricas de cada muestra, en este orden
+METRICAS = ('tiempo_ms', 'consultas', 'tiempo_db_ms', 'bytes')
+PERCENTILES = (50, 95, 99)
+
+
+def directorio():
+    return getattr(settings, 'PERFILADO_DIR', os.path.join(tempfile.gettempdir(), 'perfilado'))
+
+
+def _archivo_proceso(pid=None):
+    return os.path.join(directorio(), f'perfilado-{pid or os.getpid()}.json')
+
+
+class RegistroPerfiles:
+    """Ventana móvil de muestras por vista, segura entre hilos"""
+
+    def __init__(self):
+        self._muestras = defaultdict(self._ventana)
+        self._lock = threading.Lock()
+        self._ultimo_volcado = time.monotonic()
+
+    @staticmethod
+    def _ventana():
+        return deque(maxlen=getattr(settings, 'PERFILADO_VENTANA', 1000))
+
+    def registrar(self, vista, tiempo_ms, consultas, tiempo_db_ms, bytes_respuesta):
+        with self._lock:
+            self._muestras[vista].append((tiempo_ms, consultas, tiempo_db_ms, bytes_respuesta))
+
+    def muestras(self):
+        with self._lock:
+            return {vista: list(muestras) for vista, muestras in self._muestras.items()}
+
+    def reiniciar(self):
+        with self._lock:
+            self._muestras.clear()
+
+    def volcar(self, forzar=False):
+        """Escribe las muestras del proceso en PERFILADO_DIR cada PERFILADO_INTERVALO segundos"""
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultimo_volcado < getattr(settings, 'PERFILADO_INTERVALO', 30):
+            return
+        self._ultimo_volcado = ahora
+
+        os.makedirs(directorio(), exist_ok=True)
+        destino = _archivo_proceso()
+        temporal = f'{destino}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(self.muestras(), archivo)
+        os.replace(temporal, destino)
+
+
+registro = RegistroPerfiles()
+
+
+def muestras_combinadas():
+    """Muestras de este proceso más las volcadas por los demás procesos"""
+    combinadas = defaultdict(list)
+    for vista, muestras in registro.muestras().items():
+        combinadas[vista].extend(muestras)
+
+    propio = _archivo_proceso()
+    if os.path.isdir(directorio()):
+        for nombre in os.listdir(directorio()):
+            ruta = os.path.join(directorio(), nombre)
+            if not nombre.startswith('perfilado-') or not nombre.endswith('.json') or ruta == propio:
+                continue
+            try:
+                with open(ruta, encoding='utf-8') as archivo:
+                    for vista, muestras in json.load(archivo).items():
+                        combinadas[vista].extend(tuple(m) for m in muestras)
+            except (OSError, ValueError):
+                continue
+    return dict(combinadas)
+
+
+def reporte(muestras=None, orden='tiempo_ms'):
+    """
+    Resumen por vista: número de solicitudes y, para cada métrica, p50/p95/p99,
+    promedio y máximo. Ordenado de mayor a menor p95 de la métrica 'orden'.
+    """
+    if orden not in METRICAS:
+        raise ValueError(f"Orden no válido: {orden}. Use {', '.join(METRICAS)}")
+    if muestras is None:
+        muestras = muestras_combinadas()
+
+    filas = []
+    for vista, valores in muestras.items():
+        if not valores:
+            continue
+        matriz = np.asarray(valores, dtype=float)
+        percentiles = np.percentile(matriz, PERCENTILES, axis=0)
+        fila = {'vista': vista, 'solicitudes': len(valores)}
+        for i, metrica in enumerate(METRICAS):
+            fila[metrica] = {
+                **{f'p{p}': round(float(percentiles[j, i]), 2) for j, p in enumerate(PERCENTILES)},
+                'promedio': round(float(matriz[:, i].mean()), 2),
+                'max': round(float(matriz[:, i].max()), 2),
+            }
+        filas.append(fila)
+
+    filas.sort(key=lambda fila: fila[orden]['p95'], reverse=True)
+    return filas
+
+
+def reiniciar():
+    """Descarta las muestras en memoria y las volcadas en disco"""
+    registro.reiniciar()
+    if os.path.isdir(directorio()):
+        for nombre in os.listdir(directorio()):
+            if nombre.startswith('perfilado-'):
+                try:
+                    os.remove(os.path.join(directorio(), nombre))
+                except OSError:
+                    pass
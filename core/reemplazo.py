@@ -0,0 +1,308 @@
+"""
+Análisis de reemplazo Defender/Challenger calculado en el servidor.
+
+El cliente solo envía las máquinas y los parámetros financieros; el PV, el EAC,
+los flujos anuales, la recomendación y la tabla de amortización se calculan
+aquí con core.finance y se guardan en AnalisisComparativo.
+"""
+import hashlib
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .finance import (
+    analisis_par, curvas_eac, evaluar_mensual, filas_amortizacion, parametros_mensuales, parametros_vida,
+    reemplazo_diferido, resumen_mensual, sensibilidad, tornado,
+)
+from .models import AnalisisComparativo, FlujoCaja, TablaAmortizacion
+
+# Parámetros por defecto (los mismos del formulario de comparar.html)
+PARAMETROS_DEFECTO = {
+    'wacc': Decimal('0.14'),
+    'tax_rate': Decimal('0.21'),
+    'financing_rate': Decimal('7.5'),
+    'financing_months': 60,
+}
+MAX_MESES_FINANCIAMIENTO = 600
+
+
+def _decimal(data, campo):
+    valor = data.get(campo)
+    if valor is None or valor == '':
+        return PARAMETROS_DEFECTO[campo]
+    try:
+        numero = Decimal(str(valor))
+    except InvalidOperation:
+        raise ValueError(f'Valor no válido para {campo}: {valor}')
+    if not numero.is_finite():
+        raise ValueError(f'Valor no válido para {campo}: {valor}')
+    return numero
+
+
+def leer_parametros(data):
+    """
+    Valida los parámetros financieros de una petición. wacc y tax_rate son
+    fracciones (0.14 = 14 %) y financing_rate es un porcentaje anual.
+    """
+    parametros = {
+        'wacc': _decimal(data, 'wacc'),
+        'tax_rate': _decimal(data, 'tax_rate'),
+        'financing_rate': _decimal(data, 'financing_rate'),
+    }
+    try:
+        parametros['financing_months'] = int(data.get('financing_months', PARAMETROS_DEFECTO['financing_months']))
+    except (OverflowError, TypeError, ValueError):
+        raise ValueError(f"Valor no válido para financing_months: {data.get('financing_months')}")
+
+    if not Decimal('-0.99') < parametros['wacc'] < Decimal('10'):
+        raise ValueError('wacc debe estar entre -0.99 y 10')
+    if not Decimal('0') <= parametros['tax_rate'] < Decimal('1'):
+        raise ValueError('tax_rate debe estar entre 0 y 1')
+    if not Decimal('0') <= parametros['financing_rate'] < Decimal('1000'):
+        raise ValueError('financing_rate debe estar entre 0 y 1000')
+    if not 0 <= parametros['financing_months'] <= MAX_MESES_FINANCIAMIENTO:
+        raise ValueError(f'financing_months debe estar entre 0 y {MAX_MESES_FINANCIAMIENTO}')
+    return parametros
+
+
+# ==================== ANÁLISIS ====================
+
+def calcular_analisis(defender, challenger, parametros):
+    """PV, EAC, flujos, recomendación y amortización de un par Defender/Challenger"""
+    resultado = analisis_par(defender, challenger, parametros['wacc'], parametros['tax_rate'])
+    resultado['recomendacion'] = (
+        'Defender' if resultado['eac_defender'] < resultado['eac_challenger'] else 'Challenger'
+    )
+    resultado['ahorro_anual'] = abs(resultado['eac_defender'] - resultado['eac_challenger'])
+    resultado['monto_financiado'] = challenger.costo_inicial_total
+    resultado['tabla_amortizacion'] = list(filas_amortizacion(
+        resultado['monto_financiado'], parametros['financing_rate'], parametros['financing_months']
+    ))
+    return resultado
+
+
+def _filas_flujo(analisis, tipo_equipo, flujos):
+    return [
+        FlujoCaja(
+            analisis=analisis,
+            tipo_equipo=tipo_equipo,
+            año=flujo['year'],
+            cash_flow_bruto=Decimal(str(flujo['cash_flow'])),
+            depreciacion=Decimal(str(flujo['depreciation'])),
+            tax_shield=Decimal(str(flujo['tax_shield'])),
+            after_tax_cash_flow=Decimal(str(flujo['after_tax_cash_flow'])),
+            present_value=Decimal(str(flujo['pv'])),
+        )
+        for flujo in flujos
+    ]
+
+
+def guardar_analisis_calculado(defender, challenger, parametros, resultado, nombre_analisis=None, analisis=None):
+    """
+    Guarda el análisis con sus flujos y su tabla de amortización en una sola
+    transacción. Si se recibe un análisis existente se actualiza y sus filas se
+    reemplazan, de modo que guardar de nuevo no duplica datos. Las filas se
+    escriben con bulk_create: el número de consultas no depende del plazo.
+
+    La tabla de amortización se calcula bajo demanda (AnalisisComparativo.filas_amortizacion);
+    solo se guarda en TablaAmortizacion con PERSISTIR_TABLA_AMORTIZACION = True.
+    """
+    campos = {
+        'defender': defender,
+        'challenger': challenger,
+        'pv_defender': resultado['pv_defender'],
+        'eac_defender': resultado['eac_defender'],
+        'pv_challenger': resultado['pv_challenger'],
+        'eac_challenger': resultado['eac_challenger'],
+        'recomendacion': resultado['recomendacion'],
+        'monto_financiado': resultado['monto_financiado'],
+        **parametros,
+    }
+
+    with transaction.atomic():
+        if analisis is None:
+            analisis = AnalisisComparativo.objects.create(
+                nombre_analisis=nombre_analisis or f'{defender.nombre} vs {challenger.nombre} - {date.today():%d/%m/%Y}',
+                **campos,
+            )
+        else:
+            if nombre_analisis:
+                analisis.nombre_analisis = nombre_analisis
+            for campo, valor in campos.items():
+                setattr(analisis, campo, valor)
+            analisis.save()
+            FlujoCaja.objects.filter(analisis=analisis).delete()
+            TablaAmortizacion.objects.filter(analisis=analisis).delete()
+
+        FlujoCaja.objects.bulk_create(
+            _filas_flujo(analisis, 'Defender', resultado['flujos_defender'])
+            + _filas_flujo(analisis, 'Challenger', resultado['flujos_challenger'])
+        )
+        if getattr(settings, 'PERSISTIR_TABLA_AMORTIZACION', False):
+            TablaAmortizacion.objects.bulk_create(
+                TablaAmortizacion(analisis=analisis, **fila) for fila in resultado['tabla_amortizacion']
+            )
+
+    return analisis
+
+
+def serializar_resultado(defender, challenger, parametros, resultado):
+    """Resultado del análisis listo para JsonResponse"""
+    def redondear(valor):
+        return round(float(valor), 2)
+
+    return {
+        'analisis': {
+            'wacc': float(parametros['wacc']),
+            'tax_rate': float(parametros['tax_rate']),
+            'financing_rate': float(parametros['financing_rate']),
+            'financing_months': parametros['financing_months'],
+            'pv_defender': redondear(resultado['pv_defender']),
+            'eac_defender': redondear(resultado['eac_defender']),
+            'pv_challenger': redondear(resultado['pv_challenger']),
+            'eac_challenger': redondear(resultado['eac_challenger']),
+            'recomendacion': resultado['recomendacion'],
+            'ahorro_anual': redondear(resultado['ahorro_anual']),
+        },
+        'defender': {
+            'id': str(defender.id),
+            'nombre': defender.nombre,
+            **resultado['resumen_defender'],
+            'flujos': resultado['flujos_defender'],
+        },
+        'challenger': {
+            'id': str(challenger.id),
+            'nombre': challenger.nombre,
+            **resultado['resumen_challenger'],
+            'flujos': resultado['flujos_challenger'],
+        },
+        'amortizacion': {
+            'monto_financiado': redondear(resultado['monto_financiado']),
+            'pago_mensual': redondear(resultado['tabla_amortizacion'][0]['pago_mensual'])
+            if resultado['tabla_amortizacion'] else 0,
+            'tabla': [
+                {campo: valor if campo == 'mes' else redondear(valor) for campo, valor in fila.items()}
+                for fila in resultado['tabla_amortizacion']
+            ],
+        },
+    }
+
+
+# ==================== SENSIBILIDAD ====================
+
+# Cambiar al modificar el cálculo de sensibilidad (invalida la caché)
+VERSION_SENSIBILIDAD = 1
+
+
+def clave_sensibilidad(analisis, variacion):
+    """Clave de caché del tornado: el análisis y un hash de todas sus entradas"""
+    entradas = {
+        'version': VERSION_SENSIBILIDAD,
+        'variacion': variacion,
+        'parametros': [str(analisis.wacc), str(analisis.tax_rate), str(analisis.financing_rate),
+                       analisis.financing_months, str(analisis.principal_prestamo)],
+        'maquinas': [
+            [str(getattr(maquina, campo)) for campo in sensibilidad.CAMPOS_MAQUINA]
+            for maquina in (analisis.defender, analisis.challenger)
+        ],
+    }
+    huella = hashlib.sha256(json.dumps(entradas, sort_keys=True).encode()).hexdigest()[:32]
+    return f'sensibilidad:{analisis.pk}:{huella}'
+
+
+def sensibilidad_analisis(analisis, variacion=sensibilidad.VARIACION_DEFECTO):
+    """
+    Tornado de un análisis guardado (ver core.finance.sensibilidad). Retorna
+    (resultado, desde_cache). Cambiar una máquina o un parámetro cambia la clave,
+    así que nunca se sirve un resultado calculado con entradas anteriores.
+    """
+    clave = clave_sensibilidad(analisis, variacion)
+    resultado = cache.get(clave)
+    if resultado is not None:
+        return resultado, True
+    resultado = tornado(analisis.defender, analisis.challenger, {
+        'wacc': analisis.wacc,
+        'tax_rate': analisis.tax_rate,
+        'financing_rate': analisis.financing_rate,
+        'financing_months': analisis.financing_months,
+    }, variacion, analisis.principal_prestamo)
+    cache.set(clave, resultado, getattr(settings, 'SENSIBILIDAD_CACHE_TIMEOUT', 3600))
+    return resultado, False
+
+
+# ==================== VIDA ECONÓMICA ====================
+
+def vida_economica_flota(maquinas, parametros, challenger=None, curva=False):
+    """
+    Edad de reemplazo de mínimo EAC de cada máquina (ver
+    core.finance.vida_economica), evaluadas todas en una sola llamada. Con un
+    Challenger, cada Defender incluye además los planes "conservar k años y
+    luego cambiar" contra el EAC mínimo de ese Challenger.
+    """
+    maquinas = list(maquinas)
+    evaluadas = maquinas + ([challenger] if challenger is not None else [])
+    curvas = curvas_eac(parametros_vida(evaluadas), parametros['wacc'], parametros['tax_rate'])
+    eac_challenger = float(curvas['eac_minimo'][-1]) if challenger is not None else None
+
+    resultado = []
+    for i, maquina in enumerate(maquinas):
+        vida = int(np.count_nonzero(~np.isnan(curvas['eac'][i])))
+        fila = {
+            'id': str(maquina.id),
+            'nombre': maquina.nombre,
+            'tipo': maquina.tipo,
+            'vida_meses': vida,
+            'edad_optima_meses': int(curvas['edad_optima'][i]),
+            'eac_minimo': float(curvas['eac_minimo'][i]),
+            'eac_vida_completa': float(curvas['eac'][i, vida - 1]),
+        }
+        if curva:
+            fila['curva_eac'] = curvas['eac'][i, :vida].tolist()
+        if challenger is not None and maquina.tipo == 'Defender':
+            fila['reemplazo'] = reemplazo_diferido(curvas, i, eac_challenger, parametros['wacc'])
+        resultado.append(fila)
+
+    return {
+        'maquinas': resultado,
+        'challenger': None if challenger is None else {
+            'id': str(challenger.id),
+            'nombre': challenger.nombre,
+            'edad_optima_meses': int(curvas['edad_optima'][-1]),
+            'eac_minimo': eac_challenger,
+        },
+    }
+
+
+# ==================== COSTO MENSUAL ====================
+
+def costo_mensual_par(defender, challenger, parametros, detalle=False):
+    """
+    Modelo mensual completo (ver core.finance.mensual) de un par
+    Defender/Challenger, ambos evaluados en una sola llamada.
+    """
+    resultado = evaluar_mensual(
+        parametros_mensuales([defender, challenger], ['Defender', 'Challenger']),
+        parametros['wacc'], parametros['tax_rate'],
+    )
+    defender, challenger = [
+        {
+            'id': str(maquina.id),
+            'nombre': maquina.nombre,
+            'unidades_produccion': maquina.production_rate_units,
+            **resumen_mensual(resultado, indice, detalle),
+        }
+        for indice, maquina in enumerate((defender, challenger))
+    ]
+    eac_defender = defender['eac']
+    eac_challenger = challenger['eac']
+    return {
+        'defender': defender,
+        'challenger': challenger,
+        'recomendacion': 'Defender' if eac_defender < eac_challenger else 'Challenger',
+        'ahorro_anual': abs(eac_defender - eac_challenger),
+    }
@@ -0,0 +1,264 @@
+"""
+Reporte de flujo de caja de un registro en JSON, PDF (reportlab) o XLSX.
+
+Los archivos PDF y XLSX se generan bajo demanda y se guardan en
+REPORTES_CACHE_DIR con una clave derivada de Registro.id y
+fecha_actualizacion: mientras el registro no cambie, las descargas siguientes
+se sirven desde disco. Al generar una versión nueva se borran las anteriores
+del mismo registro.
+"""
+import hashlib
+import os
+import tempfile
+from datetime import date
+
+from django.conf import settings
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from django.utils import timezone
+from django.utils.html import escape
+
+from .exportacion import CONTENT_TYPE_XLSX, columna, escribir_libro, hoja
+
+FORMATOS_REPORTE = {
+    'pdf': 'application/pdf',
+    'xlsx': CONTENT_TYPE_XLSX,
+}
+
+# Cambiar al modificar el contenido o el diseño de los reportes (invalida la caché)
+VERSION_REPORTE = 1
+
+
+def directorio_cache():
+    return getattr(settings, 'REPORTES_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'reportes_flujo'))
+
+
+def datos_reporte_flujo(registro):
+    """Datos del reporte: resumen del registro, obligaciones con su saldo y pagos"""
+    pagos_proveedor = registro.obtener_pagos_proveedor()
+    pagado_por_obligacion = {}
+    for pago in pagos_proveedor:
+        obligacion_id = pago.get('obligacion_id')
+        pagado_por_obligacion[obligacion_id] = pagado_por_obligacion.get(obligacion_id, 0.0) + float(pago.get('monto', 0))
+
+    obligaciones = []
+    for obl in registro.obtener_obligaciones():
+        pagado = pagado_por_obligacion.get(obl.get('id'), 0.0)
+        total = float(obl.get('valor_pagar', 0))
+        obligaciones.append({
+            'proveedor': obl.get('proveedor_nombre', 'N/A'),
+            'valor_total': total,
+            'pagado': pagado,
+            'saldo': total - pagado,
+            'fecha_vencimiento': str(obl.get('fecha_vencimiento', '')),
+            'descripcion': obl.get('descripcion', ''),
+        })
+
+    return {
+        'registro': {
+            'id': registro.id,
+            'cliente': registro.cliente.nombre,
+            'fecha_entrega': str(registro.fecha_entrega_cliente),
+            'valor_cobrar': float(registro.valor_cobrar_cliente),
+            'saldo_pendiente': float(registro.saldo_pendiente),
+        },
+        'obligaciones': obligaciones,
+        'pagos_cliente': [
+            {
+                'fecha': str(p.get('fecha_pago', '')),
+                'monto': float(p.get('monto', 0)),
+                'metodo': p.get('metodo_pago', ''),
+                'referencia': p.get('referencia', ''),
+            }
+            for p in registro.obtener_pagos_cliente()
+        ],
+        'pagos_proveedor': [
+            {
+                'fecha': str(p.get('fecha_pago', '')),
+                'monto': float(p.get('monto', 0)),
+                'metodo': p.get('metodo_pago', ''),
+                'obligacion_id': p.get('obligacion_id', ''),
+            }
+            for p in pagos_proveedor
+        ],
+    }
+
+
+# ==================== XLSX ====================
+
+def _fecha_o_none(valor):
+    """Las fechas del reporte son texto; las vacías o 'None' se dejan en blanco"""
+    try:
+        return date.fromisoformat(valor).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def generar_xlsx(datos, destino):
+    registro = datos['registro']
+    escribir_libro(destino, [
+        hoja('Resumen', [
+            columna('Registro', 'id'),
+            columna('Cliente', 'cliente', ancho=30),
+            columna('Fecha Entrega', 'fecha_entrega', 'fecha'),
+            columna('Valor a Cobrar', 'valor_cobrar', 'moneda', 16),
+            columna('Saldo Pendiente', 'saldo_pendiente', 'moneda', 16),
+        ], [{**registro, 'fecha_entrega': _fecha_o_none(registro['fecha_entrega'])}],
+            titulo=f"Flujo de Caja - Registro {registro['id']}", totales=False),
+        hoja('Obligaciones', [
+            columna('Proveedor', 'proveedor', ancho=30),
+            columna('Fecha Vencimiento', 'fecha_vencimiento', 'fecha'),
+            columna('Valor Total', 'valor_total', 'moneda', 16),
+            columna('Pagado', 'pagado', 'moneda', 16),
+            columna('Saldo', 'saldo', 'moneda', 16),
+            columna('Descripción', 'descripcion', ancho=40),
+        ], ({**o, 'fecha_vencimiento': _fecha_o_none(o['fecha_vencimiento'])} for o in datos['obligaciones'])),
+        hoja('Pagos Cliente', [
+            columna('Fecha', 'fecha', 'fecha'),
+            columna('Monto', 'monto', 'moneda', 16),
+            columna('Método', 'metodo'),
+            columna('Referencia', 'referencia', ancho=20),
+        ], ({**p, 'fecha': _fecha_o_none(p['fecha'])} for p in datos['pagos_cliente'])),
+        hoja('Pagos Proveedor', [
+            columna('Fecha', 'fecha', 'fecha'),
+            columna('Monto', 'monto', 'moneda', 16),
+            columna('Método', 'metodo'),
+            columna('Obligación', 'obligacion_id', 'entero', 12),
+        ], ({**p, 'fecha': _fecha_o_none(p['fecha']), 'obligacion_id': p['obligacion_id'] or None}
+            for p in datos['pagos_proveedor'])),
+    ])
+
+
+# ==================== PDF ====================
+
+ESTILOS_PDF = getSampleStyleSheet()
+
+ESTILO_TABLA_PDF = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E2E8F0')),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+
+def moneda(valor):
+    return f"${valor:,.2f}"
+
+
+def tabla_pdf(encabezados, filas, alinear_derecha=()):
+    """Tabla de reportlab con encabezado repetido en cada página; 'Sin movimientos' si no hay filas"""
+    if not filas:
+        return Paragraph('Sin movimientos', ESTILOS_PDF['Italic'])
+    tabla = Table([encabezados] + filas, repeatRows=1, hAlign='LEFT')
+    tabla.setStyle(ESTILO_TABLA_PDF)
+    for columna_derecha in alinear_derecha:
+        tabla.setStyle(TableStyle([('ALIGN', (columna_derecha, 1), (columna_derecha, -1), 'RIGHT')]))
+    return tabla
+
+
+def documento_pdf(destino, titulo, elementos):
+    SimpleDocTemplate(
+        destino, pagesize=landscape(letter), title=titulo,
+        leftMargin=1.5 * cm, rightMargin=1.5 * cm, topMargin=1.5 * cm, bottomMargin=1.5 * cm,
+    ).build(elementos)
+
+
+def generar_pdf(datos, destino):
+    estilos = ESTILOS_PDF
+    registro = datos['registro']
+    obligaciones = datos['obligaciones']
+    elementos = [
+        Paragraph(f"Flujo de Caja - Registro {escape(registro['id'])}", estilos['Title']),
+        Paragraph(
+            f"Cliente: <b>{escape(registro['cliente'])}</b> | Fecha de entrega: {registro['fecha_entrega']} | "
+            f"Valor a cobrar: {moneda(registro['valor_cobrar'])} | "
+            f"Saldo pendiente: {moneda(registro['saldo_pendiente'])}",
+            estilos['Normal'],
+        ),
+        Paragraph(f"Generado: {timezone.localtime():%Y-%m-%d %H:%M}", estilos['Normal']),
+        Spacer(1, 0.5 * cm),
+        Paragraph('Obligaciones', estilos['Heading2']),
+        tabla_pdf(
+            ['Proveedor', 'Vencimiento', 'Valor Total', 'Pagado', 'Saldo', 'Descripción'],
+            [[o['proveedor'], o['fecha_vencimiento'], moneda(o['valor_total']), moneda(o['pagado']),
+              moneda(o['saldo']), Paragraph(escape(o['descripcion'] or ''), estilos['BodyText'])]
+             for o in obligaciones]
+            + ([['Total', '', moneda(sum(o['valor_total'] for o in obligaciones)),
+                 moneda(sum(o['pagado'] for o in obligaciones)),
+                 moneda(sum(o['saldo'] for o in obligaciones)), '']] if obligaciones else []),
+            alinear_derecha=(2, 3, 4),
+        ),
+        Spacer(1, 0.5 * cm),
+        Paragraph('Pagos del Cliente', estilos['Heading2']),
+        tabla_pdf(
+            ['Fecha', 'Monto', 'Método', 'Referencia'],
+            [[p['fecha'], moneda(p['monto']), p['metodo'], p['referencia']] for p in datos['pagos_cliente']],
+            alinear_derecha=(1,),
+        ),
+        Spacer(1, 0.5 * cm),
+        Paragraph('Pagos a Proveedores', estilos['Heading2']),
+        tabla_pdf(
+            ['Fecha', 'Monto', 'Método', 'Obligación'],
+            [[p['fecha'], moneda(p['monto']), p['metodo'], p['obligacion_id'] or '']
+             for p in datos['pagos_proveedor']],
+            alinear_derecha=(1,),
+        ),
+    ]
+    documento_pdf(destino, f"Flujo de Caja {registro['id']}", elementos)
+
+
+GENERADORES = {
+    'pdf': generar_pdf,
+    'xlsx': generar_xlsx,
+}
+
+
+# ==================== CACHÉ EN DISCO ====================
+
+def _prefijo(registro):
+    return hashlib.sha256(str(registro.pk).encode()).hexdigest()[:20]
+
+
+def ruta_reporte(registro, formato):
+    """Ruta en caché del reporte para el estado actual del registro"""
+    version = hashlib.sha256(
+        f"{registro.fecha_actualizacion.isoformat()}|{VERSION_REPORTE}".encode()
+    ).hexdigest()[:12]
+    return os.path.join(directorio_cache(), f"{_prefijo(registro)}-{version}.{formato}")
+
+
+def archivo_reporte(registro, formato):
+    """
+    Retorna la ruta del reporte (PDF o XLSX) del registro, generándolo solo si no
+    existe uno para su fecha_actualizacion actual.
+    """
+    if formato not in GENERADORES:
+        raise ValueError(f"Formato no válido: {formato}. Use json, {', '.join(GENERADORES)}")
+
+    ruta = ruta_reporte(registro, formato)
+    if os.path.exists(ruta):
+        return ruta
+
+    os.makedirs(directorio_cache(), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        GENERADORES[formato](datos_reporte_flujo(registro), temporal)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+    # Descartar las versiones anteriores del mismo registro
+    prefijo = _prefijo(registro)
+    for nombre in os.listdir(directorio_cache()):
+        anterior = os.path.join(directorio_cache(), nombre)
+        if nombre.startswith(f"{prefijo}-") and nombre.endswith(f".{formato}") and anterior != ruta:
+            try:
+                os.remove(anterior)
+            except OSError:
+                pass
+    return ruta
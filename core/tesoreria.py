@@ -0,0 +1,132 @@
+"""
+Proyección de flujo de caja de toda la cartera (cuentas por cobrar y por pagar).
+
+Los saldos pendientes se obtienen en una sola consulta (UNION de registros y
+obligaciones) y la agregación por día, semana o mes se hace con NumPy.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import DecimalField, F, Value
+
+from .models import Obligacion, Registro
+
+AGRUPACIONES = ('dia', 'semana', 'mes')
+
+# Horizonte máximo de la proyección (en días)
+HORIZONTE_MAXIMO = 366 * 5
+
+
+def movimientos_pendientes(fecha_inicio, fecha_fin):
+    """
+    Retorna (fecha, ingreso, egreso) de cada saldo pendiente que vence en el período:
+    el saldo por cobrar de cada registro en su fecha límite de cobro y el saldo de
+    cada obligación en su fecha de vencimiento. Se ejecuta en una sola consulta.
+    """
+    monto = DecimalField(max_digits=15, decimal_places=2)
+    cero = Value(Decimal('0'), output_field=monto)
+
+    ingresos = Registro.objects.filter(
+        saldo_pendiente__gt=0,
+        fecha_limite_cobro__range=(fecha_inicio, fecha_fin),
+    ).order_by().annotate(
+        fecha=F('fecha_limite_cobro'), ingreso=F('saldo_pendiente'), egreso=cero,
+    ).values_list('fecha', 'ingreso', 'egreso')
+
+    egresos = Obligacion.objects.con_saldo().filter(
+        saldo__gt=0,
+        fecha_vencimiento__range=(fecha_inicio, fecha_fin),
+    ).order_by().annotate(
+        fecha=F('fecha_vencimiento'), ingreso=cero, egreso=F('saldo'),
+    ).values_list('fecha', 'ingreso', 'egreso')
+
+    return ingresos.union(egresos, all=True)
+
+
+def _inicio_periodo(dias, agrupacion):
+    """Fecha de inicio del período (día, semana ISO o mes) de cada día como datetime64[D]"""
+    if agrupacion == 'semana':
+        # 1970-01-01 fue jueves: se desplaza para que la semana empiece el lunes
+        return dias - ((dias.astype('int64') + 3) % 7).astype('timedelta64[D]')
+    if agrupacion == 'mes':
+        return dias.astype('datetime64[M]').astype('datetime64[D]')
+    return dias
+
+
+def proyectar_flujo_cartera(fecha_inicio, fecha_fin, agrupacion='dia', saldo_inicial=0):
+    """
+    Proyecta el flujo de caja consolidado entre fecha_inicio y fecha_fin.
+
+    Retorna un diccionario con 'periodos' (ingresos, egresos, flujo neto, saldo
+    acumulado y días con saldo negativo por período) y 'resumen'. El saldo
+    acumulado parte de saldo_inicial y se evalúa día a día, de modo que los días
+    negativos se cuentan igual con cualquier agrupación.
+    """
+    if agrupacion not in AGRUPACIONES:
+        raise ValueError(f"Agrupación no válida: {agrupacion}. Use {', '.join(AGRUPACIONES)}")
+    if fecha_fin < fecha_inicio:
+        raise ValueError('La fecha final no puede ser anterior a la fecha inicial')
+    n_dias = (fecha_fin - fecha_inicio).days + 1
+    if n_dias > HORIZONTE_MAXIMO:
+        raise ValueError(f'El horizonte no puede superar {HORIZONTE_MAXIMO} días')
+
+    filas = list(movimientos_pendientes(fecha_inicio, fecha_fin))
+    if filas:
+        fechas, ingresos, egresos = zip(*filas)
+        indices = (np.array(fechas, dtype='datetime64[D]') - np.datetime64(fecha_inicio, 'D')).astype('int64')
+        ingresos_dia = np.bincount(indices, weights=np.array(ingresos, dtype=float), minlength=n_dias)
+        egresos_dia = np.bincount(indices, weights=np.array(egresos, dtype=float), minlength=n_dias)
+    else:
+        ingresos_dia = np.zeros(n_dias)
+        egresos_dia = np.zeros(n_dias)
+
+    neto_dia = ingresos_dia - egresos_dia
+    acumulado_dia = float(saldo_inicial) + np.cumsum(neto_dia)
+    negativo_dia = acumulado_dia < 0
+
+    # Límites de cada período sobre el eje de días
+    dias = np.datetime64(fecha_inicio, 'D') + np.arange(n_dias)
+    inicio_periodo = _inicio_periodo(dias, agrupacion)
+    cortes = np.flatnonzero(np.r_[True, inicio_periodo[1:] != inicio_periodo[:-1]])
+    finales = np.r_[cortes[1:], n_dias] - 1
+
+    ingresos_periodo = np.add.reduceat(ingresos_dia, cortes)
+    egresos_periodo = np.add.reduceat(egresos_dia, cortes)
+    negativos_periodo = np.add.reduceat(negativo_dia.astype('int64'), cortes)
+
+    periodos = [
+        {
+            'periodo': dias[inicio].item().isoformat(),
+            'fecha_inicio': dias[inicio].item().isoformat(),
+            'fecha_fin': dias[fin].item().isoformat(),
+            'ingresos_esperados': round(float(ingresos_periodo[i]), 2),
+            'egresos_esperados': round(float(egresos_periodo[i]), 2),
+            'flujo_neto': round(float(ingresos_periodo[i] - egresos_periodo[i]), 2),
+            'flujo_acumulado': round(float(acumulado_dia[fin]), 2),
+            'dias_flujo_negativo': int(negativos_periodo[i]),
+        }
+        for i, (inicio, fin) in enumerate(zip(cortes, finales))
+    ]
+
+    dias_negativos = np.flatnonzero(negativo_dia)
+    resumen = {
+        'total_ingresos': round(float(ingresos_dia.sum()), 2),
+        'total_egresos': round(float(egresos_dia.sum()), 2),
+        'flujo_neto_total': round(float(neto_dia.sum()), 2),
+        'saldo_inicial': float(saldo_inicial),
+        'saldo_final': round(float(acumulado_dia[-1]), 2),
+        'flujo_acumulado_min': round(float(acumulado_dia.min()), 2),
+        'flujo_acumulado_max': round(float(acumulado_dia.max()), 2),
+        'dias_con_flujo_negativo': int(dias_negativos.size),
+        'primer_dia_negativo': dias[dias_negativos[0]].item().isoformat() if dias_negativos.size else None,
+        'periodo_dias': n_dias,
+        'movimientos': len(filas),
+    }
+    return {'periodos': periodos, 'resumen': resumen}
+
+
+def rango_por_defecto():
+    """Horizonte por defecto: desde hoy y 90 días hacia adelante"""
+    hoy = date.today()
+    return hoy, hoy + timedelta(days=90)
@@ -1,3 +1,1785 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import uuid
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal, localcontext
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import openpyxl
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils import timezone
+
+from .estados_cuenta import datos_estados_cuenta, generar_estados_cuenta
+from .finance import (
+    analisis_par, analisis_portafolio, eac_vectorizado, evaluar_maquinas, filas_amortizacion, leer_distribuciones,
+    parametros_maquinas, parametros_simulacion, simular,
+)
+from .finance.amortizacion import _terminos
+from . import benchmark, busqueda, catalogos, perfilado
+from .models import (
+    AnalisisComparativo, Cliente, Maquina, PagoCliente, Proveedor, Registro, TablaAmortizacion, TrabajoImportacion,
+)
+from .tesoreria import proyectar_flujo_cartera
+from .importacion import importar_excel
+from .reemplazo import calcular_analisis, guardar_analisis_calculado, leer_parametros
+from .trabajos import ejecutar_importacion
+from .views import calcular_eac, clasificar_cobros_por_antiguedad
+
+
+def crear_datos_tesoreria():
+    """Clientes, proveedores y registros con cobros repartidos en todos los rangos"""
+    hoy = date.today()
+    cliente = Cliente.objects.create(id='C1', nombre='Cliente Uno', city='Bogotá', terminos_contractuales=30)
+    otro = Cliente.objects.create(id='C2', nombre='Cliente Dos', city='Cali', terminos_contractuales=60)
+    Proveedor.objects.create(id='P1', nombre='Proveedor Uno', contacto='Ana', terminos_pago=30)
+
+    escenarios = [
+        # (id, cliente, días desde la entrega, valor, pagos como (días desde la entrega, monto))
+        ('R1', cliente, 200, '1000.00', [(0, '100.10'), (30, '50.20'), (31, '25.00'), (95, '10.00'), (150, '5.55')]),
+        ('R2', cliente, 45, '500.00', [(60, '100.00'), (61, '20.00')]),
+        ('R3', otro, 10, '800.00', []),
+        ('R4', otro, 100, '300.00', [(5, '300.00')]),
+        ('R5', cliente, 400, '250.00', [(90, '0.30'), (91, '0.10'), (120, '0.20'), (121, '0.40')]),
+    ]
+    for registro_id, cli, dias, valor, pagos in escenarios:
+        entrega = hoy - timedelta(days=dias)
+        registro = Registro.objects.create(
+            id=registro_id, cliente=cli, fecha_entrega_cliente=entrega, valor_cobrar_cliente=Decimal(valor)
+        )
+        for dias_pago, monto in pagos:
+            registro.agregar_pago_cliente(monto=Decimal(monto), fecha_pago=entrega + timedelta(days=dias_pago))
+        registro.actualizar_estado_cobro()
+
+
+class CuentasPorCobrarApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        crear_datos_tesoreria()
+
+    def _cxc_referencia(self):
+        """Cálculo registro por registro (implementación original en Python)"""
+        data = []
+        for registro in Registro.objects.select_related('cliente').all():
+            saldo_pendiente = registro.calcular_saldo_pendiente_cliente()
+            if saldo_pendiente <= 0:
+                continue
+            data.append({
+                'registro_id': registro.id,
+                'dias_vencidos': abs(registro.dias_vencimiento) if registro.esta_vencido else 0,
+                'esta_vencido': registro.esta_vencido,
+                'valor_original': float(registro.valor_cobrar_cliente),
+                'saldo_pendiente': float(saldo_pendiente),
+                'total_cobrado': float(registro.valor_cobrar_cliente - saldo_pendiente),
+                'estado_cobro': registro.get_estado_cobro_display(),
+                **clasificar_cobros_por_antiguedad(registro.obtener_pagos_cliente(), registro.fecha_entrega_cliente),
+            })
+        return data
+
+    def test_coincide_con_calculo_por_registro(self):
+        respuesta = self.client.get(reverse('api_cuentas_por_cobrar'))
+        self.assertEqual(respuesta.status_code, 200)
+        cxc_data = respuesta.json()['cxc_data']
+
+        esperado = self._cxc_referencia()
+        self.assertEqual([i['registro_id'] for i in cxc_data], [i['registro_id'] for i in esperado])
+        for item, referencia in zip(cxc_data, esperado):
+            for campo, valor in referencia.items():
+                if isinstance(valor, float):
+                    self.assertAlmostEqual(item[campo], valor, places=2, msg=f"{item['registro_id']}.{campo}")
+                else:
+                    self.assertEqual(item[campo], valor, msg=f"{item['registro_id']}.{campo}")
+
+    def test_resumen(self):
+        resumen = self.client.get(reverse('api_cuentas_por_cobrar')).json()['resumen']
+        esperado = self._cxc_referencia()
+        self.assertAlmostEqual(resumen['total_facturado'], sum(i['valor_original'] for i in esperado), places=2)
+        self.assertAlmostEqual(resumen['total_saldo_pendiente'], sum(i['saldo_pendiente'] for i in esperado), places=2)
+        self.assertAlmostEqual(resumen['total_cobrado'], sum(i['total_cobrado'] for i in esperado), places=2)
+
+    def test_numero_de_consultas_constante(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse('api_cuentas_por_cobrar'))
+
+    def test_filtros(self):
+        data = self.client.get(reverse('api_cuentas_por_cobrar'), {'cliente': 'Cliente Dos'}).json()['cxc_data']
+        self.assertEqual({i['registro_id'] for i in data}, {'R3'})
+        vencidos = self.client.get(reverse('api_cuentas_por_cobrar'), {'estado': 'vencido'}).json()['cxc_data']
+        aldia = self.client.get(reverse('api_cuentas_por_cobrar'), {'estado': 'aldia'}).json()['cxc_data']
+        self.assertTrue(vencidos and all(i['esta_vencido'] for i in vencidos))
+        self.assertFalse(any(i['esta_vencido'] for i in aldia))
+        self.assertEqual(len(vencidos) + len(aldia), len(self._cxc_referencia()))
+
+    def test_exportacion_xlsx(self):
+        respuesta = self.client.get(reverse('exportar_cxc_xlsx'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        self.assertIn('cuentas_por_cobrar_', respuesta['Content-Disposition'])
+        hoja = openpyxl.load_workbook(BytesIO(b''.join(respuesta.streaming_content))).active
+        filas = list(hoja.iter_rows(min_row=4, values_only=True))
+
+        api = self.client.get(reverse('api_cuentas_por_cobrar')).json()
+        self.assertEqual([fila[2] for fila in filas[:-1]], [i['registro_id'] for i in api['cxc_data']])
+        self.assertEqual(filas[-1][0], 'Total')
+        self.assertAlmostEqual(filas[-1][7], api['resumen']['total_saldo_pendiente'], places=2)
+
+
+class CuentasPorPagarApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        crear_datos_tesoreria()
+        hoy = date.today()
+        obligaciones = [
+            # (registro, proveedor, valor, días hasta el vencimiento, pagos como (días desde hoy, monto))
+            ('R1', 'Proveedor Uno', '400.00', -45, [(-10, '100.00')]),
+            ('R1', 'Proveedor Dos', '250.00', 15, []),
+            ('R2', 'Proveedor Uno', '300.00', -5, [(0, '300.00')]),
+            ('R2', 'Proveedor Uno', '120.00', -95, [(-40, '20.00')]),
+            ('R3', 'Proveedor Dos', '80.00', 60, []),
+        ]
+        for registro_id, proveedor, valor, dias, pagos in obligaciones:
+            registro = Registro.objects.get(pk=registro_id)
+            obligacion = registro.agregar_obligacion(proveedor, Decimal(valor), hoy + timedelta(days=dias))
+            for dias_pago, monto in pagos:
+                registro.agregar_pago_proveedor(obligacion['id'], Decimal(monto), hoy + timedelta(days=dias_pago))
+
+    def _get(self, **params):
+        respuesta = self.client.get(reverse('api_cuentas_por_pagar'), params)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_paginacion_y_totales_del_conjunto_filtrado(self):
+        data = self._get(page=2, page_size=3)
+        self.assertEqual(len(data['cxp_data']), 1)
+        self.assertEqual(data['paginacion']['total_items'], 4)
+        self.assertEqual(data['paginacion']['total_pages'], 2)
+        self.assertFalse(data['paginacion']['has_next'])
+        totales = data['totales']
+        self.assertAlmostEqual(totales['totalOriginal'], 850.0)
+        self.assertAlmostEqual(totales['totalPaid'], 120.0)
+        self.assertAlmostEqual(totales['totalPending'], 730.0)
+        self.assertAlmostEqual(totales['totalOverdue'], 400.0)
+
+    def test_filtros(self):
+        vencidas = self._get(overdue_only='1')['cxp_data']
+        self.assertEqual({i['id'] for i in vencidas}, {'R1-1', 'R2-2'})
+        self.assertTrue(all(i['isOverdue'] for i in vencidas))
+
+        por_proveedor = self._get(vendor='Proveedor Dos')
+        self.assertEqual({i['id'] for i in por_proveedor['cxp_data']}, {'R1-2', 'R3-1'})
+        self.assertAlmostEqual(por_proveedor['totales']['totalPending'], 330.0)
+
+        hoy = date.today()
+        rango = self._get(due_from=(hoy - timedelta(days=50)).isoformat(), due_to=(hoy + timedelta(days=20)).isoformat())
+        self.assertEqual({i['id'] for i in rango['cxp_data']}, {'R1-1', 'R1-2'})
+
+        self.assertEqual([i['id'] for i in self._get(status='91+')['cxp_data']], ['R2-2'])
+
+    def test_lista_de_proveedores_acotada(self):
+        data = self._get()
+        self.assertEqual(data['proveedores'], ['Proveedor Dos', 'Proveedor Uno'])
+        self.assertFalse(data['proveedores_truncado'])
+        self.assertEqual(self._get(vendor_q='dos')['proveedores'], ['Proveedor Dos'])
+        with mock.patch('core.views.MAX_PROVEEDORES_CXP', 1):
+            data = self._get()
+        self.assertEqual(data['proveedores'], ['Proveedor Dos'])
+        self.assertTrue(data['proveedores_truncado'])
+
+    def test_ordenamiento(self):
+        ascendente = [i['netBalance'] for i in self._get(sort='netBalance')['cxp_data']]
+        self.assertEqual(ascendente, sorted(ascendente))
+        descendente = [i['overdueDays'] for i in self._get(sort='-overdueDays')['cxp_data']]
+        self.assertEqual(descendente, [95, 45, 0, 0])
+
+    def test_pagos_por_antiguedad_de_la_pagina(self):
+        item = next(i for i in self._get(vendor='Proveedor Uno')['cxp_data'] if i['id'] == 'R1-1')
+        self.assertAlmostEqual(item['paidAmount'], 100.0)
+        self.assertAlmostEqual(item['pagos_0_30'], 0.0)
+        self.assertAlmostEqual(item['netBalance'], 300.0)
+
+    def test_numero_de_consultas_no_depende_de_la_pagina(self):
+        with self.assertNumQueries(5):
+            self._get(page_size=1)
+        with self.assertNumQueries(5):
+            self._get(page_size=500)
+
+    def _exportar(self, **params):
+        respuesta = self.client.get(reverse('exportar_cxp_xlsx'), params)
+        self.assertEqual(respuesta.status_code, 200)
+        hoja = openpyxl.load_workbook(BytesIO(b''.join(respuesta.streaming_content))).active
+        return list(hoja.iter_rows(min_row=4, values_only=True))
+
+    def test_exportacion_xlsx_con_filtros_y_orden_de_la_api(self):
+        with mock.patch('core.views.LOTE_EXPORTACION', 2):
+            filas = self._exportar(sort='-netBalance')
+        api = self._get(sort='-netBalance', page_size=500)
+        self.assertEqual([fila[1] for fila in filas[:-1]], [i['documentNumber'] for i in api['cxp_data']])
+        self.assertEqual([fila[7] for fila in filas[:-1]], [i['paidAmount'] for i in api['cxp_data']])
+        self.assertEqual(filas[-1][0], 'Total')
+        self.assertAlmostEqual(filas[-1][6], api['totales']['totalPending'], places=2)
+
+        vencidas = self._exportar(overdue_only='1', page='2')
+        self.assertEqual({fila[1] for fila in vencidas[:-1]}, {'FAC-R1-1', 'FAC-R2-2'})
+        self.assertIsInstance(vencidas[0][3], datetime)
+
+    def test_exportacion_xlsx_consultas_por_lote(self):
+        with mock.patch('core.views.LOTE_EXPORTACION', 2):
+            with self.assertNumQueries(3):
+                self._exportar()
+
+
+class SaldosMaterializadosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        crear_datos_tesoreria()
+
+    def _saldos_calculados(self, registro):
+        return {
+            'total_cobrado': registro.valor_cobrar_cliente - registro.calcular_saldo_pendiente_cliente(),
+            'saldo_pendiente': registro.calcular_saldo_pendiente_cliente(),
+            'total_obligaciones_pendientes': registro.calcular_total_obligaciones(),
+            'margen_bruto': registro.valor_cobrar_cliente - (
+                registro.obligaciones.aggregate(total=Sum('valor_pagar'))['total'] or Decimal('0')
+            ),
+        }
+
+    def assertSaldosAlDia(self, registro_id):
+        registro = Registro.objects.get(pk=registro_id)
+        for campo, valor in self._saldos_calculados(registro).items():
+            self.assertEqual(getattr(registro, campo), valor, msg=f"{registro_id}.{campo}")
+
+    def test_agregar_y_eliminar_movimientos(self):
+        registro = Registro.objects.get(pk='R2')
+        self.assertEqual(registro.saldo_pendiente, Decimal('380.00'))
+        self.assertEqual(registro.porcentaje_cobrado, Decimal('24.00'))
+
+        obligacion = registro.agregar_obligacion('Proveedor Uno', Decimal('200.00'), date.today())
+        pago = registro.agregar_pago_proveedor(obligacion['id'], Decimal('50.00'), date.today())
+        registro.agregar_pago_cliente(Decimal('80.00'), date.today())
+        self.assertSaldosAlDia('R2')
+        self.assertEqual(Registro.objects.get(pk='R2').total_obligaciones_pendientes, Decimal('150.00'))
+
+        registro.eliminar_pago_proveedor(pago['id'])
+        self.assertEqual(Registro.objects.get(pk='R2').total_obligaciones_pendientes, Decimal('200.00'))
+        registro.eliminar_obligacion(obligacion['id'])
+        self.assertSaldosAlDia('R2')
+        self.assertEqual(Registro.objects.get(pk='R2').margen_bruto, Decimal('500.00'))
+
+    def test_numeracion_bloquea_el_registro(self):
+        # Dos instancias del mismo registro (dos peticiones) numeran en secuencia
+        primera, segunda = Registro.objects.get(pk='R3'), Registro.objects.get(pk='R3')
+        with mock.patch.object(Registro.objects, 'select_for_update', wraps=Registro.objects.select_for_update) as bloqueo:
+            a = primera.agregar_obligacion('Proveedor Uno', Decimal('10.00'), date.today())
+            b = segunda.agregar_obligacion('Proveedor Uno', Decimal('20.00'), date.today())
+            primera.agregar_pago_cliente(Decimal('5.00'), date.today())
+            segunda.agregar_pago_proveedor(a['id'], Decimal('5.00'), date.today())
+        self.assertEqual(bloqueo.call_count, 4)
+        self.assertEqual((a['id'], b['id']), (1, 2))
+        self.assertSaldosAlDia('R3')
+
+    def test_cambio_de_valor_a_cobrar(self):
+        registro = Registro.objects.get(pk='R3')
+        registro.valor_cobrar_cliente = Decimal('900.00')
+        registro.save(update_fields=['valor_cobrar_cliente'])
+        self.assertEqual(Registro.objects.get(pk='R3').saldo_pendiente, Decimal('900.00'))
+
+    def test_comando_recalcular_saldos(self):
+        Registro.objects.update(saldo_pendiente=0, total_cobrado=0, margen_bruto=0, porcentaje_cobrado=0)
+        call_command('recalcular_saldos', stdout=StringIO())
+        for registro_id in Registro.objects.values_list('pk', flat=True):
+            self.assertSaldosAlDia(registro_id)
+        self.assertEqual(Registro.objects.get(pk='R4').porcentaje_cobrado, Decimal('100.00'))
+
+    def test_filtrar_por_saldo_en_sql(self):
+        self.assertEqual(
+            set(Registro.objects.filter(saldo_pendiente__gt=0).values_list('pk', flat=True)),
+            {'R1', 'R2', 'R3', 'R5'}
+        )
+
+
+class DiasPromedioPagoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        crear_datos_tesoreria()
+
+    def _referencia(self, cliente_id):
+        """Cálculo original: recorre todos los pagos del cliente"""
+        dias = [
+            (pago.fecha_pago - pago.registro.fecha_entrega_cliente).days
+            for pago in PagoCliente.objects.filter(registro__cliente_id=cliente_id, fecha_pago__isnull=False)
+            .select_related('registro')
+        ]
+        dias = [d for d in dias if d >= 0]
+        return (sum(dias), len(dias), sum(dias) // len(dias) if dias else 1)
+
+    def assertCoincide(self, *clientes):
+        for cliente in Cliente.objects.filter(pk__in=clientes):
+            self.assertEqual(
+                (cliente.dias_pago_acumulados, cliente.pagos_con_dias, cliente.average_days_to_pay),
+                self._referencia(cliente.pk), msg=cliente.pk,
+            )
+
+    def test_incremental_al_agregar_y_eliminar_pagos(self):
+        self.assertCoincide('C1', 'C2')
+        registro = Registro.objects.get(pk='R2')
+        pago = registro.agregar_pago_cliente(Decimal('10.00'), registro.fecha_entrega_cliente + timedelta(days=200))
+        self.assertCoincide('C1')
+        registro.agregar_pago_cliente(Decimal('1.00'), registro.fecha_entrega_cliente - timedelta(days=3))
+        self.assertCoincide('C1')
+        registro.eliminar_pago_cliente(pago['id'])
+        self.assertCoincide('C1')
+
+    def test_cambio_de_fecha_de_entrega_y_de_cliente(self):
+        registro = Registro.objects.get(pk='R1')
+        registro.fecha_entrega_cliente -= timedelta(days=10)
+        registro.save()
+        self.assertCoincide('C1')
+
+        registro.cliente = Cliente.objects.get(pk='C2')
+        registro.save()
+        self.assertCoincide('C1', 'C2')
+
+        registro.delete()
+        self.assertCoincide('C2')
+
+    def test_guardar_no_depende_del_historial_del_cliente(self):
+        def consultas_al_guardar(registro_id):
+            registro = Registro.objects.get(pk=registro_id)
+            with CaptureQueriesContext(connection) as contexto:
+                registro.agregar_pago_cliente(Decimal('1.00'), registro.fecha_entrega_cliente + timedelta(days=5))
+            return len(contexto.captured_queries)
+
+        antes = consultas_al_guardar('R1')
+        cliente = Cliente.objects.get(pk='C1')
+        for i in range(20):
+            registro = Registro.objects.create(id=f'H{i}', cliente=cliente, fecha_entrega_cliente=date(2024, 1, 1),
+                                               valor_cobrar_cliente=Decimal('100.00'))
+            registro.agregar_pago_cliente(Decimal('10.00'), date(2024, 1, 1) + timedelta(days=i))
+        self.assertEqual(consultas_al_guardar('R1'), antes)
+        self.assertCoincide('C1')
+
+    def test_comando_de_reconstruccion(self):
+        Cliente.objects.filter(pk='C1').update(dias_pago_acumulados=0, pagos_con_dias=0, average_days_to_pay=99)
+        Registro.objects.filter(pk='R2').update(dias_pago_total=0, pagos_con_dias=0)
+        call_command('recalcular_dias_pago', stdout=StringIO())
+        self.assertCoincide('C1', 'C2')
+        self.assertEqual(Registro.objects.get(pk='R2').pagos_con_dias, 2)
+
+
+class CatalogosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        crear_datos_tesoreria()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_terminos_con_etag_y_revalidacion(self):
+        url = reverse('api_catalogo_terminos')
+        respuesta = self.client.get(url)
+        datos = respuesta.json()
+        self.assertEqual(datos['clientes']['C2'], {'nombre': 'Cliente Dos', 'terminos': 60})
+        self.assertEqual(datos['proveedores'], {'P1': {'nombre': 'Proveedor Uno', 'terminos': 30}})
+        self.assertIn('no-cache', respuesta['Cache-Control'])
+        etag = respuesta['ETag']
+
+        # Servido desde la caché, y 304 si el navegador ya tiene la versión vigente
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json(), datos)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Cliente.objects.create(id='C3', nombre='Cliente Tres', city='Cali', terminos_contractuales=15)
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+        self.assertEqual(respuesta.json()['clientes']['C3'], {'nombre': 'Cliente Tres', 'terminos': 15})
+
+    def test_guardar_proveedor_invalida(self):
+        self.assertEqual(catalogos.terminos()['proveedores']['P1']['terminos'], 30)
+        proveedor = Proveedor.objects.get(pk='P1')
+        proveedor.terminos_pago = 45
+        with self.captureOnCommitCallbacks(execute=True):
+            proveedor.save()
+        self.assertEqual(catalogos.terminos()['proveedores']['P1']['terminos'], 45)
+
+    def test_importacion_invalida(self):
+        catalogos.terminos()
+        importar_excel(crear_libro_importacion(1))
+        self.assertIn('C9', catalogos.terminos()['clientes'])
+
+    def test_busqueda(self):
+        url = reverse('api_buscar_catalogo', args=['clientes'])
+        self.assertEqual([c['id'] for c in self.client.get(url, {'q': 'dos'}).json()['resultados']], ['C2'])
+        self.assertEqual([c['id'] for c in self.client.get(url, {'q': 'c1'}).json()['resultados']], ['C1'])
+        self.assertEqual(len(self.client.get(url, {'limit': 1}).json()['resultados']), 1)
+        respuesta = self.client.get(reverse('api_buscar_catalogo', args=['proveedores']), {'q': 'uno'})
+        self.assertEqual(respuesta.json()['resultados'], [{'id': 'P1', 'nombre': 'Proveedor Uno', 'terminos': 30}])
+        self.assertEqual(self.client.get(reverse('api_buscar_catalogo', args=['otros'])).status_code, 400)
+
+    def test_formulario_no_incrusta_los_catalogos(self):
+        Cliente.objects.bulk_create([
+            Cliente(id=f'X{i}', nombre=f'Extra {i}', city='Cali', terminos_contractuales=30) for i in range(30)
+        ])
+        respuesta = self.client.get(reverse('registros_crear'))
+        self.assertNotContains(respuesta, 'Extra 1')
+        self.assertNotIn('clientes_data', respuesta.context)
+
+        respuesta = self.client.get(reverse('registros_editar', args=['R3']))
+        opciones = respuesta.context['form']['cliente'].field.widget.choices
+        self.assertEqual([valor for valor, _ in opciones], ['', 'C2'])
+        self.assertNotContains(respuesta, 'Extra 1')
+
+
+class BusquedaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        crear_datos_tesoreria()
+        # Varias filas con la misma fecha de creación para probar el desempate por ID
+        Registro.objects.filter(pk__in=['R2', 'R3', 'R4']).update(fecha_creacion=timezone.now())
+        Maquina.objects.create(tipo='Defender', nombre='Torno', numero_serie='TR-100')
+        Maquina.objects.create(nombre='Torno CNC', numero_serie='CNC-7')
+        Maquina.objects.create(nombre='Prensa', numero_serie='PR-1')
+
+    def test_keyset_recorre_todas_las_filas_una_vez(self):
+        esperado = list(Registro.objects.order_by('-fecha_creacion', 'id').values_list('id', flat=True))
+        vistos, cursor = [], None
+        while True:
+            items, cursor = busqueda.pagina_keyset(Registro.objects.all(), busqueda.ORDEN_REGISTROS, cursor, 2)
+            self.assertLessEqual(len(items), 2)
+            vistos += [registro.id for registro in items]
+            if not cursor:
+                break
+        self.assertEqual(vistos, esperado)
+
+        with self.assertRaises(ValueError):
+            busqueda.pagina_keyset(Registro.objects.all(), busqueda.ORDEN_REGISTROS, 'no-es-un-cursor')
+
+    @mock.patch('core.busqueda.TAMANO_PAGINA', 2)
+    def test_listas_paginadas(self):
+        respuesta = self.client.get(reverse('registros_list'))
+        self.assertEqual(len(respuesta.context['registros']), 2)
+        cursor = respuesta.context['siguiente_cursor']
+        segunda = self.client.get(reverse('registros_list'), {'cursor': cursor}).context['registros']
+        self.assertFalse({r.id for r in segunda} & {r.id for r in respuesta.context['registros']})
+        # Un cursor dañado vuelve a la primera página
+        self.assertEqual(len(self.client.get(reverse('registros_list'), {'cursor': 'x'}).context['registros']), 2)
+
+        respuesta = self.client.get(reverse('clientes_list'), {'q': 'cali'})
+        self.assertEqual([c.id for c in respuesta.context['clientes']], ['C2'])
+        self.assertIsNone(respuesta.context['siguiente_cursor'])
+
+        respuesta = self.client.get(reverse('maquinaria'), {'q': 'torno'})
+        self.assertEqual([m.nombre for m in respuesta.context['maquinas']], ['Torno', 'Torno CNC'])
+
+    def test_filtro_por_estado_usa_las_etiquetas(self):
+        self.assertEqual(busqueda.estados_cobro_que_coinciden('parcial'), ['pagado_parcial'])
+        respuesta = self.client.get(reverse('registros_list'), {'q': 'Pagado Total'})
+        self.assertEqual({r.id for r in respuesta.context['registros']},
+                         set(Registro.objects.filter(estado_cobro='pagado_total').values_list('id', flat=True)))
+
+    def test_busqueda_combinada_ordenada_por_relevancia(self):
+        datos = self.client.get(reverse('api_buscar'), {'q': 'r1'}).json()
+        self.assertEqual((datos['resultados'][0]['tipo'], datos['resultados'][0]['id']), ('registro', 'R1'))
+
+        resultados = self.client.get(reverse('api_buscar'), {'q': 'torno'}).json()['resultados']
+        self.assertEqual([r['titulo'] for r in resultados], ['Torno', 'Torno CNC'])
+
+        resultados = self.client.get(reverse('api_buscar'), {'q': 'uno'}).json()['resultados']
+        self.assertEqual(resultados[0], {
+            'tipo': 'registro', 'id': resultados[0]['id'], 'titulo': resultados[0]['id'],
+            'detalle': resultados[0]['detalle'], 'puntaje': 40,
+            'url': reverse('registros_editar', args=[resultados[0]['id']]),
+        })
+        self.assertIn('cliente', [r['tipo'] for r in resultados])
+
+        resultados = self.client.get(reverse('api_buscar'), {'q': 'uno', 'tipo': 'clientes'}).json()['resultados']
+        self.assertEqual([r['id'] for r in resultados], ['C1'])
+
+        self.assertEqual(len(busqueda.buscar('r', tamano=2)), 2)
+        self.assertEqual(self.client.get(reverse('api_buscar'), {'q': ' '}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_buscar'), {'q': 'x', 'tipo': 'otro'}).status_code, 400)
+
+
+class FlujoCajaCarteraTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        crear_datos_tesoreria()
+        hoy = date.today()
+        for registro_id, valor, dias, pago in [('R1', '2000.00', -3, '500.00'), ('R3', '400.00', 10, None),
+                                              ('R3', '100.00', 40, '100.00'), ('R5', '60.00', 10, None)]:
+            registro = Registro.objects.get(pk=registro_id)
+            obligacion = registro.agregar_obligacion('Proveedor Uno', Decimal(valor), hoy + timedelta(days=dias))
+            if pago:
+                registro.agregar_pago_proveedor(obligacion['id'], Decimal(pago), hoy)
+
+    def _referencia_diaria(self, fecha_inicio, fecha_fin):
+        """Suma registro por registro de Registro.obtener_proyeccion_flujo"""
+        por_dia = {}
+        for registro in Registro.objects.all():
+            for movimiento in registro.obtener_proyeccion_flujo(fecha_inicio, fecha_fin):
+                signo = 1 if movimiento['tipo'] == 'ingreso' else -1
+                por_dia[movimiento['fecha']] = por_dia.get(movimiento['fecha'], 0) + signo * movimiento['monto']
+        return por_dia
+
+    def test_coincide_con_proyeccion_por_registro(self):
+        fecha_inicio, fecha_fin = date.today() - timedelta(days=400), date.today() + timedelta(days=60)
+        with self.assertNumQueries(1):
+            proyeccion = proyectar_flujo_cartera(fecha_inicio, fecha_fin)
+        referencia = self._referencia_diaria(fecha_inicio, fecha_fin)
+
+        periodos = proyeccion['periodos']
+        self.assertEqual(len(periodos), (fecha_fin - fecha_inicio).days + 1)
+        acumulado = 0
+        for periodo in periodos:
+            esperado = referencia.get(date.fromisoformat(periodo['fecha_inicio']), 0)
+            acumulado += esperado
+            self.assertAlmostEqual(periodo['flujo_neto'], esperado, places=2, msg=periodo['fecha_inicio'])
+            self.assertAlmostEqual(periodo['flujo_acumulado'], acumulado, places=2)
+
+    def test_agrupacion_y_dias_negativos(self):
+        hoy = date.today()
+        diaria = proyectar_flujo_cartera(hoy - timedelta(days=5), hoy + timedelta(days=45), 'dia')
+        mensual = proyectar_flujo_cartera(hoy - timedelta(days=5), hoy + timedelta(days=45), 'mes')
+        semanal = proyectar_flujo_cartera(hoy - timedelta(days=5), hoy + timedelta(days=45), 'semana')
+
+        negativos = sum(1 for p in diaria['periodos'] if p['flujo_acumulado'] < 0)
+        self.assertGreater(negativos, 0)
+        self.assertEqual(diaria['resumen']['dias_con_flujo_negativo'], negativos)
+        for agrupada in (mensual, semanal):
+            self.assertEqual(sum(p['dias_flujo_negativo'] for p in agrupada['periodos']), negativos)
+            self.assertAlmostEqual(
+                sum(p['flujo_neto'] for p in agrupada['periodos']), diaria['resumen']['flujo_neto_total'], places=2
+            )
+            self.assertEqual(agrupada['periodos'][-1]['flujo_acumulado'], diaria['resumen']['saldo_final'])
+        for periodo in semanal['periodos'][1:]:
+            self.assertEqual(date.fromisoformat(periodo['fecha_inicio']).weekday(), 0)
+
+        con_saldo = proyectar_flujo_cartera(hoy - timedelta(days=5), hoy + timedelta(days=45), 'dia', 10000)
+        self.assertEqual(con_saldo['resumen']['dias_con_flujo_negativo'], 0)
+
+    def test_endpoint(self):
+        respuesta = self.client.get(reverse('api_flujo_caja_cartera'), {'agrupacion': 'week'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['agrupacion'], 'semana')
+        respuesta = self.client.get(reverse('api_flujo_caja_cartera'), {'agrupacion': 'trimestre'})
+        self.assertEqual(respuesta.status_code, 400)
+        respuesta = self.client.get(reverse('api_flujo_caja_cartera'), {'fecha_fin': '2025-02-30'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(respuesta.json()['success'])
+        for saldo in ('NaN', 'sNaN', 'Infinity', '-inf', '1e999999', 'abc'):
+            respuesta = self.client.get(reverse('api_flujo_caja_cartera'), {'saldo_inicial': saldo})
+            self.assertEqual(respuesta.status_code, 400, saldo)
+            self.assertFalse(respuesta.json()['success'])
+
+
+def crear_libro_importacion(n_registros=3):
+    """Libro Excel con el formato de la plantilla de importación completa"""
+    libro = openpyxl.Workbook()
+    libro.remove(libro.active)
+    hojas = {
+        'Clientes': [('C9', 'Cliente Nueve', 'Medellín', None, None, 45, 0, True, '')],
+        'Proveedores': [('P9', 'Proveedor Nueve', 'Luis', None, None, 30, 'Acero', True, '')],
+        'Registros': [
+            (f'N{i}', 'C9', date(2025, 1, 1) + timedelta(days=i), 1000 + i, 'pendiente', '')
+            for i in range(n_registros)
+        ] + [('N-MAL', 'NO-EXISTE', '2025-01-01', 100, 'pendiente', '')],
+        'Obligaciones': [
+            (f'N{i}', 'P9', 'Proveedor Nueve', 300, date(2025, 3, 1), 'Materia prima', '')
+            for i in range(n_registros)
+        ] + [('N0', 'P9', 'Proveedor Nueve', 'abc', date(2025, 3, 1), '', '')],
+        'Pagos_Cliente': [
+            (f'N{i}', 250, date(2025, 2, 1), 'efectivo', '', '') for i in range(n_registros)
+        ] + [('R1', 50, date(2025, 2, 1), 'cheque', '', '')],
+        'Pagos_Proveedor': [
+            (f'N{i}', 1, 100, date(2025, 2, 15), 'transferencia', '', '') for i in range(n_registros)
+        ] + [('N-MAL', 1, 10, None, None, '', '')],
+    }
+    for nombre, filas in hojas.items():
+        hoja = libro.create_sheet(nombre)
+        hoja.append(['encabezado'])
+        for fila in filas:
+            hoja.append(list(fila))
+    archivo = BytesIO()
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+class ReporteFlujoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        crear_datos_tesoreria()
+        registro = Registro.objects.get(pk='R1')
+        obligacion = registro.agregar_obligacion('Proveedor <Uno> & Cía', Decimal('400.00'), date.today())
+        registro.agregar_pago_proveedor(obligacion['id'], Decimal('150.00'), date.today())
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        ajustes = override_settings(REPORTES_CACHE_DIR=self.directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def _descargar(self, formato, registro_id='R1'):
+        respuesta = self.client.get(reverse('exportar_reporte', args=[registro_id]), {'format': formato})
+        self.assertEqual(respuesta.status_code, 200)
+        return b''.join(respuesta.streaming_content)
+
+    def test_json_por_defecto(self):
+        data = self.client.get(reverse('exportar_reporte', args=['R1'])).json()['data']
+        self.assertEqual(data['registro']['id'], 'R1')
+        self.assertEqual(data['obligaciones'][0]['pagado'], 150.0)
+        self.assertEqual(data['obligaciones'][0]['saldo'], 250.0)
+        self.assertEqual(len(data['pagos_cliente']), 5)
+
+    def test_pdf_y_xlsx(self):
+        self.assertTrue(self._descargar('pdf').startswith(b'%PDF'))
+        libro = openpyxl.load_workbook(BytesIO(self._descargar('xlsx')))
+        self.assertEqual(libro.sheetnames, ['Resumen', 'Obligaciones', 'Pagos Cliente', 'Pagos Proveedor'])
+        self.assertEqual(libro['Obligaciones']['A2'].value, 'Proveedor <Uno> & Cía')
+        self.assertEqual(libro['Obligaciones']['E2'].value, 250.0)
+        self.assertEqual(self.client.get(reverse('exportar_reporte', args=['R1']), {'format': 'doc'}).status_code, 400)
+
+    def test_cache_por_fecha_actualizacion(self):
+        self._descargar('pdf')
+        archivos = os.listdir(self.directorio.name)
+        self.assertEqual(len(archivos), 1)
+
+        with mock.patch('core.reportes.generar_pdf') as generar:
+            self._descargar('pdf')
+        generar.assert_not_called()
+
+        registro = Registro.objects.get(pk='R1')
+        registro.agregar_pago_cliente(Decimal('10.00'), date.today())
+        self._descargar('pdf')
+        nuevos = os.listdir(self.directorio.name)
+        self.assertEqual(len(nuevos), 1)
+        self.assertNotEqual(nuevos, archivos)
+
+    def test_recalcular_saldos_invalida_la_cache(self):
+        anterior = Registro.objects.get(pk='R2').fecha_actualizacion
+        Registro.objects.filter(pk='R2').recalcular_saldos()
+        self.assertGreater(Registro.objects.get(pk='R2').fecha_actualizacion, anterior)
+
+
+class EstadosCuentaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        crear_datos_tesoreria()
+        Cliente.objects.create(id='C3', nombre='Sin Registros', city='Pasto', terminos_contractuales=30)
+
+    def _zip(self, **kwargs):
+        archivo = BytesIO()
+        generados = generar_estados_cuenta(archivo, **kwargs)
+        return generados, zipfile.ZipFile(archivo)
+
+    def test_datos_en_tres_consultas(self):
+        with self.assertNumQueries(3):
+            estados = datos_estados_cuenta()
+        self.assertEqual([e['id'] for e in estados], ['C2', 'C1'])
+        uno = estados[1]
+        self.assertEqual([r['id'] for r in uno['registros']], ['R5', 'R1', 'R2'])
+        self.assertEqual(len(uno['registros'][1]['pagos']), 5)
+        esperado = Registro.objects.filter(cliente_id='C1').aggregate(total=Sum('saldo_pendiente'))['total']
+        self.assertAlmostEqual(uno['totales']['saldo'], float(esperado), places=2)
+
+    def test_zip_con_un_pdf_por_cliente(self):
+        generados, archivo_zip = self._zip(procesos=1)
+        self.assertEqual(generados, 2)
+        self.assertEqual(sorted(archivo_zip.namelist()), ['estado_cuenta_C1.pdf', 'estado_cuenta_C2.pdf'])
+        self.assertTrue(archivo_zip.read('estado_cuenta_C1.pdf').startswith(b'%PDF'))
+
+    def test_pool_de_procesos_y_filtro_de_clientes(self):
+        generados, archivo_zip = self._zip(clientes=['C1', 'C3'], procesos=2)
+        self.assertEqual(generados, 1)
+        self.assertEqual(archivo_zip.namelist(), ['estado_cuenta_C1.pdf'])
+
+        generados, archivo_zip = self._zip(procesos=2)
+        self.assertEqual(len(archivo_zip.namelist()), 2)
+
+    def test_accion_admin(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'a@example.com', 'clave'))
+        respuesta = self.client.post(reverse('admin:core_cliente_changelist'), {
+            'action': 'descargar_estados_cuenta', '_selected_action': ['C1', 'C2'],
+        })
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'application/zip')
+        contenido = zipfile.ZipFile(BytesIO(b''.join(respuesta.streaming_content)))
+        self.assertEqual(len(contenido.namelist()), 2)
+
+    def test_comando(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = os.path.join(directorio, 'estados.zip')
+            call_command('estados_cuenta', 'C2', '--salida', salida, '--procesos', '1', stdout=StringIO())
+            self.assertEqual(zipfile.ZipFile(salida).namelist(), ['estado_cuenta_C2.pdf'])
+
+
+class ImportacionExcelTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        crear_datos_tesoreria()
+
+    def test_importa_libro_completo(self):
+        resultado = importar_excel(crear_libro_importacion())
+
+        self.assertEqual(resultado['creados'], {
+            'Clientes': 1, 'Proveedores': 1, 'Registros': 3,
+            'Obligaciones': 3, 'Pagos_Cliente': 4, 'Pagos_Proveedor': 3,
+        })
+        self.assertEqual(resultado['filas_con_error'], 3)
+        self.assertEqual(
+            sorted((e['hoja'], e['fila']) for e in resultado['errores']),
+            [('Obligaciones', 5), ('Pagos_Proveedor', 5), ('Registros', 5)]
+        )
+
+        registro = Registro.objects.get(pk='N1')
+        self.assertEqual(registro.fecha_limite_cobro, date(2025, 1, 2) + timedelta(days=45))
+        self.assertEqual(registro.saldo_pendiente, Decimal('751.00'))
+        self.assertEqual(registro.margen_bruto, Decimal('701.00'))
+        self.assertEqual(registro.total_obligaciones_pendientes, Decimal('200.00'))
+        self.assertEqual(registro.obtener_pagos_proveedor()[0]['obligacion_id'], 1)
+
+        # Los movimientos sobre registros existentes continúan su numeración
+        r1 = Registro.objects.get(pk='R1')
+        self.assertEqual([p['id'] for p in r1.obtener_pagos_cliente()], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(r1.total_cobrado, Decimal('240.85'))
+
+    def test_filas_existentes_no_se_duplican(self):
+        importar_excel(crear_libro_importacion())
+        resultado = importar_excel(crear_libro_importacion())
+        self.assertEqual(resultado['creados']['Clientes'], 0)
+        self.assertEqual(resultado['creados']['Registros'], 0)
+        self.assertEqual(Registro.objects.get(pk='N0').obligaciones.count(), 2)
+
+    def test_consultas_no_dependen_del_numero_de_filas(self):
+        with self.assertNumQueries(23):
+            importar_excel(crear_libro_importacion(5))
+        Cliente.objects.filter(pk='C9').delete()
+        Proveedor.objects.filter(pk='P9').delete()
+        with self.assertNumQueries(23):
+            importar_excel(crear_libro_importacion(50))
+
+class TrabajoImportacionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        crear_datos_tesoreria()
+
+    def _subir(self, **extra):
+        archivo = crear_libro_importacion()
+        archivo.name = 'libro.xlsx'
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            respuesta = self.client.post(reverse('cargar_excel_completo'), {'archivo_excel': archivo}, **extra)
+        self.assertEqual(len(callbacks), 1)  # El trabajo se encola al confirmar la transacción
+        return respuesta
+
+    def test_subida_ajax_devuelve_trabajo_y_progreso(self):
+        respuesta = self._subir(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(respuesta.status_code, 202)
+        data = respuesta.json()
+        self.assertEqual(TrabajoImportacion.objects.get().estado, 'pendiente')
+
+        trabajo = self.client.get(data['estado_url']).json()['trabajo']
+        self.assertEqual(trabajo['estado'], 'pendiente')
+        self.assertFalse(trabajo['terminado'])
+
+        ejecutar_importacion(data['trabajo_id'])
+        trabajo = self.client.get(data['estado_url']).json()['trabajo']
+        self.assertEqual(trabajo['estado'], 'completado')
+        self.assertTrue(trabajo['terminado'])
+        self.assertEqual(trabajo['filas_procesadas'], 18)
+        self.assertEqual(trabajo['filas_totales'], 18)
+        self.assertEqual(trabajo['filas_con_error'], 3)
+        self.assertEqual(len(trabajo['errores']), 3)
+        self.assertEqual(trabajo['creados']['Registros'], 3)
+        self.assertTrue(Registro.objects.filter(pk='N0').exists())
+        self.assertEqual(bytes(TrabajoImportacion.objects.get().contenido), b'')
+
+        # Un trabajo ya procesado no se vuelve a ejecutar
+        self.assertIsNone(ejecutar_importacion(data['trabajo_id']))
+
+    def test_subida_sin_javascript_redirige_con_el_trabajo(self):
+        respuesta = self._subir()
+        trabajo = TrabajoImportacion.objects.get()
+        self.assertRedirects(respuesta, f"{reverse('cargar_excel_completo')}?trabajo={trabajo.pk}")
+        pagina = self.client.get(respuesta.url)
+        self.assertContains(pagina, reverse('estado_importacion', args=[trabajo.pk]))
+
+    def test_archivo_invalido_marca_el_trabajo_como_fallido(self):
+        trabajo = TrabajoImportacion.objects.create(nombre_archivo='roto.xlsx', contenido=b'no es un excel')
+        with self.assertLogs('core.trabajos', level='ERROR'):
+            ejecutar_importacion(trabajo.pk)
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'fallido')
+        self.assertTrue(trabajo.mensaje_error)
+
+    def test_comando_retoma_trabajos_en_proceso_abandonados(self):
+        contenido = crear_libro_importacion().getvalue()
+        hace_dos_horas = timezone.now() - timedelta(hours=2)
+        abandonado = TrabajoImportacion.objects.create(
+            nombre_archivo='abandonado.xlsx', contenido=contenido, estado='en_proceso',
+            fecha_inicio=hace_dos_horas, filas_procesadas=5,
+        )
+        reciente = TrabajoImportacion.objects.create(
+            nombre_archivo='reciente.xlsx', contenido=contenido, estado='en_proceso', fecha_inicio=timezone.now(),
+        )
+
+        salida = StringIO()
+        call_command('procesar_importaciones', stdout=salida)
+        self.assertIn('1 trabajos en proceso abandonados', salida.getvalue())
+        abandonado.refresh_from_db()
+        self.assertEqual(abandonado.estado, 'completado')
+        self.assertEqual(abandonado.filas_procesadas, 18)
+        self.assertEqual(bytes(abandonado.contenido), b'')
+        self.assertGreater(abandonado.fecha_inicio, hace_dos_horas)
+        reciente.refresh_from_db()
+        self.assertEqual(reciente.estado, 'en_proceso')
+
+        # Con un timeout menor también se retoma el reciente
+        call_command('procesar_importaciones', timeout=0, stdout=StringIO())
+        reciente.refresh_from_db()
+        self.assertEqual(reciente.estado, 'completado')
+
+
+def crear_par_maquinas(defender=None, challenger=None):
+    """Defender 'Torno' y Challenger 'CNC' de referencia; 'defender' y 'challenger' cambian o agregan campos"""
+    return (
+        Maquina.objects.create(**{
+            'tipo': 'Defender', 'nombre': 'Torno', 'purchase_price': Decimal('85000'),
+            'acquisition_cost': Decimal('90000'), 'current_resale_value': Decimal('30000'),
+            'salvage_value': Decimal('5000'), 'useful_life': 100, 'annual_maintenance_labor_parts': Decimal('12000'),
+            'operator_labor_cost': Decimal('18.50'), 'monthly_operating_hours': 160,
+            **(defender or {}),
+        }),
+        Maquina.objects.create(**{
+            'nombre': 'CNC', 'purchase_price': Decimal('150000'), 'installation_and_training_cost': Decimal('8000'),
+            'setup_costs': Decimal('2500'), 'salvage_value': Decimal('15000'), 'useful_life': 150,
+            'annual_maintenance_labor_parts': Decimal('6000'),
+            **(challenger or {}),
+        }),
+    )
+
+
+def _analisis_referencia(defender, challenger, wacc, tax_rate):
+    """Cálculo año a año (implementación original de calcular_analisis_completo)"""
+    resultado = {}
+    for rol, maquina in (('defender', defender), ('challenger', challenger)):
+        if rol == 'defender':
+            base = float(maquina.acquisition_cost or maquina.purchase_price or 0)
+            reventa = float(maquina.current_resale_value or 0)
+            pv_total = reventa - (reventa - base) * tax_rate
+            vida = (maquina.useful_life or 120) / 12
+        else:
+            pv_total = float(maquina.purchase_price or 0) + float(maquina.installation_and_training_cost or 0) + \
+                float(maquina.setup_costs or 0)
+            base = float(maquina.purchase_price or 0) + float(maquina.installation_and_training_cost or 0)
+            vida = (maquina.useful_life or 180) / 12
+        opex = float(maquina.annual_maintenance_labor_parts or 0) + \
+            (float(maquina.operator_labor_cost or 0) * float(maquina.monthly_operating_hours or 0) * 12)
+        flujos = []
+        for year in range(1, int(vida) + 1):
+            depreciacion = (base - float(maquina.salvage_value or 0)) / vida
+            tax_shield = depreciacion * tax_rate
+            after_tax = opex * (1 - tax_rate) - tax_shield
+            pv = after_tax / ((1 + wacc) ** year)
+            pv_total += pv
+            flujos.append({'year': year, 'cash_flow': opex, 'depreciation': depreciacion,
+                           'tax_shield': tax_shield, 'after_tax_cash_flow': after_tax, 'pv': pv})
+        pv_total -= float(maquina.salvage_value or 0) / ((1 + wacc) ** vida)
+        resultado[f'pv_{rol}'] = pv_total
+        resultado[f'eac_{rol}'] = calcular_eac(pv_total, vida, wacc)
+        resultado[f'flujos_{rol}'] = flujos
+    return resultado
+
+
+class MotorFinancieroTests(TestCase):
+    def _maquinas(self):
+        defenders = [
+            Maquina(tipo='Defender', nombre='Torno', purchase_price=Decimal('85000'), acquisition_cost=Decimal('90000'),
+                    current_resale_value=Decimal('30000'), salvage_value=Decimal('5000'), useful_life=100,
+                    annual_maintenance_labor_parts=Decimal('12000'), operator_labor_cost=Decimal('18.50'),
+                    monthly_operating_hours=160),
+            Maquina(tipo='Defender', nombre='Prensa sin datos'),
+            Maquina(tipo='Defender', nombre='Fresa', purchase_price=Decimal('40000'), useful_life=7,
+                    current_resale_value=Decimal('45000'), annual_maintenance_labor_parts=Decimal('3000')),
+        ]
+        challengers = [
+            Maquina(nombre='CNC', purchase_price=Decimal('150000'), installation_and_training_cost=Decimal('8000'),
+                    setup_costs=Decimal('2500'), salvage_value=Decimal('15000'), useful_life=150,
+                    annual_maintenance_labor_parts=Decimal('6000'), operator_labor_cost=Decimal('20'),
+                    monthly_operating_hours=120.5),
+            Maquina(nombre='Challenger sin datos'),
+            Maquina(nombre='Corta vida', purchase_price=Decimal('10000'), useful_life=30,
+                    salvage_value=Decimal('1000')),
+        ]
+        return defenders, challengers
+
+    def test_coincide_con_calculo_anio_a_anio(self):
+        defenders, challengers = self._maquinas()
+        for wacc, tax_rate in ((0.12, 0.3), (0, 0.25), (0.08, 0), (-0.02, 0.3)):
+            for defender, challenger in zip(defenders, challengers):
+                esperado = _analisis_referencia(defender, challenger, wacc, tax_rate)
+                resultado = analisis_par(defender, challenger, wacc, tax_rate)
+                for clave in ('pv_defender', 'eac_defender', 'pv_challenger', 'eac_challenger'):
+                    self.assertAlmostEqual(float(resultado[clave]), esperado[clave], delta=1e-6,
+                                           msg=f'{defender.nombre}/{challenger.nombre} {clave} wacc={wacc}')
+                for rol in ('flujos_defender', 'flujos_challenger'):
+                    self.assertEqual(len(resultado[rol]), len(esperado[rol]))
+                    for flujo, referencia in zip(resultado[rol], esperado[rol]):
+                        self.assertEqual(flujo.keys(), referencia.keys())
+                        for campo, valor in referencia.items():
+                            self.assertAlmostEqual(flujo[campo], valor, delta=1e-9)
+
+    def test_portafolio_vectorizado(self):
+        defenders, challengers = self._maquinas()
+        resultado = analisis_portafolio(defenders, challengers, 0.1, 0.3)
+        self.assertEqual(resultado['Defender']['pv_flujos'].shape, (3, 10))
+        self.assertEqual(resultado['Challenger']['pv_flujos'].shape, (3, 15))
+        # Años posteriores a la vida de la máquina quedan en cero
+        self.assertEqual(resultado['Challenger']['mascara'][2].sum(), 2)
+        self.assertTrue((resultado['Challenger']['pv_flujos'][2, 2:] == 0).all())
+        for i, (defender, challenger) in enumerate(zip(defenders, challengers)):
+            esperado = _analisis_referencia(defender, challenger, 0.1, 0.3)
+            self.assertAlmostEqual(resultado['Defender']['pv'][i], esperado['pv_defender'], delta=1e-6)
+            self.assertAlmostEqual(resultado['Challenger']['eac'][i], esperado['eac_challenger'], delta=1e-6)
+
+    def test_tasas_por_maquina(self):
+        _, challengers = self._maquinas()
+        tasas = [0.05, 0.1, 0.2]
+        resultado = evaluar_maquinas(parametros_maquinas(challengers, 'Challenger'), tasas, 0.3)
+        for i, wacc in enumerate(tasas):
+            esperado = _analisis_referencia(Maquina(), challengers[i], wacc, 0.3)
+            self.assertAlmostEqual(resultado['pv'][i], esperado['pv_challenger'], delta=1e-6)
+
+    def test_eac_casos_limite(self):
+        casos = [(1000.0, 10, 0.1), (1000.0, 10, 0), (1000.0, 0, 0.1), (-500.0, 2.5, 0.07), (1000.0, 10, -0.05)]
+        pv, vida, wacc = (np.array(c, dtype=float) for c in zip(*casos))
+        for calculado, caso in zip(eac_vectorizado(pv, vida, wacc), casos):
+            self.assertAlmostEqual(calculado, calcular_eac(*caso), delta=1e-9)
+
+
+def eac_anual_referencia(maquina, rol, wacc, tax_rate, gradiente=0):
+    """EAC con el mantenimiento de cada año sumado mes a mes (1 + g/100·(mes-1))"""
+    vida = maquina.useful_life / 12
+    m0 = float(maquina.annual_maintenance_labor_parts or 0) / 12
+    operador = float(maquina.operator_labor_cost or 0) * (maquina.monthly_operating_hours or 0) * 12
+    if rol == 'Defender':
+        base = float(maquina.acquisition_cost or maquina.purchase_price)
+        reventa = float(maquina.current_resale_value or 0)
+        pv = reventa - (reventa - base) * tax_rate
+    else:
+        base = float(maquina.purchase_price + (maquina.installation_and_training_cost or 0))
+        pv = base + float(maquina.setup_costs or 0)
+    depreciacion = (base - float(maquina.salvage_value)) / vida
+    for anio in range(1, int(vida) + 1):
+        mantenimiento = sum(m0 * (1 + gradiente / 100 * (mes - 1))
+                            for mes in range(12 * (anio - 1) + 1, 12 * anio + 1))
+        pv += ((mantenimiento + operador) * (1 - tax_rate) - depreciacion * tax_rate) / (1 + wacc) ** anio
+    pv -= float(maquina.salvage_value) / (1 + wacc) ** vida
+    return calcular_eac(pv, vida, wacc)
+
+
+class SimulacionMonteCarloTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.defender, cls.challenger = crear_par_maquinas()
+
+    def _post(self, **datos):
+        data = {'defender_id': str(self.defender.id), 'challenger_id': str(self.challenger.id),
+                'wacc': 0.12, 'tax_rate': 0.3, **datos}
+        return self.client.post(reverse('api_simular_analisis'), data=json.dumps(data),
+                                content_type='application/json')
+
+    def test_sin_incertidumbre_coincide_con_el_analisis(self):
+        data = self._post(escenarios=50).json()
+        esperado = analisis_par(self.defender, self.challenger, 0.12, 0.3)
+        for rol in ('defender', 'challenger'):
+            self.assertAlmostEqual(data[f'eac_{rol}']['percentiles']['p5'], float(esperado[f'eac_{rol}']), places=6)
+            self.assertAlmostEqual(data[f'eac_{rol}']['percentiles']['p95'], float(esperado[f'eac_{rol}']), places=6)
+            self.assertAlmostEqual(data['caso_base'][f'eac_{rol}'], float(esperado[f'eac_{rol}']), places=6)
+        self.assertEqual(data['probabilidad_challenger'],
+                         1.0 if esperado['eac_challenger'] < esperado['eac_defender'] else 0.0)
+
+    def test_distribuciones_reproducibles_por_semilla(self):
+        distribuciones = {
+            'wacc': {'tipo': 'triangular', 'min': 0.08, 'moda': 0.12, 'max': 0.2},
+            'tax_rate': {'tipo': 'uniforme', 'min': 0.25, 'max': 0.35},
+            'maintenance_cost_gradient': {
+                'Defender': {'tipo': 'normal', 'media': 2, 'desviacion': 0.5},
+                'Challenger': {'tipo': 'fijo', 'valor': 1},
+            },
+            'salvage_value': {'tipo': 'uniforme', 'min': 0.5, 'max': 1.5},
+        }
+        data = self._post(escenarios=5000, semilla=7, bins=20, distribuciones=distribuciones).json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['escenarios'], 5000)
+        self.assertTrue(0 <= data['probabilidad_challenger'] <= 1)
+        self.assertEqual(sum(data['histograma_eac']['defender']), 5000)
+        self.assertEqual(sum(data['histograma_diferencia']['conteos']), 5000)
+        self.assertEqual(len(data['histograma_eac']['bordes']), 21)
+        percentiles = list(data['diferencia']['percentiles'].values())
+        self.assertEqual(percentiles, sorted(percentiles))
+        self.assertEqual(self._post(escenarios=5000, semilla=7, bins=20, distribuciones=distribuciones).json(), data)
+
+    def test_gradiente_en_porcentaje_como_en_el_formulario(self):
+        """maintenance_cost_gradient = 2 significa que el mantenimiento mensual sube 2 % de su valor inicial cada mes"""
+        for gradiente in (2, 5):
+            Maquina.objects.filter(pk__in=[self.defender.pk, self.challenger.pk]).update(
+                maintenance_cost_gradient=gradiente
+            )
+            data = self._post(escenarios=200, distribuciones={
+                'wacc': {'tipo': 'uniforme', 'min': 0.1, 'max': 0.14},
+            }).json()
+            self.assertTrue(data['success'], data.get('error'))
+            for rol, maquina in (('defender', self.defender), ('challenger', self.challenger)):
+                maquina.refresh_from_db()
+                esperado = eac_anual_referencia(maquina, rol.capitalize(), 0.12, 0.3, gradiente)
+                self.assertAlmostEqual(data['caso_base'][f'eac_{rol}'], esperado, places=4)
+                self.assertLess(data['caso_base'][f'eac_{rol}'], 1e6)
+
+    def test_resultado_no_depende_del_numero_de_procesos(self):
+        maquinas = {'Defender': parametros_simulacion(self.defender, 'Defender'),
+                    'Challenger': parametros_simulacion(self.challenger, 'Challenger')}
+        especificacion = leer_distribuciones({'wacc': {'tipo': 'uniforme', 'min': 0.05, 'max': 0.2}},
+                                             maquinas, 0.12, 0.3)
+        with mock.patch('core.finance.simulacion.LOTE_ESCENARIOS', 400):
+            secuencial = simular(maquinas, especificacion, 1000, semilla=3, procesos=1)
+            paralelo = simular(maquinas, especificacion, 1000, semilla=3, procesos=2)
+        self.assertEqual(paralelo['procesos'], 2)
+        secuencial.pop('procesos'), paralelo.pop('procesos')
+        self.assertEqual(secuencial, paralelo)
+
+    def test_validaciones(self):
+        self.assertEqual(self._post(escenarios=10 ** 6).status_code, 400)
+        self.assertEqual(self._post(distribuciones={'wacc': {'tipo': 'beta'}}).status_code, 400)
+        self.assertEqual(self._post(distribuciones={'otra': {'tipo': 'fijo', 'valor': 1}}).status_code, 400)
+        self.assertEqual(self._post(distribuciones={'wacc': {
+            'Defender': {'tipo': 'fijo', 'valor': 0.1}, 'Challenger': {'tipo': 'fijo', 'valor': 0.1}}}).status_code, 400)
+        self.assertEqual(self._post(distribuciones={
+            'energy_cost': {'tipo': 'triangular', 'min': 1, 'moda': 3, 'max': 2}}).status_code, 400)
+        self.assertEqual(self._post(defender_id=str(uuid.uuid4())).status_code, 404)
+
+
+class SensibilidadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.defender, cls.challenger = crear_par_maquinas(
+            challenger={'operator_labor_cost': Decimal('15'), 'monthly_operating_hours': 160},
+        )
+        cls.analisis = AnalisisComparativo.objects.create(
+            nombre_analisis='Torno vs CNC', defender=cls.defender, challenger=cls.challenger,
+            wacc=Decimal('0.12'), tax_rate=Decimal('0.3'), financing_rate=Decimal('7.5'), financing_months=48,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def _get(self, **parametros):
+        return self.client.get(reverse('api_sensibilidad_analisis', args=[self.analisis.id]), parametros)
+
+    def _brecha(self, defender, challenger, wacc=0.12, tax_rate=0.3):
+        resultado = analisis_par(defender, challenger, wacc, tax_rate)
+        return float(resultado['eac_defender'] - resultado['eac_challenger'])
+
+    def test_cada_barra_coincide_con_el_analisis_recalculado(self):
+        data = self._get(variacion=10).json()
+        self.assertTrue(data['success'])
+        self.assertAlmostEqual(data['base']['brecha'], self._brecha(self.defender, self.challenger), places=4)
+
+        campos = {'precio_compra': ('purchase_price', 'acquisition_cost'), 'vida_util': ('useful_life',),
+                  'mantenimiento': ('annual_maintenance_labor_parts',), 'operador': ('operator_labor_cost',),
+                  'salvamento': ('salvage_value',)}
+        filas = {(fila['entrada'], fila['maquina']): fila for fila in data['entradas']}
+        self.assertEqual(len(filas), 15)
+        for (entrada, rol), fila in filas.items():
+            for extremo, factor in (('brecha_baja', Decimal('0.9')), ('brecha_alta', Decimal('1.1'))):
+                maquinas = {'Defender': Maquina.objects.get(pk=self.defender.pk),
+                            'Challenger': Maquina.objects.get(pk=self.challenger.pk)}
+                tasas = {'wacc': 0.12, 'tax_rate': 0.3}
+                if entrada in tasas:
+                    tasas[entrada] *= float(factor)
+                for campo in campos.get(entrada, ()):
+                    if getattr(maquinas[rol], campo) is not None:
+                        setattr(maquinas[rol], campo, getattr(maquinas[rol], campo) * factor)
+                esperado = self._brecha(maquinas['Defender'], maquinas['Challenger'], **tasas)
+                self.assertAlmostEqual(fila[extremo], esperado, places=4, msg=(entrada, rol, extremo))
+
+        # Sin consumo registrado la energía no mueve la brecha; el financiamiento nunca lo hace
+        self.assertEqual(filas[('energia', 'Challenger')]['impacto'], 0)
+        financiamiento = filas[('financing_rate', None)]
+        self.assertEqual(financiamiento['impacto'], 0)
+        self.assertLess(financiamiento['pago_mensual_bajo'], data['base']['pago_mensual'])
+        self.assertGreater(financiamiento['pago_mensual_alto'], data['base']['pago_mensual'])
+        impactos = [fila['impacto'] for fila in data['entradas']]
+        self.assertEqual(impactos, sorted(impactos, reverse=True))
+
+    def test_gradiente_realista(self):
+        Maquina.objects.filter(pk=self.defender.pk).update(maintenance_cost_gradient=2)
+        Maquina.objects.filter(pk=self.challenger.pk).update(maintenance_cost_gradient=5)
+        self.defender.refresh_from_db()
+        self.challenger.refresh_from_db()
+        data = self._get(variacion=10).json()
+        self.assertTrue(data['success'])
+
+        def brecha(defender, challenger, wacc=0.12):
+            return (eac_anual_referencia(defender, 'Defender', wacc, 0.3, defender.maintenance_cost_gradient)
+                    - eac_anual_referencia(challenger, 'Challenger', wacc, 0.3, challenger.maintenance_cost_gradient))
+
+        self.assertAlmostEqual(data['base']['brecha'], brecha(self.defender, self.challenger), places=4)
+        filas = {(fila['entrada'], fila['maquina']): fila for fila in data['entradas']}
+        mantenimiento = filas[('mantenimiento', 'Challenger')]
+        challenger = Maquina.objects.get(pk=self.challenger.pk)
+        challenger.annual_maintenance_labor_parts *= Decimal('1.1')
+        self.assertAlmostEqual(mantenimiento['brecha_alta'], brecha(self.defender, challenger), places=4)
+        self.assertAlmostEqual(filas[('wacc', None)]['brecha_baja'],
+                               brecha(self.defender, self.challenger, 0.12 * 0.9), places=4)
+        self.assertTrue(all(abs(fila['brecha_alta']) < 1e6 for fila in data['entradas']))
+
+    def test_resultado_en_cache_por_entradas(self):
+        self.assertFalse(self._get().json()['desde_cache'])
+        self.assertTrue(self._get().json()['desde_cache'])
+        self.assertFalse(self._get(variacion=20).json()['desde_cache'])
+
+        Maquina.objects.filter(pk=self.challenger.pk).update(energy_consumption=Decimal('30'), energy_cost=Decimal('0.2'))
+        data = self._get().json()
+        self.assertFalse(data['desde_cache'])
+        energia = next(f for f in data['entradas'] if f['entrada'] == 'energia' and f['maquina'] == 'Challenger')
+        self.assertGreater(energia['impacto'], 0)
+
+    def test_validaciones(self):
+        self.assertEqual(self._get(variacion='abc').status_code, 400)
+        self.assertEqual(self._get(variacion=0).status_code, 400)
+        self.assertEqual(self._get(variacion=100).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_sensibilidad_analisis', args=[uuid.uuid4()])).status_code, 404)
+
+
+class VidaEconomicaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.defender, cls.challenger = crear_par_maquinas(
+            defender={'useful_life': 96, 'annual_maintenance_labor_parts': None,
+                      'initial_monthly_maintenance_cost': Decimal('900'), 'maintenance_cost_gradient': 2},
+            challenger={'useful_life': 180, 'maintenance_cost_gradient': 1.5},
+        )
+
+    def _referencia(self, maquina, wacc, tax_rate):
+        """EAC mes a mes de cada edad de retención, calculado con un ciclo simple"""
+        vida = maquina.useful_life
+        r = (1 + wacc) ** (1 / 12) - 1
+        compra = float(maquina.purchase_price) + float(maquina.installation_and_training_cost or 0)
+        if maquina.tipo == 'Defender':
+            base = float(maquina.acquisition_cost)
+            reventa_0 = float(maquina.current_resale_value)
+            inicial = reventa_0 - (reventa_0 - base) * tax_rate
+        else:
+            base = compra
+            reventa_0 = float(maquina.purchase_price)
+            inicial = compra + float(maquina.setup_costs or 0)
+        salvamento = float(maquina.salvage_value)
+        m0 = (float(maquina.initial_monthly_maintenance_cost) if maquina.initial_monthly_maintenance_cost is not None
+              else float(maquina.annual_maintenance_labor_parts) / 12)
+        operador = float(maquina.operator_labor_cost or 0) * (maquina.monthly_operating_hours or 0)
+        depreciacion = (base - salvamento) / vida
+        eac, acumulado = [], inicial
+        for t in range(1, vida + 1):
+            costo = m0 * (1 + maquina.maintenance_cost_gradient / 100 * (t - 1)) + operador
+            acumulado += (costo * (1 - tax_rate) - depreciacion * tax_rate) / (1 + r) ** t
+            reventa = reventa_0 - (reventa_0 - salvamento) * t / vida
+            eac.append(calcular_eac(acumulado - reventa / (1 + r) ** t, t / 12, wacc))
+        return eac
+
+    def _post(self, **datos):
+        data = {'wacc': 0.12, 'tax_rate': 0.3, **datos}
+        return self.client.post(reverse('api_vida_economica'), data=json.dumps(data), content_type='application/json')
+
+    def test_curvas_coinciden_con_el_calculo_mes_a_mes(self):
+        data = self._post(curva=True).json()
+        self.assertTrue(data['success'])
+        filas = {fila['id']: fila for fila in data['maquinas']}
+        for maquina in (self.defender, self.challenger):
+            esperado = self._referencia(maquina, 0.12, 0.3)
+            fila = filas[str(maquina.id)]
+            self.assertEqual(fila['vida_meses'], maquina.useful_life)
+            np.testing.assert_allclose(fila['curva_eac'], esperado, rtol=1e-9)
+            self.assertEqual(fila['edad_optima_meses'], int(np.argmin(esperado)) + 1)
+            self.assertAlmostEqual(fila['eac_minimo'], min(esperado), places=6)
+            self.assertAlmostEqual(fila['eac_vida_completa'], esperado[-1], places=6)
+
+    def test_edad_optima_calculada_a_mano(self):
+        """
+        Sin descuento ni impuestos, con la reventa partiendo del precio de compra:
+        PV(n) = 12000 + 1750·n + 10·n·(n-1), de modo que el costo mensual
+        12000/n + 1740 + 10·n es mínimo en n = 35 (√1200 ≈ 34,6).
+        """
+        maquina = Maquina.objects.create(
+            nombre='Prensa', purchase_price=Decimal('100000'), installation_and_training_cost=Decimal('8000'),
+            setup_costs=Decimal('4000'), salvage_value=Decimal('10000'), useful_life=120,
+            initial_monthly_maintenance_cost=Decimal('1000'), maintenance_cost_gradient=2,
+        )
+        data = self._post(maquina_ids=[str(maquina.id)], wacc=0, tax_rate=0).json()
+        fila = data['maquinas'][0]
+        self.assertEqual(fila['edad_optima_meses'], 35)
+        self.assertAlmostEqual(fila['eac_minimo'], 12 * (12000 / 35 + 1740 + 10 * 35), places=6)
+
+    def test_conservar_defender_y_luego_cambiar(self):
+        data = self._post(maquina_ids=[str(self.defender.id)], challenger_id=str(self.challenger.id)).json()
+        self.assertEqual(len(data['maquinas']), 1)
+        reemplazo = data['maquinas'][0]['reemplazo']
+        planes = reemplazo['planes']
+        self.assertEqual([p['anios_defender'] for p in planes], list(range(9)))
+        # Cambiar ya cuesta el EAC mínimo del Challenger; conservar toda la vida, el EAC del Defender
+        self.assertAlmostEqual(planes[0]['eac'], data['challenger']['eac_minimo'], places=6)
+        self.assertAlmostEqual(planes[-1]['eac'], data['maquinas'][0]['eac_vida_completa'], places=6)
+        mejor = min(planes, key=lambda p: p['eac'])
+        self.assertEqual(reemplazo['anios_optimos'], mejor['anios_defender'])
+
+    def test_validaciones(self):
+        self.assertEqual(self._post(wacc='abc').status_code, 400)
+        self.assertEqual(self._post(maquina_ids=['no-es-uuid']).status_code, 400)
+        self.assertEqual(self._post(challenger_id=str(uuid.uuid4())).status_code, 404)
+
+
+class RankingFlotaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.defenders = [
+            Maquina.objects.create(
+                tipo='Defender', nombre=f'Torno {i}', purchase_price=Decimal('85000'),
+                current_resale_value=Decimal(20000 + 5000 * i), salvage_value=Decimal('5000'), useful_life=96,
+                annual_maintenance_labor_parts=Decimal(9000 + 4000 * i), criticality_ranking=criticidad,
+            )
+            for i, criticidad in enumerate([3, None, 1.5, 5, 2])
+        ]
+        cls.challengers = [
+            Maquina.objects.create(
+                nombre=f'CNC {j}', purchase_price=Decimal(60000 + 30000 * j), salvage_value=Decimal('10000'),
+                useful_life=180, annual_maintenance_labor_parts=Decimal(6000 - 1000 * j),
+            )
+            for j in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def _post(self, **datos):
+        data = {'wacc': 0.12, 'tax_rate': 0.3, **datos}
+        return self.client.post(reverse('api_ranking_flota'), data=json.dumps(data), content_type='application/json')
+
+    def _esperado(self):
+        """Todos los pares con ahorro positivo, evaluados uno por uno con analisis_par"""
+        pares = []
+        for defender in self.defenders:
+            peso = defender.criticality_ranking or 1.0
+            for challenger in self.challengers:
+                resultado = analisis_par(defender, challenger, 0.12, 0.3)
+                ahorro = float(resultado['eac_defender'] - resultado['eac_challenger'])
+                if ahorro > 0:
+                    pares.append((ahorro * peso, defender.nombre, challenger.nombre))
+        return sorted(pares, key=lambda par: -par[0])
+
+    def test_ranking_por_bloques_coincide_con_pares_individuales(self):
+        esperado = self._esperado()
+        self.assertGreater(len(esperado), 3)
+        with mock.patch('core.finance.ranking.LOTE_PARES', 5):
+            data = self._post(limite=3).json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['pares_evaluados'], 20)
+        self.assertEqual(data['pares_recomendados'], len(esperado))
+        self.assertEqual([(p['defender']['nombre'], p['challenger']['nombre']) for p in data['pares']],
+                         [(d, c) for _, d, c in esperado[:3]])
+        for par, (puntaje, _, _) in zip(data['pares'], esperado):
+            self.assertAlmostEqual(par['puntaje'], puntaje, places=4)
+
+        # Mejor Challenger de cada Defender que tenga algún reemplazo con ahorro
+        mejores = {}
+        for puntaje, defender, challenger in esperado:
+            mejores.setdefault(defender, (puntaje, challenger))
+        self.assertEqual({p['defender']['nombre']: p['challenger']['nombre'] for p in data['por_defender']},
+                         {d: c for d, (_, c) in mejores.items()})
+        puntajes = [p['puntaje'] for p in data['por_defender']]
+        self.assertEqual(puntajes, sorted(puntajes, reverse=True))
+
+    def test_subconjunto_y_cache(self):
+        subconjunto = {'defender_ids': [str(self.defenders[3].id)], 'challenger_ids': [str(self.challengers[0].id)]}
+        data = self._post(**subconjunto).json()
+        self.assertEqual(data['pares_evaluados'], 1)
+        self.assertFalse(data['desde_cache'])
+        self.assertTrue(self._post(**subconjunto).json()['desde_cache'])
+
+        # Guardar una máquina invalida el ranking en caché
+        with self.captureOnCommitCallbacks(execute=True):
+            self.challengers[0].annual_maintenance_labor_parts = Decimal('90000')
+            self.challengers[0].save()
+        data = self._post(**subconjunto).json()
+        self.assertFalse(data['desde_cache'])
+        self.assertEqual(data['pares_recomendados'], 0)
+
+    def test_validaciones(self):
+        self.assertEqual(self._post(limite=0).status_code, 400)
+        self.assertEqual(self._post(defender_ids=['no-es-uuid']).status_code, 400)
+
+    def test_comando_genera_xlsx(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = os.path.join(directorio, 'ranking.xlsx')
+            call_command('ranking_reemplazos', '--wacc', '0.12', '--tax-rate', '0.3', '--salida', salida,
+                         stdout=StringIO())
+            libro = openpyxl.load_workbook(salida)
+        self.assertEqual(libro.sheetnames, ['Por Defender', 'Mejores Pares'])
+        filas = list(libro['Mejores Pares'].iter_rows(min_row=4, values_only=True))
+        self.assertEqual(len(filas), len(self._esperado()))
+        self.assertEqual(filas[0][0], self._esperado()[0][1])
+
+
+class CostoMensualTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.defender, cls.challenger = crear_par_maquinas(
+            defender={
+                'useful_life': 120, 'annual_maintenance_labor_parts': None,
+                'initial_monthly_maintenance_cost': Decimal('800'), 'maintenance_cost_gradient': 2,
+                'energy_consumption': 12.5, 'energy_cost': Decimal('0.15'), 'cost_of_downtime': Decimal('200'),
+                'availability': 92, 'consumable_replacement_cost_1': Decimal('40'), 'consumable_lifespan_1': 500,
+                'production_rate': 25,
+            },
+            challenger={
+                'useful_life': 360, 'operator_labor_cost': Decimal('15'), 'monthly_operating_hours': 160,
+                'energy_consumption': 9, 'energy_cost': Decimal('0.15'), 'availability': 97,
+            },
+        )
+
+    def _referencia(self, maquina, rol, wacc, tax_rate):
+        """PV, EAC y costo por unidad sumando mes a mes"""
+        vida = maquina.useful_life
+        horas = maquina.monthly_operating_hours
+        disponibilidad = (maquina.availability or 100) / 100
+        m0 = (float(maquina.initial_monthly_maintenance_cost) if maquina.initial_monthly_maintenance_cost
+              else float(maquina.annual_maintenance_labor_parts) / 12)
+        unidades = (maquina.production_rate or 0) * horas * disponibilidad
+        fijo = (float(maquina.operator_labor_cost) * horas
+                + (maquina.energy_consumption or 0) * float(maquina.energy_cost or 0) * horas
+                + float(maquina.cost_of_downtime or 0) * horas * (1 - disponibilidad))
+        if maquina.consumable_lifespan_1:
+            fijo += float(maquina.consumable_replacement_cost_1) * unidades / maquina.consumable_lifespan_1
+        if rol == 'Defender':
+            base = float(maquina.acquisition_cost or maquina.purchase_price)
+            reventa = float(maquina.current_resale_value or 0)
+            pv = reventa - (reventa - base) * tax_rate
+        else:
+            base = float(maquina.purchase_price + maquina.installation_and_training_cost)
+            pv = base + float(maquina.setup_costs)
+        depreciacion = (base - float(maquina.salvage_value)) / vida
+        unidades_pv = 0.0
+        for t in range(1, vida + 1):
+            descuento = (1 + wacc) ** (t / 12)
+            costo = m0 * (1 + (maquina.maintenance_cost_gradient or 0) / 100 * (t - 1)) + fijo
+            pv += (costo * (1 - tax_rate) - depreciacion * tax_rate) / descuento
+            unidades_pv += unidades / descuento
+        pv -= float(maquina.salvage_value) / (1 + wacc) ** (vida / 12)
+        return pv, calcular_eac(pv, vida / 12, wacc), (pv / unidades_pv if unidades_pv else None)
+
+    def _post(self, **datos):
+        data = {'defender_id': str(self.defender.id), 'challenger_id': str(self.challenger.id),
+                'wacc': 0.12, 'tax_rate': 0.3, **datos}
+        return self.client.post(reverse('api_costo_mensual_analisis'), data=json.dumps(data),
+                                content_type='application/json')
+
+    def test_coincide_con_el_calculo_mes_a_mes(self):
+        data = self._post(detalle=True).json()
+        self.assertTrue(data['success'])
+        for clave, maquina, rol in (('defender', self.defender, 'Defender'),
+                                     ('challenger', self.challenger, 'Challenger')):
+            pv, eac, costo_unidad = self._referencia(maquina, rol, 0.12, 0.3)
+            self.assertAlmostEqual(data[clave]['pv'], pv, places=4)
+            self.assertAlmostEqual(data[clave]['eac'], eac, places=4)
+            self.assertLess(data[clave]['eac'], 1e6)
+            if costo_unidad is None:
+                self.assertIsNone(data[clave]['costo_por_unidad'])
+            else:
+                self.assertAlmostEqual(data[clave]['costo_por_unidad'], costo_unidad, places=8)
+            self.assertEqual(len(data[clave]['flujos_mensuales']), maquina.useful_life)
+        self.assertEqual(data['defender']['unidades_totales'], 25 * 160 * 0.92 * 120)
+        self.assertGreater(data['defender']['totales']['consumibles'], 0)
+        self.assertGreater(data['defender']['totales']['inactividad'], 0)
+        self.assertEqual(data['recomendacion'],
+                         'Defender' if data['defender']['eac'] < data['challenger']['eac'] else 'Challenger')
+
+    def test_consistente_con_el_analisis_anual(self):
+        """Con solo mantenimiento anual y operador, el modelo mensual se aproxima a analisis_par"""
+        defender = Maquina.objects.create(
+            tipo='Defender', nombre='Fresa', purchase_price=Decimal('85000'), current_resale_value=Decimal('30000'),
+            salvage_value=Decimal('5000'), useful_life=120, annual_maintenance_labor_parts=Decimal('12000'),
+            operator_labor_cost=Decimal('18.50'), monthly_operating_hours=160,
+        )
+        data = self._post(defender_id=str(defender.id)).json()
+        anual = analisis_par(defender, self.challenger, 0.12, 0.3)
+        self.assertAlmostEqual(data['defender']['eac'] / float(anual['eac_defender']), 1, delta=0.05)
+
+    def test_roles_por_posicion_y_analisis_guardado(self):
+        analisis = AnalisisComparativo.objects.create(
+            nombre_analisis='CNC vs Torno', defender=self.challenger, challenger=self.defender,
+            wacc=Decimal('0.1'), tax_rate=Decimal('0.25'),
+        )
+        data = self.client.post(reverse('api_costo_mensual_analisis'), data=json.dumps({'analisis_id': str(analisis.id)}),
+                                content_type='application/json').json()
+        self.assertEqual(data['defender']['id'], str(self.challenger.id))
+        self.assertAlmostEqual(data['defender']['pv'], self._referencia(self.challenger, 'Defender', 0.1, 0.25)[0],
+                               places=4)
+
+    def test_validaciones(self):
+        self.assertEqual(self._post(challenger_id=str(uuid.uuid4())).status_code, 404)
+        self.assertEqual(self._post(tax_rate=2).status_code, 400)
+        self.assertEqual(self.client.post(reverse('api_costo_mensual_analisis'), data=json.dumps({}),
+                                          content_type='application/json').status_code, 400)
+
+
+class AnalisisServidorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.defender, cls.challenger = crear_par_maquinas()
+
+    def _post(self, url_name='api_calcular_analisis', **datos):
+        data = {
+            'defender_id': str(self.defender.id), 'challenger_id': str(self.challenger.id),
+            'wacc': 0.12, 'tax_rate': 0.3, 'financing_rate': 7.5, 'financing_months': 48, **datos,
+        }
+        return self.client.post(reverse(url_name), data=json.dumps(data), content_type='application/json')
+
+    def test_calcula_sin_guardar(self):
+        respuesta = self._post(guardar=False)
+        self.assertEqual(respuesta.status_code, 200)
+        data = respuesta.json()
+        self.assertFalse(AnalisisComparativo.objects.exists())
+        self.assertNotIn('analisis_id', data)
+
+        esperado = _analisis_referencia(self.defender, self.challenger, 0.12, 0.3)
+        self.assertAlmostEqual(data['analisis']['eac_defender'], esperado['eac_defender'], places=2)
+        self.assertAlmostEqual(data['analisis']['pv_challenger'], esperado['pv_challenger'], places=2)
+        recomendacion = 'Defender' if esperado['eac_defender'] < esperado['eac_challenger'] else 'Challenger'
+        self.assertEqual(data['analisis']['recomendacion'], recomendacion)
+        self.assertEqual(len(data['defender']['flujos']), 8)
+        self.assertEqual(len(data['challenger']['flujos']), 12)
+        self.assertEqual(len(data['amortizacion']['tabla']), 48)
+        self.assertEqual(data['amortizacion']['monto_financiado'], 160500)
+
+    def test_guarda_resultados_del_servidor(self):
+        # Los resultados enviados por el cliente se ignoran
+        data = self._post(pv_defender=1, eac_defender=1, recomendacion='Defender', nombre_analisis='Prueba').json()
+        analisis = AnalisisComparativo.objects.get(pk=data['analisis_id'])
+        esperado = _analisis_referencia(self.defender, self.challenger, 0.12, 0.3)
+
+        self.assertEqual(analisis.nombre_analisis, 'Prueba')
+        self.assertEqual(analisis.financing_months, 48)
+        self.assertAlmostEqual(float(analisis.eac_defender), esperado['eac_defender'], places=2)
+        self.assertAlmostEqual(float(analisis.pv_challenger), esperado['pv_challenger'], places=2)
+        self.assertEqual(analisis.flujos_caja.filter(tipo_equipo='Defender').count(), 8)
+        self.assertEqual(analisis.flujos_caja.filter(tipo_equipo='Challenger').count(), 12)
+        self.assertEqual(analisis.monto_financiado, Decimal('160500'))
+        self.assertEqual(len(list(analisis.filas_amortizacion())), 48)
+        self.assertFalse(analisis.tabla_amortizacion.exists())
+        flujo = analisis.flujos_caja.get(tipo_equipo='Challenger', año=1)
+        self.assertAlmostEqual(float(flujo.depreciacion), esperado['flujos_challenger'][0]['depreciation'], places=2)
+        self.assertAlmostEqual(float(flujo.tax_shield), esperado['flujos_challenger'][0]['tax_shield'], places=2)
+
+    def test_guardar_analisis_calcula_en_el_servidor(self):
+        data = self._post('api_guardar_analisis', pv_defender=1, eac_challenger=1).json()
+        analisis = AnalisisComparativo.objects.get(pk=data['analisis_id'])
+        self.assertNotEqual(analisis.pv_defender, Decimal('1'))
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self._post(tax_rate='abc').status_code, 400)
+        self.assertEqual(self._post(financing_months=-1).status_code, 400)
+        self.assertEqual(self._post(defender_id='no-es-uuid').status_code, 400)
+        self.assertEqual(self._post(challenger_id=str(uuid.uuid4())).status_code, 404)
+        self.assertFalse(AnalisisComparativo.objects.exists())
+
+    def test_parametros_no_finitos(self):
+        for campo, valor in (('wacc', 'NaN'), ('wacc', 'sNaN'), ('tax_rate', 'Infinity'), ('financing_rate', '-inf')):
+            with self.assertRaises(ValueError):
+                leer_parametros({campo: valor})
+        for url_name in ('api_calcular_analisis', 'api_simular_analisis', 'api_costo_mensual_analisis',
+                         'api_vida_economica', 'api_ranking_flota'):
+            respuesta = self._post(url_name, wacc='NaN')
+            self.assertEqual(respuesta.status_code, 400, url_name)
+            self.assertFalse(respuesta.json()['success'])
+        self.assertFalse(AnalisisComparativo.objects.exists())
+
+    def test_requiere_csrf(self):
+        self.client = Client(enforce_csrf_checks=True)
+        self.assertEqual(self._post().status_code, 403)
+
+    @override_settings(PERSISTIR_TABLA_AMORTIZACION=True)
+    def test_consultas_constantes_al_guardar(self):
+        consultas = []
+        for meses in (12, 120):
+            parametros = leer_parametros({'wacc': 0.1, 'tax_rate': 0.3, 'financing_months': meses})
+            resultado = calcular_analisis(self.defender, self.challenger, parametros)
+            with CaptureQueriesContext(connection) as contexto:
+                analisis = guardar_analisis_calculado(self.defender, self.challenger, parametros, resultado)
+            consultas.append(len(contexto))
+            self.assertEqual(analisis.tabla_amortizacion.count(), meses)
+        self.assertEqual(consultas[0], consultas[1])
+
+    def test_guardar_de_nuevo_reemplaza_las_filas(self):
+        analisis_id = self._post(nombre_analisis='Original').json()['analisis_id']
+        data = self._post(analisis_id=analisis_id, financing_months=24, wacc=0.2).json()
+        self.assertEqual(data['analisis_id'], analisis_id)
+
+        analisis = AnalisisComparativo.objects.get()
+        self.assertEqual(analisis.nombre_analisis, 'Original')
+        self.assertEqual(analisis.wacc, Decimal('0.2'))
+        self.assertEqual(len(list(analisis.filas_amortizacion())), 24)
+        self.assertEqual(analisis.flujos_caja.count(), 20)
+        esperado = _analisis_referencia(self.defender, self.challenger, 0.2, 0.3)
+        self.assertAlmostEqual(float(analisis.eac_challenger), esperado['eac_challenger'], places=2)
+
+    def test_error_al_guardar_no_deja_datos_parciales(self):
+        parametros = leer_parametros({})
+        resultado = calcular_analisis(self.defender, self.challenger, parametros)
+        resultado['flujos_challenger'].append(dict(resultado['flujos_challenger'][0]))  # Año duplicado
+        with self.assertRaises(IntegrityError):
+            guardar_analisis_calculado(self.defender, self.challenger, parametros, resultado)
+        self.assertFalse(AnalisisComparativo.objects.exists())
+
+
+def _amortizacion_referencia(P, financing_rate, financing_months):
+    """Tabla mes a mes (implementación original de generar_tabla_amortizacion), redondeada como en la BD"""
+    r = financing_rate / Decimal('100') / Decimal('12')
+    n = financing_months
+    if n <= 0 or P <= 0:
+        return []
+    if r == 0:
+        payment = P / Decimal(str(n))
+    else:
+        factor = (Decimal('1') + r) ** n
+        payment = P * (r * factor) / (factor - Decimal('1'))
+
+    filas = []
+    balance = P
+    for mes in range(1, n + 1):
+        interest_payment = balance * r
+        principal_payment = payment - interest_payment
+        final_balance = balance - principal_payment
+        filas.append({
+            'mes': mes,
+            'balance_inicial': balance.quantize(Decimal('0.01')),
+            'pago_mensual': payment.quantize(Decimal('0.01')),
+            'pago_principal': principal_payment.quantize(Decimal('0.01')),
+            'pago_interes': interest_payment.quantize(Decimal('0.01')),
+            'balance_final': max(Decimal('0'), final_balance).quantize(Decimal('0.01')),
+        })
+        balance = final_balance
+        if balance <= 0:
+            break
+    return filas
+
+
+class AmortizacionBajoDemandaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        defender = Maquina.objects.create(tipo='Defender', nombre='Torno')
+        challenger = Maquina.objects.create(nombre='CNC', purchase_price=Decimal('150000'),
+                                            installation_and_training_cost=Decimal('8000'))
+        cls.analisis = AnalisisComparativo.objects.create(
+            nombre_analisis='Prueba', defender=defender, challenger=challenger,
+            financing_rate=Decimal('7.5'), financing_months=60, monto_financiado=Decimal('160500'),
+        )
+
+    def test_coincide_con_la_tabla_mes_a_mes(self):
+        casos = [
+            (Decimal('160500'), Decimal('7.5'), 60), (Decimal('1234567.89'), Decimal('12.25'), 360),
+            (Decimal('999.99'), Decimal('0'), 7), (Decimal('50000'), Decimal('36'), 600),
+            (Decimal('10'), Decimal('0.01'), 1), (Decimal('0'), Decimal('5'), 12), (Decimal('1000'), Decimal('5'), 0),
+        ]
+        for P, tasa, meses in casos:
+            self.assertEqual(list(filas_amortizacion(P, tasa, meses)), _amortizacion_referencia(P, tasa, meses))
+
+    def test_exacta_con_tasas_extremas(self):
+        # El cálculo mes a mes pierde precisión; se compara con él a 100 dígitos
+        with localcontext() as contexto:
+            contexto.prec = 100
+            referencia = _amortizacion_referencia(Decimal('50000'), Decimal('99.99'), 600)
+        self.assertEqual(list(filas_amortizacion(Decimal('50000'), Decimal('99.99'), 600)), referencia)
+
+    def test_rango_de_meses(self):
+        completa = _amortizacion_referencia(Decimal('160500'), Decimal('7.5'), 60)
+        self.assertEqual(list(filas_amortizacion(Decimal('160500'), Decimal('7.5'), 60, 25, 30)), completa[24:30])
+        self.assertEqual(list(filas_amortizacion(Decimal('160500'), Decimal('7.5'), 60, 58, 100)), completa[57:])
+
+    def test_terminos_en_cache(self):
+        _terminos.cache_clear()
+        for _ in range(3):
+            list(filas_amortizacion(Decimal('160500'), Decimal('7.5'), 60, 1, 12))
+        self.assertEqual(_terminos.cache_info().misses, 1)
+        self.assertEqual(_terminos.cache_info().hits, 2)
+
+    def test_detalle_paginado(self):
+        completa = _amortizacion_referencia(Decimal('160500'), Decimal('7.5'), 60)
+        data = self.client.get(reverse('analisis_detalle', args=[self.analisis.id]), {'page': 2, 'page_size': 25}).json()
+        self.assertEqual([f['mes'] for f in data['tabla_amortizacion']], list(range(26, 51)))
+        self.assertEqual(data['tabla_amortizacion'][0]['balance_inicial'], str(completa[25]['balance_inicial']))
+        self.assertEqual(data['paginacion']['total_pages'], 3)
+        self.assertTrue(data['paginacion']['has_next'])
+
+        data = self.client.get(reverse('api_analisis_detalle', args=[self.analisis.id]), {'page': 3, 'page_size': 25}).json()
+        self.assertEqual(len(data['tabla_amortizacion']), 10)
+        self.assertFalse(data['paginacion']['has_next'])
+
+    def test_detalle_completo_sin_filas_guardadas(self):
+        self.assertFalse(TablaAmortizacion.objects.exists())
+        data = self.client.get(reverse('analisis_detalle', args=[self.analisis.id])).json()
+        self.assertNotIn('paginacion', data)
+        self.assertEqual(len(data['tabla_amortizacion']), 60)
+        lista = self.client.get(reverse('analisis_lista')).json()['analisis']
+        self.assertEqual(lista[0]['pago_mensual'], float(_amortizacion_referencia(Decimal('160500'), Decimal('7.5'), 60)[0]['pago_mensual']))
+        self.assertEqual(lista[0]['monto_prestamo'], 160500)
+
+
+class AnalisisListaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        defender = Maquina.objects.create(tipo='Defender', nombre='Torno')
+        challenger = Maquina.objects.create(nombre='CNC', purchase_price=Decimal('100000'))
+        for i in range(12):
+            AnalisisComparativo.objects.create(
+                nombre_analisis=f'Análisis {i}', defender=defender, challenger=challenger,
+                financing_months=12 * (i + 1), monto_financiado=Decimal('100000'),
+            )
+        # Análisis antiguo sin monto guardado: se usa el costo del challenger
+        AnalisisComparativo.objects.filter(nombre_analisis='Análisis 0').update(monto_financiado=None)
+
+    def test_consultas_fijas(self):
+        with self.assertNumQueries(2):
+            data = self.client.get(reverse('analisis_lista')).json()
+        self.assertEqual(len(data['analisis']), 12)
+        for item in data['analisis']:
+            analisis = AnalisisComparativo.objects.get(pk=item['id'])
+            self.assertEqual(item['monto_prestamo'], 100000)
+            self.assertEqual(item['pago_mensual'], float(next(analisis.filas_amortizacion())['pago_mensual']))
+
+        with self.assertNumQueries(3):
+            data = self.client.get(reverse('analisis_lista'), {'page': 2, 'page_size': 5}).json()
+        self.assertEqual(len(data['analisis']), 5)
+        self.assertEqual(data['paginacion']['total_items'], 12)
+        self.assertEqual(data['paginacion']['total_pages'], 3)
+
+    def test_since(self):
+        cursor = self.client.get(reverse('analisis_lista')).json()['ultima_actualizacion']
+        self.assertEqual(self.client.get(reverse('analisis_lista'), {'since': cursor}).json()['analisis'], [])
+
+        analisis = AnalisisComparativo.objects.get(nombre_analisis='Análisis 3')
+        analisis.recomendacion = 'Challenger'
+        analisis.save()
+        data = self.client.get(reverse('analisis_lista'), {'since': cursor}).json()
+        self.assertEqual([a['id'] for a in data['analisis']], [str(analisis.id)])
+        self.assertGreater(data['ultima_actualizacion'], cursor)
+
+    def test_since_invalido(self):
+        self.assertEqual(self.client.get(reverse('analisis_lista'), {'since': 'ayer'}).status_code, 400)
+
+
+class PerfiladoTests(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        configuracion = override_settings(PERFILADO_ACTIVO=True, PERFILADO_DIR=directorio.name)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        self.directorio = directorio.name
+        perfilado.reiniciar()
+        self.addCleanup(perfilado.reiniciar)
+        self.client = Client()  # Carga el middleware con la configuración activa
+
+    def _staff(self):
+        usuario = User.objects.create_user('admin', password='clave', is_staff=True)
+        self.client.force_login(usuario)
+
+    def test_registra_metricas_por_vista(self):
+        for _ in range(3):
+            self.client.get(reverse('analisis_lista'))
+        self.client.get(reverse('api_cuentas_por_cobrar'))
+
+        filas = {fila['vista']: fila for fila in perfilado.reporte()}
+        self.assertEqual(filas['analisis_lista']['solicitudes'], 3)
+        self.assertEqual(filas['analisis_lista']['consultas']['p50'], 2)
+        self.assertEqual(filas['api_cuentas_por_cobrar']['consultas']['max'], 1)
+        self.assertGreater(filas['analisis_lista']['bytes']['p95'], 0)
+        self.assertGreaterEqual(filas['analisis_lista']['tiempo_ms']['p99'], filas['analisis_lista']['tiempo_db_ms']['p99'])
+
+    def test_combina_muestras_de_otros_procesos(self):
+        self.client.get(reverse('analisis_lista'))
+        with open(os.path.join(self.directorio, 'perfilado-1.json'), 'w') as archivo:
+            json.dump({'analisis_lista': [[10, 5, 2, 100]], 'otra_vista': [[1, 0, 0, 10]]}, archivo)
+
+        filas = {fila['vista']: fila for fila in perfilado.reporte()}
+        self.assertEqual(filas['analisis_lista']['solicitudes'], 2)
+        self.assertEqual(filas['analisis_lista']['consultas']['max'], 5)
+        self.assertIn('otra_vista', filas)
+
+    def test_endpoint_solo_staff(self):
+        respuesta = self.client.get(reverse('api_perfilado'))
+        self.assertEqual(respuesta.status_code, 302)
+
+        self._staff()
+        self.client.get(reverse('analisis_lista'))
+        data = self.client.get(reverse('api_perfilado'), {'orden': 'consultas'}).json()
+        self.assertTrue(data['activo'])
+        self.assertIn('analisis_lista', [fila['vista'] for fila in data['vistas']])
+        self.assertEqual(self.client.get(reverse('api_perfilado'), {'orden': 'x'}).status_code, 400)
+
+        self.assertEqual(self.client.delete(reverse('api_perfilado')).status_code, 200)
+        # Solo queda la propia petición de reinicio
+        self.assertEqual([fila['vista'] for fila in perfilado.reporte()], ['api_perfilado'])
+
+    def test_comando_reporte(self):
+        self.client.get(reverse('analisis_lista'))
+        salida = StringIO()
+        call_command('reporte_perfilado', '--json', stdout=salida)
+        self.assertEqual(json.loads(salida.getvalue())[0]['vista'], 'analisis_lista')
+
+        salida = StringIO()
+        call_command('reporte_perfilado', '--reiniciar', stdout=salida)
+        self.assertIn('analisis_lista', salida.getvalue())
+        self.assertEqual(perfilado.reporte(), [])
+
+
+class BenchmarkTests(TestCase):
+    def test_generacion_determinista(self):
+        conteo = benchmark.generar_datos(200, semilla=7)
+        self.assertEqual(conteo['registros'], Registro.objects.count())
+        self.assertEqual(conteo['maquinas'], Maquina.objects.count())
+        saldos = list(Registro.objects.order_by('id').values_list('id', 'saldo_pendiente'))
+
+        Registro.objects.all().delete()
+        Cliente.objects.all().delete()
+        Proveedor.objects.all().delete()
+        AnalisisComparativo.objects.all().delete()
+        Maquina.objects.all().delete()
+        self.assertEqual(benchmark.generar_datos(200, semilla=7), conteo)
+        self.assertEqual(list(Registro.objects.order_by('id').values_list('id', 'saldo_pendiente')), saldos)
+
+    def test_ejecucion_y_comparacion(self):
+        resultado = benchmark.ejecutar_benchmarks(200, repeticiones=1)
+        casos = {caso['caso']: caso for caso in resultado['casos']}
+        self.assertEqual(set(casos), {
+            'cuentas_por_cobrar_api', 'cuentas_por_pagar_api', 'calcular_flujo_caja', 'flujo_caja_cartera_api',
+            'cargar_excel_completo', 'generar_tabla_amortizacion', 'calcular_analisis_completo',
+            'analisis_portafolio',
+        })
+        self.assertEqual(casos['analisis_portafolio']['consultas'], 0)
+        json.dumps(resultado)
+
+        actual = {'resultados': [resultado]}
+        comparacion = benchmark.comparar(actual, actual)
+        self.assertEqual(len(comparacion), len(casos) - sum(1 for c in casos.values() if not c['mediana_ms']))
+        self.assertTrue(all(fila['variacion_pct'] == 0 for fila in comparacion))
@@ -0,0 +1,116 @@
+"""
+Cola local de trabajos de importación.
+
+Los archivos subidos se guardan en la tabla TrabajoImportacion y se procesan en
+un ThreadPoolExecutor del propio proceso (sin broker externo). El progreso se
+escribe en la misma tabla para que la página de importación lo consulte.
+Los trabajos que queden pendientes (por ejemplo, tras reiniciar el servidor)
+se pueden procesar con el comando procesar_importaciones. Un trabajo que quedó
+'en_proceso' porque el proceso murió no dejó datos (la importación es una sola
+transacción), así que pasado IMPORTACION_TIMEOUT_EN_PROCESO segundos desde su
+inicio se vuelve a poner en pendiente.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .importacion import importar_excel
+from .models import TrabajoImportacion
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'IMPORTACION_MAX_WORKERS', 1),
+    thread_name_prefix='importacion',
+)
+
+
+def crear_trabajo_importacion(archivo):
+    """Guarda el archivo subido como un trabajo pendiente y lo encola al confirmar la transacción"""
+    trabajo = TrabajoImportacion.objects.create(
+        nombre_archivo=getattr(archivo, 'name', '') or 'archivo.xlsx',
+        contenido=archivo.read(),
+    )
+    transaction.on_commit(lambda: encolar(trabajo.pk))
+    return trabajo
+
+
+def encolar(trabajo_id):
+    """Envía el trabajo al pool de hilos"""
+    return _executor.submit(_ejecutar_en_hilo, trabajo_id)
+
+
+def _ejecutar_en_hilo(trabajo_id):
+    close_old_connections()
+    try:
+        ejecutar_importacion(trabajo_id)
+    except Exception:
+        logger.exception('Error inesperado en el trabajo de importación %s', trabajo_id)
+    finally:
+        connection.close()
+
+
+def tiempo_maximo_en_proceso():
+    return getattr(settings, 'IMPORTACION_TIMEOUT_EN_PROCESO', 3600)
+
+
+def reiniciar_trabajos_estancados(segundos=None):
+    """
+    Devuelve a 'pendiente' los trabajos en proceso iniciados hace más de
+    'segundos' (por defecto IMPORTACION_TIMEOUT_EN_PROCESO). Retorna cuántos.
+    """
+    if segundos is None:
+        segundos = tiempo_maximo_en_proceso()
+    limite = timezone.now() - timedelta(seconds=segundos)
+    return TrabajoImportacion.objects.filter(estado='en_proceso', fecha_inicio__lt=limite).update(
+        estado='pendiente', fecha_inicio=None, filas_totales=0, filas_procesadas=0, filas_con_error=0,
+    )
+
+
+def ejecutar_importacion(trabajo_id):
+    """
+    Procesa un trabajo pendiente. Solo un proceso puede tomarlo: el cambio de
+    estado a 'en_proceso' se hace con un UPDATE condicionado al estado pendiente.
+    """
+    tomado = TrabajoImportacion.objects.filter(pk=trabajo_id, estado='pendiente').update(
+        estado='en_proceso', fecha_inicio=timezone.now()
+    )
+    if not tomado:
+        return None
+
+    trabajo = TrabajoImportacion.objects.get(pk=trabajo_id)
+
+    def progreso(resultado):
+        TrabajoImportacion.objects.filter(pk=trabajo_id).update(
+            filas_totales=resultado['filas_totales'],
+            filas_procesadas=resultado['filas_procesadas'],
+            filas_con_error=resultado['filas_con_error'],
+        )
+
+    try:
+        resultado = importar_excel(BytesIO(bytes(trabajo.contenido)), progreso=progreso)
+    except Exception as e:
+        logger.exception('Falló el trabajo de importación %s', trabajo_id)
+        trabajo.estado = 'fallido'
+        trabajo.mensaje_error = str(e)
+    else:
+        trabajo.estado = 'completado'
+        trabajo.filas_totales = resultado['filas_totales']
+        trabajo.filas_procesadas = resultado['filas_procesadas']
+        trabajo.filas_con_error = resultado['filas_con_error']
+        trabajo.errores = resultado['errores']
+        trabajo.creados = resultado['creados']
+
+    # El archivo ya no se necesita una vez procesado
+    trabajo.contenido = b''
+    trabajo.fecha_fin = timezone.now()
+    trabajo.save(update_fields=[
+        'estado', 'mensaje_error', 'filas_totales', 'filas_procesadas', 'filas_con_error',
+        'errores', 'creados', 'contenido', 'fecha_fin',
+    ])
+    return trabajo
@@ -11,6 +11,8 @@ urlpatterns = [
     path('maquinaria/editar/<uuid:id>/', views.editar_maquina, name='editar_maquina'),
     path('maquinaria/analisis-financiero/', views.comparar_maquina, name='analisis_financiero'),
     path('maquinaria/eliminar/<uuid:maquina_id>/', views.maquinaria_eliminar, name='maquinaria_eliminar'),
+    path('api/maquinaria/vida-economica/', views.api_vida_economica, name='api_vida_economica'),
+    path('api/maquinaria/ranking-reemplazos/', views.api_ranking_flota, name='api_ranking_flota'),
     
     path('analisis/confirmar-eliminacion/<uuid:analisis_id>/', views.confirmar_eliminacion, name='confirmar_eliminacion'),
     
@@ -19,8 +21,12 @@ urlpatterns = [
     path('api/maquinas/tipo/<str:tipo>/', views.api_maquinas_por_tipo, name='api_maquinas_tipo'),
     path('api/maquina/<uuid:id>/', views.api_maquina_detalle, name='api_maquina_detalle'),
     path('api/guardar-analisis/', views.guardar_analisis, name='api_guardar_analisis'),
+    path('api/analisis/calcular/', views.api_calcular_analisis, name='api_calcular_analisis'),
+    path('api/analisis/simular/', views.api_simular_analisis, name='api_simular_analisis'),
+    path('api/analisis/costo-mensual/', views.api_costo_mensual_analisis, name='api_costo_mensual_analisis'),
     path('api/analisis-guardados/', views.api_analisis_guardados, name='api_analisis_guardados'),
     path('api/analisis/<uuid:analisis_id>/', views.api_analisis_detalle, name='api_analisis_detalle'),
+    path('api/analisis/<uuid:analisis_id>/sensibilidad/', views.api_sensibilidad_analisis, name='api_sensibilidad_analisis'),
 
     path('dashboard-amortizacion/', views.dashboard_amortizacion, name='dashboard_amortizacion'),
     
@@ -56,20 +62,29 @@ urlpatterns = [
     path('registros/validar-id/', views.validar_id_registro, name='validar_id_registro'),
     path('clientes/<int:cliente_id>/terminos/', views.obtener_terminos_cliente, name='obtener_terminos_cliente'),
     path('proveedores/<int:proveedor_id>/terminos/', views.obtener_terminos_proveedor, name='obtener_terminos_proveedor'),
+    path('api/buscar/', views.api_buscar, name='api_buscar'),
+    path('api/catalogos/terminos/', views.api_catalogo_terminos, name='api_catalogo_terminos'),
+    path('api/catalogos/<str:tipo>/buscar/', views.api_buscar_catalogo, name='api_buscar_catalogo'),
     
     path('registros/<str:registro_id>/flujo/', views.flujo_caja_view, name='flujo_caja'),
     path('calcular-flujo/', views.calcular_flujo_caja, name='calcular_flujo'),
+    path('api/flujo-caja-cartera/', views.flujo_caja_cartera_api, name='api_flujo_caja_cartera'),
     path('dashboard-datos/<int:registro_id>/', views.obtener_datos_dashboard, name='dashboard_datos'),
-    path('exportar-reporte/<int:registro_id>/', views.exportar_reporte_flujo, name='exportar_reporte'),
+    path('exportar-reporte/<str:registro_id>/', views.exportar_reporte_flujo, name='exportar_reporte'),
     
     path('registro/importar/', views.cargar_excel_completo, name='cargar_excel_completo'),
+    path('api/importaciones/<uuid:trabajo_id>/', views.estado_importacion, name='estado_importacion'),
 
     # URLs de Cuentas por Cobrar y Pagar
     path('cxc/', views.cuentas_por_cobrar, name='cuentas_por_cobrar'),
     path('api/cuentas-por-cobrar/', views.cuentas_por_cobrar_api, name='api_cuentas_por_cobrar'),
+    path('cxc/export.xlsx', views.exportar_cxc_xlsx, name='exportar_cxc_xlsx'),
     # URLs para Cuentas por Pagar (CXP)
     path('cxp/', views.cuentas_por_pagar, name='cuentas_por_pagar'),
     path('api/cuentas-por-pagar/', views.cuentas_por_pagar_api, name='api_cuentas_por_pagar'),
+    path('cxp/export.xlsx', views.exportar_cxp_xlsx, name='exportar_cxp_xlsx'),
+
+    path('api/perfilado/', views.api_perfilado, name='api_perfilado'),
 
 
     
@@ -1,22 +1,38 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
-import openpyxl
-from django.views.decorators.http import require_http_methods
+from django.urls import reverse
+from django.http import FileResponse, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_http_methods
 from django.db import transaction
-from django.db.models import Q, Sum
+from django.db.models import Q, Sum, Count, F, Max
+from django.core.paginator import Paginator
 from django.core.exceptions import ValidationError
 from django.core.serializers.json import DjangoJSONEncoder
 from django.utils.safestring import mark_safe
+from django.conf import settings
 from django.contrib import messages
-from django.utils.dateparse import parse_date
-from .models import Registro, Cliente, Proveedor, Maquina, AnalisisComparativo, FlujoCaja, TablaAmortizacion
+from django.contrib.admin.views.decorators import staff_member_required
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import Registro, Cliente, Proveedor, Maquina, AnalisisComparativo, FlujoCaja, TablaAmortizacion, Obligacion, PagoProveedor, TrabajoImportacion
 from .forms import RegistroForm, MaquinaForm
+from .exportacion import CONTENT_TYPE_XLSX, columna, libro_xlsx
+from .finance import analisis_par, leer_distribuciones, parametros_simulacion, simulacion, simular
+from .reemplazo import (
+    MAX_MESES_FINANCIAMIENTO, calcular_analisis, costo_mensual_par, guardar_analisis_calculado, leer_parametros,
+    sensibilidad_analisis, serializar_resultado, vida_economica_flota,
+)
+from .tesoreria import proyectar_flujo_cartera, rango_por_defecto
+from .trabajos import crear_trabajo_importacion
+from . import busqueda, catalogos, flota, perfilado, reportes
 from django.core.serializers import serialize
 from decimal import Decimal
 from datetime import datetime, date, timedelta
+from itertools import islice
 import json
+import math
+import os
 from django.utils import timezone
-from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.csrf import ensure_csrf_cookie
 import logging
 import traceback
 
@@ -28,21 +44,24 @@ def vista_tesoreria(request):
     # Aquí puedes agregar la lógica para tu página de tesorería
     return render(request, 'tesoreria.html')
 
+def _pagina_lista(request, queryset, orden):
+    """Página por cursor (?cursor=) de una lista HTML; un cursor inválido muestra la primera"""
+    try:
+        return busqueda.pagina_keyset(queryset, orden, request.GET.get('cursor'))
+    except ValueError:
+        return busqueda.pagina_keyset(queryset, orden)
+
 def vista_maquinaria(request):
-    query = request.GET.get('q', '')
-    
-    if query:
-        maquinas = Maquina.objects.filter(
-            Q(nombre__icontains=query) | 
-            Q(numero_serie__icontains=query)
-        )
-    else:
-        maquinas = Maquina.objects.all()
+    query = request.GET.get('q', '').strip()
+    maquinas, siguiente_cursor = _pagina_lista(
+        request, busqueda.filtrar_maquinas(Maquina.objects.all(), query), busqueda.ORDEN_MAQUINAS
+    )
     
     # Cambia esta línea para usar el template correcto
     return render(request, 'maquinaria.html', {  # o el nombre que tengas
         'maquinas': maquinas,
-        'query': query
+        'query': query,
+        'siguiente_cursor': siguiente_cursor,
     })
 
 def maquinaria_eliminar(request, maquina_id):
@@ -146,6 +165,7 @@ def editar_maquina(request, id):
         'maquina': maquina
     })
 
+@ensure_csrf_cookie
 def comparar_maquina(request):
     """Vista principal para el análisis financiero"""
     context = {}
@@ -232,210 +252,247 @@ def api_maquina_detalle(request, id):
         return JsonResponse({'error': str(e)}, status=500)
 
 
-@csrf_exempt
-@require_http_methods(["POST"])
-def guardar_analisis(request):
-    """Guardar un nuevo análisis completo"""
+def _analisis_desde_peticion(request, guardar):
+    """Calcula (y opcionalmente guarda) el análisis descrito en el cuerpo JSON de la petición"""
     try:
         data = json.loads(request.body)
-        
-        # Obtener las máquinas
+        parametros = leer_parametros(data)
         defender = Maquina.objects.get(id=data['defender_id'])
         challenger = Maquina.objects.get(id=data['challenger_id'])
-        
-        # Crear el análisis - Convertir todos los valores a Decimal
-        analisis = AnalisisComparativo.objects.create(
-            nombre_analisis=data['nombre_analisis'],
-            defender=defender,
-            challenger=challenger,
-            wacc=Decimal(str(data['wacc'])),  # Convertir float a Decimal
-            tax_rate=Decimal(str(data['tax_rate'])), 
-            financing_rate=Decimal(str(data['financing_rate'])),
-            financing_months=int(data['financing_months']),
-            pv_defender=Decimal(str(data['pv_defender'])),
-            eac_defender=Decimal(str(data['eac_defender'])),
-            pv_challenger=Decimal(str(data['pv_challenger'])),
-            eac_challenger=Decimal(str(data['eac_challenger'])),
-            recomendacion=data['recomendacion']
-        )
-        
-        # Guardar flujos de caja del Defender
-        for flujo_data in data.get('flujos_defender', []):
-            FlujoCaja.objects.create(
-                analisis=analisis,
-                tipo_equipo='Defender',
-                año=int(flujo_data['year']),
-                cash_flow_bruto=Decimal(str(flujo_data['cashFlow'])),
-                depreciacion=Decimal('0'),  # Calcular si es necesario
-                tax_shield=Decimal('0'),    # Calcular si es necesario
-                after_tax_cash_flow=Decimal(str(flujo_data['afterTaxCashFlow'])),
-                present_value=Decimal(str(flujo_data['pv']))
-            )
-        
-        # Guardar flujos de caja del Challenger
-        for flujo_data in data.get('flujos_challenger', []):
-            FlujoCaja.objects.create(
-                analisis=analisis,
-                tipo_equipo='Challenger',
-                año=int(flujo_data['year']),
-                cash_flow_bruto=Decimal(str(flujo_data['cashFlow'])),
-                depreciacion=Decimal('0'),  # Calcular si es necesario
-                tax_shield=Decimal('0'),    # Calcular si es necesario
-                after_tax_cash_flow=Decimal(str(flujo_data['afterTaxCashFlow'])),
-                present_value=Decimal(str(flujo_data['pv']))
+        # Con analisis_id se vuelve a guardar un análisis existente (sus filas se reemplazan)
+        analisis = AnalisisComparativo.objects.get(id=data['analisis_id']) if data.get('analisis_id') else None
+    except Maquina.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Máquina no encontrada'}, status=404)
+    except AnalisisComparativo.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Análisis no encontrado'}, status=404)
+    except KeyError as e:
+        return JsonResponse({'success': False, 'error': f'Falta el campo {e}'}, status=400)
+    except (ValueError, ValidationError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    try:
+        resultado = calcular_analisis(defender, challenger, parametros)
+        data_respuesta = {'success': True, **serializar_resultado(defender, challenger, parametros, resultado)}
+        if guardar:
+            analisis = guardar_analisis_calculado(
+                defender, challenger, parametros, resultado, data.get('nombre_analisis'), analisis
             )
-        
-        # Generar y guardar tabla de amortización
-        generar_tabla_amortizacion(analisis)
-        
+            data_respuesta['analisis']['nombre_analisis'] = analisis.nombre_analisis
+            data_respuesta['analisis_id'] = str(analisis.id)
+            data_respuesta['message'] = 'Análisis guardado exitosamente'
+        return JsonResponse(data_respuesta)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["POST"])
+def api_calcular_analisis(request):
+    """
+    Calcula en el servidor el análisis Defender/Challenger (PV, EAC, flujos,
+    recomendación y amortización). Se guarda salvo que se envíe "guardar": false.
+    """
+    guardar = True
+    try:
+        guardar = json.loads(request.body).get('guardar', True) is not False
+    except (ValueError, AttributeError):
+        pass
+    return _analisis_desde_peticion(request, guardar)
+
+
+@require_http_methods(["POST"])
+def guardar_analisis(request):
+    """Guardar un nuevo análisis completo (los resultados se calculan en el servidor)"""
+    return _analisis_desde_peticion(request, guardar=True)
+
+
+def procesos_simulacion():
+    return getattr(settings, 'SIMULACION_PROCESOS', None) or os.cpu_count() or 1
+
+
+def _par_desde_peticion(request):
+    """
+    Lee del cuerpo JSON el par a evaluar: defender_id y challenger_id con wacc y
+    tax_rate, o analisis_id de un análisis guardado (wacc y tax_rate opcionales).
+    Retorna ((data, defender, challenger, parametros), None) o (None, respuesta
+    de error).
+    """
+    try:
+        data = json.loads(request.body)
+        if data.get('analisis_id'):
+            analisis = AnalisisComparativo.objects.select_related('defender', 'challenger').get(id=data['analisis_id'])
+            defender, challenger = analisis.defender, analisis.challenger
+            parametros = leer_parametros({
+                'wacc': data.get('wacc', analisis.wacc),
+                'tax_rate': data.get('tax_rate', analisis.tax_rate),
+            })
+        else:
+            parametros = leer_parametros(data)
+            defender = Maquina.objects.get(id=data['defender_id'])
+            challenger = Maquina.objects.get(id=data['challenger_id'])
+    except Maquina.DoesNotExist:
+        return None, JsonResponse({'success': False, 'error': 'Máquina no encontrada'}, status=404)
+    except AnalisisComparativo.DoesNotExist:
+        return None, JsonResponse({'success': False, 'error': 'Análisis no encontrado'}, status=404)
+    except KeyError as e:
+        return None, JsonResponse({'success': False, 'error': f'Falta el campo {e}'}, status=400)
+    except (AttributeError, TypeError, ValueError, ValidationError) as e:
+        return None, JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return (data, defender, challenger, parametros), None
+
+
+@require_http_methods(["POST"])
+def api_simular_analisis(request):
+    """
+    Simulación Monte Carlo de un par Defender/Challenger (ver core.finance.simulacion).
+    Cuerpo JSON: el par (ver _par_desde_peticion); escenarios (por defecto 10.000,
+    máximo 100.000), semilla, bins y distribuciones {variable: {"tipo": ..., parámetros}}.
+    """
+    par, error = _par_desde_peticion(request)
+    if error:
+        return error
+    data, defender, challenger, parametros = par
+    try:
+        maquinas = {
+            'Defender': parametros_simulacion(defender, 'Defender'),
+            'Challenger': parametros_simulacion(challenger, 'Challenger'),
+        }
+        especificacion = leer_distribuciones(
+            data.get('distribuciones'), maquinas, parametros['wacc'], parametros['tax_rate']
+        )
+        escenarios = int(data.get('escenarios', simulacion.ESCENARIOS_DEFECTO))
+        semilla = int(data['semilla']) if data.get('semilla') is not None else None
+        bins = int(data.get('bins', simulacion.BINS_DEFECTO))
+    except (TypeError, ValueError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    try:
+        resultado = simular(maquinas, especificacion, escenarios, semilla, procesos_simulacion(), bins)
+        return JsonResponse({
+            'success': True,
+            'defender': {'id': str(defender.id), 'nombre': defender.nombre},
+            'challenger': {'id': str(challenger.id), 'nombre': challenger.nombre},
+            **resultado,
+        })
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["POST"])
+def api_costo_mensual_analisis(request):
+    """
+    Modelo de costos mensual completo de un par Defender/Challenger (ver
+    core.finance.mensual): energía, inactividad, consumibles, crecimiento del
+    mantenimiento y costo por unidad producida. Cuerpo JSON: el par (ver
+    _par_desde_peticion) y detalle para incluir la serie mensual de cada máquina.
+    """
+    par, error = _par_desde_peticion(request)
+    if error:
+        return error
+    data, defender, challenger, parametros = par
+    try:
+        resultado = costo_mensual_par(defender, challenger, parametros, detalle=bool(data.get('detalle')))
+        return JsonResponse({
+            'success': True,
+            'wacc': float(parametros['wacc']),
+            'tax_rate': float(parametros['tax_rate']),
+            **resultado,
+        })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+def api_sensibilidad_analisis(request, analisis_id):
+    """
+    Tornado de un análisis guardado: cambio de la brecha de EAC al desplazar cada
+    entrada ±variacion % (parámetro GET, por defecto 10). Se guarda en caché por
+    análisis y valores de entrada.
+    """
+    analisis = get_object_or_404(AnalisisComparativo.objects.select_related('defender', 'challenger'), id=analisis_id)
+    try:
+        variacion = float(request.GET.get('variacion', 10)) / 100
+        resultado, desde_cache = sensibilidad_analisis(analisis, variacion)
         return JsonResponse({
             'success': True,
             'analisis_id': str(analisis.id),
-            'message': 'Análisis guardado exitosamente'
+            'defender': {'id': str(analisis.defender.id), 'nombre': analisis.defender.nombre},
+            'challenger': {'id': str(analisis.challenger.id), 'nombre': analisis.challenger.nombre},
+            'desde_cache': desde_cache,
+            **resultado,
         })
-        
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@require_http_methods(["POST"])
+def api_vida_economica(request):
+    """
+    Vida económica (edad de reemplazo de mínimo EAC) de varias máquinas en una
+    sola llamada. Cuerpo JSON: maquina_ids (opcional, por defecto todas), wacc,
+    tax_rate, curva (incluir el EAC de cada edad) y challenger_id opcional para
+    evaluar en cada Defender "conservar k años y luego cambiar".
+    """
+    try:
+        data = json.loads(request.body or '{}')
+        parametros = leer_parametros(data)
+        maquinas = Maquina.objects.order_by('nombre', 'id')
+        if data.get('maquina_ids'):
+            maquinas = maquinas.filter(id__in=data['maquina_ids'])
+        challenger = Maquina.objects.get(id=data['challenger_id']) if data.get('challenger_id') else None
+        maquinas = list(maquinas)
     except Maquina.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Máquina no encontrada'}, status=404)
+    except (TypeError, ValueError, ValidationError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    try:
+        resultado = vida_economica_flota(maquinas, parametros, challenger, curva=bool(data.get('curva')))
+        return JsonResponse({
+            'success': True,
+            'wacc': float(parametros['wacc']),
+            'tax_rate': float(parametros['tax_rate']),
+            **resultado,
+        })
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
-def generar_tabla_amortizacion(analisis):
-    """Generar tabla de amortización para el análisis"""
-    # Calcular el monto del préstamo (costo inicial del challenger)
-    challenger = analisis.challenger
-    P = Decimal('0')
-    
-    # Sumar todos los costos - asegurándonos de que sean Decimal
-    if challenger.purchase_price:
-        P += challenger.purchase_price
-    if challenger.installation_and_training_cost:
-        P += challenger.installation_and_training_cost
-    if challenger.setup_costs:
-        P += challenger.setup_costs
-    
-    # Parámetros del préstamo - convertir a Decimal
-    r = analisis.financing_rate / Decimal('100') / Decimal('12')  # Tasa mensual
-    n = analisis.financing_months
-    
-    if n <= 0 or P <= 0:
-        return
-    
-    # Calcular pago mensual
-    if r == 0:
-        payment = P / Decimal(str(n))
-    else:
-        # Fórmula de pago mensual con Decimal
-        factor = (Decimal('1') + r) ** n
-        payment = P * (r * factor) / (factor - Decimal('1'))
-    
-    # Generar tabla mes a mes
-    balance = P
-    
-    for mes in range(1, n + 1):
-        interest_payment = balance * r
-        principal_payment = payment - interest_payment
-        final_balance = balance - principal_payment
-        
-        TablaAmortizacion.objects.create(
-            analisis=analisis,
-            mes=mes,
-            balance_inicial=balance,
-            pago_mensual=payment,
-            pago_principal=principal_payment,
-            pago_interes=interest_payment,
-            balance_final=max(Decimal('0'), final_balance)  # No permitir balance negativo
+@require_http_methods(["POST"])
+def api_ranking_flota(request):
+    """
+    Ranking de reemplazos de la flota: todos los pares Defender × Challenger (o
+    los de defender_ids / challenger_ids) ordenados por ahorro de EAC ponderado
+    por la criticidad del Defender. Cuerpo JSON: wacc, tax_rate, limite
+    (mejores pares a devolver, por defecto 100).
+    """
+    try:
+        data = json.loads(request.body or '{}')
+        parametros = leer_parametros(data)
+        resultado, desde_cache = flota.ranking_flota(
+            parametros, data.get('defender_ids'), data.get('challenger_ids'),
+            int(data.get('limite', flota.LIMITE_DEFECTO)),
         )
-        
-        balance = final_balance
-        if balance <= 0:
-            break
+    except (TypeError, ValueError, ValidationError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+    return JsonResponse({
+        'success': True,
+        'wacc': float(parametros['wacc']),
+        'tax_rate': float(parametros['tax_rate']),
+        'desde_cache': desde_cache,
+        **resultado,
+    })
+
 
 def calcular_analisis_completo(analisis):
     """Función para calcular el análisis financiero completo"""
-    defender = analisis.defender
-    challenger = analisis.challenger
-    wacc = float(analisis.wacc)
-    tax_rate = float(analisis.tax_rate)
-    
-    # Análisis Defender
-    book_value = float(defender.acquisition_cost or defender.purchase_price or 0)
-    resale_value = float(defender.current_resale_value or 0)
-    tax_on_sale = (resale_value - book_value) * tax_rate
-    after_tax_opportunity_cost = resale_value - tax_on_sale
-    
-    annual_op_ex_defender = float(defender.annual_maintenance_labor_parts or 0) + \
-                          (float(defender.operator_labor_cost or 0) * float(defender.monthly_operating_hours or 0) * 12)
-    
-    life_years_defender = (defender.useful_life or 120) / 12
-    
-    pv_defender = after_tax_opportunity_cost
-    flujos_defender = []
-    
-    for year in range(1, int(life_years_defender) + 1):
-        depreciation = (book_value - float(defender.salvage_value or 0)) / life_years_defender
-        tax_shield = depreciation * tax_rate
-        after_tax_cash_flow = annual_op_ex_defender * (1 - tax_rate) - tax_shield
-        pv = after_tax_cash_flow / ((1 + wacc) ** year)
-        
-        pv_defender += pv
-        flujos_defender.append({
-            'year': year,
-            'cash_flow': annual_op_ex_defender,
-            'depreciation': depreciation,
-            'tax_shield': tax_shield,
-            'after_tax_cash_flow': after_tax_cash_flow,
-            'pv': pv
-        })
-    
-    # Restar valor de salvamento
-    pv_defender -= float(defender.salvage_value or 0) / ((1 + wacc) ** life_years_defender)
-    
-    eac_defender = calcular_eac(pv_defender, life_years_defender, wacc)
-    
-    # Análisis Challenger
-    initial_cost = float(challenger.purchase_price or 0) + \
-                  float(challenger.installation_and_training_cost or 0) + \
-                  float(challenger.setup_costs or 0)
-    
-    annual_op_ex_challenger = float(challenger.annual_maintenance_labor_parts or 0) + \
-                            (float(challenger.operator_labor_cost or 0) * float(challenger.monthly_operating_hours or 0) * 12)
-    
-    life_years_challenger = (challenger.useful_life or 180) / 12
-    depreciable_base = float(challenger.purchase_price or 0) + float(challenger.installation_and_training_cost or 0)
-    
-    pv_challenger = initial_cost
-    flujos_challenger = []
-    
-    for year in range(1, int(life_years_challenger) + 1):
-        depreciation = (depreciable_base - float(challenger.salvage_value or 0)) / life_years_challenger
-        tax_shield = depreciation * tax_rate
-        after_tax_cash_flow = annual_op_ex_challenger * (1 - tax_rate) - tax_shield
-        pv = after_tax_cash_flow / ((1 + wacc) ** year)
-        
-        pv_challenger += pv
-        flujos_challenger.append({
-            'year': year,
-            'cash_flow': annual_op_ex_challenger,
-            'depreciation': depreciation,
-            'tax_shield': tax_shield,
-            'after_tax_cash_flow': after_tax_cash_flow,
-            'pv': pv
-        })
-    
-    # Restar valor de salvamento
-    pv_challenger -= float(challenger.salvage_value or 0) / ((1 + wacc) ** life_years_challenger)
-    
-    eac_challenger = calcular_eac(pv_challenger, life_years_challenger, wacc)
-    
-    return {
-        'pv_defender': Decimal(str(pv_defender)),
-        'eac_defender': Decimal(str(eac_defender)),
-        'pv_challenger': Decimal(str(pv_challenger)),
-        'eac_challenger': Decimal(str(eac_challenger)),
-        'flujos_defender': flujos_defender,
-        'flujos_challenger': flujos_challenger
-    }
+    return analisis_par(analisis.defender, analisis.challenger, analisis.wacc, analisis.tax_rate)
 
 def calcular_eac(pv_costs, life_in_years, wacc):
     """Calcular Equivalent Annual Cost"""
@@ -468,12 +525,43 @@ def api_analisis_guardados(request):
     
     return JsonResponse(data, safe=False)
 
+def pagina_amortizacion(analisis, params):
+    """
+    Filas de la tabla de amortización calculadas bajo demanda. Sin page ni
+    page_size se retorna la tabla completa; con ellos, solo los meses de esa página.
+    """
+    if 'page' not in params and 'page_size' not in params:
+        return list(analisis.filas_amortizacion()), None
+
+    total_items = analisis.financing_months if analisis.pago_mensual > 0 else 0
+    try:
+        page_size = min(max(int(params.get('page_size', 60)), 1), MAX_MESES_FINANCIAMIENTO)
+    except ValueError:
+        page_size = 60
+    total_pages = max((total_items + page_size - 1) // page_size, 1)
+    try:
+        page = min(max(int(params.get('page', 1)), 1), total_pages)
+    except ValueError:
+        page = 1
+
+    desde = (page - 1) * page_size + 1
+    filas = list(analisis.filas_amortizacion(desde, desde + page_size - 1))
+    return filas, {
+        'page': page,
+        'page_size': page_size,
+        'total_items': total_items,
+        'total_pages': total_pages,
+        'has_next': page < total_pages,
+        'has_previous': page > 1,
+    }
+
+
 def api_analisis_detalle(request, analisis_id):
-    """API para obtener detalles de un análisis específico"""
-    analisis = get_object_or_404(AnalisisComparativo, id=analisis_id)
+    """API para obtener detalles de un análisis específico (amortización paginada con page/page_size)"""
+    analisis = get_object_or_404(AnalisisComparativo.objects.select_related('defender', 'challenger'), id=analisis_id)
     
     flujos_caja = list(analisis.flujos_caja.all().values())
-    tabla_amortizacion = list(analisis.tabla_amortizacion.all().values())
+    tabla_amortizacion, paginacion = pagina_amortizacion(analisis, request.GET)
     
     data = {
         'analisis': {
@@ -500,6 +588,8 @@ def api_analisis_detalle(request, analisis_id):
         'flujos_caja': flujos_caja,
         'tabla_amortizacion': tabla_amortizacion,
     }
+    if paginacion:
+        data['paginacion'] = paginacion
     
     return JsonResponse(data)
 
@@ -508,19 +598,50 @@ def dashboard_amortizacion(request):
     return render(request, 'amortizacion_dashboard.html')
 
 def analisis_lista(request):
-    """Obtener lista de análisis únicos"""
+    """
+    Obtener lista de análisis únicos en un número fijo de consultas.
+    Parámetros opcionales: page y page_size (sin ellos se retorna la lista completa)
+    y since (ISO 8601) para traer solo los análisis creados o modificados después;
+    la respuesta incluye ultima_actualizacion para usarla como próximo since.
+    """
     try:
-        # Obtener todos los análisis únicos con información básica
-        analisis = AnalisisComparativo.objects.all()
+        analisis = AnalisisComparativo.objects.select_related('challenger').order_by('-fecha_creacion', 'id')
+
+        since = request.GET.get('since')
+        if since:
+            # Un '+' sin codificar en la zona horaria llega como espacio
+            fecha_since = parse_datetime(since.replace(' ', '+') if 'T' in since else since)
+            if fecha_since is None:
+                return JsonResponse({'error': f'Fecha since no válida: {since}'}, status=400)
+            if timezone.is_naive(fecha_since):
+                fecha_since = timezone.make_aware(fecha_since)
+            analisis = analisis.filter(fecha_actualizacion__gt=fecha_since)
+
+        ultima_actualizacion = analisis.order_by().aggregate(ultima=Max('fecha_actualizacion'))['ultima']
+
+        paginacion = None
+        if 'page' in request.GET or 'page_size' in request.GET:
+            try:
+                page_size = min(max(int(request.GET.get('page_size', 50)), 1), 500)
+            except ValueError:
+                page_size = 50
+            paginator = Paginator(analisis, page_size)
+            pagina = paginator.get_page(request.GET.get('page'))
+            analisis = pagina.object_list
+            paginacion = {
+                'page': pagina.number,
+                'page_size': page_size,
+                'total_items': paginator.count,
+                'total_pages': paginator.num_pages,
+                'has_next': pagina.has_next(),
+                'has_previous': pagina.has_previous(),
+            }
         
         data = []
         for a in analisis:
-            # Calcular pago mensual desde el primer registro de la tabla
-            primer_pago = TablaAmortizacion.objects.filter(analisis=a, mes=1).first()
-            pago_mensual = float(primer_pago.pago_mensual) if primer_pago else 0
-            
-            # Calcular monto del préstamo (balance inicial del primer mes)
-            monto_prestamo = float(primer_pago.balance_inicial) if primer_pago else 0
+            # Pago mensual en forma cerrada (sin consultar la tabla de amortización)
+            pago_mensual = float(a.pago_mensual)
+            monto_prestamo = float(a.principal_prestamo) if pago_mensual else 0
             
             data.append({
                 'id': str(a.id),  # Convertir UUID a string
@@ -532,10 +653,17 @@ def analisis_lista(request):
                 'wacc': float(a.wacc) * 100,  # Convertir a porcentaje para mostrar
                 'tax_rate': float(a.tax_rate) * 100,  # Convertir a porcentaje para mostrar
                 'fecha_creacion': a.fecha_creacion.strftime('%Y-%m-%d %H:%M'),
+                'fecha_actualizacion': a.fecha_actualizacion.isoformat(),
                 'recomendacion': a.recomendacion or 'Pendiente'
             })
         
-        return JsonResponse({'analisis': data})
+        response_data = {
+            'analisis': data,
+            'ultima_actualizacion': ultima_actualizacion.isoformat() if ultima_actualizacion else since,
+        }
+        if paginacion:
+            response_data['paginacion'] = paginacion
+        return JsonResponse(response_data)
     
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -547,22 +675,13 @@ def analisis_detalle(request, analisis_id):
         # Verificar que el análisis existe
         analisis = AnalisisComparativo.objects.get(id=analisis_id)
         
-        # Obtener toda la tabla de amortización ordenada por mes
-        tabla = TablaAmortizacion.objects.filter(analisis=analisis).order_by('mes')
+        # Tabla de amortización calculada bajo demanda (completa o paginada)
+        tabla, paginacion = pagina_amortizacion(analisis, request.GET)
         
-        tabla_data = []
-        for row in tabla:
-            tabla_data.append({
-                'mes': row.mes,
-                'balance_inicial': str(row.balance_inicial),
-                'pago_mensual': str(row.pago_mensual),
-                'pago_principal': str(row.pago_principal),
-                'pago_interes': str(row.pago_interes),
-                'balance_final': str(row.balance_final)
-            })
+        tabla_data = [{campo: valor if campo == 'mes' else str(valor) for campo, valor in fila.items()} for fila in tabla]
         
         # Incluir información del análisis con parámetros reales
-        return JsonResponse({
+        data = {
             'id': str(analisis_id),
             'nombre_analisis': analisis.nombre_analisis,
             'parametros': {
@@ -574,7 +693,10 @@ def analisis_detalle(request, analisis_id):
             'tabla_amortizacion': tabla_data,
             'recomendacion': analisis.recomendacion,
             'fecha_creacion': analisis.fecha_creacion.strftime('%Y-%m-%d %H:%M')
-        })
+        }
+        if paginacion:
+            data['paginacion'] = paginacion
+        return JsonResponse(data)
     
     except AnalisisComparativo.DoesNotExist:
         return JsonResponse({'error': 'Análisis no encontrado'}, status=404)
@@ -655,19 +777,17 @@ def confirmar_eliminacion(request, analisis_id):
 # ==================== VISTAS DE Clientes ====================
 
 def clientes_list(request):
-    """Lista todos los clientes activos con búsqueda opcional"""
-    clientes = Cliente.objects.all()
-    
-    # Implementar búsqueda si hay parámetro 'q'
-    query = request.GET.get('q')
-    if query:
-        clientes = clientes.filter(
-            Q(id__icontains=query) |
-            Q(nombre__icontains=query) |
-            Q(contacto__icontains=query)
-        )
+    """Lista los clientes por páginas (cursor) con búsqueda opcional"""
+    query = request.GET.get('q', '').strip()
+    clientes, siguiente_cursor = _pagina_lista(
+        request, busqueda.filtrar_clientes(Cliente.objects.all(), query), busqueda.ORDEN_CLIENTES
+    )
     
-    return render(request, 'listar_clientes.html', {'clientes': clientes})
+    return render(request, 'listar_clientes.html', {
+        'clientes': clientes,
+        'query': query,
+        'siguiente_cursor': siguiente_cursor,
+    })
 
 def clientes_crear(request):
     """Crear nuevo cliente"""
@@ -821,22 +941,18 @@ def registros_list(request):
     """
     Vista minimalista para listar registros. Los cálculos se delegan a JavaScript.
     """
-    query = request.GET.get('q', '')
+    query = request.GET.get('q', '').strip()
     
-    # Query base optimizada que se ordena por defecto según el Meta del modelo
-    registros_qs = Registro.objects.select_related('cliente')
-
-    # Filtra solo si hay un término de búsqueda
-    if query:
-        registros_qs = registros_qs.filter(
-            Q(id__icontains=query) |
-            Q(cliente__nombre__icontains=query) |
-            Q(estado_cobro__icontains=query)
-        )
+    # Página por cursor en el orden del Meta del modelo (más recientes primero)
+    registros_qs = Registro.objects.select_related('cliente').prefetch_related('pagos_cliente')
+    registros, siguiente_cursor = _pagina_lista(
+        request, busqueda.filtrar_registros(registros_qs, query), busqueda.ORDEN_REGISTROS
+    )
 
     context = {
-        'registros': registros_qs,
+        'registros': registros,
         'query': query,
+        'siguiente_cursor': siguiente_cursor,
     }
 
     return render(request, 'listar_registros.html', context)
@@ -848,33 +964,13 @@ def registros_crear(request):
     if request.method != 'POST':
         form = RegistroForm()
         
-        # 1. PREPARAR DATOS PARA EL FRONTEND (CAMBIO PRINCIPAL)
-        # Se obtienen los términos de todos los clientes y proveedores para inyectarlos en el script.
-        # Esto es más eficiente que hacer múltiples llamadas AJAX.
-        
-        clientes = Cliente.objects.filter()
-        clientes_data = {
-            str(c.id): {
-                'nombre': c.nombre,
-                'terminos': c.terminos_contractuales
-            } for c in clientes
-        }
-
-        proveedores = Proveedor.objects.filter()
-        proveedores_data = {
-            str(p.id): {
-                'nombre': p.nombre,
-                'terminos': p.terminos_pago
-            } for p in proveedores
-        }
-
+        # Los términos de clientes y proveedores no se incrustan en la página: el
+        # script los pide a api_catalogo_terminos (cacheable con ETag) y busca
+        # clientes con api_buscar_catalogo.
         context = {
             'form': form,
             'fecha_hoy': date.today().isoformat(),
             'metodos_pago': Registro.METODO_PAGO_CHOICES,
-            # Convertir los diccionarios a JSON para que JS los pueda leer
-            'clientes_data': json.dumps(clientes_data),
-            'proveedores_data': json.dumps(proveedores_data),
         }
         # Asegúrate que el nombre del template sea el correcto
         return render(request, 'crear_registros.html', context)
@@ -946,15 +1042,14 @@ def registros_crear(request):
                 pagos_cliente_procesados = [{'id': i + 1, **pago} for i, pago in enumerate(pagos_cliente) if pago.get('monto')]
                 pagos_proveedor_procesados = [{'id': i + 1, **pago} for i, pago in enumerate(pagos_proveedor) if pago.get('monto')]
                 
-                # Asignar datos procesados
-                registro.obligaciones_data = obligaciones_procesadas
-                registro.pagos_cliente_data = pagos_cliente_procesados
-                registro.pagos_proveedor_data = pagos_proveedor_procesados
-                
                 # El método save() del modelo se encargará de la fecha_limite_cobro del cliente
                 registro.save() 
-                if registro.cliente:
-                    registro.cliente.actualizar_dias_promedio_pago()
+                
+                # Guardar obligaciones y pagos en sus tablas
+                # Registro.save() ajusta los días promedio de pago del cliente
+                registro.reemplazar_movimientos(
+                    obligaciones_procesadas, pagos_cliente_procesados, pagos_proveedor_procesados
+                )
                 messages.success(request, f'Registro {registro.id} creado exitosamente.')
                 return redirect('registros_list')
                 
@@ -983,23 +1078,6 @@ def registros_editar(request, id):
     if request.method != 'POST':
         form = RegistroForm(instance=registro)
         
-        # Preparar datos para el frontend
-        clientes = Cliente.objects.filter()
-        clientes_data = {
-            str(c.id): {
-                'nombre': c.nombre,
-                'terminos': c.terminos_contractuales
-            } for c in clientes
-        }
-
-        proveedores = Proveedor.objects.filter()
-        proveedores_data = {
-            str(p.id): {
-                'nombre': p.nombre,
-                'terminos': p.terminos_pago
-            } for p in proveedores
-        }
-
         # Preparar datos existentes del registro para el frontend
         registro_data = {
             'obligaciones': registro.obtener_obligaciones(),
@@ -1012,8 +1090,6 @@ def registros_editar(request, id):
             'registro': registro,
             'fecha_hoy': date.today().isoformat(),
             'metodos_pago': Registro.METODO_PAGO_CHOICES,
-            'clientes_data': json.dumps(clientes_data),
-            'proveedores_data': json.dumps(proveedores_data),
             'registro_data': json.dumps(registro_data),
             'es_edicion': True,
         }
@@ -1098,20 +1174,17 @@ def registros_editar(request, id):
                             pago_procesado['id'] = max_id + 1
                         pagos_proveedor_procesados.append(pago_procesado)
                 
-                # Actualizar datos del registro
-                registro_actualizado.obligaciones_data = obligaciones_procesadas
-                registro_actualizado.pagos_cliente_data = pagos_cliente_procesados
-                registro_actualizado.pagos_proveedor_data = pagos_proveedor_procesados
-                
                 # Guardar registro actualizado
                 registro_actualizado.save()
                 
-                # Actualizar estado de cobro automáticamente
-                registro_actualizado.actualizar_estado_cobro()
+                # Actualizar obligaciones y pagos en sus tablas
+                registro_actualizado.reemplazar_movimientos(
+                    obligaciones_procesadas, pagos_cliente_procesados, pagos_proveedor_procesados
+                )
                 
-                # Actualizar días promedio de pago del cliente
-                if registro_actualizado.cliente:
-                    registro_actualizado.cliente.actualizar_dias_promedio_pago()
+                # Actualizar estado de cobro automáticamente (los días promedio de pago
+                # del cliente se ajustan en Registro.save())
+                registro_actualizado.actualizar_estado_cobro()
                     
                 messages.success(request, f'Registro {registro_actualizado.id} actualizado exitosamente.')
                 return redirect('registros_list')
@@ -1176,6 +1249,56 @@ def obtener_terminos_proveedor(request, proveedor_id):
             'error': 'Error al obtener datos del proveedor'
         })
 
+# ==================== BÚSQUEDA COMBINADA ====================
+
+@require_http_methods(["GET"])
+def api_buscar(request):
+    """
+    Búsqueda combinada en registros, clientes y máquinas, ordenada por relevancia.
+    Parámetros: q, tipo (repetible: registros, clientes, maquinas). Retorna a lo
+    sumo busqueda.TAMANO_BUSQUEDA resultados.
+    """
+    try:
+        resultados = busqueda.buscar(request.GET.get('q', ''), request.GET.getlist('tipo'))
+        return JsonResponse({
+            'success': True,
+            'resultados': resultados,
+            'tamano_pagina': busqueda.TAMANO_BUSQUEDA,
+        })
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+# ==================== CATÁLOGOS (TÉRMINOS Y BÚSQUEDA) ====================
+
+@require_http_methods(["GET"])
+@condition(etag_func=lambda request: catalogos.version())
+def api_catalogo_terminos(request):
+    """
+    Términos de pago de todos los clientes y proveedores. La respuesta lleva como
+    ETag la versión del catálogo: el navegador la revalida con If-None-Match y
+    recibe 304 mientras ningún cliente o proveedor cambie.
+    """
+    response = JsonResponse(catalogos.terminos())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@require_http_methods(["GET"])
+def api_buscar_catalogo(request, tipo):
+    """Búsqueda (typeahead) de clientes o proveedores por nombre o ID"""
+    try:
+        limite = min(max(int(request.GET.get('limit', catalogos.LIMITE_BUSQUEDA)), 1), 100)
+        resultados = catalogos.buscar(tipo, request.GET.get('q', ''), limite)
+        return JsonResponse({'success': True, 'resultados': resultados})
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
 # ==================== FLUJO DE CAJA ====================
 
 def flujo_caja_view(request, registro_id):
@@ -1321,7 +1444,7 @@ def calcular_flujo_caja(request):
             'id': registro.id,
             'cliente': registro.cliente.nombre,
             'valor_cobrar': float(registro.valor_cobrar_cliente),
-            'saldo_pendiente': float(registro.calcular_saldo_pendiente_cliente()),
+            'saldo_pendiente': float(registro.saldo_pendiente),
         }
     })
 
@@ -1333,9 +1456,9 @@ def obtener_datos_dashboard(request, registro_id):
     
     # Calcular métricas principales
     valor_cobrar = float(registro.valor_cobrar_cliente)
-    saldo_pendiente = float(registro.calcular_saldo_pendiente_cliente())
-    total_obligaciones = float(registro.calcular_total_obligaciones())
-    margen_bruto = float(registro.margen_bruto) if hasattr(registro, 'margen_bruto') else 0
+    saldo_pendiente = float(registro.saldo_pendiente)
+    total_obligaciones = float(registro.total_obligaciones_pendientes)
+    margen_bruto = float(registro.margen_bruto)
     
     # Calcular porcentajes
     porcentaje_cobrado = ((valor_cobrar - saldo_pendiente) / valor_cobrar * 100) if valor_cobrar > 0 else 0
@@ -1372,187 +1495,112 @@ def obtener_datos_dashboard(request, registro_id):
         }
     })
 
+@require_http_methods(["GET"])
 def exportar_reporte_flujo(request, registro_id):
     """
-    Vista para exportar el reporte de flujo de caja
+    Reporte de flujo de caja de un registro. ?format=json (por defecto), pdf o xlsx.
+    Los archivos PDF y XLSX se sirven desde la caché en disco mientras el registro
+    no cambie (ver core.reportes).
     """
-    registro = get_object_or_404(Registro, pk=registro_id)
-    
-    # Aquí implementarías la lógica para generar PDF, Excel, etc.
-    # Por ahora retornamos un JSON con los datos
-    
-    obligaciones = []
-    for obl in registro.obtener_obligaciones():
-        pagos = registro.obtener_pagos_de_obligacion(obl.get('id'))
-        pagado = sum([float(p.get('monto', 0)) for p in pagos])
-        total = float(obl.get('valor_pagar', 0))
-        
-        obligaciones.append({
-            'proveedor': obl.get('proveedor_nombre', 'N/A'),
-            'valor_total': total,
-            'pagado': pagado,
-            'saldo': total - pagado,
-            'fecha_vencimiento': str(obl.get('fecha_vencimiento', '')),
-            'descripcion': obl.get('descripcion', ''),
+    registro = get_object_or_404(Registro.objects.select_related('cliente'), pk=registro_id)
+    formato = request.GET.get('format', 'json')
+
+    if formato == 'json':
+        return JsonResponse({
+            'success': True,
+            'data': reportes.datos_reporte_flujo(registro),
+            'message': 'Reporte generado exitosamente'
         })
-    
-    data = {
-        'registro': {
-            'id': registro.id,
-            'cliente': registro.cliente.nombre,
-            'fecha_entrega': str(registro.fecha_entrega_cliente),
-            'valor_cobrar': float(registro.valor_cobrar_cliente),
-            'saldo_pendiente': float(registro.calcular_saldo_pendiente_cliente()),
-        },
-        'obligaciones': obligaciones,
-        'pagos_cliente': [
-            {
-                'fecha': str(p.get('fecha_pago', '')),
-                'monto': float(p.get('monto', 0)),
-                'metodo': p.get('metodo_pago', ''),
-                'referencia': p.get('referencia', ''),
-            }
-            for p in registro.obtener_pagos_cliente()
-        ],
-        'pagos_proveedor': [
-            {
-                'fecha': str(p.get('fecha_pago', '')),
-                'monto': float(p.get('monto', 0)),
-                'metodo': p.get('metodo_pago', ''),
-                'obligacion_id': p.get('obligacion_id', ''),
-            }
-            for p in registro.obtener_pagos_proveedor()
-        ],
-    }
-    
+
+    try:
+        ruta = reportes.archivo_reporte(registro, formato)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return FileResponse(
+        open(ruta, 'rb'), as_attachment=True, content_type=reportes.FORMATOS_REPORTE[formato],
+        filename=f"flujo_caja_{registro.pk}.{formato}",
+    )
+
+# Equivalencias aceptadas para el parámetro 'agrupacion'
+AGRUPACIONES_FLUJO = {'day': 'dia', 'week': 'semana', 'month': 'mes'}
+
+def flujo_caja_cartera_api(request):
+    """
+    API endpoint con la proyección de flujo de caja de toda la cartera: saldos por
+    cobrar de los registros y saldos por pagar de las obligaciones.
+    Parámetros: fecha_inicio, fecha_fin, agrupacion (dia|semana|mes) y saldo_inicial.
+    """
+    inicio_defecto, fin_defecto = rango_por_defecto()
+    agrupacion = request.GET.get('agrupacion', 'dia')
+    agrupacion = AGRUPACIONES_FLUJO.get(agrupacion, agrupacion)
+
+    try:
+        # parse_date lanza ValueError con fechas bien formadas pero imposibles (2025-02-30)
+        fecha_inicio = parse_date(request.GET.get('fecha_inicio') or '') or inicio_defecto
+        fecha_fin = parse_date(request.GET.get('fecha_fin') or '') or fin_defecto
+        saldo_inicial = Decimal(request.GET.get('saldo_inicial') or '0')
+        # NaN, Infinity o valores que desbordan el float darían JSON no válido
+        if not saldo_inicial.is_finite() or not math.isfinite(float(saldo_inicial)):
+            raise ValueError(f"Valor no válido para saldo_inicial: {request.GET.get('saldo_inicial')}")
+        proyeccion = proyectar_flujo_cartera(fecha_inicio, fecha_fin, agrupacion, saldo_inicial)
+    except (ValueError, ArithmeticError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
     return JsonResponse({
         'success': True,
-        'data': data,
-        'message': 'Reporte generado exitosamente'
+        'agrupacion': agrupacion,
+        'fecha_inicio': fecha_inicio.isoformat(),
+        'fecha_fin': fecha_fin.isoformat(),
+        'data': proyeccion['periodos'],
+        'resumen': proyeccion['resumen'],
     })
 
 # ================= IMPORTAR REGISTROS ==================
 
+# Máximo de errores por fila que devuelve la API de estado de importación
+MAX_ERRORES_IMPORTACION = 200
+
 def cargar_excel_completo(request):
+    """
+    Recibe el libro Excel completo (clientes, proveedores, registros, obligaciones
+    y pagos) y lo encola como TrabajoImportacion para procesarlo en segundo plano.
+    Las peticiones AJAX reciben el id del trabajo y la URL para consultar su progreso.
+    """
     if request.method == "POST" and request.FILES.get("archivo_excel"):
-        archivo = request.FILES["archivo_excel"]
         try:
-            wb = openpyxl.load_workbook(archivo)
-
-            # === 1. CLIENTES ===
-            if "Clientes" in wb.sheetnames:
-                hoja_clientes = wb["Clientes"]
-                for fila in list(hoja_clientes.iter_rows(min_row=2, values_only=True)):
-                    (id_cliente, nombre, city, email, telefono,
-                     terminos, avg_dias, activo, observaciones) = fila
-                    if not Cliente.objects.filter(id=id_cliente).exists():
-                        Cliente.objects.create(
-                            id=id_cliente,
-                            nombre=nombre,
-                            city=city,
-                            email=email,
-                            telefono=telefono,
-                            terminos_contractuales=int(terminos),
-                            average_days_to_pay=int(avg_dias),
-                            activo=bool(activo),
-                            observaciones=observaciones or ""
-                        )
-
-            # === 2. PROVEEDORES ===
-            if "Proveedores" in wb.sheetnames:
-                hoja_prov = wb["Proveedores"]
-                for fila in list(hoja_prov.iter_rows(min_row=2, values_only=True)):
-                    (id_prov, nombre, contacto, email, telefono,
-                     terminos, tipo_mp, activo, observaciones) = fila
-                    if not Proveedor.objects.filter(id=id_prov).exists():
-                        Proveedor.objects.create(
-                            id=id_prov,
-                            nombre=nombre,
-                            contacto=contacto,
-                            email=email,
-                            telefono=telefono,
-                            terminos_pago=int(terminos),
-                            tipo_materia_prima=tipo_mp,
-                            activo=bool(activo),
-                            observaciones=observaciones or ""
-                        )
-
-            # === 3. REGISTROS ===
-            hoja_registros = wb["Registros"]
-            for fila in list(hoja_registros.iter_rows(min_row=2, values_only=True)):
-                id_registro, cliente_id, fecha_entrega, valor_cobrar, estado_cobro, observaciones = fila
-                try:
-                    cliente = Cliente.objects.get(id=cliente_id)
-                    if not Registro.objects.filter(id=id_registro).exists():
-                        Registro.objects.create(
-                            id=id_registro,
-                            cliente=cliente,
-                            fecha_entrega_cliente=fecha_entrega if isinstance(fecha_entrega, datetime) else datetime.strptime(fecha_entrega, "%Y-%m-%d").date(),
-                            valor_cobrar_cliente=Decimal(valor_cobrar),
-                            estado_cobro=estado_cobro,
-                            observaciones=observaciones or ""
-                        )
-                except Exception as e:
-                    messages.error(request, f"Registro {id_registro}: {str(e)}")
-
-            # === 4. OBLIGACIONES ===
-            hoja_obl = wb["Obligaciones"]
-            for fila in list(hoja_obl.iter_rows(min_row=2, values_only=True)):
-                registro_id, proveedor_id, proveedor_nombre, valor_pagar, fecha_vencimiento, descripcion, referencia = fila
-                try:
-                    registro = Registro.objects.get(id=registro_id)
-                    registro.agregar_obligacion(
-                        proveedor_nombre=proveedor_nombre,
-                        valor_pagar=Decimal(valor_pagar),
-                        fecha_vencimiento=fecha_vencimiento,
-                        proveedor_id=proveedor_id,
-                        descripcion=descripcion or "",
-                        referencia=referencia or ""
-                    )
-                except Exception as e:
-                    messages.error(request, f"Obligación para registro {registro_id}: {str(e)}")
-
-            # === 5. PAGOS CLIENTE ===
-            hoja_pc = wb["Pagos_Cliente"]
-            for fila in list(hoja_pc.iter_rows(min_row=2, values_only=True)):
-                registro_id, monto, fecha_pago, metodo_pago, referencia, observaciones = fila
-                try:
-                    registro = Registro.objects.get(id=registro_id)
-                    registro.agregar_pago_cliente(
-                        monto=Decimal(monto),
-                        fecha_pago=fecha_pago,
-                        metodo_pago=metodo_pago or "transferencia",
-                        referencia=referencia or "",
-                        observaciones=observaciones or ""
-                    )
-                except Exception as e:
-                    messages.error(request, f"Pago cliente {registro_id}: {str(e)}")
-
-            # === 6. PAGOS PROVEEDOR ===
-            hoja_pp = wb["Pagos_Proveedor"]
-            for fila in list(hoja_pp.iter_rows(min_row=2, values_only=True)):
-                registro_id, obligacion_id, monto, fecha_pago, metodo_pago, referencia, observaciones = fila
-                try:
-                    registro = Registro.objects.get(id=registro_id)
-                    registro.agregar_pago_proveedor(
-                        obligacion_id=int(obligacion_id),
-                        monto=Decimal(monto),
-                        fecha_pago=fecha_pago,
-                        metodo_pago=metodo_pago or "transferencia",
-                        referencia=referencia or "",
-                        observaciones=observaciones or ""
-                    )
-                except Exception as e:
-                    messages.error(request, f"Pago proveedor {registro_id}: {str(e)}")
-
-            messages.success(request, "Archivo importado correctamente.")
-
+            trabajo = crear_trabajo_importacion(request.FILES["archivo_excel"])
         except Exception as e:
+            if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                return JsonResponse({'success': False, 'error': str(e)}, status=500)
             messages.error(request, f"Error general: {str(e)}")
+            return redirect("cargar_excel_completo")
 
-        return redirect("cargar_excel_completo")
+        estado_url = reverse('estado_importacion', args=[trabajo.pk])
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return JsonResponse({
+                'success': True,
+                'trabajo_id': str(trabajo.pk),
+                'estado_url': estado_url,
+            }, status=202)
 
-    return render(request, "cargar_excel_completo.html")
+        messages.info(request, f"Importación de {trabajo.nombre_archivo} en proceso.")
+        return redirect(f"{reverse('cargar_excel_completo')}?trabajo={trabajo.pk}")
+
+    trabajo_estado_url = None
+    trabajo_id = request.GET.get('trabajo')
+    try:
+        if trabajo_id and TrabajoImportacion.objects.filter(pk=trabajo_id).exists():
+            trabajo_estado_url = reverse('estado_importacion', args=[trabajo_id])
+    except ValidationError:
+        pass  # ID de trabajo mal formado
+    return render(request, "cargar_excel_completo.html", {'trabajo_estado_url': trabajo_estado_url})
+
+def estado_importacion(request, trabajo_id):
+    """API endpoint con el estado y el progreso de un trabajo de importación"""
+    trabajo = get_object_or_404(TrabajoImportacion.objects.defer('contenido'), pk=trabajo_id)
+    data = trabajo.como_dict()
+    data['errores'] = data['errores'][:MAX_ERRORES_IMPORTACION]
+    return JsonResponse({'success': True, 'trabajo': data})
 
 # ================= CXC ==================
 
@@ -1576,14 +1624,9 @@ def cuentas_por_cobrar(request):
     total_pagado = Decimal('0')
     
     for registro in registros:
-        # Calcular saldo pendiente
-        saldo_pendiente = registro.calcular_saldo_pendiente_cliente()
-        
-        # Calcular total pagado por el cliente
-        pagos_realizados = sum(
-            Decimal(str(pago.get('monto', 0))) 
-            for pago in registro.obtener_pagos_cliente()
-        )
+        # Saldo pendiente y total pagado (columnas materializadas)
+        saldo_pendiente = registro.saldo_pendiente
+        pagos_realizados = registro.total_cobrado
         
         # Calcular días de vencimiento
         dias_vencimiento = registro.dias_vencimiento or 0
@@ -1725,62 +1768,173 @@ def clasificar_pagos_por_antiguedad(pagos_obligacion, fecha_inicio_obligacion):
             
     return rangos
 
-# --- API Endpoint ACTUALIZADA ---
+# Ordenamientos permitidos en la API de CxP (campo de la respuesta -> campo del queryset)
+ORDEN_CXP = {
+    'netDueDate': 'fecha_vencimiento',
+    'postingDate': 'fecha_creacion',
+    'vendorName': 'proveedor_nombre',
+    'originalAmount': 'valor_pagar',
+    'netBalance': 'saldo',
+    'paidAmount': 'pagado',
+    'overdueDays': '-fecha_vencimiento',
+}
+
+# Máximo de nombres de proveedor para el filtro de la API de CxP (se acotan con 'vendor_q')
+MAX_PROVEEDORES_CXP = 100
+
+# Rangos de días vencidos aceptados por el parámetro 'status' (desde, hasta)
+RANGOS_VENCIMIENTO_CXP = {
+    '0-30': (1, 30),
+    '31-60': (31, 60),
+    '61-90': (61, 90),
+    '91+': (91, None),
+}
+
+def obligaciones_cxp_filtradas(params, hoy=None):
+    """
+    Retorna el queryset de obligaciones con saldo pendiente aplicando los filtros
+    de la API de Cuentas por Pagar: vendor, overdue_only, status, due_from,
+    due_to, min_balance y sort.
+    """
+    hoy = hoy or date.today()
+    obligaciones = Obligacion.objects.con_saldo().filter(saldo__gt=0)
+
+    vendor = params.get('vendor')
+    if vendor:
+        obligaciones = obligaciones.filter(Q(proveedor_nombre=vendor) | Q(proveedor_id=vendor))
+
+    if params.get('overdue_only', '').lower() in ('1', 'true', 'si', 'sí', 'yes'):
+        obligaciones = obligaciones.filter(fecha_vencimiento__lt=hoy)
+
+    status = params.get('status')
+    if status == 'current':
+        obligaciones = obligaciones.filter(Q(fecha_vencimiento__gte=hoy) | Q(fecha_vencimiento__isnull=True))
+    elif status == 'overdue':
+        obligaciones = obligaciones.filter(fecha_vencimiento__lt=hoy)
+    elif status in RANGOS_VENCIMIENTO_CXP:
+        desde, hasta = RANGOS_VENCIMIENTO_CXP[status]
+        obligaciones = obligaciones.filter(fecha_vencimiento__lte=hoy - timedelta(days=desde))
+        if hasta is not None:
+            obligaciones = obligaciones.filter(fecha_vencimiento__gte=hoy - timedelta(days=hasta))
+
+    due_from = parse_date(params.get('due_from') or '')
+    if due_from:
+        obligaciones = obligaciones.filter(fecha_vencimiento__gte=due_from)
+    due_to = parse_date(params.get('due_to') or '')
+    if due_to:
+        obligaciones = obligaciones.filter(fecha_vencimiento__lte=due_to)
+
+    try:
+        min_balance = Decimal(params.get('min_balance') or '0')
+    except ArithmeticError:
+        min_balance = Decimal('0')
+    if min_balance > 0:
+        obligaciones = obligaciones.filter(saldo__gte=min_balance)
+
+    sort = params.get('sort') or 'netDueDate'
+    campo = ORDEN_CXP.get(sort.lstrip('-'), 'fecha_vencimiento')
+    descendente = sort.startswith('-') != campo.startswith('-')
+    campo = F(campo.lstrip('-'))
+    orden = campo.desc(nulls_last=True) if descendente else campo.asc(nulls_last=True)
+    return obligaciones.order_by(orden, 'registro_id', 'numero')
+
+def totales_cxp(obligaciones, hoy=None):
+    """Totales de CxP calculados en la base de datos sobre todo el conjunto filtrado"""
+    hoy = hoy or date.today()
+    totales = obligaciones.order_by().aggregate(
+        total_items=Count('id'),
+        totalOriginal=Sum('valor_pagar'),
+        totalPending=Sum('saldo'),
+        totalPaid=Sum('pagado'),
+        totalOverdue=Sum('saldo', filter=Q(fecha_vencimiento__lt=hoy)),
+    )
+    return {k: (v if k == 'total_items' else float(v or 0)) for k, v in totales.items()}
+
+def serializar_obligacion_cxp(obligacion, pagos, hoy=None):
+    """Construye el item de la API de CxP para una obligación anotada con con_saldo()"""
+    hoy = hoy or date.today()
+    overdue_days = 0
+    if obligacion.fecha_vencimiento:
+        overdue_days = max((hoy - obligacion.fecha_vencimiento).days, 0)
+
+    # Día 0 de la obligación: su fecha de creación
+    fecha_inicio = obligacion.fecha_creacion
+    rangos_de_pagos = clasificar_pagos_por_antiguedad(pagos, fecha_inicio)
+
+    return {
+        'id': f"{obligacion.registro_id}-{obligacion.numero}",
+        'vendorName': obligacion.proveedor_nombre or 'Desconocido',
+        'documentNumber': f"FAC-{obligacion.registro_id}-{obligacion.numero}",
+        'postingDate': fecha_inicio.isoformat() if fecha_inicio else None,
+        'netDueDate': obligacion.fecha_vencimiento.isoformat() if obligacion.fecha_vencimiento else None,
+        'originalAmount': float(obligacion.valor_pagar),
+        'netBalance': float(obligacion.saldo),
+        'paidAmount': float(obligacion.pagado),
+        'overdueDays': overdue_days,
+        'isOverdue': overdue_days > 0,
+        'description': obligacion.descripcion,
+        **rangos_de_pagos  # Añadir los rangos de pagos
+    }
+
+def pagos_por_obligacion(obligaciones):
+    """Agrupa en una sola consulta los pagos (como diccionario) de las obligaciones dadas"""
+    pagos = {}
+    for pago in PagoProveedor.objects.filter(obligacion__in=obligaciones).select_related('obligacion'):
+        pagos.setdefault(pago.obligacion_id, []).append(pago.como_dict())
+    return pagos
+
+# --- API Endpoint con paginación, filtros y ordenamiento en servidor ---
 def cuentas_por_pagar_api(request):
-    """API endpoint para obtener los datos consolidados de Cuentas por Pagar."""
+    """
+    API endpoint para obtener los datos consolidados de Cuentas por Pagar.
+    Parámetros: page, page_size, vendor, overdue_only, status, due_from, due_to,
+    min_balance y sort (nombre de campo de la respuesta, con '-' para descendente).
+    Los totales se calculan sobre todo el conjunto filtrado, no solo la página.
+    'proveedores' trae a lo sumo MAX_PROVEEDORES_CXP nombres con saldo que
+    contienen 'vendor_q'; 'proveedores_truncado' indica si hay más.
+    """
     try:
-        registros = Registro.objects.all()
-        cxp_data = []
+        hoy = date.today()
+        obligaciones = obligaciones_cxp_filtradas(request.GET, hoy)
 
-        for registro in registros:
-            for obligacion in registro.obtener_obligaciones():
-                valor_original = Decimal(str(obligacion.get('valor_pagar', 0)))
-                pagos_obligacion = registro.obtener_pagos_de_obligacion(obligacion.get('id'))
-                pagos_realizados = sum(Decimal(str(pago.get('monto', 0))) for pago in pagos_obligacion)
-                saldo_pendiente = valor_original - pagos_realizados
-                
-                if saldo_pendiente <= 0:
-                    continue
-                
-                # --- Lógica de Vencimiento (para la columna 'Estado') ---
-                fecha_vencimiento_str = obligacion.get('fecha_vencimiento')
-                overdue_days = 0
-                net_due_date = None
-                if fecha_vencimiento_str:
-                    try:
-                        fecha_vencimiento = datetime.strptime(fecha_vencimiento_str, '%Y-%m-%d').date()
-                        net_due_date = fecha_vencimiento.isoformat()
-                        dias_vencidos = (date.today() - fecha_vencimiento).days
-                        overdue_days = dias_vencidos if dias_vencidos > 0 else 0
-                    except (ValueError, TypeError): pass
-
-                # --- Lógica de Pagos por Antigüedad (la nueva lógica) ---
-                fecha_inicio_str = obligacion.get('fecha_creacion', registro.fecha_creacion.date().isoformat())
-                fecha_inicio = None
-                try:
-                    fecha_inicio = datetime.fromisoformat(fecha_inicio_str).date()
-                except: pass
-
-                rangos_de_pagos = clasificar_pagos_por_antiguedad(pagos_obligacion, fecha_inicio)
-
-                # Construir el objeto para la API
-                cxp_item = {
-                    'id': f"{registro.id}-{obligacion.get('id')}",
-                    'vendorName': obligacion.get('proveedor_nombre', 'Desconocido'),
-                    'documentNumber': f"FAC-{registro.id}-{obligacion.get('id')}",
-                    'postingDate': fecha_inicio.isoformat() if fecha_inicio else None,
-                    'netDueDate': net_due_date,
-                    'originalAmount': float(valor_original),
-                    'netBalance': float(saldo_pendiente),
-                    'paidAmount': float(pagos_realizados),
-                    'overdueDays': overdue_days,
-                    'isOverdue': overdue_days > 0,
-                    'description': obligacion.get('descripcion', 'N/A'),
-                    **rangos_de_pagos  # Añadir los rangos de pagos
-                }
-                cxp_data.append(cxp_item)
+        try:
+            page_size = min(max(int(request.GET.get('page_size', 50)), 1), 500)
+        except ValueError:
+            page_size = 50
+        paginator = Paginator(obligaciones, page_size)
+        pagina = paginator.get_page(request.GET.get('page'))
+
+        obligaciones_pagina = list(pagina.object_list)
+        pagos = pagos_por_obligacion(obligaciones_pagina)
+        cxp_data = [
+            serializar_obligacion_cxp(obligacion, pagos.get(obligacion.pk, []), hoy)
+            for obligacion in obligaciones_pagina
+        ]
+
+        proveedores = Obligacion.objects.con_saldo().filter(saldo__gt=0).exclude(proveedor_nombre='')
+        vendor_q = (request.GET.get('vendor_q') or '').strip()
+        if vendor_q:
+            proveedores = proveedores.filter(proveedor_nombre__icontains=vendor_q)
+        proveedores = list(proveedores.order_by('proveedor_nombre').values_list(
+            'proveedor_nombre', flat=True
+        ).distinct()[:MAX_PROVEEDORES_CXP + 1])
 
-        response_data = {'success': True, 'cxp_data': cxp_data, 'fecha_reporte': timezone.now().isoformat()}
+        response_data = {
+            'success': True,
+            'cxp_data': cxp_data,
+            'totales': totales_cxp(obligaciones, hoy),
+            'paginacion': {
+                'page': pagina.number,
+                'page_size': page_size,
+                'total_items': paginator.count,
+                'total_pages': paginator.num_pages,
+                'has_next': pagina.has_next(),
+                'has_previous': pagina.has_previous(),
+            },
+            'proveedores': proveedores[:MAX_PROVEEDORES_CXP],
+            'proveedores_truncado': len(proveedores) > MAX_PROVEEDORES_CXP,
+            'fecha_reporte': timezone.now().isoformat(),
+        }
         return JsonResponse(response_data)
         
     except Exception as e:
@@ -1833,11 +1987,57 @@ def clasificar_cobros_por_antiguedad(pagos_cliente, fecha_inicio):
             
     return rangos
 
-# --- API ENDPOINT PARA CUENTAS POR COBRAR (CORREGIDA) ---
+def registros_cxc_filtrados(params, hoy=None):
+    """
+    Retorna el queryset de registros con saldo por cobrar, anotado con con_cobros(),
+    aplicando los filtros de Cuentas por Cobrar: cliente (nombre o id) y estado
+    ('vencido' o 'aldia').
+    """
+    hoy = hoy or date.today()
+    registros = Registro.objects.select_related('cliente').filter(saldo_pendiente__gt=0)
+
+    cliente = params.get('cliente')
+    if cliente:
+        registros = registros.filter(Q(cliente__nombre=cliente) | Q(cliente_id=cliente))
+
+    vencido = Q(fecha_limite_cobro__lt=hoy) & ~Q(estado_cobro='pagado_total')
+    estado = params.get('estado')
+    if estado == 'vencido':
+        registros = registros.filter(vencido)
+    elif estado == 'aldia':
+        registros = registros.exclude(vencido)
+
+    return registros.con_cobros(hoy).order_by('-fecha_creacion', 'id')
+
+def serializar_registro_cxc(registro):
+    """Construye el item de la API de CxC para un registro anotado con con_cobros()"""
+    # El día 0 es la fecha de entrega al cliente
+    fecha_inicio = registro.fecha_entrega_cliente
+    return {
+        'registro_id': registro.id,
+        'cliente_nombre': registro.cliente.nombre if registro.cliente else "N/A",
+        'fecha_entrega': fecha_inicio.isoformat() if fecha_inicio else None,
+        'fecha_vencimiento': registro.fecha_limite_cobro.isoformat() if registro.fecha_limite_cobro else None,
+        'dias_vencidos': registro.dias_vencidos.days,
+        'esta_vencido': bool(registro.vencido),
+        'valor_original': float(registro.valor_cobrar_cliente),
+        'saldo_pendiente': float(registro.saldo_pendiente),
+        'total_cobrado': float(registro.total_cobrado),
+        'estado_cobro': registro.get_estado_cobro_display(),
+        **{rango: float(getattr(registro, rango)) for rango, _, _ in Registro.RANGOS_COBRO},
+    }
+
+# --- API ENDPOINT PARA CUENTAS POR COBRAR ---
 def cuentas_por_cobrar_api(request):
-    """API endpoint para obtener los datos consolidados de Cuentas por Cobrar."""
+    """
+    API endpoint para obtener los datos consolidados de Cuentas por Cobrar.
+    Parámetros opcionales: cliente y estado (ver registros_cxc_filtrados).
+    Los saldos se leen de las columnas materializadas del registro; días vencidos y
+    cobros por antigüedad se calculan en la base de datos (Registro.objects.con_cobros()),
+    con la misma lógica que clasificar_cobros_por_antiguedad.
+    """
     try:
-        registros = Registro.objects.select_related('cliente').all()
+        registros = registros_cxc_filtrados(request.GET)
         cxc_data = []
         
         resumen = {
@@ -1847,43 +2047,10 @@ def cuentas_por_cobrar_api(request):
         }
 
         for registro in registros:
-            saldo_pendiente = registro.calcular_saldo_pendiente_cliente()
-
-            if saldo_pendiente <= 0:
-                continue
-
-            valor_original = registro.valor_cobrar_cliente
-            total_cobrado = valor_original - saldo_pendiente
-            
-            resumen['total_facturado'] += valor_original
-            resumen['total_saldo_pendiente'] += saldo_pendiente
-            resumen['total_cobrado'] += total_cobrado
-            
-            dias_vencidos = 0
-            if registro.esta_vencido:
-                # El método dias_vencimiento devuelve un número negativo para días vencidos
-                dias_vencidos = abs(registro.dias_vencimiento)
-
-            # --- LÓGICA CORREGIDA ---
-            # El día 0 es la fecha de entrega al cliente
-            fecha_inicio = registro.fecha_entrega_cliente
-            pagos_del_cliente = registro.obtener_pagos_cliente()
-            rangos_cobros = clasificar_cobros_por_antiguedad(pagos_del_cliente, fecha_inicio)
-            
-            cxc_item = {
-                'registro_id': registro.id,
-                'cliente_nombre': registro.cliente.nombre if registro.cliente else "N/A",
-                'fecha_entrega': fecha_inicio.isoformat() if fecha_inicio else None,
-                'fecha_vencimiento': registro.fecha_limite_cobro.isoformat() if registro.fecha_limite_cobro else None,
-                'dias_vencidos': dias_vencidos,
-                'esta_vencido': registro.esta_vencido,
-                'valor_original': float(valor_original),
-                'saldo_pendiente': float(saldo_pendiente),
-                'total_cobrado': float(total_cobrado),
-                'estado_cobro': registro.get_estado_cobro_display(),
-                **rangos_cobros # Desempacar el diccionario de cobros clasificados
-            }
-            cxc_data.append(cxc_item)
+            resumen['total_facturado'] += registro.valor_cobrar_cliente
+            resumen['total_saldo_pendiente'] += registro.saldo_pendiente
+            resumen['total_cobrado'] += registro.total_cobrado
+            cxc_data.append(serializar_registro_cxc(registro))
             
         response_data = {
             'success': True,
@@ -1896,3 +2063,110 @@ def cuentas_por_cobrar_api(request):
         
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+# ==================== EXPORTACIÓN XLSX ====================
+
+# Filas leídas de la base de datos por lote al exportar
+LOTE_EXPORTACION = 2000
+
+COLUMNAS_CXC = [
+    columna('Estado', 'estado_cobro', ancho=16),
+    columna('Cliente', 'cliente_nombre', ancho=30),
+    columna('Documento', 'registro_id'),
+    columna('Fecha Entrega (Día 0)', 'fecha_entrega', 'fecha'),
+    columna('Fecha Vencimiento', 'fecha_vencimiento', 'fecha'),
+    columna('Días Venc.', 'dias_vencidos', 'entero', 10),
+    columna('Valor Original', 'valor_original', 'moneda', 16),
+    columna('Saldo Pendiente', 'saldo_pendiente', 'moneda', 16),
+    columna('Total Cobrado', 'total_cobrado', 'moneda', 16),
+    columna('Cobros 0-30d', 'cobros_0_30', 'moneda'),
+    columna('Cobros 31-60d', 'cobros_31_60', 'moneda'),
+    columna('Cobros 61-90d', 'cobros_61_90', 'moneda'),
+    columna('Cobros 91-120d', 'cobros_91_120', 'moneda'),
+    columna('Cobros +120d', 'cobros_120_plus', 'moneda'),
+]
+
+COLUMNAS_CXP = [
+    columna('Proveedor', 'vendorName', ancho=30),
+    columna('Documento', 'documentNumber', ancho=18),
+    columna('Fecha Inicio (Día 0)', 'postingDate', 'fecha'),
+    columna('Fecha Vencimiento', 'netDueDate', 'fecha'),
+    columna('Días Venc.', 'overdueDays', 'entero', 10),
+    columna('Valor Original', 'originalAmount', 'moneda', 16),
+    columna('Saldo Pendiente', 'netBalance', 'moneda', 16),
+    columna('Pagado', 'paidAmount', 'moneda', 16),
+    columna('Pagos 0-30d', 'pagos_0_30', 'moneda'),
+    columna('Pagos 31-60d', 'pagos_31_60', 'moneda'),
+    columna('Pagos 61-90d', 'pagos_61_90', 'moneda'),
+    columna('Pagos 91-120d', 'pagos_91_120', 'moneda'),
+    columna('Pagos +120d', 'pagos_120_plus', 'moneda'),
+    columna('Descripción', 'description', ancho=40),
+]
+
+def _respuesta_xlsx(archivo, nombre):
+    return FileResponse(
+        archivo, as_attachment=True, content_type=CONTENT_TYPE_XLSX,
+        filename=f"{nombre}_{date.today().isoformat()}.xlsx",
+    )
+
+def _items_cxp(obligaciones, hoy):
+    """Serializa las obligaciones por lotes, con los pagos de cada lote en una consulta"""
+    iterador = obligaciones.iterator(chunk_size=LOTE_EXPORTACION)
+    while True:
+        lote = list(islice(iterador, LOTE_EXPORTACION))
+        if not lote:
+            return
+        pagos = pagos_por_obligacion(lote)
+        for obligacion in lote:
+            yield serializar_obligacion_cxp(obligacion, pagos.get(obligacion.pk, []), hoy)
+
+@require_http_methods(["GET"])
+def exportar_cxc_xlsx(request):
+    """Reporte de antigüedad de Cuentas por Cobrar en XLSX, con los filtros de la API"""
+    hoy = date.today()
+    registros = registros_cxc_filtrados(request.GET, hoy).iterator(chunk_size=LOTE_EXPORTACION)
+    archivo = libro_xlsx(
+        'Cuentas por Cobrar', COLUMNAS_CXC, (serializar_registro_cxc(r) for r in registros),
+        titulo=f"Cuentas por Cobrar al {hoy.isoformat()}",
+    )
+    return _respuesta_xlsx(archivo, 'cuentas_por_cobrar')
+
+@require_http_methods(["GET"])
+def exportar_cxp_xlsx(request):
+    """
+    Reporte de antigüedad de Cuentas por Pagar en XLSX con los mismos filtros y
+    orden de cuentas_por_pagar_api (sin paginación).
+    """
+    hoy = date.today()
+    obligaciones = obligaciones_cxp_filtradas(request.GET, hoy)
+    archivo = libro_xlsx(
+        'Cuentas por Pagar', COLUMNAS_CXP, _items_cxp(obligaciones, hoy),
+        titulo=f"Cuentas por Pagar al {hoy.isoformat()}",
+    )
+    return _respuesta_xlsx(archivo, 'cuentas_por_pagar')
+
+
+# ==================== PERFILADO ====================
+
+@staff_member_required
+@require_http_methods(["GET", "DELETE"])
+def api_perfilado(request):
+    """
+    Reporte de perfilado por vista (solo staff): p50/p95/p99 de tiempo, consultas,
+    tiempo en base de datos y bytes. ?orden= elige la métrica; DELETE reinicia.
+    """
+    if request.method == 'DELETE':
+        perfilado.reiniciar()
+        return JsonResponse({'success': True})
+    try:
+        vistas = perfilado.reporte(orden=request.GET.get('orden', 'tiempo_ms'))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return JsonResponse({
+        'success': True,
+        'activo': getattr(settings, 'PERFILADO_ACTIVO', False),
+        'vistas': vistas,
+        'fecha_reporte': timezone.now().isoformat(),
+    })
+